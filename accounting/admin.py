@@ -6,7 +6,20 @@ from django.http import HttpResponseRedirect
 from django.utils import timezone
 from django.db import models
 from datetime import timedelta
-from .models_invoice import Invoice, InvoiceLine, Payment, OwnerReceipt
+from .models_invoice import (
+    Invoice,
+    InvoiceLine,
+    Payment,
+    OwnerReceipt,
+    BulkEmailJob,
+    BulkEmailJobItem,
+    OwnerReceiptBatchJob,
+    OwnerReceiptBatchItem,
+    AgingSnapshot,
+    AccountingPeriod,
+    PeriodClosingBalance,
+)
+from .models_sequence import DocumentSequence
 
 
 class ReceiptDateFilter(admin.SimpleListFilter):
@@ -78,8 +91,8 @@ class ReceiptStatusFilter(admin.SimpleListFilter):
 
 
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ("invoice", "date", "amount", "method")
-    search_fields = ("invoice__number", "method")
+    list_display = ("invoice", "date", "amount", "method", "reference")
+    search_fields = ("invoice__number", "method", "reference")
     list_filter = ("date",)
 
 
@@ -93,7 +106,57 @@ class InvoiceAdmin(admin.ModelAdmin):
     search_fields = ("number", "customer__full_name", "description")
     list_filter = ("status",)
     inlines = [InvoiceLineInline]
-    readonly_fields = ("total_amount",)
+    readonly_fields = ("total_amount", "paid_amount", "balance")
+
+
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ("series", "year", "last_value", "updated_at")
+    list_filter = ("series", "year")
+    readonly_fields = ("updated_at",)
+
+
+class BulkEmailJobItemInline(admin.TabularInline):
+    model = BulkEmailJobItem
+    extra = 0
+    fields = ("invoice", "email", "status", "error_message", "processed_at")
+    readonly_fields = fields
+    can_delete = False
+
+
+class BulkEmailJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "requested_by", "status", "total_count", "sent_count",
+        "error_count", "skipped_count", "created_at", "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = (
+        "requested_by", "status", "celery_task_id", "total_count", "processed_count",
+        "sent_count", "error_count", "skipped_count", "started_at", "finished_at",
+        "error_message",
+    )
+    inlines = [BulkEmailJobItemInline]
+
+
+class OwnerReceiptBatchItemInline(admin.TabularInline):
+    model = OwnerReceiptBatchItem
+    extra = 0
+    fields = ("invoice", "agent", "receipt", "status", "error_message", "processed_at")
+    readonly_fields = fields
+    can_delete = False
+
+
+class OwnerReceiptBatchJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "period", "agent", "requested_by", "status", "total_count",
+        "generated_count", "sent_count", "error_count", "skipped_count", "finished_at",
+    )
+    list_filter = ("status", "period")
+    readonly_fields = (
+        "requested_by", "period", "agent", "send_email", "status", "celery_task_id",
+        "total_count", "processed_count", "generated_count", "sent_count", "error_count",
+        "skipped_count", "started_at", "finished_at", "error_message",
+    )
+    inlines = [OwnerReceiptBatchItemInline]
 
 
 class InvoiceLineAdmin(admin.ModelAdmin):
@@ -442,7 +505,48 @@ class OwnerReceiptAdmin(admin.ModelAdmin):
         return super().changelist_view(request, extra_context)
 
 
+class AgingSnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        "snapshot_date", "dimension", "label", "current", "days_1_30", "days_31_60",
+        "days_61_90", "days_over_90", "total", "invoice_count",
+    )
+    list_filter = ("dimension", "snapshot_date")
+    search_fields = ("label",)
+    date_hierarchy = "snapshot_date"
+
+
+
+class PeriodClosingBalanceInline(admin.TabularInline):
+    model = PeriodClosingBalance
+    extra = 0
+    can_delete = False
+    fields = (
+        "dimension", "object_id", "invoiced", "paid", "balance",
+        "collected", "collected_count", "period_collected",
+    )
+    readonly_fields = fields
+
+
+class AccountingPeriodAdmin(admin.ModelAdmin):
+    """Los períodos se cierran y reabren desde Contabilidad para respetar el orden."""
+
+    list_display = ("__str__", "period_start", "period_end", "closed_at", "closed_by")
+    readonly_fields = ("period_start", "period_end", "closed_at", "closed_by")
+    inlines = [PeriodClosingBalanceInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Invoice, InvoiceAdmin)
 admin.site.register(InvoiceLine, InvoiceLineAdmin)
 admin.site.register(Payment, PaymentAdmin)
 admin.site.register(OwnerReceipt, OwnerReceiptAdmin)
+admin.site.register(DocumentSequence, DocumentSequenceAdmin)
+admin.site.register(BulkEmailJob, BulkEmailJobAdmin)
+admin.site.register(OwnerReceiptBatchJob, OwnerReceiptBatchJobAdmin)
+admin.site.register(AgingSnapshot, AgingSnapshotAdmin)
+admin.site.register(AccountingPeriod, AccountingPeriodAdmin)
@@ -3,12 +3,14 @@
 Management command to assign numbers to invoices that don't have one assigned.
 
 This command identifies invoices without a number and assigns them a sequential
-number following the format INV-YEAR-XXX.
+number following the format INV-YEAR-XXX. Numbers are reserved as a single
+block from the invoice DocumentSequence instead of scanning existing invoices.
 """
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from accounting.models_invoice import Invoice
+from accounting.models_sequence import DocumentSequence
 from django.utils import timezone
 
 
@@ -58,50 +60,30 @@ class Command(BaseCommand):
         
         self.stdout.write(f'Found {count} invoices without numbers')
         
-        # Find the highest existing number for the year
-        year_prefix = f'INV-{year}-'
-        existing_invoices = Invoice.objects.filter(
-            number__startswith=year_prefix
-        ).order_by('number')
-        
-        if existing_invoices.exists():
-            # Extract the highest number
-            highest_number = 0
-            for invoice in existing_invoices:
-                try:
-                    number_part = invoice.number.split('-')[-1]
-                    number = int(number_part)
-                    if number > highest_number:
-                        highest_number = number
-                except (ValueError, IndexError):
-                    continue
-        else:
-            highest_number = 0
-        
-        self.stdout.write(f'Starting from number: {highest_number + 1}')
+        series = DocumentSequence.SERIES_INVOICE
         
         if not dry_run:
             with transaction.atomic():
-                for i, invoice in enumerate(invoices_without_number):
-                    new_number = highest_number + i + 1
-                    formatted_number = f'INV-{year}-{new_number:03d}'
-                    
-                    # Check if this number already exists
-                    while Invoice.objects.filter(number=formatted_number).exists():
-                        new_number += 1
-                        formatted_number = f'INV-{year}-{new_number:03d}'
-                    
+                invoices = list(invoices_without_number.order_by('date', 'pk'))
+                # Reserve the whole block at once; rolled back with the transaction
+                numbers = DocumentSequence.allocate(series, count=len(invoices), year=year)
+                
+                self.stdout.write(f'Starting from number: {numbers[0]}')
+                
+                for invoice, formatted_number in zip(invoices, numbers):
                     invoice.number = formatted_number
-                    invoice.save(update_fields=['number'])
-                    
                     self.stdout.write(
                         f'  Invoice ID {invoice.pk} -> {formatted_number}'
                     )
+                
+                Invoice.objects.bulk_update(invoices, ['number'], batch_size=500)
         else:
             # Dry run - just show what would be done
-            for i, invoice in enumerate(invoices_without_number):
-                new_number = highest_number + i + 1
-                formatted_number = f'INV-{year}-{new_number:03d}'
+            next_value = DocumentSequence.peek(series, year)
+            self.stdout.write(f'Starting from number: {next_value}')
+            
+            for i, invoice in enumerate(invoices_without_number.order_by('date', 'pk')):
+                formatted_number = DocumentSequence.format_number(series, year, next_value + i)
                 
                 self.stdout.write(
                     f'  Invoice ID {invoice.pk} -> {formatted_number} (DRY RUN)'
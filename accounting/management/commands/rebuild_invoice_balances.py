@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Management command to rebuild the stored paid amount and balance of invoices.
+
+Invoice.paid_amount and Invoice.balance are maintained incrementally by
+Payment.save() and Payment.delete(). This command recomputes them from the
+payment history, e.g. after bulk imports or manual database fixes.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+from accounting.models_invoice import Invoice, Payment
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored paid amount and balance of invoices from payment history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many invoices are out of sync without making changes',
+        )
+        parser.add_argument(
+            '--invoice',
+            type=int,
+            action='append',
+            dest='invoice_ids',
+            help='Only rebuild the given invoice ID (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        invoices = Invoice.objects.all()
+        if options['invoice_ids']:
+            invoices = invoices.filter(pk__in=options['invoice_ids'])
+
+        out_of_sync = self._out_of_sync(invoices).count()
+        self.stdout.write(f'Found {out_of_sync} invoices with stale balances')
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('DRY RUN completed. No changes were made.')
+            )
+            return
+
+        with transaction.atomic():
+            updated = Invoice.rebuild_stored_balances(invoices)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt balances of {updated} invoices')
+        )
+
+    def _out_of_sync(self, invoices):
+        amount_field = DecimalField(max_digits=14, decimal_places=2)
+        paid = (
+            Payment.objects.filter(invoice=OuterRef('pk'))
+            .order_by()
+            .values('invoice')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+        return (
+            invoices.order_by()
+            .annotate(
+                actual_paid=Coalesce(
+                    Subquery(paid, output_field=amount_field),
+                    Value(Decimal('0')),
+                    output_field=amount_field,
+                )
+            )
+            .exclude(paid_amount=F('actual_paid'), balance=F('total_amount') - F('actual_paid'))
+        )
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:15
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_invoice_balances(apps, schema_editor):
+    Invoice = apps.get_model('accounting', 'Invoice')
+    Payment = apps.get_model('accounting', 'Payment')
+    paid = (
+        Payment.objects.filter(invoice=OuterRef('pk'))
+        .order_by()
+        .values('invoice')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Invoice.objects.update(
+        paid_amount=Coalesce(
+            Subquery(paid, output_field=DecimalField(max_digits=14, decimal_places=2)),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+    Invoice.objects.update(balance=F('total_amount') - F('paid_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0012_allow_blank_receipt_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='balance',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=14, verbose_name='Saldo Pendiente'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto Pagado'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'due_date', 'balance'], name='invoice_status_due_balance_idx'),
+        ),
+        migrations.RunPython(backfill_invoice_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0013_invoice_paid_amount_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('series', models.CharField(max_length=20, verbose_name='Serie')),
+                ('year', models.PositiveIntegerField(verbose_name='Año')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Numeración',
+                'verbose_name_plural': 'Secuencias de Numeración',
+                'ordering': ['series', '-year'],
+                'unique_together': {('series', 'year')},
+            },
+        ),
+    ]
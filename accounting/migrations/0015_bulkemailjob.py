@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0014_documentsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkEmailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=16, verbose_name='Estado')),
+                ('celery_task_id', models.CharField(blank=True, max_length=255, verbose_name='ID de Tarea')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('processed_count', models.PositiveIntegerField(default=0, verbose_name='Procesadas')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Enviadas')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Omitidas')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('error_message', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Envío Masivo de Facturas',
+                'verbose_name_plural': 'Envíos Masivos de Facturas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BulkEmailJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviada'), ('failed', 'Error'), ('skipped', 'Omitida')], default='pending', max_length=16, verbose_name='Estado')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+                ('error_message', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesada')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bulk_email_items', to='accounting.invoice', verbose_name='Factura')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='accounting.bulkemailjob', verbose_name='Envío Masivo')),
+            ],
+            options={
+                'verbose_name': 'Factura de Envío Masivo',
+                'verbose_name_plural': 'Facturas de Envío Masivo',
+                'indexes': [models.Index(fields=['job', 'status'], name='accounting__job_id_9fd833_idx')],
+                'unique_together': {('job', 'invoice')},
+            },
+        ),
+    ]
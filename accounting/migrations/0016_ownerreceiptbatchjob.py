@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0015_bulkemailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerReceiptBatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('period', models.DateField(verbose_name='Período')),
+                ('send_email', models.BooleanField(default=True, verbose_name='Enviar por Email')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=16, verbose_name='Estado')),
+                ('celery_task_id', models.CharField(blank=True, max_length=255, verbose_name='ID de Tarea')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('processed_count', models.PositiveIntegerField(default=0, verbose_name='Procesadas')),
+                ('generated_count', models.PositiveIntegerField(default=0, verbose_name='Generados')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Enviados')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Omitidas')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('error_message', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('agent', models.ForeignKey(blank=True, help_text='Si se indica, solo se procesan los contratos de este agente', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Agente')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owner_receipt_batch_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Generación Masiva de Comprobantes',
+                'verbose_name_plural': 'Generaciones Masivas de Comprobantes',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OwnerReceiptBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('generated', 'Generado'), ('sent', 'Enviado'), ('done', 'Generado sin envío'), ('failed', 'Error'), ('skipped', 'Omitida')], default='pending', max_length=16, verbose_name='Estado')),
+                ('error_message', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesada')),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Agente')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owner_receipt_batch_items', to='accounting.invoice', verbose_name='Factura')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='accounting.ownerreceiptbatchjob', verbose_name='Generación Masiva')),
+                ('receipt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounting.ownerreceipt', verbose_name='Comprobante')),
+            ],
+            options={
+                'verbose_name': 'Factura de Generación Masiva',
+                'verbose_name_plural': 'Facturas de Generación Masiva',
+                'indexes': [models.Index(fields=['job', 'status'], name='accounting__job_id_0aadae_idx')],
+                'unique_together': {('job', 'invoice')},
+            },
+        ),
+    ]
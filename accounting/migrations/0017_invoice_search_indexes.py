@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:42
+
+from django.db import migrations, models
+
+
+# Índices trigram (pg_trgm) para las búsquedas icontains del listado de facturas.
+# Django traduce icontains a UPPER(columna::text) LIKE UPPER(%s), por eso los
+# índices son de expresión sobre UPPER(). Solo existen en PostgreSQL.
+TRIGRAM_INDEXES = [
+    ('invoice_number_trgm_idx', 'accounting_invoice', 'number'),
+    ('customer_first_name_trgm_idx', 'customers_customer', 'first_name'),
+    ('customer_last_name_trgm_idx', 'customers_customer', 'last_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('accounting', '0016_ownerreceiptbatchjob'),
+        ('customers', '0002_alter_customer_country_alter_customer_locality_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['date', 'id'], name='invoice_date_id_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
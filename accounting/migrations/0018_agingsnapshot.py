@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0017_invoice_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('snapshot_date', models.DateField(verbose_name='Fecha')),
+                ('dimension', models.CharField(choices=[('customer', 'Cliente'), ('agent', 'Agente'), ('property', 'Propiedad')], max_length=16, verbose_name='Agrupación')),
+                ('object_id', models.PositiveIntegerField(blank=True, help_text='Cliente, agente o propiedad; vacío para las facturas sin agente o propiedad', null=True, verbose_name='ID')),
+                ('label', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('current', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Por Vencer')),
+                ('days_1_30', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='0-30 Días')),
+                ('days_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='31-60 Días')),
+                ('days_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='61-90 Días')),
+                ('days_over_90', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Más de 90 Días')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('invoice_count', models.PositiveIntegerField(default=0, verbose_name='Facturas')),
+            ],
+            options={
+                'verbose_name': 'Antigüedad de Saldos',
+                'verbose_name_plural': 'Antigüedad de Saldos',
+                'ordering': ['-snapshot_date', 'dimension', '-total'],
+                'indexes': [models.Index(fields=['snapshot_date', 'dimension'], name='accounting__snapsho_98dbd4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0018_agingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoiceline',
+            name='accrued_until',
+            field=models.DateField(blank=True, null=True, verbose_name='Interés devengado hasta'),
+        ),
+        migrations.AddField(
+            model_name='invoiceline',
+            name='is_late_fee',
+            field=models.BooleanField(default=False, verbose_name='Interés por mora'),
+        ),
+        migrations.AddConstraint(
+            model_name='invoiceline',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_late_fee', True)), fields=('invoice',), name='unique_late_fee_line_per_invoice'),
+        ),
+    ]
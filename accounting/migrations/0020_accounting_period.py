@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounting', '0019_invoiceline_late_fee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountingPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('period_start', models.DateField(unique=True, verbose_name='Inicio')),
+                ('period_end', models.DateField(unique=True, verbose_name='Fin')),
+                ('closed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Cierre')),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_accounting_periods', to=settings.AUTH_USER_MODEL, verbose_name='Cerrado por')),
+            ],
+            options={
+                'verbose_name': 'Período Contable',
+                'verbose_name_plural': 'Períodos Contables',
+                'ordering': ['-period_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodClosingBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dimension', models.CharField(choices=[('customer', 'Cliente'), ('contract', 'Contrato'), ('agent', 'Agente')], max_length=16, verbose_name='Agrupación')),
+                ('object_id', models.PositiveIntegerField(blank=True, help_text='Cliente, contrato o agente; vacío para los movimientos sin contrato o agente', null=True, verbose_name='ID')),
+                ('invoiced', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Facturado')),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Pagado')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Saldo')),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cobros de Contratos')),
+                ('collected_count', models.PositiveIntegerField(default=0, verbose_name='Cantidad de Cobros')),
+                ('period_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Cobros del Mes')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='accounting.accountingperiod', verbose_name='Período')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Cierre',
+                'verbose_name_plural': 'Saldos de Cierre',
+                'ordering': ['period', 'dimension', 'object_id'],
+                'indexes': [models.Index(fields=['period', 'dimension', 'object_id'], name='accounting__period__7ae2aa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:52
+
+import re
+
+from django.db import migrations, models
+
+# Las importaciones anteriores guardaban la referencia al final de las notas
+IMPORTED_REFERENCE = re.compile(r'\(Ref\. ([^()]+)\)$')
+
+
+def backfill_payment_references(apps, schema_editor):
+    Payment = apps.get_model('accounting', 'Payment')
+    payments = []
+    for payment in Payment.objects.filter(notes__endswith=')', notes__contains='(Ref. ').only('id', 'notes'):
+        match = IMPORTED_REFERENCE.search(payment.notes)
+        if match:
+            payment.reference = match.group(1)[:100]
+            payments.append(payment)
+    Payment.objects.bulk_update(payments, ['reference'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0020_accounting_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='reference',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Referencia'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['invoice', 'reference'], name='payment_invoice_reference_idx'),
+        ),
+        migrations.RunPython(backfill_payment_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0021_payment_reference'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agingsnapshot',
+            name='days_1_30',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='1-30 Días'),
+        ),
+    ]
@@ -1,12 +1,15 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
-from core.models import BaseModel
+from core.models import BaseModel, FieldTrackerMixin
 from customers.models import Customer
+from accounting.models_sequence import DocumentSequence
 from decimal import Decimal
 import uuid
 
 
-class Invoice(BaseModel):
+class Invoice(FieldTrackerMixin, BaseModel):
     """
     Modelo que representa una factura en el sistema.
 
@@ -40,24 +43,240 @@ class Invoice(BaseModel):
     total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0.0)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="draft")
 
+    # Totales desnormalizados, mantenidos por Payment.save() y las señales de borrado de pagos
+    paid_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Monto Pagado"
+    )
+    balance = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, db_index=True, verbose_name="Saldo Pendiente"
+    )
+
+    # Valores originales disponibles en las señales sin releer la fila
+    tracked_fields = ("status", "date", "total_amount", "customer", "contract")
+
+    # Campos y estados que forman parte de los saldos de cierre de un período
+    PERIOD_BALANCE_FIELDS = ("date", "total_amount", "customer", "contract")
+    PERIOD_EXCLUDED_STATUSES = ("draft", "cancelled")
+
     class Meta:
         verbose_name = "Factura"
         verbose_name_plural = "Facturas"
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["status", "due_date", "balance"], name="invoice_status_due_balance_idx"),
+            # Paginación por clave del listado: ORDER BY date DESC, id DESC
+            models.Index(fields=["date", "id"], name="invoice_date_id_idx"),
+        ]
 
     def __str__(self):
         return f"Factura Nº{self.number} - {self.customer}"
 
+    def save(self, *args, **kwargs):
+        """
+        Guarda la factura manteniendo el saldo coherente con el total y lo pagado.
+
+        ``paid_amount`` lo mantienen los pagos con expresiones F, así que la
+        instancia puede tenerlo desactualizado. Cuando el guardado escribe los
+        totales de una factura existente, se relee el monto pagado bloqueando
+        la fila antes de recalcular el saldo, para no pisar pagos registrados
+        desde otra instancia.
+
+        Raises:
+            ValidationError: Si el cambio altera los saldos de un período cerrado
+        """
+        self.check_period_lock()
+        update_fields = kwargs.get("update_fields")
+        writes_totals = update_fields is None or {"total_amount", "paid_amount"} & set(update_fields)
+        if not writes_totals:
+            super().save(*args, **kwargs)
+            return
+
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"paid_amount", "balance"}
+        with transaction.atomic():
+            if not self._state.adding:
+                stored_paid = (
+                    Invoice.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("paid_amount", flat=True)
+                    .first()
+                )
+                if stored_paid is not None:
+                    self.paid_amount = stored_paid
+            self.balance = Decimal(str(self.total_amount or 0)) - Decimal(str(self.paid_amount or 0))
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """
+        Elimina la factura si su fecha no pertenece a un período cerrado.
+
+        Raises:
+            ValidationError: Si la factura tiene fecha en un período cerrado
+        """
+        AccountingPeriod.check_open(self.date, subject=f"la factura {self.number}")
+        return super().delete(*args, **kwargs)
+
+    def clean(self):
+        super().clean()
+        self.check_period_lock()
+
+    def check_period_lock(self):
+        """
+        Impide crear la factura o cambiar sus importes en un mes cerrado.
+
+        Los cambios de estado entre validada, enviada y pagada no alteran los
+        saldos de cierre y se permiten siempre.
+
+        Raises:
+            ValidationError: Si la factura (antes o después del cambio) tiene
+            fecha en un período cerrado
+        """
+        subject = f"la factura {self.number}"
+        if self._state.adding:
+            AccountingPeriod.check_open(self.date, subject=subject)
+            return
+
+        changed = self.changed_fields()
+        status_change = set(changed.get("status", ()))
+        if set(self.PERIOD_BALANCE_FIELDS) & changed.keys() or status_change & set(self.PERIOD_EXCLUDED_STATUSES):
+            AccountingPeriod.check_open(self.previous_value("date"), self.date, subject=subject)
+
     def get_balance(self):
         """
-        Calcula el saldo pendiente de la factura.
+        Devuelve el saldo pendiente de la factura.
+
+        Returns:
+            Decimal: La diferencia entre el monto total de la factura y la suma de todos los pagos realizados,
+            leída de la columna almacenada ``balance``.
+        """
+        return self.balance
+
+    def calculate_balance(self):
+        """
+        Calcula el saldo pendiente a partir del historial de pagos.
+
+        Se usa para verificar o reconstruir la columna ``balance``.
 
         Returns:
-            Decimal: La diferencia entre el monto total de la factura y la suma de todos los pagos realizados.
+            Decimal: La diferencia entre el monto total y la suma de los pagos registrados.
         """
         paid_amount = self.payments.aggregate(total=models.Sum("amount"))["total"] or 0
         return self.total_amount - paid_amount
 
+    def apply_payment_delta(self, delta):
+        """
+        Suma ``delta`` al monto pagado y lo resta del saldo de forma atómica.
+
+        La actualización se hace con expresiones F en la base de datos para que
+        pagos concurrentes sobre la misma factura no se pisen entre sí, y luego
+        se refrescan los valores en la instancia.
+
+        Args:
+            delta (Decimal): Importe a sumar (negativo para revertir un pago)
+        """
+        if not delta:
+            return
+        Invoice.objects.filter(pk=self.pk).update(
+            paid_amount=F("paid_amount") + delta,
+            balance=F("balance") - delta,
+        )
+        self.refresh_from_db(fields=["paid_amount", "balance"])
+
+    @classmethod
+    def rebuild_stored_balances(cls, queryset=None):
+        """
+        Recalcula ``paid_amount`` y ``balance`` desde el historial de pagos.
+
+        Se ejecuta con dos UPDATE basados en conjuntos, sin cargar las facturas
+        en memoria.
+
+        Args:
+            queryset (QuerySet, optional): Facturas a recalcular (todas por defecto)
+
+        Returns:
+            int: Cantidad de facturas actualizadas
+        """
+        from django.db.models import OuterRef, Subquery, Sum, Value
+        from django.db.models.functions import Coalesce
+
+        if queryset is None:
+            queryset = cls.objects.all()
+        amount_field = models.DecimalField(max_digits=14, decimal_places=2)
+        paid = (
+            Payment.objects.filter(invoice=OuterRef("pk"))
+            .order_by()
+            .values("invoice")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        updated = queryset.order_by().update(
+            paid_amount=Coalesce(
+                Subquery(paid, output_field=amount_field),
+                Value(Decimal("0")),
+                output_field=amount_field,
+            )
+        )
+        queryset.order_by().update(balance=F("total_amount") - F("paid_amount"))
+
+        # Los UPDATE no disparan señales: descartar los indicadores cacheados
+        from accounting.service_modules.dashboard_service import invalidate_dashboard_kpis
+        invalidate_dashboard_kpis()
+        return updated
+
+    @classmethod
+    def settle_from_payments(cls, queryset):
+        """
+        Recalcula totales pagados, saldos y estados desde el historial de pagos.
+
+        Aplica en un único UPDATE la misma regla que ``update_status()``: saldo
+        cero o negativo pasa a pagada y una factura pagada con saldo vuelve a
+        enviada. Se usa después de insertar pagos en bloque, que no pasan por
+        ``Payment.save()`` ni disparan señales.
+
+        Args:
+            queryset (QuerySet): Facturas a recalcular
+
+        Returns:
+            int: Cantidad de facturas actualizadas
+        """
+        from django.db.models import Case, OuterRef, Subquery, Sum, Value, When
+        from django.db.models.functions import Coalesce
+        from django.db.models.lookups import GreaterThan, LessThanOrEqual
+
+        amount_field = models.DecimalField(max_digits=14, decimal_places=2)
+        paid = Coalesce(
+            Subquery(
+                Payment.objects.filter(invoice=OuterRef("pk"))
+                .order_by()
+                .values("invoice")
+                .annotate(total=Sum("amount"))
+                .values("total"),
+                output_field=amount_field,
+            ),
+            Value(Decimal("0")),
+            output_field=amount_field,
+        )
+        balance = models.ExpressionWrapper(F("total_amount") - paid, output_field=amount_field)
+        # El UPDATE no dispara post_save: los PDFs de comprobantes muestran el estado de la factura
+        OwnerReceipt.objects.filter(invoice__in=queryset.order_by().values("pk")).exclude(
+            pdf_file_path=""
+        ).update(pdf_file_path="")
+        updated = queryset.order_by().update(
+            paid_amount=paid,
+            balance=balance,
+            status=Case(
+                When(LessThanOrEqual(balance, Decimal("0")), then=Value("paid")),
+                When(Q(status="paid") & GreaterThan(balance, Decimal("0")), then=Value("sent")),
+                default=F("status"),
+            ),
+            updated_at=timezone.now(),
+        )
+
+        # Los UPDATE no disparan señales: descartar los indicadores cacheados
+        from accounting.service_modules.dashboard_service import invalidate_dashboard_kpis
+        invalidate_dashboard_kpis()
+        return updated
+
     def update_status(self):
         """
         Actualiza el estado de la factura basándose en el saldo pendiente.
@@ -71,7 +290,8 @@ class Invoice(BaseModel):
             self.status = "paid"
         elif self.status == "paid" and balance > 0:
             self.status = "sent"  # o el estado que corresponda
-        self.save()
+        # Solo se guarda el estado para no pisar los totales mantenidos con F()
+        self.save(update_fields=["status", "updated_at"])
 
     def mark_as_sent(self):
         """
@@ -106,7 +326,8 @@ class Invoice(BaseModel):
         
         return cls.objects.filter(
             due_date__lt=today,
-            status__in=['validated', 'sent']  # Exclude draft, paid, and cancelled
+            status__in=['validated', 'sent'],  # Exclude draft, paid, and cancelled
+            balance__gt=0
         ).select_related('customer', 'contract__agent')
 
     @classmethod
@@ -118,7 +339,7 @@ class Invoice(BaseModel):
             days_threshold (int): Number of days to look ahead for due invoices
             
         Returns:
-            QuerySet: Invoices due within the threshold
+            QuerySet: Invoices due within the threshold with outstanding balances
         """
         from django.utils import timezone
         today = timezone.now().date()
@@ -127,7 +348,8 @@ class Invoice(BaseModel):
         return cls.objects.filter(
             due_date__lte=threshold_date,
             due_date__gte=today,
-            status__in=['validated', 'sent']  # Exclude draft, paid, and cancelled
+            status__in=['validated', 'sent'],  # Exclude draft, paid, and cancelled
+            balance__gt=0
         ).select_related('customer', 'contract__agent')
 
     def days_until_due(self):
@@ -248,10 +470,22 @@ class InvoiceLine(BaseModel):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="lines")
     concept = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=14, decimal_places=2)
+    is_late_fee = models.BooleanField(default=False, verbose_name="Interés por mora")
+    accrued_until = models.DateField(
+        null=True, blank=True, verbose_name="Interés devengado hasta"
+    )
 
     class Meta:
         verbose_name = "Línea de Factura"
         verbose_name_plural = "Líneas de Factura"
+        constraints = [
+            # Una sola línea de interés por mora por factura
+            models.UniqueConstraint(
+                fields=["invoice"],
+                condition=Q(is_late_fee=True),
+                name="unique_late_fee_line_per_invoice",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.concept} ({self.amount})"
@@ -272,17 +506,58 @@ class Payment(BaseModel):
     amount = models.DecimalField(max_digits=14, decimal_places=2)
     method = models.CharField(max_length=100)
     notes = models.TextField(blank=True)
+    # Identificador del movimiento bancario (FITID del OFX o referencia del CSV)
+    reference = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
 
     class Meta:
         verbose_name = "Pago"
         verbose_name_plural = "Pagos"
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["invoice", "reference"], name="payment_invoice_reference_idx"),
+        ]
 
     def __str__(self):
         return f"Pago {self.amount} a Factura Nº{self.invoice.number}"
 
+    def clean(self):
+        super().clean()
+        AccountingPeriod.check_open(self.date, subject="el pago")
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda el pago y actualiza los totales almacenados de la factura.
+
+        Si el pago ya existía se bloquea su fila para conocer el importe y la
+        factura anteriores; la diferencia se aplica antes de guardar para que
+        las señales post_save ya vean el saldo actualizado.
+
+        Raises:
+            ValidationError: Si el pago (antes o después del cambio) tiene fecha
+            en un período cerrado
+        """
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    Payment.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("invoice_id", "amount", "date")
+                    .first()
+                )
+            AccountingPeriod.check_open(self.date, previous and previous["date"], subject="el pago")
+
+            if previous and previous["invoice_id"] != self.invoice_id:
+                Invoice(pk=previous["invoice_id"]).apply_payment_delta(-previous["amount"])
+                self.invoice.apply_payment_delta(Decimal(str(self.amount)))
+            else:
+                previous_amount = previous["amount"] if previous else Decimal("0")
+                self.invoice.apply_payment_delta(Decimal(str(self.amount)) - previous_amount)
+
+            super().save(*args, **kwargs)
 
-class OwnerReceipt(BaseModel):
+
+class OwnerReceipt(FieldTrackerMixin, BaseModel):
     """
     Modelo que registra los comprobantes generados para propietarios.
     
@@ -372,6 +647,9 @@ class OwnerReceipt(BaseModel):
         blank=True,
         verbose_name="Mensaje de Error"
     )
+
+    # Valores originales disponibles en las señales sin releer la fila
+    tracked_fields = ('status',)
     
     class Meta:
         verbose_name = "Comprobante de Propietario"
@@ -421,28 +699,13 @@ class OwnerReceipt(BaseModel):
         """
         Genera un número único de comprobante.
         
+        El número se reserva en la secuencia de la serie REC del año actual,
+        sin consultar los comprobantes existentes.
+        
         Returns:
             str: Número de comprobante único en formato REC-YYYY-NNNN
         """
-        current_year = timezone.now().year
-        prefix = f"REC-{current_year}-"
-        
-        # Get the last receipt number for this year
-        last_receipt = cls.objects.filter(
-            receipt_number__startswith=prefix
-        ).order_by('-receipt_number').first()
-        
-        if last_receipt:
-            # Extract the sequential number and increment
-            try:
-                last_number = int(last_receipt.receipt_number.split('-')[-1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-        
-        return f"{prefix}{next_number:04d}"
+        return DocumentSequence.allocate(DocumentSequence.SERIES_OWNER_RECEIPT)[0]
     
     def mark_as_sent(self, email_address=None):
         """
@@ -559,4 +822,421 @@ class OwnerReceipt(BaseModel):
             self.discount_amount = amounts['discount_amount']
             self.net_amount = amounts['net_amount']
         
+        # El PDF muestra el estado del comprobante: si cambia, se vuelve a generar
+        if self.pdf_file_path and self.has_field_changed('status'):
+            self.pdf_file_path = ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'pdf_file_path'}
+        
         super().save(*args, **kwargs)
+
+
+class BulkEmailJob(BaseModel):
+    """
+    Modelo que registra un envío masivo de facturas por correo electrónico.
+
+    El envío se procesa en segundo plano con Celery; el modelo guarda el avance
+    para que la lista de facturas pueda consultarlo mientras se ejecuta.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    requested_by = models.ForeignKey(
+        'agents.Agent',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Solicitado por"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    celery_task_id = models.CharField(max_length=255, blank=True, verbose_name="ID de Tarea")
+    total_count = models.PositiveIntegerField(default=0, verbose_name="Total")
+    processed_count = models.PositiveIntegerField(default=0, verbose_name="Procesadas")
+    sent_count = models.PositiveIntegerField(default=0, verbose_name="Enviadas")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Errores")
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name="Omitidas")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    error_message = models.TextField(blank=True, verbose_name="Mensaje de Error")
+
+    class Meta:
+        verbose_name = "Envío Masivo de Facturas"
+        verbose_name_plural = "Envíos Masivos de Facturas"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Envío masivo #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def progress_percentage(self):
+        """
+        Calcula el porcentaje de facturas procesadas.
+
+        Returns:
+            int: Porcentaje entre 0 y 100
+        """
+        if not self.total_count:
+            return 100 if self.is_finished else 0
+        return int(self.processed_count * 100 / self.total_count)
+
+
+class BulkEmailJobItem(BaseModel):
+    """
+    Modelo que registra el resultado del envío de una factura dentro de un envío masivo.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviada'),
+        ('failed', 'Error'),
+        ('skipped', 'Omitida'),
+    ]
+
+    job = models.ForeignKey(
+        BulkEmailJob,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name="Envío Masivo"
+    )
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        related_name='bulk_email_items',
+        verbose_name="Factura"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    email = models.EmailField(blank=True, verbose_name="Email")
+    error_message = models.TextField(blank=True, verbose_name="Mensaje de Error")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Procesada")
+
+    class Meta:
+        verbose_name = "Factura de Envío Masivo"
+        verbose_name_plural = "Facturas de Envío Masivo"
+        unique_together = ('job', 'invoice')
+        indexes = [
+            models.Index(fields=['job', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice.number} - {self.get_status_display()}"
+
+
+class OwnerReceiptBatchJob(BaseModel):
+    """
+    Modelo que registra la generación y envío masivo de comprobantes de un período.
+
+    Cada factura del período tiene un ítem con su estado; los ítems pendientes
+    funcionan como punto de control, así que un proceso reiniciado continúa
+    donde se detuvo.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    requested_by = models.ForeignKey(
+        'agents.Agent',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='owner_receipt_batch_jobs',
+        verbose_name="Solicitado por"
+    )
+    period = models.DateField(verbose_name="Período")
+    agent = models.ForeignKey(
+        'agents.Agent',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Agente",
+        help_text="Si se indica, solo se procesan los contratos de este agente"
+    )
+    send_email = models.BooleanField(default=True, verbose_name="Enviar por Email")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    celery_task_id = models.CharField(max_length=255, blank=True, verbose_name="ID de Tarea")
+    total_count = models.PositiveIntegerField(default=0, verbose_name="Total")
+    processed_count = models.PositiveIntegerField(default=0, verbose_name="Procesadas")
+    generated_count = models.PositiveIntegerField(default=0, verbose_name="Generados")
+    sent_count = models.PositiveIntegerField(default=0, verbose_name="Enviados")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Errores")
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name="Omitidas")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    error_message = models.TextField(blank=True, verbose_name="Mensaje de Error")
+
+    class Meta:
+        verbose_name = "Generación Masiva de Comprobantes"
+        verbose_name_plural = "Generaciones Masivas de Comprobantes"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Comprobantes {self.period:%m/%Y} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def progress_percentage(self):
+        """
+        Calcula el porcentaje de facturas procesadas.
+
+        Returns:
+            int: Porcentaje entre 0 y 100
+        """
+        if not self.total_count:
+            return 100 if self.is_finished else 0
+        return int(self.processed_count * 100 / self.total_count)
+
+    def agent_progress(self):
+        """
+        Resume el avance del proceso agrupado por agente.
+
+        Returns:
+            list: Diccionarios con el agente y la cantidad de ítems por estado
+        """
+        from django.db.models import Count, Q
+
+        return list(
+            self.items.order_by()
+            .values('agent_id', 'agent__first_name', 'agent__last_name')
+            .annotate(
+                total=Count('id'),
+                pending=Count('id', filter=Q(status__in=['pending', 'generated'])),
+                sent=Count('id', filter=Q(status='sent')),
+                done=Count('id', filter=Q(status='done')),
+                failed=Count('id', filter=Q(status='failed')),
+                skipped=Count('id', filter=Q(status='skipped')),
+            )
+            .order_by('agent__last_name', 'agent__first_name')
+        )
+
+
+class OwnerReceiptBatchItem(BaseModel):
+    """
+    Modelo que registra el estado de una factura dentro de una generación masiva.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('generated', 'Generado'),
+        ('sent', 'Enviado'),
+        ('done', 'Generado sin envío'),
+        ('failed', 'Error'),
+        ('skipped', 'Omitida'),
+    ]
+
+    job = models.ForeignKey(
+        OwnerReceiptBatchJob,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name="Generación Masiva"
+    )
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        related_name='owner_receipt_batch_items',
+        verbose_name="Factura"
+    )
+    agent = models.ForeignKey(
+        'agents.Agent',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Agente"
+    )
+    receipt = models.ForeignKey(
+        OwnerReceipt,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Comprobante"
+    )
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', verbose_name="Estado")
+    error_message = models.TextField(blank=True, verbose_name="Mensaje de Error")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Procesada")
+
+    class Meta:
+        verbose_name = "Factura de Generación Masiva"
+        verbose_name_plural = "Facturas de Generación Masiva"
+        unique_together = ('job', 'invoice')
+        indexes = [
+            models.Index(fields=['job', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice.number} - {self.get_status_display()}"
+
+
+class AgingSnapshot(BaseModel):
+    """
+    Modelo que guarda la antigüedad de saldos de un día, agrupada por cliente, agente o propiedad.
+
+    Se genera una vez por día con Celery para comparar la cartera entre fechas
+    sin recalcular sobre las facturas.
+    """
+
+    DIMENSION_CHOICES = [
+        ('customer', 'Cliente'),
+        ('agent', 'Agente'),
+        ('property', 'Propiedad'),
+    ]
+
+    snapshot_date = models.DateField(verbose_name="Fecha")
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES, verbose_name="Agrupación")
+    object_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="ID",
+        help_text="Cliente, agente o propiedad; vacío para las facturas sin agente o propiedad"
+    )
+    label = models.CharField(max_length=255, verbose_name="Nombre")
+    current = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Por Vencer")
+    days_1_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="1-30 Días")
+    days_31_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="31-60 Días")
+    days_61_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="61-90 Días")
+    days_over_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Más de 90 Días")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total")
+    invoice_count = models.PositiveIntegerField(default=0, verbose_name="Facturas")
+
+    class Meta:
+        verbose_name = "Antigüedad de Saldos"
+        verbose_name_plural = "Antigüedad de Saldos"
+        ordering = ['-snapshot_date', 'dimension', '-total']
+        indexes = [
+            models.Index(fields=['snapshot_date', 'dimension']),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_date:%d/%m/%Y} - {self.get_dimension_display()}: {self.label}"
+
+
+class AccountingPeriod(BaseModel):
+    """
+    Modelo que representa un mes contable cerrado.
+
+    Los meses se cierran en orden, así que todos los períodos cerrados forman
+    un bloque continuo que termina en la fecha de bloqueo: no se pueden crear
+    ni modificar facturas, pagos ni cobros de contratos con fecha hasta ese
+    día. Al cerrar un mes se guardan los saldos de cierre
+    (``PeriodClosingBalance``) desde los que parten los reportes.
+    """
+
+    period_start = models.DateField(unique=True, verbose_name="Inicio")
+    period_end = models.DateField(unique=True, verbose_name="Fin")
+    closed_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Cierre")
+    closed_by = models.ForeignKey(
+        'agents.Agent',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='closed_accounting_periods',
+        verbose_name="Cerrado por"
+    )
+
+    class Meta:
+        verbose_name = "Período Contable"
+        verbose_name_plural = "Períodos Contables"
+        ordering = ['-period_start']
+
+    def __str__(self):
+        return f"{self.period_start:%m/%Y}"
+
+    @classmethod
+    def get_lock_date(cls):
+        """
+        Devuelve el último día del último mes cerrado, o None si no hay cierres.
+
+        Se lee de la base en cada llamada (``period_end`` es único, así que el
+        MAX sale del índice): un valor cacheado por proceso dejaría a los demás
+        workers web y de Celery escribir en un mes recién cerrado.
+        """
+        return cls.objects.aggregate(last=models.Max('period_end'))['last']
+
+    @classmethod
+    def is_locked(cls, day):
+        """
+        Indica si ``day`` pertenece a un mes cerrado.
+        """
+        lock_date = cls.get_lock_date()
+        return bool(day and lock_date and day <= lock_date)
+
+    @classmethod
+    def check_open(cls, *days, subject="el registro"):
+        """
+        Verifica que ninguna de las fechas pertenezca a un mes cerrado.
+
+        Raises:
+            ValidationError: Si alguna fecha está en un período cerrado
+        """
+        lock_date = cls.get_lock_date()
+        if lock_date is None:
+            return
+        for day in days:
+            if day and day <= lock_date:
+                raise ValidationError(
+                    f"No se puede modificar {subject}: el período contable hasta el "
+                    f"{lock_date:%d/%m/%Y} está cerrado."
+                )
+
+
+class PeriodClosingBalance(BaseModel):
+    """
+    Modelo que guarda los saldos acumulados al cierre de un mes contable.
+
+    Hay una fila por cliente, contrato y agente con movimientos. Los importes
+    son acumulados desde el inicio del historial hasta el fin del período, de
+    modo que un reporte suma la fila del último cierre y solo recorre los
+    movimientos posteriores.
+    """
+
+    DIMENSION_CHOICES = [
+        ('customer', 'Cliente'),
+        ('contract', 'Contrato'),
+        ('agent', 'Agente'),
+    ]
+
+    period = models.ForeignKey(
+        AccountingPeriod, on_delete=models.CASCADE, related_name='balances', verbose_name="Período"
+    )
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES, verbose_name="Agrupación")
+    object_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="ID",
+        help_text="Cliente, contrato o agente; vacío para los movimientos sin contrato o agente"
+    )
+    invoiced = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Facturado")
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Pagado")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Saldo")
+    collected = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Cobros de Contratos"
+    )
+    collected_count = models.PositiveIntegerField(default=0, verbose_name="Cantidad de Cobros")
+    period_collected = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Cobros del Mes"
+    )
+
+    class Meta:
+        verbose_name = "Saldo de Cierre"
+        verbose_name_plural = "Saldos de Cierre"
+        ordering = ['period', 'dimension', 'object_id']
+        indexes = [
+            models.Index(fields=['period', 'dimension', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.period} - {self.get_dimension_display()} {self.object_id}: {self.balance}"
@@ -0,0 +1,195 @@
+from django.apps import apps
+from django.db import models, transaction
+from django.utils import timezone
+from core.models import BaseModel
+
+
+class DocumentSequence(BaseModel):
+    """
+    Modelo que lleva la numeración correlativa de los documentos por serie y año.
+
+    Cada combinación de serie (por ejemplo 'INV' o 'REC') y año tiene una única
+    fila con el último número asignado. Las reservas bloquean esa fila con
+    ``select_for_update``, por lo que asignar uno o muchos números cuesta una
+    sola lectura y una sola escritura, sin recorrer los documentos existentes.
+
+    Si la reserva se hace dentro de la transacción que guarda los documentos,
+    un rollback también deshace la reserva y no quedan huecos en la numeración.
+    """
+
+    SERIES_INVOICE = "INV"
+    SERIES_OWNER_RECEIPT = "REC"
+
+    # Formato de cada serie y campo del que se toma el valor inicial la
+    # primera vez que se usa una serie en un año
+    SERIES_CONFIG = {
+        SERIES_INVOICE: {
+            "format": "INV-{year}-{value:03d}",
+            "model": "accounting.Invoice",
+            "field": "number",
+        },
+        SERIES_OWNER_RECEIPT: {
+            "format": "REC-{year}-{value:04d}",
+            "model": "accounting.OwnerReceipt",
+            "field": "receipt_number",
+        },
+    }
+
+    series = models.CharField(max_length=20, verbose_name="Serie")
+    year = models.PositiveIntegerField(verbose_name="Año")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Último Número")
+
+    class Meta:
+        verbose_name = "Secuencia de Numeración"
+        verbose_name_plural = "Secuencias de Numeración"
+        unique_together = ("series", "year")
+        ordering = ["series", "-year"]
+
+    def __str__(self):
+        return f"{self.series} {self.year}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, series, count=1, year=None):
+        """
+        Reserva un bloque de números consecutivos de una serie.
+
+        Args:
+            series (str): Serie de numeración
+            count (int): Cantidad de números a reservar
+            year (int, optional): Año de la numeración (actual por defecto)
+
+        Returns:
+            range: Números reservados
+        """
+        if count < 1:
+            raise ValueError("La cantidad de números a reservar debe ser positiva")
+        year = year or timezone.now().year
+
+        with transaction.atomic():
+            sequence = cls._get_locked(series, year)
+            first_value = sequence.last_value + 1
+            sequence.last_value += count
+            sequence.save(update_fields=["last_value", "updated_at"])
+
+        return range(first_value, first_value + count)
+
+    @classmethod
+    def allocate(cls, series, count=1, year=None):
+        """
+        Reserva números y los devuelve formateados según la serie.
+
+        Args:
+            series (str): Serie de numeración
+            count (int): Cantidad de números a reservar
+            year (int, optional): Año de la numeración (actual por defecto)
+
+        Returns:
+            list: Números de documento formateados
+        """
+        year = year or timezone.now().year
+        return [cls.format_number(series, year, value) for value in cls.reserve(series, count, year)]
+
+    @classmethod
+    def release(cls, series, year, values):
+        """
+        Devuelve a la secuencia el final de un bloque reservado que no se usó.
+
+        Solo se devuelve si nadie reservó números después del bloque; en caso
+        contrario los números quedan como hueco y se informa con False.
+
+        Args:
+            series (str): Serie de numeración
+            year (int): Año de la numeración
+            values (range): Números sin usar, al final del bloque reservado
+
+        Returns:
+            bool: True si los números volvieron a estar disponibles
+        """
+        if not values:
+            return True
+        updated = cls.objects.filter(
+            series=series, year=year, last_value=values[-1]
+        ).update(last_value=values[0] - 1, updated_at=timezone.now())
+        return updated == 1
+
+    @classmethod
+    def peek(cls, series, year=None):
+        """
+        Devuelve el próximo número de la serie sin reservarlo.
+
+        Args:
+            series (str): Serie de numeración
+            year (int, optional): Año de la numeración (actual por defecto)
+
+        Returns:
+            int: Próximo número disponible
+        """
+        year = year or timezone.now().year
+        last_value = (
+            cls.objects.filter(series=series, year=year)
+            .values_list("last_value", flat=True)
+            .first()
+        )
+        if last_value is None:
+            last_value = cls._initial_value(series, year)
+        return last_value + 1
+
+    @classmethod
+    def format_number(cls, series, year, value):
+        """
+        Formatea un número de la serie.
+
+        Args:
+            series (str): Serie de numeración
+            year (int): Año de la numeración
+            value (int): Número correlativo
+
+        Returns:
+            str: Número de documento, por ejemplo INV-2024-001
+        """
+        number_format = cls.SERIES_CONFIG.get(series, {}).get("format", "{series}-{year}-{value}")
+        return number_format.format(series=series, year=year, value=value)
+
+    @classmethod
+    def _get_locked(cls, series, year):
+        """
+        Obtiene la fila de la serie bloqueada, creándola si no existe.
+        """
+        try:
+            return cls.objects.select_for_update().get(series=series, year=year)
+        except cls.DoesNotExist:
+            # get_or_create resuelve la carrera si dos procesos la crean a la vez
+            cls.objects.get_or_create(
+                series=series,
+                year=year,
+                defaults={"last_value": cls._initial_value(series, year)},
+            )
+            return cls.objects.select_for_update().get(series=series, year=year)
+
+    @classmethod
+    def _initial_value(cls, series, year):
+        """
+        Calcula el último número ya usado por documentos existentes.
+
+        Solo se ejecuta cuando una serie se usa por primera vez en un año, para
+        continuar la numeración asignada antes de existir la secuencia.
+        """
+        config = cls.SERIES_CONFIG.get(series)
+        if not config:
+            return 0
+
+        model = apps.get_model(config["model"])
+        field = config["field"]
+        prefix = cls.format_number(series, year, 0).rsplit("-", 1)[0] + "-"
+        highest = 0
+        numbers = (
+            model.objects.filter(**{f"{field}__startswith": prefix})
+            .order_by()
+            .values_list(field, flat=True)
+        )
+        for number in numbers.iterator():
+            try:
+                highest = max(highest, int(number[len(prefix):]))
+            except ValueError:
+                continue
+        return highest
@@ -0,0 +1,259 @@
+"""
+Antigüedad de saldos (aging) de cuentas por cobrar.
+
+Los saldos abiertos se reparten en tramos según los días de atraso (por
+vencer, 1-30, 31-60, 61-90 y más de 90) con una sola consulta: cada tramo es
+una suma condicional (``SUM(CASE WHEN ... THEN balance ELSE 0 END)``) y el
+``GROUP BY`` agrupa por cliente, agente o propiedad. Se usa la columna de saldo
+almacenada, sin recorrer facturas ni pagos en Python.
+
+Una tarea diaria guarda el resultado en ``AgingSnapshot`` para poder comparar
+la cartera entre fechas sin recalcular.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from accounting.models_invoice import AgingSnapshot, Invoice
+from accounting.service_modules.export_service import ExportColumn
+
+logger = logging.getLogger(__name__)
+
+
+OPEN_STATUSES = ('validated', 'sent')
+
+CENTS = Decimal('0.01')
+
+# (clave, título, días de atraso desde, días de atraso hasta); None = sin límite
+AGING_BUCKETS = [
+    ('current', 'Por vencer', None, 0),
+    ('days_1_30', '1-30 días', 1, 30),
+    ('days_31_60', '31-60 días', 31, 60),
+    ('days_61_90', '61-90 días', 61, 90),
+    ('days_over_90', 'Más de 90 días', 91, None),
+]
+
+AGING_DIMENSIONS = {
+    'customer': {
+        'id': 'customer_id',
+        'labels': ('customer__first_name', 'customer__last_name'),
+        'empty_label': 'Sin cliente',
+    },
+    'agent': {
+        'id': 'contract__agent_id',
+        'labels': ('contract__agent__first_name', 'contract__agent__last_name'),
+        'empty_label': 'Sin agente',
+    },
+    'property': {
+        'id': 'contract__property_id',
+        'labels': ('contract__property__title',),
+        'empty_label': 'Sin propiedad',
+    },
+}
+
+AMOUNT_KEYS = [bucket[0] for bucket in AGING_BUCKETS] + ['total']
+
+AGING_EXPORT_COLUMNS = (
+    [ExportColumn('Nombre', 'label')]
+    + [ExportColumn(title, key) for key, title, _, _ in AGING_BUCKETS]
+    + [ExportColumn('Total', 'total'), ExportColumn('Facturas', 'invoice_count')]
+)
+
+
+class AgingError(Exception):
+    """Error en el reporte de antigüedad de saldos."""
+    pass
+
+
+def _bucket_condition(as_of, min_days, max_days):
+    # días de atraso = as_of - due_date
+    condition = Q()
+    if min_days is not None:
+        condition &= Q(due_date__lte=as_of - timedelta(days=min_days))
+    if max_days is not None:
+        condition &= Q(due_date__gte=as_of - timedelta(days=max_days))
+    return condition
+
+
+def open_invoices():
+    """
+    Facturas con saldo pendiente que participan del aging.
+
+    Returns:
+        QuerySet: Facturas validadas o enviadas con saldo mayor a cero
+    """
+    return Invoice.objects.filter(status__in=OPEN_STATUSES, balance__gt=0)
+
+
+def compute_aging(dimension='customer', as_of=None, queryset=None):
+    """
+    Calcula la antigüedad de saldos agrupada por cliente, agente o propiedad.
+
+    Args:
+        dimension (str): ``customer``, ``agent`` o ``property``
+        as_of (date): Fecha de referencia para los días de atraso (hoy por defecto)
+        queryset (QuerySet): Facturas a considerar (las abiertas por defecto)
+
+    Returns:
+        list: Un diccionario por grupo con ``object_id``, ``label``, los tramos,
+        ``total`` e ``invoice_count``, ordenados por total descendente
+
+    Raises:
+        AgingError: Si la agrupación no existe
+    """
+    if dimension not in AGING_DIMENSIONS:
+        raise AgingError(f"Agrupación inválida: {dimension}")
+    config = AGING_DIMENSIONS[dimension]
+    as_of = as_of or timezone.localdate()
+    queryset = open_invoices() if queryset is None else queryset
+    amount = DecimalField(max_digits=14, decimal_places=2)
+
+    aggregates = {
+        key: Sum(
+            Case(
+                When(_bucket_condition(as_of, min_days, max_days), then=F('balance')),
+                default=Value(Decimal('0.00')),
+                output_field=amount,
+            )
+        )
+        for key, _, min_days, max_days in AGING_BUCKETS
+    }
+    rows = (
+        queryset.order_by()
+        .values(config['id'], *config['labels'])
+        .annotate(total=Sum('balance'), invoice_count=Count('id'), **aggregates)
+        .order_by('-total')
+    )
+
+    results = []
+    for row in rows:
+        label = ' '.join(filter(None, (row[field] for field in config['labels']))).strip()
+        results.append({
+            'object_id': row[config['id']],
+            'label': label or config['empty_label'],
+            'invoice_count': row['invoice_count'],
+            **{key: (row[key] or Decimal('0')).quantize(CENTS) for key in AMOUNT_KEYS},
+        })
+    return results
+
+
+def aging_totals(rows):
+    """
+    Suma los tramos de todas las filas de un reporte.
+
+    Returns:
+        dict: Totales por tramo, ``total`` e ``invoice_count``
+    """
+    totals = {key: Decimal('0.00') for key in AMOUNT_KEYS}
+    totals['invoice_count'] = 0
+    for row in rows:
+        for key in AMOUNT_KEYS:
+            totals[key] += row[key]
+        totals['invoice_count'] += row['invoice_count']
+    return totals
+
+
+def take_aging_snapshot(as_of=None):
+    """
+    Guarda la antigüedad de saldos del día para todas las agrupaciones.
+
+    Si ya había una instantánea de esa fecha se reemplaza, así la tarea puede
+    ejecutarse más de una vez por día.
+
+    Args:
+        as_of (date): Fecha de la instantánea (hoy por defecto)
+
+    Returns:
+        int: Cantidad de filas guardadas
+    """
+    as_of = as_of or timezone.localdate()
+    snapshots = [
+        AgingSnapshot(
+            snapshot_date=as_of,
+            dimension=dimension,
+            object_id=row['object_id'],
+            label=row['label'][:255],
+            invoice_count=row['invoice_count'],
+            **{key: row[key] for key in AMOUNT_KEYS},
+        )
+        for dimension in AGING_DIMENSIONS
+        for row in compute_aging(dimension, as_of)
+    ]
+    with transaction.atomic():
+        AgingSnapshot.objects.filter(snapshot_date=as_of).delete()
+        AgingSnapshot.objects.bulk_create(snapshots)
+    logger.info(f"Instantánea de antigüedad de saldos del {as_of}: {len(snapshots)} filas")
+    return len(snapshots)
+
+
+def get_snapshot_rows(dimension, snapshot_date):
+    """
+    Lee las filas guardadas de una instantánea.
+
+    Returns:
+        list: Filas con el mismo formato que compute_aging (vacía si no hay instantánea)
+    """
+    return list(
+        AgingSnapshot.objects.filter(snapshot_date=snapshot_date, dimension=dimension)
+        .order_by('-total')
+        .values('object_id', 'label', 'invoice_count', *AMOUNT_KEYS)
+    )
+
+
+def get_aging_report(dimension='customer', as_of=None, compare_to=None):
+    """
+    Arma el reporte de antigüedad de saldos.
+
+    Para el día de hoy se calcula en vivo; para fechas pasadas se lee la
+    instantánea guardada. Opcionalmente agrega la diferencia de los totales
+    contra la instantánea de otra fecha.
+
+    Args:
+        dimension (str): ``customer``, ``agent`` o ``property``
+        as_of (date): Fecha del reporte (hoy por defecto)
+        compare_to (date): Fecha de la instantánea a comparar (opcional)
+
+    Returns:
+        dict: ``dimension``, ``as_of``, ``source`` (live/snapshot), ``rows``,
+        ``totals`` y, si se pidió comparación, ``comparison`` con
+        ``date``, ``totals`` y ``delta``
+
+    Raises:
+        AgingError: Si la agrupación no existe
+    """
+    if dimension not in AGING_DIMENSIONS:
+        raise AgingError(f"Agrupación inválida: {dimension}")
+    today = timezone.localdate()
+    as_of = as_of or today
+
+    if as_of < today:
+        rows = get_snapshot_rows(dimension, as_of)
+        source = 'snapshot'
+    else:
+        rows = compute_aging(dimension, as_of)
+        source = 'live'
+    totals = aging_totals(rows)
+
+    comparison = None
+    if compare_to:
+        previous_rows = get_snapshot_rows(dimension, compare_to)
+        if previous_rows:
+            previous_totals = aging_totals(previous_rows)
+            comparison = {
+                'date': compare_to,
+                'totals': previous_totals,
+                'delta': {key: totals[key] - previous_totals[key] for key in AMOUNT_KEYS},
+            }
+
+    return {
+        'dimension': dimension,
+        'as_of': as_of,
+        'source': source,
+        'rows': rows,
+        'totals': totals,
+        'comparison': comparison,
+    }
@@ -1,8 +1,11 @@
 from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 from decimal import Decimal
 from contracts.models import Contract
 from accounting.models_invoice import Invoice, InvoiceLine
+from accounting.models_sequence import DocumentSequence
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +19,17 @@ class AutomaticInvoiceService:
     configurada en cada contrato activo.
     """
     
+    # Tamaño de los lotes de consulta y de escritura con bulk_create
+    BATCH_SIZE = 500
+    
+    # Meses que abarca cada frecuencia de facturación
+    FREQUENCY_MONTHS = {
+        'monthly': 1,
+        'quarterly': 3,
+        'semi-annually': 6,
+        'annually': 12,
+    }
+    
     @classmethod
     def generate_monthly_invoices(cls):
         """
@@ -57,40 +71,51 @@ class AutomaticInvoiceService:
         return cls._generate_invoices_by_frequency('annually')
     
     @classmethod
-    def _generate_invoices_by_frequency(cls, frequency):
+    def _generate_invoices_by_frequency(cls, frequency, reference_date=None):
         """
         Genera facturas para contratos con una frecuencia específica.
         
+        Trabaja por lotes: obtiene la fecha de la última factura de todos los
+        contratos en una única consulta agrupada, decide en memoria qué contratos
+        deben facturarse y escribe facturas y líneas con ``bulk_create`` en
+        bloques de ``BATCH_SIZE``.
+        
         Args:
             frequency (str): Frecuencia de facturación
+            reference_date (date, optional): Fecha de facturación (hoy por defecto)
             
         Returns:
             dict: Resumen de la operación
         """
-        today = timezone.now().date()
+        today = reference_date or timezone.now().date()
         
         # Obtener contratos activos con la frecuencia especificada
-        contracts = Contract.objects.filter(
-            status=Contract.STATUS_ACTIVE,
-            frequency=frequency
-        ).select_related('customer', 'property', 'agent')
+        contracts = list(
+            Contract.objects.filter(
+                status=Contract.STATUS_ACTIVE,
+                frequency=frequency
+            ).select_related('customer', 'property', 'agent')
+        )
         
-        created_invoices = []
+        last_invoice_dates = cls._get_last_invoice_dates([contract.pk for contract in contracts])
+        
+        pending = []
         errors = []
         
         for contract in contracts:
             try:
                 # Verificar si necesita facturación
-                if cls._should_generate_invoice(contract, today):
-                    invoice = cls._create_invoice_from_contract(contract, today)
-                    created_invoices.append(invoice)
-                    logger.info(f"Factura {invoice.number} creada para contrato {contract.id}")
+                if cls._is_invoice_due(contract, today, last_invoice_dates.get(contract.pk)):
+                    pending.append((contract, cls._build_invoice_from_contract(contract, today)))
                     
             except Exception as e:
                 error_msg = f"Error al crear factura para contrato {contract.id}: {str(e)}"
                 errors.append(error_msg)
                 logger.error(error_msg)
         
+        created_invoices, write_errors = cls._bulk_create_invoices(pending, today)
+        errors.extend(write_errors)
+        
         return {
             'frequency': frequency,
             'contracts_processed': len(contracts),
@@ -100,6 +125,29 @@ class AutomaticInvoiceService:
             'error_messages': errors
         }
     
+    @classmethod
+    def _get_last_invoice_dates(cls, contract_ids):
+        """
+        Obtiene la fecha de la última factura de cada contrato en una sola consulta.
+        
+        Args:
+            contract_ids (list): IDs de los contratos a consultar
+            
+        Returns:
+            dict: Mapa {contract_id: fecha de la última factura}
+        """
+        last_dates = {}
+        for start in range(0, len(contract_ids), cls.BATCH_SIZE):
+            chunk = contract_ids[start:start + cls.BATCH_SIZE]
+            rows = (
+                Invoice.objects.filter(contract_id__in=chunk)
+                .values('contract_id')
+                .annotate(last_date=Max('date'))
+                .values_list('contract_id', 'last_date')
+            )
+            last_dates.update(rows)
+        return last_dates
+    
     @classmethod
     def _should_generate_invoice(cls, contract, reference_date):
         """
@@ -112,26 +160,38 @@ class AutomaticInvoiceService:
         Returns:
             bool: True si se debe generar factura
         """
-        # Verificar si ya existe una factura para este período
-        last_invoice = Invoice.objects.filter(
-            contract=contract,
-            date__gte=cls._get_period_start_date(contract, reference_date)
-        ).order_by('-date').first()
+        last_invoice_date = cls._get_last_invoice_dates([contract.pk]).get(contract.pk)
+        return cls._is_invoice_due(contract, reference_date, last_invoice_date)
+    
+    @classmethod
+    def _is_invoice_due(cls, contract, reference_date, last_invoice_date):
+        """
+        Decide en memoria si un contrato debe facturarse.
         
-        if last_invoice:
-            return False  # Ya existe factura para este período
+        Args:
+            contract (Contract): Contrato a evaluar
+            reference_date (date): Fecha de referencia
+            last_invoice_date (date): Fecha de la última factura del contrato o None
+            
+        Returns:
+            bool: True si se debe generar factura
+        """
+        # Verificar si ya existe una factura para este período
+        if last_invoice_date and last_invoice_date >= cls._get_period_start_date(contract, reference_date):
+            return False
         
         # Verificar si es tiempo de facturar según la frecuencia
-        return cls._is_billing_due(contract, reference_date)
+        return cls._is_billing_due(contract, reference_date, last_invoice_date)
     
     @classmethod
-    def _is_billing_due(cls, contract, reference_date):
+    def _is_billing_due(cls, contract, reference_date, last_invoice_date=None):
         """
         Verifica si es tiempo de facturar según la frecuencia del contrato.
         
         Args:
             contract (Contract): Contrato a evaluar
             reference_date (date): Fecha de referencia
+            last_invoice_date (date, optional): Fecha de la última factura del contrato
             
         Returns:
             bool: True si es tiempo de facturar
@@ -140,7 +200,7 @@ class AutomaticInvoiceService:
             return False
         
         # Calcular la próxima fecha de facturación
-        next_billing_date = cls._calculate_next_billing_date(contract)
+        next_billing_date = cls._next_billing_date_from(contract, last_invoice_date or contract.start_date)
         
         # Es tiempo de facturar si la fecha de referencia es igual o posterior
         return reference_date >= next_billing_date
@@ -156,35 +216,25 @@ class AutomaticInvoiceService:
         Returns:
             date: Próxima fecha de facturación
         """
-        # Obtener la última factura del contrato
-        last_invoice = Invoice.objects.filter(contract=contract).order_by('-date').first()
-        
-        if last_invoice:
-            base_date = last_invoice.date
-        else:
-            base_date = contract.start_date
+        last_invoice_date = cls._get_last_invoice_dates([contract.pk]).get(contract.pk)
+        return cls._next_billing_date_from(contract, last_invoice_date or contract.start_date)
+    
+    @classmethod
+    def _next_billing_date_from(cls, contract, base_date):
+        """
+        Calcula la fecha de facturación siguiente a una fecha base.
         
-        # Calcular siguiente fecha según frecuencia
-        if contract.frequency == 'monthly':
-            # Próximo mes
-            if base_date.month == 12:
-                return base_date.replace(year=base_date.year + 1, month=1)
-            else:
-                return base_date.replace(month=base_date.month + 1)
-                
-        elif contract.frequency == 'quarterly':
-            # Próximo trimestre (3 meses)
-            return cls._add_months(base_date, 3)
-            
-        elif contract.frequency == 'semi-annually':
-            # Próximo semestre (6 meses)
-            return cls._add_months(base_date, 6)
+        Args:
+            contract (Contract): Contrato
+            base_date (date): Fecha de la última factura o de inicio del contrato
             
-        elif contract.frequency == 'annually':
-            # Próximo año
-            return base_date.replace(year=base_date.year + 1)
-        
-        return base_date
+        Returns:
+            date: Próxima fecha de facturación
+        """
+        months = cls.FREQUENCY_MONTHS.get(contract.frequency)
+        if not months:
+            return base_date
+        return cls._add_months(base_date, months)
     
     @classmethod
     def _add_months(cls, date_obj, months):
@@ -250,31 +300,96 @@ class AutomaticInvoiceService:
         Returns:
             Invoice: Factura creada
         """
+        created_invoices, errors = cls._bulk_create_invoices(
+            [(contract, cls._build_invoice_from_contract(contract, invoice_date))],
+            invoice_date
+        )
+        if errors:
+            raise RuntimeError(errors[0])
+        return created_invoices[0]
+    
+    @classmethod
+    def _build_invoice_from_contract(cls, contract, invoice_date):
+        """
+        Construye en memoria la factura y su línea a partir de un contrato.
+        
+        Args:
+            contract (Contract): Contrato base
+            invoice_date (date): Fecha de la factura
+            
+        Returns:
+            tuple: (Invoice, InvoiceLine) sin guardar
+        """
         # Calcular fecha de vencimiento (30 días por defecto)
         due_date = invoice_date + timedelta(days=30)
         
         # Crear descripción según frecuencia
         period_desc = cls._get_period_description(contract.frequency, invoice_date)
         
-        # Crear factura
-        invoice = Invoice.objects.create(
+        invoice = Invoice(
             customer=contract.customer,
             contract=contract,
             date=invoice_date,
             due_date=due_date,
             description=f'Factura automática - {period_desc} - {contract.property.title}',
             total_amount=contract.amount,
+            balance=contract.amount,  # bulk_create no ejecuta Invoice.save()
             status='validated'  # Marcar como validada automáticamente
         )
-        
-        # Crear línea de factura
-        InvoiceLine.objects.create(
+        line = InvoiceLine(
             invoice=invoice,
             concept=f'Alquiler {period_desc} - {contract.property.title}',
             amount=contract.amount
         )
+        return invoice, line
+    
+    @classmethod
+    def _bulk_create_invoices(cls, pending, invoice_date):
+        """
+        Guarda las facturas pendientes en bloques de ``BATCH_SIZE``.
+        
+        Cada bloque se escribe en su propia transacción junto con la reserva de
+        sus números en la secuencia de facturas: si falla, se revierten facturas,
+        líneas y números, y el error se registra para cada contrato del bloque
+        sin afectar al resto.
+        
+        Args:
+            pending (list): Tuplas (contract, (Invoice, InvoiceLine))
+            invoice_date (date): Fecha de las facturas
+            
+        Returns:
+            tuple: (facturas creadas, mensajes de error)
+        """
+        created_invoices = []
+        errors = []
+        if not pending:
+            return created_invoices, errors
+        
+        for start in range(0, len(pending), cls.BATCH_SIZE):
+            chunk = pending[start:start + cls.BATCH_SIZE]
+            invoices = [invoice for _, (invoice, _) in chunk]
+            lines = [line for _, (_, line) in chunk]
+            
+            try:
+                with transaction.atomic():
+                    numbers = DocumentSequence.allocate(
+                        DocumentSequence.SERIES_INVOICE, count=len(invoices), year=invoice_date.year
+                    )
+                    for invoice, number in zip(invoices, numbers):
+                        invoice.number = number
+                    Invoice.objects.bulk_create(invoices)
+                    InvoiceLine.objects.bulk_create(lines)
+            except Exception as e:
+                for contract, _ in chunk:
+                    error_msg = f"Error al crear factura para contrato {contract.id}: {str(e)}"
+                    errors.append(error_msg)
+                    logger.error(error_msg)
+                continue
+            
+            created_invoices.extend(invoices)
+            logger.info(f"Lote de {len(invoices)} facturas automáticas creado")
         
-        return invoice
+        return created_invoices, errors
     
     @classmethod
     def _get_period_description(cls, frequency, date_obj):
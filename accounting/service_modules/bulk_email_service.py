@@ -0,0 +1,201 @@
+"""
+Servicio de envío masivo de facturas por correo electrónico.
+
+El envío se divide en dos etapas: la vista crea un ``BulkEmailJob`` con una
+fila por factura seleccionada y una tarea de Celery lo procesa por bloques.
+Cada bloque carga sus facturas con una sola consulta, renderiza los PDFs en
+paralelo (reutilizando la caché de PDFs) y envía todos los correos por una
+única conexión SMTP. Cada envío se guarda apenas sale el correo, así que una
+tarea reanudada no vuelve a enviar las facturas ya enviadas.
+"""
+import logging
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounting.models_invoice import BulkEmailJob, BulkEmailJobItem, Invoice
+from accounting.service_modules.pdf_cache_service import get_pdf_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BulkInvoiceEmailService:
+    """
+    Servicio que crea y procesa envíos masivos de facturas.
+    """
+
+    SENDABLE_STATUSES = ('validated', 'sent')
+    CHUNK_SIZE = 25
+
+    def __init__(self, chunk_size=None, pdf_cache=None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.pdf_cache = pdf_cache or get_pdf_cache()
+
+    def create_job(self, invoice_ids, requested_by=None):
+        """
+        Crea un envío masivo con las facturas seleccionadas.
+
+        Las facturas que no se pueden enviar (cliente sin email o estado no
+        válido) quedan registradas como omitidas con el motivo.
+
+        Args:
+            invoice_ids (list): IDs de las facturas seleccionadas
+            requested_by: Agente que solicita el envío
+
+        Returns:
+            BulkEmailJob: Envío creado, pendiente de procesar
+        """
+        invoices = (
+            Invoice.objects.filter(id__in=invoice_ids)
+            .order_by('id')
+            .values_list('id', 'status', 'customer__email')
+        )
+
+        items = []
+        skipped_count = 0
+        now = timezone.now()
+        for invoice_id, status, email in invoices:
+            item = BulkEmailJobItem(invoice_id=invoice_id, email=email or '')
+            if not email:
+                item.status = 'skipped'
+                item.error_message = "El cliente no tiene correo electrónico."
+            elif status not in self.SENDABLE_STATUSES:
+                item.status = 'skipped'
+                item.error_message = "La factura no está en estado 'Validada' o 'Enviada'."
+            if item.status == 'skipped':
+                item.processed_at = now
+                skipped_count += 1
+            items.append(item)
+
+        with transaction.atomic():
+            job = BulkEmailJob.objects.create(
+                requested_by=requested_by,
+                total_count=len(items),
+                processed_count=skipped_count,
+                skipped_count=skipped_count,
+            )
+            for item in items:
+                item.job = job
+            BulkEmailJobItem.objects.bulk_create(items)
+
+        logger.info(
+            f"Envío masivo #{job.pk} creado: {len(items)} facturas, {skipped_count} omitidas"
+        )
+        return job
+
+    def process_job(self, job_id):
+        """
+        Procesa los correos pendientes de un envío masivo.
+
+        Es idempotente: si la tarea se reintenta solo se procesan las facturas
+        que siguen pendientes.
+
+        Args:
+            job_id (int): ID del envío masivo
+
+        Returns:
+            BulkEmailJob: Envío actualizado
+        """
+        job = BulkEmailJob.objects.get(pk=job_id)
+        if job.is_finished:
+            return job
+
+        BulkEmailJob.objects.filter(pk=job.pk).update(
+            status='running', started_at=job.started_at or timezone.now()
+        )
+
+        try:
+            while True:
+                items = list(
+                    job.items.filter(status='pending')
+                    .select_related('invoice__customer')
+                    .order_by('id')[:self.chunk_size]
+                )
+                if not items:
+                    break
+                self._process_chunk(job, items)
+        except Exception as e:
+            logger.error(f"Error procesando el envío masivo #{job.pk}: {str(e)}")
+            BulkEmailJob.objects.filter(pk=job.pk).update(
+                status='failed', error_message=str(e), finished_at=timezone.now()
+            )
+            raise
+
+        BulkEmailJob.objects.filter(pk=job.pk).update(status='completed', finished_at=timezone.now())
+        job.refresh_from_db()
+        logger.info(
+            f"Envío masivo #{job.pk} completado: {job.sent_count} enviadas, "
+            f"{job.error_count} errores, {job.skipped_count} omitidas"
+        )
+        return job
+
+    def _process_chunk(self, job, items):
+        """
+        Renderiza y envía un bloque de facturas por una única conexión SMTP.
+        """
+        from accounting.services import INVOICE_PDF_TEMPLATE, build_invoice_email, render_invoice_html
+
+        documents = [
+            (render_invoice_html(item.invoice), INVOICE_PDF_TEMPLATE, None)
+            for item in items
+        ]
+        pdf_results = self.pdf_cache.render_many(documents)
+
+        connection = get_connection()
+        try:
+            connection.open()
+            for item, pdf_result in zip(items, pdf_results):
+                invoice = item.invoice
+                item.processed_at = timezone.now()
+                if pdf_result.error:
+                    item.status = 'failed'
+                    item.error_message = f"Error al generar el PDF: {str(pdf_result.error)}"
+                    continue
+                try:
+                    build_invoice_email(invoice, pdf_result.content, connection=connection).send()
+                except Exception as e:
+                    item.status = 'failed'
+                    item.error_message = str(e)
+                    logger.error(f"Error al enviar correo para factura {invoice.id}: {str(e)}")
+                    continue
+                self._mark_sent(job, item)
+        finally:
+            connection.close()
+
+        # Los ítems enviados ya se guardaron uno por uno en _mark_sent
+        failed_items = [item for item in items if item.status == 'failed']
+        now = timezone.now()
+        for item in failed_items:
+            item.updated_at = now  # bulk_update no aplica auto_now
+
+        with transaction.atomic():
+            BulkEmailJobItem.objects.bulk_update(
+                failed_items, ['status', 'error_message', 'processed_at', 'updated_at']
+            )
+            BulkEmailJob.objects.filter(pk=job.pk).update(
+                processed_count=F('processed_count') + len(failed_items),
+                error_count=F('error_count') + len(failed_items),
+                updated_at=now,
+            )
+
+    def _mark_sent(self, job, item):
+        """
+        Guarda el envío de una factura apenas sale el correo.
+
+        No se espera al final del bloque: si el proceso se interrumpe a mitad
+        del envío, al reanudarlo las facturas ya enviadas no se reenvían.
+        """
+        item.status = 'sent'
+        item.error_message = ''
+        with transaction.atomic():
+            item.save(update_fields=['status', 'error_message', 'processed_at', 'updated_at'])
+            BulkEmailJob.objects.filter(pk=job.pk).update(
+                processed_count=F('processed_count') + 1,
+                sent_count=F('sent_count') + 1,
+                updated_at=timezone.now(),
+            )
+        # Se guarda con save() para que se disparen las notificaciones de cambio de estado
+        if item.invoice.status == 'validated':
+            item.invoice.mark_as_sent()
@@ -0,0 +1,244 @@
+"""
+Estado de cuenta de clientes: facturas, pagos y saldo acumulado.
+
+El libro del cliente se obtiene con una sola consulta: la unión de sus
+facturas (débitos) y sus pagos (créditos), con el saldo acumulado calculado
+por la base de datos con una función de ventana. El saldo se calcula sobre
+todos los movimientos y recién después se filtra el rango de fechas, así que
+el primer movimiento del rango ya trae el saldo que arrastra la cuenta.
+
+Para cuentas con miles de movimientos el HTML se genera por bloques a medida
+que se leen las filas (sin cargarlas todas en el contexto de la plantilla), lo
+que permite devolverlo con ``StreamingHttpResponse``. El PDF se arma con esos
+mismos bloques y se renderiza con WeasyPrint a través de la caché de PDFs.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounting.models_invoice import Invoice, Payment
+from accounting.service_modules.pdf_cache_service import get_pdf_cache
+from accounting.service_modules.receipt_context import ReceiptContext
+
+logger = logging.getLogger(__name__)
+
+
+CUSTOMER_STATEMENT_HEADER_TEMPLATE = 'accounting/customer_statement/header.html'
+CUSTOMER_STATEMENT_ROWS_TEMPLATE = 'accounting/customer_statement/rows.html'
+CUSTOMER_STATEMENT_FOOTER_TEMPLATE = 'accounting/customer_statement/footer.html'
+
+# Facturas que forman parte de la cuenta corriente del cliente
+STATEMENT_INVOICE_STATUSES = ('validated', 'sent', 'paid')
+
+CENTS = Decimal('0.01')
+
+_LEDGER_SQL = """
+    SELECT entry_date, entry_type, entry_id, reference, description, debit, credit, balance
+    FROM (
+        SELECT
+            ledger.*,
+            SUM(ledger.debit - ledger.credit) OVER (
+                ORDER BY ledger.entry_date, ledger.sort_order, ledger.entry_id
+                ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+            ) AS balance
+        FROM (
+            SELECT
+                i.date AS entry_date, 0 AS sort_order, 'invoice' AS entry_type, i.id AS entry_id,
+                i.number AS reference, i.description AS description,
+                i.total_amount AS debit, 0 AS credit
+            FROM {invoice_table} i
+            WHERE i.customer_id = %s AND i.status IN ({statuses})
+            UNION ALL
+            SELECT
+                p.date AS entry_date, 1 AS sort_order, 'payment' AS entry_type, p.id AS entry_id,
+                i.number AS reference, p.method AS description,
+                0 AS debit, p.amount AS credit
+            FROM {payment_table} p
+            INNER JOIN {invoice_table} i ON i.id = p.invoice_id
+            WHERE i.customer_id = %s AND i.status <> 'draft'
+        ) ledger
+    ) statement
+    WHERE entry_date >= %s AND entry_date <= %s
+    ORDER BY entry_date, sort_order, entry_id
+"""
+
+
+class CustomerStatementError(Exception):
+    """Excepción específica para errores del estado de cuenta."""
+    pass
+
+
+def _amount(value):
+    # SQLite devuelve los importes calculados como int/float
+    return Decimal(str(value or 0)).quantize(CENTS)
+
+
+class CustomerStatementService:
+    """
+    Servicio que arma y renderiza el estado de cuenta de un cliente.
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, pdf_cache=None):
+        self.pdf_cache = pdf_cache or get_pdf_cache()
+
+    def ledger(self, customer, start=None, end=None):
+        """
+        Recorre los movimientos del cliente con su saldo acumulado.
+
+        Las filas se leen por bloques de CHUNK_SIZE de un cursor del lado del
+        servidor cuando la base lo permite.
+
+        Args:
+            customer: Cliente
+            start (date): Primer día incluido (opcional)
+            end (date): Último día incluido (opcional)
+
+        Yields:
+            dict: ``date``, ``type`` (``invoice`` o ``payment``), ``id``,
+            ``reference``, ``description``, ``debit``, ``credit`` y ``balance``
+        """
+        sql = _LEDGER_SQL.format(
+            invoice_table=connection.ops.quote_name(Invoice._meta.db_table),
+            payment_table=connection.ops.quote_name(Payment._meta.db_table),
+            statuses=', '.join(['%s'] * len(STATEMENT_INVOICE_STATUSES)),
+        )
+        params = [
+            customer.pk, *STATEMENT_INVOICE_STATUSES, customer.pk,
+            start or date.min, end or date.max,
+        ]
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.CHUNK_SIZE)
+                if not rows:
+                    break
+                for entry_date, entry_type, entry_id, reference, description, debit, credit, balance in rows:
+                    if isinstance(entry_date, str):
+                        entry_date = date.fromisoformat(entry_date)
+                    yield {
+                        'date': entry_date,
+                        'type': entry_type,
+                        'id': entry_id,
+                        'reference': reference,
+                        'description': description or '',
+                        'debit': _amount(debit),
+                        'credit': _amount(credit),
+                        'balance': _amount(balance),
+                    }
+
+    def opening_balance(self, customer, start):
+        """
+        Saldo de la cuenta antes de ``start``.
+
+        Solo se usa cuando el rango no tiene movimientos; si los tiene, el
+        saldo inicial sale del primer movimiento del libro.
+        """
+        if start is None:
+            return Decimal('0.00')
+        invoiced = Invoice.objects.filter(
+            customer=customer, status__in=STATEMENT_INVOICE_STATUSES, date__lt=start
+        ).aggregate(total=Sum('total_amount'))['total']
+        paid = Payment.objects.filter(
+            invoice__customer=customer, date__lt=start
+        ).exclude(invoice__status='draft').aggregate(total=Sum('amount'))['total']
+        return _amount(invoiced) - _amount(paid)
+
+    def iter_html(self, customer, start=None, end=None, company=None, toolbar=False):
+        """
+        Genera el HTML del estado de cuenta por bloques.
+
+        Args:
+            customer: Cliente
+            start (date): Primer día incluido (opcional)
+            end (date): Último día incluido (opcional)
+            company: Empresa para el encabezado (por defecto la configurada)
+            toolbar (bool): Incluir los filtros y el enlace al PDF (solo en pantalla)
+
+        Yields:
+            str: Fragmentos de HTML en orden
+        """
+        if company is None:
+            company = ReceiptContext.load_company()
+        entries = self.ledger(customer, start, end)
+        first_chunk = []
+        for entry in entries:
+            first_chunk.append(entry)
+            if len(first_chunk) >= self.CHUNK_SIZE:
+                break
+
+        if first_chunk:
+            first = first_chunk[0]
+            opening = first['balance'] - first['debit'] + first['credit']
+        else:
+            opening = self.opening_balance(customer, start)
+
+        context = {
+            'customer': customer,
+            'company': company,
+            'start': start,
+            'end': end or timezone.localdate(),
+            'generated_on': timezone.localdate(),
+            'opening_balance': opening,
+            'toolbar': toolbar,
+        }
+        yield render_to_string(CUSTOMER_STATEMENT_HEADER_TEMPLATE, context)
+
+        totals = {'debit': Decimal('0.00'), 'credit': Decimal('0.00'), 'count': 0}
+        closing = opening
+        chunk = first_chunk
+        while chunk:
+            for entry in chunk:
+                totals['debit'] += entry['debit']
+                totals['credit'] += entry['credit']
+            totals['count'] += len(chunk)
+            closing = chunk[-1]['balance']
+            yield render_to_string(CUSTOMER_STATEMENT_ROWS_TEMPLATE, {'entries': chunk})
+            chunk = []
+            for entry in entries:
+                chunk.append(entry)
+                if len(chunk) >= self.CHUNK_SIZE:
+                    break
+
+        yield render_to_string(CUSTOMER_STATEMENT_FOOTER_TEMPLATE, {
+            **context,
+            'totals': totals,
+            'closing_balance': closing,
+        })
+
+    def generate_pdf(self, customer, start=None, end=None, company=None):
+        """
+        Genera el PDF del estado de cuenta (o lo toma de la caché).
+
+        Returns:
+            bytes: Contenido del PDF
+
+        Raises:
+            CustomerStatementError: Si no se puede generar el PDF
+        """
+        html_string = ''.join(self.iter_html(customer, start, end, company=company))
+        pdf_result = self.pdf_cache.render_many([(html_string, CUSTOMER_STATEMENT_HEADER_TEMPLATE, None)])[0]
+        if pdf_result.error:
+            logger.error(
+                f"Error generando el estado de cuenta del cliente {customer.pk}: {str(pdf_result.error)}"
+            )
+            raise CustomerStatementError(f"Error técnico generando PDF: {str(pdf_result.error)}")
+        if not pdf_result.content or not pdf_result.content.startswith(b'%PDF-'):
+            raise CustomerStatementError("El contenido generado no es un PDF válido")
+        return pdf_result.content
+
+    @staticmethod
+    def filename(customer, end=None, extension='pdf'):
+        """
+        Nombre de archivo del estado de cuenta.
+        """
+        end = end or timezone.localdate()
+        name = slugify(customer.get_full_name()) or str(customer.pk)
+        return f"estado_de_cuenta_{name}_{end:%Y%m%d}.{extension}"
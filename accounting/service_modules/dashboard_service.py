@@ -0,0 +1,108 @@
+"""
+Indicadores del dashboard de contabilidad.
+
+Todos los indicadores (cantidades y montos por estado y facturas vencidas) se
+calculan con una única consulta de agregación condicional sobre las facturas,
+usando la columna de saldo almacenada. El resultado se guarda en la caché
+de Django por unos segundos y se invalida cada vez que se guarda o elimina una
+factura o un pago, así la latencia del dashboard no crece con el historial.
+
+Los ingresos cobrados parten de los saldos del último período contable
+cerrado y solo suman los pagos posteriores (ver ``period_close_service``).
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice
+from accounting.service_modules.period_close_service import invoice_payments_total
+
+logger = logging.getLogger(__name__)
+
+
+DASHBOARD_CACHE_KEY = 'accounting:dashboard:kpis'
+
+PENDING_STATUSES = ('validated', 'sent')
+
+
+def _config():
+    config = {'cache_timeout': 60, 'enabled': True}
+    config.update(getattr(settings, 'ACCOUNTING_DASHBOARD_CONFIG', {}))
+    return config
+
+
+def compute_dashboard_kpis(today=None):
+    """
+    Calcula los indicadores del dashboard.
+
+    Args:
+        today (date): Fecha de referencia para los vencimientos (hoy por defecto)
+
+    Returns:
+        dict: Indicadores del dashboard, con la fecha de referencia en ``as_of``
+    """
+    today = today or timezone.localdate()
+    pending = Q(status__in=PENDING_STATUSES)
+    overdue = pending & Q(due_date__lt=today, balance__gt=0)
+
+    kpis = Invoice.objects.aggregate(
+        total_invoices=Count('id'),
+        draft_invoices=Count('id', filter=Q(status='draft')),
+        pending_invoices=Count('id', filter=pending),
+        paid_invoices=Count('id', filter=Q(status='paid')),
+        cancelled_invoices=Count('id', filter=Q(status='cancelled')),
+        overdue_invoices_count=Count('id', filter=overdue),
+        total_pending=Sum('total_amount', filter=pending),
+        total_pending_balance=Sum('balance', filter=pending),
+        total_paid=Sum('total_amount', filter=Q(status='paid')),
+        total_overdue=Sum('balance', filter=overdue),
+    )
+    for key, value in kpis.items():
+        if value is None:
+            kpis[key] = Decimal('0.00')
+    kpis['as_of'] = today
+    return kpis
+
+
+def get_dashboard_kpis():
+    """
+    Devuelve los indicadores del dashboard desde la caché, calculándolos si hace falta.
+
+    La instantánea se descarta al cambiar el día, porque los vencimientos
+    dependen de la fecha.
+
+    Returns:
+        dict: Indicadores del dashboard (ver compute_dashboard_kpis) y los
+        ingresos cobrados en ``total_collected``
+    """
+    config = _config()
+    today = timezone.localdate()
+    if not config['enabled']:
+        return _compute_snapshot(today)
+
+    kpis = cache.get(DASHBOARD_CACHE_KEY)
+    if kpis is None or kpis.get('as_of') != today:
+        kpis = _compute_snapshot(today)
+        cache.set(DASHBOARD_CACHE_KEY, kpis, config['cache_timeout'])
+    return kpis
+
+
+def _compute_snapshot(today):
+    kpis = compute_dashboard_kpis(today)
+    kpis['total_collected'] = invoice_payments_total()
+    return kpis
+
+
+def invalidate_dashboard_kpis():
+    """
+    Descarta la instantánea de indicadores del dashboard.
+    """
+    try:
+        cache.delete(DASHBOARD_CACHE_KEY)
+    except Exception as e:
+        # Un fallo de la caché no debe impedir guardar facturas o pagos
+        logger.warning(f"No se pudo invalidar la caché del dashboard de contabilidad: {str(e)}")
@@ -0,0 +1,329 @@
+"""
+Exportación en streaming de facturas, pagos y comprobantes de propietarios.
+
+Las filas se leen con ``values_list`` (solo las columnas exportadas, sin
+instanciar modelos) y ``.iterator(chunk_size=...)``, que en PostgreSQL usa un
+cursor del lado del servidor. Cada bloque se escribe y se envía en cuanto está
+listo a través de un ``StreamingHttpResponse``, así que una exportación de
+millones de filas usa memoria constante y empieza a transferirse de inmediato.
+
+Formatos: CSV (opcionalmente comprimido con gzip) y XLSX. El XLSX se arma
+directamente como ZIP en streaming, sin dependencias adicionales.
+"""
+import csv
+import io
+import logging
+import zipfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, OwnerReceipt
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+class ExportColumn:
+    """
+    Columna de una exportación.
+
+    Args:
+        header (str): Título de la columna
+        field (str): Campo o ruta para ``values_list``
+        formatter (callable): Conversión opcional del valor leído
+    """
+
+    def __init__(self, header, field, formatter=None):
+        self.header = header
+        self.field = field
+        self.formatter = formatter
+
+
+def choices_formatter(choices):
+    """
+    Devuelve un formateador que muestra la etiqueta de un campo con choices.
+    """
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%d/%m/%Y %H:%M') if timezone.is_aware(value) \
+            else value.strftime('%d/%m/%Y %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%d/%m/%Y')
+    return value
+
+
+def iter_export_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Itera las filas de la exportación en memoria constante.
+
+    Args:
+        queryset: QuerySet ya filtrado y ordenado
+        columns (list): Columnas (ExportColumn)
+        chunk_size (int): Filas leídas de la base por vez
+
+    Yields:
+        list: Valores de cada fila, ya formateados
+    """
+    formatters = [column.formatter for column in columns]
+    rows = queryset.values_list(*[column.field for column in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [
+            _format_value(formatter(value) if formatter else value)
+            for formatter, value in zip(formatters, row)
+        ]
+
+
+INVOICE_EXPORT_COLUMNS = [
+    ExportColumn('Número', 'number'),
+    ExportColumn('Fecha', 'date'),
+    ExportColumn('Vencimiento', 'due_date'),
+    ExportColumn('Nombre Cliente', 'customer__first_name'),
+    ExportColumn('Apellido Cliente', 'customer__last_name'),
+    ExportColumn('Documento Cliente', 'customer__document'),
+    ExportColumn('Contrato', 'contract_id'),
+    ExportColumn('Descripción', 'description'),
+    ExportColumn('Estado', 'status', choices_formatter(Invoice.STATUS_CHOICES)),
+    ExportColumn('Total', 'total_amount'),
+    ExportColumn('Pagado', 'paid_amount'),
+    ExportColumn('Saldo', 'balance'),
+]
+
+PAYMENT_EXPORT_COLUMNS = [
+    ExportColumn('Fecha', 'date'),
+    ExportColumn('Factura', 'invoice__number'),
+    ExportColumn('Nombre Cliente', 'invoice__customer__first_name'),
+    ExportColumn('Apellido Cliente', 'invoice__customer__last_name'),
+    ExportColumn('Monto', 'amount'),
+    ExportColumn('Método', 'method'),
+    ExportColumn('Notas', 'notes'),
+]
+
+OWNER_RECEIPT_EXPORT_COLUMNS = [
+    ExportColumn('Número Comprobante', 'receipt_number'),
+    ExportColumn('Número Factura', 'invoice__number'),
+    ExportColumn('Estado', 'status', choices_formatter(OwnerReceipt.STATUS_CHOICES)),
+    ExportColumn('Fecha Generación', 'generated_at'),
+    ExportColumn('Fecha Envío', 'sent_at'),
+    ExportColumn('Email Enviado', 'email_sent_to'),
+    ExportColumn('Monto Bruto', 'gross_amount'),
+    ExportColumn('Porcentaje Descuento', 'discount_percentage'),
+    ExportColumn('Monto Descuento', 'discount_amount'),
+    ExportColumn('Monto Neto', 'net_amount'),
+    ExportColumn('Propiedad', 'invoice__contract__property__title'),
+    ExportColumn('Nombre Propietario', 'invoice__contract__property__owner__first_name'),
+    ExportColumn('Apellido Propietario', 'invoice__contract__property__owner__last_name'),
+    ExportColumn('Mensaje Error', 'error_message'),
+]
+
+
+class _LineBuffer:
+    """Pseudo-archivo para csv.writer que devuelve lo escrito en lugar de guardarlo."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows, rows_per_chunk=500):
+    """
+    Genera el CSV en bloques de bytes UTF-8 (con BOM para Excel).
+    """
+    writer = csv.writer(_LineBuffer())
+    yield ('\ufeff' + writer.writerow([column.header for column in columns])).encode('utf-8')
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= rows_per_chunk:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+def gzip_stream(chunks, level=6):
+    """
+    Comprime con gzip un flujo de bytes sin acumularlo en memoria.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _StreamBuffer(io.RawIOBase):
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que se retira.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if value == '':
+        return '<c/>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def stream_xlsx(columns, rows, sheet_name='Datos', rows_per_chunk=500):
+    """
+    Genera un libro XLSX de una hoja en bloques de bytes.
+
+    La hoja se escribe con cadenas en línea (sin tabla de cadenas compartidas),
+    por lo que no hace falta conocer todas las filas antes de empezar.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield buffer.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                '<row>' + ''.join(_xlsx_cell(column.header) for column in columns) + '</row>'
+            ).encode('utf-8'))
+            lines = []
+            for row in rows:
+                lines.append('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>')
+                if len(lines) >= rows_per_chunk:
+                    sheet.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    chunk = buffer.take()
+                    if chunk:
+                        yield chunk
+            if lines:
+                sheet.write(''.join(lines).encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.take()
+
+
+def rows_response(columns, rows, filename, file_format='csv', compress=False, sheet_name='Datos'):
+    """
+    Crea la respuesta HTTP en streaming a partir de filas ya calculadas.
+
+    Args:
+        columns (list): Columnas (ExportColumn); solo se usan los títulos
+        rows (iterable): Filas con los valores en el orden de las columnas
+        filename (str): Nombre base del archivo, sin extensión
+        file_format (str): ``csv`` o ``xlsx``
+        compress (bool): Comprimir con gzip (solo CSV; el XLSX ya es un ZIP)
+        sheet_name (str): Nombre de la hoja del XLSX
+
+    Returns:
+        StreamingHttpResponse: Respuesta con el archivo adjunto
+    """
+    filename = f"{filename}_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+
+    if file_format == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(columns, rows, sheet_name=sheet_name),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        filename = f'{filename}.xlsx'
+    elif compress:
+        response = StreamingHttpResponse(gzip_stream(stream_csv(columns, rows)), content_type='application/gzip')
+        filename = f'{filename}.csv.gz'
+    else:
+        response = StreamingHttpResponse(stream_csv(columns, rows), content_type='text/csv; charset=utf-8')
+        filename = f'{filename}.csv'
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Evitar que un proxy acumule la respuesta antes de enviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_response(queryset, columns, filename, file_format='csv', compress=False, sheet_name='Datos'):
+    """
+    Crea la respuesta HTTP en streaming para exportar un QuerySet.
+
+    Args:
+        queryset: QuerySet ya filtrado y ordenado
+        columns (list): Columnas (ExportColumn)
+        filename (str): Nombre base del archivo, sin extensión
+        file_format (str): ``csv`` o ``xlsx``
+        compress (bool): Comprimir con gzip (solo CSV; el XLSX ya es un ZIP)
+        sheet_name (str): Nombre de la hoja del XLSX
+
+    Returns:
+        StreamingHttpResponse: Respuesta con el archivo adjunto
+    """
+    return rows_response(
+        columns,
+        iter_export_rows(queryset, columns),
+        filename,
+        file_format=file_format,
+        compress=compress,
+        sheet_name=sheet_name,
+    )
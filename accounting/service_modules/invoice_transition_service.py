@@ -0,0 +1,246 @@
+"""
+Cambios de estado masivos de facturas (validar, enviar, cancelar, reactivar).
+
+Las vistas de una factura hacen ``save()`` por cada cambio, lo que dispara la
+señal de cambio de estado y su consulta de notificaciones. Para validar miles
+de borradores a fin de mes el servicio:
+
+1. verifica en una sola consulta qué facturas pueden pasar al nuevo estado,
+2. aplica el cambio con un único ``UPDATE ... WHERE id IN (...) AND status IN (...)``,
+3. crea las notificaciones de cambio de estado en bloque, con la misma
+   deduplicación que la señal, y
+4. invalida las cachés que las señales invalidarían (dashboard y PDFs de
+   comprobantes de propietario).
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+from accounting.models_invoice import AccountingPeriod, Invoice, InvoiceLine, OwnerReceipt, Payment
+from accounting.service_modules.dashboard_service import invalidate_dashboard_kpis
+from agents.models import Agent
+from user_notifications.services import bulk_create_notifications_if_not_exist
+
+logger = logging.getLogger(__name__)
+
+
+# Transiciones disponibles: estados de origen permitidos y estado final.
+# La reactivación vuelve a "sent" si la factura tiene pagos y a "validated" si no.
+# ``locked`` indica si la transición altera los saldos de cierre y por lo tanto
+# no se aplica a facturas con fecha en un período contable cerrado.
+TRANSITIONS = {
+    'validate': {'from': ('draft',), 'to': 'validated', 'label': 'validadas', 'locked': True},
+    'send': {'from': ('validated',), 'to': 'sent', 'label': 'marcadas como enviadas', 'locked': False},
+    'cancel': {'from': ('draft', 'validated', 'sent'), 'to': 'cancelled', 'label': 'canceladas', 'locked': True},
+    'reactivate': {'from': ('cancelled',), 'to': None, 'label': 'reactivadas', 'locked': True},
+}
+
+# Cambios de estado que generan una notificación al agente
+SIGNIFICANT_STATUS_CHANGES = {
+    ('draft', 'validated'),
+    ('validated', 'sent'),
+    ('sent', 'paid'),
+    ('paid', 'sent'),  # Pago revertido
+    ('validated', 'cancelled'),
+    ('sent', 'cancelled'),
+    ('cancelled', 'validated'),
+    ('cancelled', 'sent'),
+}
+
+STATUS_CHANGE_TEXTS = {
+    'draft': 'borrador',
+    'validated': 'validada',
+    'sent': 'enviada',
+    'paid': 'pagada',
+    'cancelled': 'cancelada',
+}
+
+# Con más cambios que este límite el agente recibe un único resumen
+NOTIFICATION_DETAIL_LIMIT = 20
+
+
+class InvoiceTransitionError(Exception):
+    """Cambio de estado masivo que no se puede aplicar."""
+    pass
+
+
+class InvoiceTransitionService:
+    """
+    Servicio que aplica un cambio de estado a un conjunto de facturas.
+    """
+
+    def transition(self, invoice_ids, action):
+        """
+        Aplica la transición ``action`` a las facturas indicadas.
+
+        Args:
+            invoice_ids (list): IDs de las facturas seleccionadas
+            action (str): ``validate``, ``send``, ``cancel`` o ``reactivate``
+
+        Returns:
+            dict: ``action``, ``updated`` (facturas que cambiaron de estado),
+            ``skipped`` (facturas omitidas con ``invoice_id``, ``number`` y
+            ``reason``) y ``notified`` (notificaciones creadas)
+
+        Raises:
+            InvoiceTransitionError: Si la acción no existe
+        """
+        if action not in TRANSITIONS:
+            raise InvoiceTransitionError(f"Acción no válida: {action}")
+        transition = TRANSITIONS[action]
+        invoice_ids = {int(invoice_id) for invoice_id in invoice_ids}
+
+        with transaction.atomic():
+            eligible, skipped = self._check(invoice_ids, action)
+            updated = 0
+            if eligible:
+                updated = Invoice.objects.filter(
+                    pk__in=[invoice['id'] for invoice in eligible],
+                    status__in=transition['from'],
+                ).update(status=self._target_expression(transition), updated_at=timezone.now())
+                OwnerReceipt.objects.filter(
+                    invoice_id__in=[invoice['id'] for invoice in eligible]
+                ).exclude(pdf_file_path='').update(pdf_file_path='')
+
+        if updated:
+            invalidate_dashboard_kpis()
+        notified = self._notify(eligible)
+        logger.info(
+            f"Cambio de estado masivo '{action}': {updated} facturas actualizadas, "
+            f"{len(skipped)} omitidas"
+        )
+        return {
+            'action': action,
+            'label': transition['label'],
+            'updated': updated,
+            'skipped': skipped,
+            'notified': notified,
+        }
+
+    def _target_expression(self, transition):
+        if transition['to']:
+            return Value(transition['to'])
+        return Case(
+            When(Exists(Payment.objects.filter(invoice=OuterRef('pk'))), then=Value('sent')),
+            default=Value('validated'),
+        )
+
+    def _check(self, invoice_ids, action):
+        """
+        Separa las facturas que pueden cambiar de estado de las que no, en una consulta.
+
+        Las filas elegibles quedan bloqueadas hasta el UPDATE para que otro
+        proceso no cambie su estado entre la verificación y la actualización.
+        """
+        transition = TRANSITIONS[action]
+        status_labels = dict(Invoice.STATUS_CHOICES)
+        rows = (
+            Invoice.objects.filter(pk__in=invoice_ids)
+            .order_by()
+            .select_for_update(of=('self',))
+            .annotate(
+                has_lines=Exists(InvoiceLine.objects.filter(invoice=OuterRef('pk'))),
+                has_payments=Exists(Payment.objects.filter(invoice=OuterRef('pk'))),
+                in_closed_period=Exists(AccountingPeriod.objects.filter(period_end__gte=OuterRef('date'))),
+            )
+            .values_list(
+                'id', 'number', 'status', 'has_lines', 'has_payments', 'in_closed_period',
+                'contract__agent_id', 'customer__first_name', 'customer__last_name',
+            )
+        )
+
+        eligible = []
+        skipped = []
+        found = set()
+        for (invoice_id, number, status, has_lines, has_payments, in_closed_period,
+                agent_id, first_name, last_name) in rows:
+            found.add(invoice_id)
+            reason = None
+            if status not in transition['from']:
+                reason = f"La factura está en estado {status_labels.get(status, status)}."
+            elif action == 'validate' and not has_lines:
+                reason = "No se puede validar una factura sin líneas."
+            elif transition['locked'] and in_closed_period:
+                reason = "La factura pertenece a un período contable cerrado."
+            if reason:
+                skipped.append({'invoice_id': invoice_id, 'number': number, 'reason': reason})
+                continue
+            eligible.append({
+                'id': invoice_id,
+                'number': number,
+                'old_status': status,
+                'new_status': transition['to'] or ('sent' if has_payments else 'validated'),
+                'agent_id': agent_id,
+                'customer': f"{first_name} {last_name}".strip(),
+            })
+
+        for invoice_id in sorted(invoice_ids - found):
+            skipped.append({'invoice_id': invoice_id, 'number': '', 'reason': "No se encontró la factura."})
+        return eligible, skipped
+
+    def _notify(self, eligible):
+        """
+        Crea en bloque las notificaciones de cambio de estado.
+
+        Cada agente recibe una notificación por factura, o un resumen si el
+        lote supera NOTIFICATION_DETAIL_LIMIT facturas de sus contratos. Se
+        crean con ``bulk_create_notifications_if_not_exist``, que aplica la
+        misma deduplicación que la señal de cambio de estado y actualiza los
+        contadores de no leídas y el stream de notificaciones.
+
+        Returns:
+            int: Notificaciones creadas
+        """
+        by_agent = defaultdict(list)
+        for invoice in eligible:
+            if not invoice['agent_id']:
+                continue
+            if (invoice['old_status'], invoice['new_status']) in SIGNIFICANT_STATUS_CHANGES:
+                by_agent[invoice['agent_id']].append(invoice)
+        if not by_agent:
+            return 0
+
+        agents = Agent.objects.in_bulk(list(by_agent))
+        candidates = []
+        for agent_id, invoices in by_agent.items():
+            agent = agents[agent_id]
+            if len(invoices) > NOTIFICATION_DETAIL_LIMIT:
+                new_status = STATUS_CHANGE_TEXTS.get(invoices[0]['new_status'], invoices[0]['new_status'])
+                numbers = ', '.join(invoice['number'] for invoice in invoices[:10])
+                candidates.append({
+                    'agent': agent,
+                    'title': f"Cambio de Estado - {len(invoices)} Facturas",
+                    'message': (
+                        f"{len(invoices)} facturas de sus contratos pasaron a estado '{new_status}': "
+                        f"{numbers} y {len(invoices) - 10} más."
+                    ),
+                    'notification_type': 'invoice_status_change',
+                })
+                continue
+            for invoice in invoices:
+                old_status = STATUS_CHANGE_TEXTS.get(invoice['old_status'], invoice['old_status'])
+                new_status = STATUS_CHANGE_TEXTS.get(invoice['new_status'], invoice['new_status'])
+                message = (
+                    f"La factura N° {invoice['number']} del cliente {invoice['customer']} "
+                    f"cambió de estado de '{old_status}' a '{new_status}'."
+                )
+                if invoice['new_status'] == 'cancelled':
+                    message += " Esta factura ya no está activa en el sistema."
+                candidates.append({
+                    'agent': agent,
+                    'title': f"Cambio de Estado - Factura {invoice['number']}",
+                    'message': message,
+                    'notification_type': 'invoice_status_change',
+                    # Solo se usa su tipo de contenido y su pk: no hace falta cargarla
+                    'related_object': Invoice(pk=invoice['id']),
+                })
+
+        try:
+            notifications = bulk_create_notifications_if_not_exist(candidates)
+        except Exception as e:
+            logger.error(f"Error creando las notificaciones del cambio de estado masivo: {str(e)}")
+            return 0
+        return len(notifications)
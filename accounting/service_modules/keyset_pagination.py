@@ -0,0 +1,192 @@
+"""
+Paginación por clave (keyset / seek) para listados grandes.
+
+En lugar de ``OFFSET`` y ``COUNT(*)``, cada página se pide a partir de los
+valores de ordenamiento de la última (o primera) fila de la página anterior:
+``WHERE (date, id) < (:date, :id) ORDER BY date DESC, id DESC LIMIT n``. Con un
+índice sobre las columnas de ordenamiento el costo de una página no depende de
+su profundidad. El total se cuenta con un tope, así las búsquedas con muchos
+resultados no recorren toda la tabla.
+"""
+import base64
+import json
+import logging
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginación mal formado."""
+    pass
+
+
+class KeysetPage:
+    """
+    Página de resultados de un ``KeysetPaginator``.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    Paginador por clave sobre un QuerySet.
+
+    El ordenamiento debe ser total: la última columna tiene que ser única
+    (normalmente ``id``) para que ninguna fila se repita o se pierda entre
+    páginas.
+
+    Args:
+        queryset: QuerySet a paginar (su ordenamiento se reemplaza)
+        per_page (int): Filas por página
+        ordering (tuple): Campos de ordenamiento, con ``-`` para descendente
+        count_cap (int): Máximo de filas a contar para el total
+    """
+
+    def __init__(self, queryset, per_page=25, ordering=('-date', '-id'), count_cap=1000):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.count_cap = count_cap
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    @cached_property
+    def _capped_count(self):
+        # COUNT sobre una subconsulta con LIMIT: se detiene al llegar al tope
+        return self.queryset.order_by().values('pk')[:self.count_cap + 1].count()
+
+    @property
+    def count(self):
+        """Cantidad de resultados, como máximo ``count_cap``."""
+        return min(self._capped_count, self.count_cap)
+
+    @property
+    def count_capped(self):
+        """Indica si hay más resultados que los contados."""
+        return self._capped_count > self.count_cap
+
+    def get_page(self, after=None, before=None):
+        """
+        Devuelve la página siguiente a ``after`` o anterior a ``before``.
+
+        Sin cursor (o con un cursor inválido) devuelve la primera página.
+
+        Args:
+            after (str): Cursor de la última fila de la página anterior
+            before (str): Cursor de la primera fila de la página siguiente
+
+        Returns:
+            KeysetPage: Página de resultados
+        """
+        try:
+            if before:
+                return self._page_before(self.decode_cursor(before))
+            if after:
+                return self._page_after(self.decode_cursor(after))
+        except InvalidCursor as e:
+            logger.warning(f"Cursor de paginación inválido: {str(e)}")
+        return self._page_after(None)
+
+    def _page_after(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward=True))
+        rows = list(queryset[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page],
+            self,
+            has_next=len(rows) > self.per_page,
+            has_previous=values is not None,
+        )
+
+    def _page_before(self, values):
+        reversed_ordering = [
+            field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+        ]
+        queryset = self.queryset.order_by(*reversed_ordering).filter(self._seek_filter(values, forward=False))
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return KeysetPage(rows, self, has_next=True, has_previous=has_previous)
+
+    def _seek_filter(self, values, forward):
+        """
+        Condición lexicográfica ``(a, b, ...) > / < (valores)`` según el ordenamiento.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for previous in range(index):
+                term &= Q(**{self.fields[previous]: values[previous]})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, obj):
+        """
+        Codifica los valores de ordenamiento de una fila como cursor opaco.
+        """
+        values = [self._field(name).value_to_string(obj) for name in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Decodifica un cursor a los valores de ordenamiento.
+
+        Raises:
+            InvalidCursor: Si el cursor no corresponde a este ordenamiento
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if not isinstance(raw_values, list) or len(raw_values) != len(self.fields):
+                raise ValueError("cantidad de valores incorrecta")
+            return [
+                self._field(name).to_python(value) for name, value in zip(self.fields, raw_values)
+            ]
+        except Exception as e:
+            raise InvalidCursor(str(e)) from e
+
+    def _field(self, name):
+        meta = self.queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
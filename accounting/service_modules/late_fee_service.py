@@ -0,0 +1,209 @@
+"""
+Devengamiento diario de intereses por mora en facturas vencidas.
+
+La tasa, el período de gracia y el tope se guardan como configuraciones de
+la empresa (``CompanyConfiguration``):
+
+- ``late_fee_enabled``: activa el devengamiento (boolean)
+- ``late_fee_rate``: tasa en porcentaje (decimal)
+- ``late_fee_rate_period``: ``day`` (tasa diaria) o ``month`` (tasa mensual, 30 días)
+- ``late_fee_grace_days``: días posteriores al vencimiento sin interés (integer)
+- ``late_fee_cap_percent``: tope del interés acumulado como porcentaje del
+  importe original de la factura (decimal, opcional)
+
+Cada factura vencida tiene como máximo una línea "Interés por mora" que se
+crea o ajusta en cada ejecución. La línea guarda hasta qué día se devengó,
+así que ejecutar el proceso más de una vez en el mismo día no suma interés.
+Pasado el período de gracia el interés se cuenta desde el vencimiento, sobre
+el capital pendiente (saldo sin el interés ya devengado). Las facturas con
+fecha en un período contable cerrado no se ajustan.
+"""
+import logging
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounting.models_invoice import AccountingPeriod, Invoice, InvoiceLine, OwnerReceipt
+from accounting.service_modules.dashboard_service import invalidate_dashboard_kpis
+
+logger = logging.getLogger(__name__)
+
+
+LATE_FEE_CONCEPT = "Interés por mora"
+
+OPEN_STATUSES = ('validated', 'sent')
+
+RATE_PERIODS = {'day': 1, 'month': 30}
+
+CENTS = Decimal('0.01')
+
+LATE_FEE_CONFIG_KEYS = (
+    'late_fee_enabled',
+    'late_fee_rate',
+    'late_fee_rate_period',
+    'late_fee_grace_days',
+    'late_fee_cap_percent',
+)
+
+
+def _to_decimal(value):
+    if value in (None, ''):
+        return None
+    return Decimal(str(value))
+
+
+def load_late_fee_config(company=None):
+    """
+    Lee la configuración de intereses por mora de la empresa en una consulta.
+
+    Returns:
+        dict: ``enabled``, ``rate`` (porcentaje), ``period``, ``grace_days`` y
+        ``cap_percent`` (None si no hay tope)
+    """
+    if company is None:
+        from core.models import Company
+        company = Company.objects.first()
+
+    values = {}
+    if company is not None:
+        values = {
+            config.config_key: config.get_value()
+            for config in company.configurations.filter(config_key__in=LATE_FEE_CONFIG_KEYS)
+        }
+
+    period = values.get('late_fee_rate_period') or 'month'
+    return {
+        'enabled': bool(values.get('late_fee_enabled')),
+        'rate': _to_decimal(values.get('late_fee_rate')) or Decimal('0'),
+        'period': period if period in RATE_PERIODS else 'month',
+        'grace_days': int(values.get('late_fee_grace_days') or 0),
+        'cap_percent': _to_decimal(values.get('late_fee_cap_percent')),
+    }
+
+
+class LateFeeAccrualService:
+    """
+    Servicio que devenga los intereses por mora de todas las facturas vencidas.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else load_late_fee_config()
+
+    def accrue(self, as_of=None):
+        """
+        Devenga los intereses hasta ``as_of`` en una sola pasada.
+
+        Se leen las facturas vencidas y sus líneas de interés en dos
+        consultas, se calcula el interés en memoria y se escriben los
+        cambios con ``bulk_create`` / ``bulk_update``.
+
+        Args:
+            as_of (date): Fecha de devengamiento (por defecto hoy)
+
+        Returns:
+            dict: ``invoices`` (facturas con interés nuevo), ``created`` y
+            ``updated`` (líneas), ``amount`` (interés devengado en esta
+            ejecución) y ``skipped`` (True si el devengamiento está desactivado)
+        """
+        as_of = as_of or timezone.localdate()
+        result = {'invoices': 0, 'created': 0, 'updated': 0, 'amount': Decimal('0.00'), 'skipped': False}
+        if not self.config['enabled'] or self.config['rate'] <= 0:
+            result['skipped'] = True
+            return result
+
+        overdue = Invoice.objects.filter(
+            status__in=OPEN_STATUSES,
+            balance__gt=0,
+            due_date__lt=as_of - timedelta(days=self.config['grace_days']),
+        )
+        lock_date = AccountingPeriod.get_lock_date()
+        if lock_date is not None:
+            # El total de las facturas de un mes cerrado forma parte de sus saldos de cierre
+            overdue = overdue.filter(date__gt=lock_date)
+        daily_rate = self.config['rate'] / Decimal(100) / RATE_PERIODS[self.config['period']]
+
+        with transaction.atomic():
+            lines = {
+                line.invoice_id: line
+                for line in InvoiceLine.objects.select_for_update().filter(
+                    is_late_fee=True, invoice__in=overdue
+                )
+            }
+
+            new_lines = []
+            changed_lines = []
+            adjusted_invoices = []
+            for invoice_id, due_date, total_amount, balance in overdue.values_list(
+                'id', 'due_date', 'total_amount', 'balance'
+            ).iterator(chunk_size=self.BATCH_SIZE):
+                line = lines.get(invoice_id)
+                accrued = line.amount if line else Decimal('0.00')
+                start = line.accrued_until if line and line.accrued_until else due_date
+                days = (as_of - start).days
+                if days <= 0:
+                    # Ya devengado hoy: la ejecución es idempotente
+                    continue
+
+                principal = total_amount - accrued
+                outstanding = min(balance - accrued, principal)
+                increment = Decimal('0.00')
+                if outstanding > 0:
+                    increment = (outstanding * daily_rate * days).quantize(CENTS, rounding=ROUND_HALF_UP)
+                if self.config['cap_percent'] is not None:
+                    cap = (principal * self.config['cap_percent'] / Decimal(100)).quantize(CENTS)
+                    increment = max(min(increment, cap - accrued), Decimal('0.00'))
+
+                if line is None:
+                    if increment <= 0:
+                        continue
+                    new_lines.append(InvoiceLine(
+                        invoice_id=invoice_id,
+                        concept=LATE_FEE_CONCEPT,
+                        amount=increment,
+                        is_late_fee=True,
+                        accrued_until=as_of,
+                    ))
+                else:
+                    line.amount = accrued + increment
+                    line.accrued_until = as_of
+                    line.updated_at = timezone.now()
+                    changed_lines.append(line)
+
+                if increment > 0:
+                    invoice = Invoice(pk=invoice_id)
+                    # Expresiones para no pisar pagos registrados mientras corre el proceso
+                    invoice.total_amount = F('total_amount') + increment
+                    invoice.balance = F('balance') + increment
+                    invoice.updated_at = timezone.now()
+                    adjusted_invoices.append(invoice)
+                    result['amount'] += increment
+
+            InvoiceLine.objects.bulk_create(new_lines, batch_size=self.BATCH_SIZE)
+            InvoiceLine.objects.bulk_update(
+                changed_lines, ['amount', 'accrued_until', 'updated_at'], batch_size=self.BATCH_SIZE
+            )
+            Invoice.objects.bulk_update(
+                adjusted_invoices, ['total_amount', 'balance', 'updated_at'], batch_size=self.BATCH_SIZE
+            )
+            OwnerReceipt.objects.filter(
+                invoice_id__in=[invoice.pk for invoice in adjusted_invoices]
+            ).exclude(pdf_file_path='').update(pdf_file_path='')
+
+        if adjusted_invoices:
+            invalidate_dashboard_kpis()
+
+        result.update({
+            'invoices': len(adjusted_invoices),
+            'created': len(new_lines),
+            'updated': len(changed_lines),
+        })
+        logger.info(
+            f"Intereses por mora al {as_of}: ${result['amount']:,.2f} en {result['invoices']} facturas "
+            f"({result['created']} líneas nuevas, {result['updated']} ajustadas)"
+        )
+        return result
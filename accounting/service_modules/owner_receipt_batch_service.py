@@ -0,0 +1,346 @@
+"""
+Servicio de generación y envío masivo de comprobantes de propietarios.
+
+Genera los comprobantes de todas las facturas de un período en bloques: cada
+bloque valida sus facturas en memoria a partir de un ``ReceiptContext``,
+reserva los números de comprobante de una sola vez, renderiza los PDFs en
+paralelo y envía los emails por una única conexión SMTP. El estado de cada
+factura queda en un ``OwnerReceiptBatchItem``, que actúa como punto de
+control: si el proceso se interrumpe, al reanudarlo solo se procesan los
+ítems pendientes, los comprobantes ya generados no se duplican y los ya
+enviados no se vuelven a enviar.
+"""
+import logging
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounting.models_invoice import (
+    Invoice,
+    OwnerReceipt,
+    OwnerReceiptBatchItem,
+    OwnerReceiptBatchJob,
+)
+from accounting.models_sequence import DocumentSequence
+from accounting.service_modules.pdf_cache_service import get_pdf_cache
+from accounting.service_modules.receipt_context import INVOICE_RELATED_FIELDS, ReceiptContext
+
+logger = logging.getLogger(__name__)
+
+
+class OwnerReceiptBatchService:
+    """
+    Servicio que crea y procesa generaciones masivas de comprobantes por período.
+    """
+
+    RECEIPT_INVOICE_STATUSES = ('validated', 'sent', 'paid')
+    OPEN_ITEM_STATUSES = ('pending', 'generated')
+    CHUNK_SIZE = 50
+
+    def __init__(self, chunk_size=None, receipt_service=None, pdf_cache=None):
+        from accounting.services import OwnerReceiptService
+
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.receipt_service = receipt_service or OwnerReceiptService()
+        self.pdf_cache = pdf_cache or get_pdf_cache()
+
+    def create_job(self, period, requested_by=None, agent=None, send_email=True):
+        """
+        Crea una generación masiva con las facturas del período.
+
+        Se incluyen las facturas con contrato en estado validada, enviada o
+        pagada que todavía no tienen un comprobante enviado.
+
+        Args:
+            period (date): Cualquier fecha del mes a procesar
+            requested_by: Agente que solicita el proceso
+            agent: Limitar a los contratos de este agente (opcional)
+            send_email (bool): Enviar los comprobantes por email
+
+        Returns:
+            OwnerReceiptBatchJob: Proceso creado, pendiente de ejecutar
+        """
+        period = period.replace(day=1)
+        invoices = (
+            Invoice.objects.filter(
+                date__year=period.year,
+                date__month=period.month,
+                status__in=self.RECEIPT_INVOICE_STATUSES,
+                contract__isnull=False,
+            )
+            .exclude(owner_receipts__status='sent')
+            .order_by('id')
+        )
+        if agent is not None:
+            invoices = invoices.filter(contract__agent=agent)
+
+        with transaction.atomic():
+            job = OwnerReceiptBatchJob.objects.create(
+                requested_by=requested_by,
+                period=period,
+                agent=agent,
+                send_email=send_email,
+            )
+            items = [
+                OwnerReceiptBatchItem(job=job, invoice_id=invoice_id, agent_id=agent_id)
+                for invoice_id, agent_id in invoices.values_list('id', 'contract__agent_id')
+            ]
+            OwnerReceiptBatchItem.objects.bulk_create(items)
+            job.total_count = len(items)
+            job.save(update_fields=['total_count', 'updated_at'])
+
+        logger.info(f"Generación masiva de comprobantes #{job.pk} creada: {len(items)} facturas de {period:%m/%Y}")
+        return job
+
+    def process_job(self, job_id):
+        """
+        Procesa los ítems pendientes de una generación masiva.
+
+        Es reanudable: los ítems ya terminados se saltean y los comprobantes
+        ya generados solo se renderizan y envían.
+
+        Args:
+            job_id (int): ID del proceso
+
+        Returns:
+            OwnerReceiptBatchJob: Proceso actualizado
+        """
+        job = OwnerReceiptBatchJob.objects.select_related('requested_by').get(pk=job_id)
+        if job.is_finished:
+            return job
+
+        OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(
+            status='running', started_at=job.started_at or timezone.now()
+        )
+
+        company = ReceiptContext.load_company()
+        related_fields = ['receipt'] + [f'invoice__{field}' for field in INVOICE_RELATED_FIELDS]
+        try:
+            while True:
+                items = list(
+                    job.items.filter(status__in=self.OPEN_ITEM_STATUSES)
+                    .select_related(*related_fields)
+                    .order_by('id')[:self.chunk_size]
+                )
+                if not items:
+                    break
+                self._process_chunk(job, items, company)
+        except Exception as e:
+            logger.error(f"Error procesando la generación masiva de comprobantes #{job.pk}: {str(e)}")
+            OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(
+                status='failed', error_message=str(e), finished_at=timezone.now()
+            )
+            raise
+
+        OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(status='completed', finished_at=timezone.now())
+        job.refresh_from_db()
+        logger.info(
+            f"Generación masiva de comprobantes #{job.pk} completada: {job.generated_count} generados, "
+            f"{job.sent_count} enviados, {job.error_count} errores, {job.skipped_count} omitidas"
+        )
+        return job
+
+    def _process_chunk(self, job, items, company):
+        """
+        Valida, genera, renderiza y envía un bloque de ítems.
+        """
+        contexts = ReceiptContext.for_invoices([item.invoice for item in items], company=company)
+        for item, context in zip(items, contexts):
+            item.context = context
+            if item.status == 'generated' and item.receipt is None:
+                # El comprobante se eliminó después de generarse; se vuelve a generar
+                item.status = 'pending'
+
+        pending = [item for item in items if item.status == 'pending']
+        self._validate(pending)
+        generated = self._generate_receipts(job, [item for item in pending if item.status == 'pending'])
+
+        ready = [item for item in items if item.status == 'generated']
+        self._render_and_send(job, ready)
+
+        # Los ítems enviados ya se guardaron uno por uno en _mark_sent
+        items = [item for item in items if item.status != 'sent']
+        now = timezone.now()
+        for item in items:
+            item.processed_at = item.processed_at or now
+            item.updated_at = now  # bulk_update no aplica auto_now
+
+        counts = {status: 0 for status, _ in OwnerReceiptBatchItem.STATUS_CHOICES}
+        for item in items:
+            counts[item.status] += 1
+
+        with transaction.atomic():
+            OwnerReceiptBatchItem.objects.bulk_update(
+                items, ['status', 'error_message', 'processed_at', 'updated_at']
+            )
+            OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(
+                processed_count=F('processed_count') + len(items) - counts['pending'] - counts['generated'],
+                error_count=F('error_count') + counts['failed'],
+                skipped_count=F('skipped_count') + counts['skipped'],
+                updated_at=now,
+            )
+        logger.debug(f"Generación masiva #{job.pk}: bloque de {len(items)} ítems procesado ({generated} generados)")
+
+    def _validate(self, items):
+        """
+        Valida en memoria las facturas de los ítems y marca las que no corresponden.
+        """
+        for item in items:
+            is_valid, error_message, _ = item.context.validate()
+            if not is_valid:
+                item.status = 'skipped'
+                item.error_message = error_message
+            elif item.context.receipts_summary['sent_number']:
+                item.status = 'skipped'
+                item.error_message = (
+                    f"La factura ya tiene un comprobante enviado: {item.context.receipts_summary['sent_number']}"
+                )
+
+    def _generate_receipts(self, job, items):
+        """
+        Crea los comprobantes de los ítems válidos reservando los números en bloque.
+
+        Los comprobantes y el estado de sus ítems se guardan en la misma
+        transacción, de modo que un reinicio nunca los vuelve a generar.
+
+        Returns:
+            int: Cantidad de comprobantes generados
+        """
+        from accounting.services import OwnerReceiptValidationError
+
+        receipts = []
+        for item in items:
+            try:
+                receipt_data = self.receipt_service.get_receipt_data(item.invoice, context=item.context)
+            except OwnerReceiptValidationError as e:
+                item.status = 'skipped'
+                item.error_message = e.messages[0] if e.messages else str(e)
+                continue
+            receipts.append(OwnerReceipt(
+                invoice=item.invoice,
+                generated_by=job.requested_by,
+                email_sent_to=receipt_data['owner']['email'],
+                gross_amount=receipt_data['financial']['gross_amount'],
+                discount_percentage=receipt_data['financial']['discount_percentage'],
+                discount_amount=receipt_data['financial']['discount_amount'],
+                net_amount=receipt_data['financial']['net_amount'],
+                status='generated',
+            ))
+        if not receipts:
+            return 0
+
+        generating = [item for item in items if item.status == 'pending']
+        now = timezone.now()
+        with transaction.atomic():
+            numbers = DocumentSequence.allocate(DocumentSequence.SERIES_OWNER_RECEIPT, count=len(receipts))
+            for receipt, number in zip(receipts, numbers):
+                receipt.receipt_number = number
+            OwnerReceipt.objects.bulk_create(receipts)
+
+            for item, receipt in zip(generating, receipts):
+                item.receipt = receipt
+                item.status = 'generated'
+                item.updated_at = now
+            OwnerReceiptBatchItem.objects.bulk_update(generating, ['receipt', 'status', 'updated_at'])
+            OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(
+                generated_count=F('generated_count') + len(receipts)
+            )
+        return len(receipts)
+
+    def _render_and_send(self, job, items):
+        """
+        Renderiza en paralelo los PDFs de los comprobantes y los envía por una única conexión.
+        """
+        from accounting.services import (
+            OWNER_RECEIPT_PDF_TEMPLATE,
+            OwnerReceiptEmailError,
+            OwnerReceiptPDFError,
+        )
+
+        documents = []
+        rendering = []
+        for item in items:
+            item.receipt.invoice = item.invoice
+            try:
+                html_string = self.receipt_service.render_receipt_html(item.receipt, context=item.context)
+            except OwnerReceiptPDFError as e:
+                self._fail(item, str(e))
+                continue
+            documents.append((html_string, OWNER_RECEIPT_PDF_TEMPLATE, None))
+            rendering.append(item)
+
+        pdf_results = self.pdf_cache.render_many(documents)
+        to_send = []
+        for item, document, pdf_result in zip(rendering, documents, pdf_results):
+            content = pdf_result.content
+            if pdf_result.error or not content or not content.startswith(b'%PDF-'):
+                self._fail(item, f"Error generando el PDF: {str(pdf_result.error or 'contenido inválido')}")
+                continue
+            if job.send_email:
+                # Al enviarse cambia el estado del comprobante y su PDF deja de estar al día
+                to_send.append((item, content))
+                continue
+            if self.pdf_cache.enabled:
+                item.receipt.pdf_file_path = self.pdf_cache.relative_path(
+                    self.pdf_cache.make_key(document[0], document[1], document[2])
+                )
+            item.status = 'done'
+
+        if to_send:
+            connection = get_connection()
+            try:
+                connection.open()
+                for item, content in to_send:
+                    receipt = item.receipt
+                    try:
+                        receipt_data = self.receipt_service.get_receipt_data(item.invoice, context=item.context)
+                        self.receipt_service.build_receipt_email(
+                            receipt, receipt_data, content, connection=connection
+                        ).send()
+                    except OwnerReceiptEmailError as e:
+                        self._fail(item, str(e))
+                        continue
+                    except Exception as e:
+                        logger.error(f"Error enviando comprobante {receipt.receipt_number}: {str(e)}")
+                        self._fail(item, f"Error enviando email: {str(e)}")
+                        continue
+                    self._mark_sent(job, item)
+            finally:
+                connection.close()
+
+        receipts = [item.receipt for item in items if item.status != 'sent']
+        if receipts:
+            OwnerReceipt.objects.bulk_update(receipts, ['status', 'sent_at', 'error_message', 'pdf_file_path'])
+
+    def _mark_sent(self, job, item):
+        """
+        Guarda el envío de un comprobante apenas sale el email.
+
+        No se espera al final del bloque: si el proceso se interrumpe a mitad
+        del envío, al reanudarlo los comprobantes ya enviados no se reenvían.
+        """
+        now = timezone.now()
+        receipt = item.receipt
+        receipt.status = 'sent'
+        receipt.sent_at = now
+        receipt.error_message = ''
+        item.status = 'sent'
+        item.error_message = ''
+        item.processed_at = item.processed_at or now
+        with transaction.atomic():
+            receipt.save(update_fields=['status', 'sent_at', 'error_message'])
+            item.save(update_fields=['status', 'error_message', 'processed_at', 'updated_at'])
+            OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(
+                processed_count=F('processed_count') + 1,
+                sent_count=F('sent_count') + 1,
+                updated_at=now,
+            )
+
+    def _fail(self, item, error_message):
+        item.status = 'failed'
+        item.error_message = error_message
+        item.receipt.status = 'failed'
+        item.receipt.error_message = error_message
+        item.receipt.pdf_file_path = ''
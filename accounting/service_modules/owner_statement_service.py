@@ -0,0 +1,396 @@
+"""
+Servicio de liquidaciones mensuales consolidadas por propietario.
+
+Un propietario con varias unidades alquiladas recibe, en lugar de un
+comprobante por factura, una única liquidación del período con todas las
+facturas de sus propiedades: un solo PDF (de varias páginas si hace falta) y un
+solo email. Los montos por línea se calculan en la consulta de facturas y los
+totales bruto, descuento y neto salen de una única agregación agrupada por
+propietario.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice
+from accounting.service_modules.pdf_cache_service import get_pdf_cache
+from accounting.service_modules.receipt_context import ReceiptContext
+
+logger = logging.getLogger(__name__)
+
+
+OWNER_STATEMENT_PDF_TEMPLATE = 'accounting/owner_statement_pdf.html'
+OWNER_STATEMENT_EMAIL_TEMPLATE = 'emails/owner_statement_email.html'
+
+AMOUNT_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+class OwnerStatementError(Exception):
+    """Excepción específica para errores de las liquidaciones de propietarios."""
+    pass
+
+
+class OwnerStatementService:
+    """
+    Servicio que arma, renderiza y envía las liquidaciones consolidadas de propietarios.
+    """
+
+    STATEMENT_INVOICE_STATUSES = ('validated', 'sent', 'paid')
+
+    def __init__(self, pdf_cache=None):
+        self.pdf_cache = pdf_cache or get_pdf_cache()
+
+    @staticmethod
+    def period_bounds(period):
+        """
+        Devuelve el primer día del período y el primer día del mes siguiente.
+
+        Args:
+            period (date): Cualquier fecha del mes
+
+        Returns:
+            tuple: (inicio, fin) con el fin excluido
+        """
+        start = period.replace(day=1)
+        if start.month == 12:
+            return start, date(start.year + 1, 1, 1)
+        return start, date(start.year, start.month + 1, 1)
+
+    def period_invoices(self, period, owner_ids=None):
+        """
+        Facturas del período con contrato y propietario, con sus montos de liquidación.
+
+        Cada factura se anota con ``discount_percentage``, ``discount_amount`` y
+        ``net_amount`` calculados en la base de datos con el porcentaje de
+        descuento de su contrato.
+
+        Args:
+            period (date): Cualquier fecha del mes
+            owner_ids (list): Limitar a estos propietarios (opcional)
+
+        Returns:
+            QuerySet: Facturas anotadas
+        """
+        start, end = self.period_bounds(period)
+        invoices = Invoice.objects.filter(
+            date__gte=start,
+            date__lt=end,
+            status__in=self.STATEMENT_INVOICE_STATUSES,
+            contract__property__owner__isnull=False,
+        )
+        if owner_ids is not None:
+            invoices = invoices.filter(contract__property__owner_id__in=owner_ids)
+
+        return invoices.annotate(
+            statement_owner_id=F('contract__property__owner_id'),
+            discount_percentage=Coalesce(
+                F('contract__owner_discount_percentage'), Value(Decimal('0.00')), output_field=AMOUNT_FIELD
+            ),
+            discount_amount=Round(
+                ExpressionWrapper(
+                    F('total_amount') * F('discount_percentage') * Value(Decimal('0.01')),
+                    output_field=AMOUNT_FIELD,
+                ),
+                2,
+                output_field=AMOUNT_FIELD,
+            ),
+            net_amount=ExpressionWrapper(
+                F('total_amount') - F('discount_amount'), output_field=AMOUNT_FIELD
+            ),
+        )
+
+    def owner_totals(self, period, owner_ids=None):
+        """
+        Totales de liquidación por propietario en una sola consulta agrupada.
+
+        Args:
+            period (date): Cualquier fecha del mes
+            owner_ids (list): Limitar a estos propietarios (opcional)
+
+        Returns:
+            dict: ID de propietario -> dict con ``invoice_count``,
+            ``property_count``, ``gross_amount``, ``discount_amount`` y ``net_amount``
+        """
+        rows = (
+            self.period_invoices(period, owner_ids)
+            .order_by()
+            .values('statement_owner_id')
+            .annotate(
+                invoice_count=Count('id'),
+                property_count=Count('contract__property', distinct=True),
+                gross_amount=Sum('total_amount'),
+                total_discount=Sum('discount_amount'),
+                total_net=Sum('net_amount'),
+            )
+        )
+        return {
+            row['statement_owner_id']: {
+                'invoice_count': row['invoice_count'],
+                'property_count': row['property_count'],
+                'gross_amount': self._amount(row['gross_amount']),
+                'discount_amount': self._amount(row['total_discount']),
+                'net_amount': self._amount(row['total_net']),
+            }
+            for row in rows
+        }
+
+    def get_statement_data(self, owner, period, company=None):
+        """
+        Arma los datos de la liquidación de un propietario.
+
+        Args:
+            owner: Propietario (Customer)
+            period (date): Cualquier fecha del mes
+            company: Empresa a mostrar (se consulta si no se indica)
+
+        Returns:
+            dict: Datos para el PDF y el email
+
+        Raises:
+            OwnerStatementError: Si el propietario no tiene facturas en el período
+        """
+        invoices = list(self._statement_lines(period, [owner.pk]))
+        totals = self.owner_totals(period, [owner.pk]).get(owner.pk)
+        if not invoices or totals is None:
+            raise OwnerStatementError(
+                f"El propietario no tiene facturas para liquidar en {period:%m/%Y}"
+            )
+        if company is None:
+            company = ReceiptContext.load_company()
+        return self._build_statement_data(owner, period, invoices, totals, company)
+
+    def render_statement_html(self, statement_data):
+        """
+        Renderiza el HTML del PDF de la liquidación.
+        """
+        try:
+            return render_to_string(OWNER_STATEMENT_PDF_TEMPLATE, statement_data)
+        except Exception as e:
+            logger.error(f"Error renderizando la liquidación de {statement_data['owner']['name']}: {str(e)}")
+            raise OwnerStatementError("Error renderizando el template de la liquidación")
+
+    def generate_pdf(self, owner, period, statement_data=None):
+        """
+        Genera el PDF de la liquidación de un propietario, o lo toma de la caché.
+
+        Returns:
+            bytes: Contenido del PDF
+
+        Raises:
+            OwnerStatementError: Si no hay datos o no se puede generar el PDF
+        """
+        statement_data = statement_data or self.get_statement_data(owner, period)
+        html_string = self.render_statement_html(statement_data)
+        pdf_result = self.pdf_cache.render_many([(html_string, OWNER_STATEMENT_PDF_TEMPLATE, None)])[0]
+        if pdf_result.error:
+            logger.error(
+                f"Error generando el PDF de la liquidación de {statement_data['owner']['name']}: {str(pdf_result.error)}"
+            )
+            raise OwnerStatementError(f"Error técnico generando PDF: {str(pdf_result.error)}")
+        pdf_content = pdf_result.content
+        if not pdf_content or not pdf_content.startswith(b'%PDF-'):
+            raise OwnerStatementError("El contenido generado no es un PDF válido")
+        return pdf_content
+
+    def build_statement_email(self, statement_data, pdf_content, connection=None):
+        """
+        Construye el email de la liquidación con el PDF adjunto.
+
+        Args:
+            statement_data (dict): Datos de la liquidación (ver get_statement_data)
+            pdf_content (bytes): PDF de la liquidación
+            connection: Conexión de correo a reutilizar (opcional)
+
+        Returns:
+            EmailMessage: Email listo para enviar
+
+        Raises:
+            OwnerStatementError: Si el propietario no tiene email
+        """
+        owner = statement_data['owner']
+        if not owner['email']:
+            raise OwnerStatementError("El propietario no tiene email configurado")
+
+        company_name = getattr(settings, 'COMPANY_NAME', 'Inmobiliaria')
+        email_body = render_to_string(OWNER_STATEMENT_EMAIL_TEMPLATE, {
+            'owner_name': owner['name'],
+            'period': statement_data['period_label'],
+            'company_name': company_name,
+            'property_count': statement_data['totals']['property_count'],
+            'invoice_count': statement_data['totals']['invoice_count'],
+            'gross_amount': statement_data['totals']['gross_amount'],
+            'discount_amount': statement_data['totals']['discount_amount'],
+            'net_amount': statement_data['totals']['net_amount'],
+        })
+        email = EmailMessage(
+            subject=f"Liquidación de Alquileres - {statement_data['period_label']}",
+            body=email_body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[owner['email']],
+            connection=connection,
+        )
+        email.content_subtype = 'html'
+        email.attach(statement_data['filename'], pdf_content, 'application/pdf')
+        return email
+
+    def send_statement(self, owner, period, connection=None):
+        """
+        Genera y envía la liquidación de un propietario.
+
+        Returns:
+            dict: Totales de la liquidación enviada
+        """
+        statement_data = self.get_statement_data(owner, period)
+        pdf_content = self.generate_pdf(owner, period, statement_data=statement_data)
+        self.build_statement_email(statement_data, pdf_content, connection=connection).send()
+        logger.info(
+            f"Liquidación de {statement_data['period_label']} enviada a {owner.email}: "
+            f"{statement_data['totals']['invoice_count']} facturas"
+        )
+        return statement_data['totals']
+
+    def send_period_statements(self, period, owner_ids=None):
+        """
+        Genera y envía las liquidaciones de todos los propietarios de un período.
+
+        Las facturas de todos los propietarios se leen en una consulta, los
+        totales en otra, los PDFs se renderizan en paralelo y los emails salen
+        por una única conexión SMTP.
+
+        Args:
+            period (date): Cualquier fecha del mes
+            owner_ids (list): Limitar a estos propietarios (opcional)
+
+        Returns:
+            dict: ``sent``, ``skipped`` y ``errors`` (lista de mensajes)
+        """
+        totals_by_owner = self.owner_totals(period, owner_ids)
+        results = {'sent': 0, 'skipped': 0, 'errors': []}
+        if not totals_by_owner:
+            return results
+
+        lines_by_owner = {}
+        owners = {}
+        for invoice in self._statement_lines(period, list(totals_by_owner)):
+            owner = invoice.contract.property.owner
+            owners[owner.pk] = owner
+            lines_by_owner.setdefault(owner.pk, []).append(invoice)
+
+        company = ReceiptContext.load_company()
+        statements = []
+        for owner_id, invoices in lines_by_owner.items():
+            owner = owners[owner_id]
+            if not owner.email:
+                results['skipped'] += 1
+                logger.warning(f"Liquidación de {owner} omitida: el propietario no tiene email")
+                continue
+            statement_data = self._build_statement_data(
+                owner, period, invoices, totals_by_owner[owner_id], company
+            )
+            try:
+                html_string = self.render_statement_html(statement_data)
+            except OwnerStatementError as e:
+                results['errors'].append(f"{owner}: {str(e)}")
+                continue
+            statements.append((statement_data, (html_string, OWNER_STATEMENT_PDF_TEMPLATE, None)))
+
+        pdf_results = self.pdf_cache.render_many([document for _, document in statements])
+
+        connection = get_connection()
+        try:
+            connection.open()
+            for (statement_data, _), pdf_result in zip(statements, pdf_results):
+                owner_name = statement_data['owner']['name']
+                content = pdf_result.content
+                if pdf_result.error or not content or not content.startswith(b'%PDF-'):
+                    results['errors'].append(
+                        f"{owner_name}: Error generando el PDF: {str(pdf_result.error or 'contenido inválido')}"
+                    )
+                    continue
+                try:
+                    self.build_statement_email(statement_data, content, connection=connection).send()
+                except Exception as e:
+                    logger.error(f"Error enviando la liquidación de {owner_name}: {str(e)}")
+                    results['errors'].append(f"{owner_name}: Error enviando email: {str(e)}")
+                    continue
+                results['sent'] += 1
+        finally:
+            connection.close()
+
+        logger.info(
+            f"Liquidaciones de {period:%m/%Y}: {results['sent']} enviadas, "
+            f"{results['skipped']} omitidas, {len(results['errors'])} errores"
+        )
+        return results
+
+    def _statement_lines(self, period, owner_ids):
+        """
+        Facturas del período con las relaciones que muestra la liquidación.
+        """
+        return (
+            self.period_invoices(period, owner_ids)
+            .select_related('customer', 'contract__property__owner', 'contract__property__property_type')
+            .order_by('statement_owner_id', 'contract__property__title', 'contract__property_id', 'date', 'id')
+        )
+
+    def _build_statement_data(self, owner, period, invoices, totals, company):
+        """
+        Agrupa las facturas por propiedad y arma el contexto de la liquidación.
+        """
+        start, _ = self.period_bounds(period)
+        properties = []
+        for invoice in invoices:
+            property_obj = invoice.contract.property
+            if not properties or properties[-1]['id'] != property_obj.pk:
+                properties.append({
+                    'id': property_obj.pk,
+                    'title': property_obj.title,
+                    'address': property_obj.full_address,
+                    'property_type': getattr(property_obj.property_type, 'name', 'N/A'),
+                    'lines': [],
+                    'gross_amount': Decimal('0.00'),
+                    'discount_amount': Decimal('0.00'),
+                    'net_amount': Decimal('0.00'),
+                })
+            group = properties[-1]
+            group['lines'].append({
+                'number': invoice.number,
+                'date': invoice.date,
+                'description': invoice.description,
+                'tenant': invoice.customer.get_full_name(),
+                'gross_amount': invoice.total_amount,
+                'discount_percentage': invoice.discount_percentage,
+                'discount_amount': invoice.discount_amount,
+                'net_amount': invoice.net_amount,
+            })
+            group['gross_amount'] += invoice.total_amount
+            group['discount_amount'] += invoice.discount_amount
+            group['net_amount'] += invoice.net_amount
+
+        return {
+            'owner': {
+                'id': owner.pk,
+                'name': owner.get_full_name(),
+                'email': owner.email or '',
+                'phone': owner.phone or '',
+                'document': owner.document or '',
+            },
+            'period': start,
+            'period_label': start.strftime('%m/%Y'),
+            'properties': properties,
+            'totals': totals,
+            'company': company,
+            'generated_on': timezone.localdate(),
+            'filename': f"liquidacion_{start:%Y_%m}_{owner.pk}.pdf",
+        }
+
+    @staticmethod
+    def _amount(value):
+        return Decimal(str(value or 0)).quantize(Decimal('0.01'))
@@ -0,0 +1,478 @@
+"""
+Importación masiva de pagos desde extractos bancarios (CSV u OFX).
+
+Guardar los pagos de a uno dispara por cada pago ``Payment.save()`` (con su
+UPDATE de la factura), las señales de notificación y el recálculo de estado
+de la factura. Para un extracto de miles de movimientos eso multiplica las
+consultas, así que la importación:
+
+1. lee el archivo y resuelve las facturas por número en una consulta por bloque,
+2. descarta los pagos ya registrados: con la referencia del banco (FITID del
+   OFX o columna de referencia del CSV) si la hay, y si no por factura, fecha
+   e importe; una fila con referencia también coincide con un pago cargado a
+   mano (sin referencia) de la misma factura, fecha e importe,
+3. inserta los pagos con ``bulk_create``, que no dispara señales,
+4. recalcula saldos y estados de las facturas afectadas en un único UPDATE y
+5. envía una sola notificación de resumen por agente.
+"""
+import csv
+import io
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from accounting.models_invoice import AccountingPeriod, Invoice, Payment
+from user_notifications.services import create_notification
+
+logger = logging.getLogger(__name__)
+
+
+IMPORT_FORMATS = ('csv', 'ofx')
+
+# Encabezados aceptados en el CSV para cada dato del pago
+CSV_COLUMN_ALIASES = {
+    'invoice': ('factura', 'invoice', 'numero_factura', 'nro_factura', 'comprobante'),
+    'date': ('fecha', 'date', 'fecha_pago'),
+    'amount': ('monto', 'importe', 'amount', 'credito'),
+    'method': ('metodo', 'método', 'method', 'medio_pago'),
+    'notes': ('notas', 'notes', 'referencia', 'concepto', 'descripcion', 'descripción'),
+    'document': ('documento', 'document', 'dni', 'cuit', 'cuil'),
+    'reference': ('referencia', 'reference', 'nro_operacion', 'numero_operacion', 'id_transaccion', 'fitid'),
+}
+
+PAYMENT_REQUIRED_COLUMNS = ('invoice', 'date', 'amount')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d')
+
+NOT_PAYABLE_STATUSES = ('draft', 'cancelled')
+
+
+class PaymentImportError(Exception):
+    """Archivo de pagos que no se puede importar."""
+    pass
+
+
+def parse_amount(value):
+    """
+    Convierte un importe con separadores ``1.234,56`` o ``1,234.56`` en Decimal.
+    """
+    value = (value or '').strip().replace('$', '').replace(' ', '')
+    if ',' in value and '.' in value:
+        if value.rfind(',') > value.rfind('.'):
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    elif ',' in value:
+        value = value.replace(',', '.')
+    try:
+        return Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Importe inválido: {value!r}")
+
+
+def parse_date(value):
+    """
+    Convierte una fecha en los formatos habituales de los extractos.
+    """
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {value!r}")
+
+
+def _normalize_header(header):
+    return (header or '').strip().lower().replace(' ', '_')
+
+
+def parse_csv(content, required_columns=PAYMENT_REQUIRED_COLUMNS):
+    """
+    Lee los movimientos de un CSV con encabezados (separado por coma o punto y coma).
+
+    Args:
+        content (str): Contenido del archivo
+        required_columns (tuple): Columnas que deben estar presentes
+
+    Returns:
+        list: Diccionarios con ``line``, ``invoice``, ``date``, ``amount``, ``method``,
+        ``notes``, ``document``, ``reference`` o ``error`` si la fila no se pudo leer
+
+    Raises:
+        PaymentImportError: Si faltan columnas obligatorias
+    """
+    try:
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(content), dialect)
+    headers = [_normalize_header(header) for header in next(reader, [])]
+
+    positions = {}
+    for key, aliases in CSV_COLUMN_ALIASES.items():
+        for index, header in enumerate(headers):
+            if header in aliases:
+                positions[key] = index
+                break
+    missing = [key for key in required_columns if key not in positions]
+    if missing:
+        raise PaymentImportError(
+            f"Faltan columnas obligatorias en el CSV: {', '.join(missing)}."
+        )
+
+    rows = []
+    for line, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+
+        def column(key):
+            index = positions.get(key)
+            return values[index].strip() if index is not None and index < len(values) else ''
+
+        row = {
+            'line': line,
+            'invoice': column('invoice'),
+            'method': column('method'),
+            'notes': column('notes'),
+            'document': column('document'),
+            'reference': column('reference'),
+        }
+        try:
+            row['date'] = parse_date(column('date'))
+            row['amount'] = parse_amount(column('amount'))
+        except ValueError as e:
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+_OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))', re.S | re.I)
+_OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)', re.I)
+
+
+def parse_ofx(content):
+    """
+    Lee los créditos de un extracto OFX (SGML o XML).
+
+    El número de factura se busca luego en el MEMO/NAME de cada movimiento.
+
+    Returns:
+        list: Diccionarios como los de parse_csv, con ``invoice`` vacío y el texto
+        del movimiento en ``notes``
+    """
+    rows = []
+    for index, match in enumerate(_OFX_TRANSACTION.finditer(content), start=1):
+        fields = {name.upper(): value.strip() for name, value in _OFX_FIELD.findall(match.group(1))}
+        row = {
+            'line': index,
+            'invoice': '',
+            'method': '',
+            'notes': ' '.join(filter(None, (fields.get('NAME'), fields.get('MEMO')))),
+            'reference': fields.get('FITID', ''),
+        }
+        try:
+            # DTPOSTED: AAAAMMDD[HHMMSS[.XXX][zona]]
+            row['date'] = parse_date(fields.get('DTPOSTED', '')[:8])
+            row['amount'] = parse_amount(fields.get('TRNAMT', ''))
+        except ValueError as e:
+            row['error'] = str(e)
+        else:
+            if row['amount'] <= 0:
+                # Débitos: no son cobros de facturas
+                continue
+        rows.append(row)
+    return rows
+
+
+def read_statement_file(uploaded_file, file_format=None, required_columns=PAYMENT_REQUIRED_COLUMNS):
+    """
+    Lee un extracto subido en CSV u OFX.
+
+    Args:
+        uploaded_file: Archivo subido (o cualquier objeto con ``read()`` y ``name``)
+        file_format (str): ``csv`` u ``ofx``; por defecto se deduce de la extensión
+        required_columns (tuple): Columnas obligatorias del CSV
+
+    Returns:
+        list: Filas de parse_csv / parse_ofx
+
+    Raises:
+        PaymentImportError: Si el formato no es válido o faltan columnas
+    """
+    name = getattr(uploaded_file, 'name', '') or ''
+    file_format = (file_format or name.rsplit('.', 1)[-1]).lower()
+    if file_format not in IMPORT_FORMATS:
+        raise PaymentImportError("Formato de archivo no soportado. Use CSV u OFX.")
+
+    raw = uploaded_file.read()
+    if isinstance(raw, bytes):
+        try:
+            content = raw.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            content = raw.decode('latin-1')
+    else:
+        content = raw
+
+    if file_format == 'ofx':
+        return parse_ofx(content)
+    return parse_csv(content, required_columns=required_columns)
+
+
+class PaymentImportService:
+    """
+    Servicio que importa pagos en bloque desde un archivo.
+    """
+
+    DEFAULT_METHOD = 'Transferencia'
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, default_method=None):
+        self.default_method = default_method or self.DEFAULT_METHOD
+
+    def parse(self, uploaded_file, file_format=None):
+        """
+        Lee el archivo subido y devuelve sus filas (ver read_statement_file).
+        """
+        return read_statement_file(uploaded_file, file_format)
+
+    def import_file(self, uploaded_file, file_format=None):
+        """
+        Importa los pagos de un archivo.
+
+        Returns:
+            dict: Resultado (ver import_rows)
+        """
+        return self.import_rows(self.parse(uploaded_file, file_format))
+
+    def import_rows(self, rows):
+        """
+        Registra en bloque los pagos leídos de un archivo.
+
+        Args:
+            rows (list): Filas de parse_csv / parse_ofx
+
+        Returns:
+            dict: ``created`` (pagos registrados), ``total_amount``, ``invoice_count``,
+            ``paid_invoice_count`` (facturas que quedaron pagadas), ``skipped``
+            (filas omitidas con ``line`` y ``reason``) y ``notified_agents``
+        """
+        skipped = []
+        lock_date = AccountingPeriod.get_lock_date()
+        invoices = self._load_invoices(rows)
+        existing, unreferenced = self._existing_payments(invoices, rows)
+
+        payments = []
+        seen = set()
+        for row in rows:
+            if row.get('error'):
+                skipped.append({'line': row['line'], 'reason': row['error']})
+                continue
+            if lock_date and row['date'] <= lock_date:
+                skipped.append({
+                    'line': row['line'],
+                    'reason': f"El período contable del {row['date']:%d/%m/%Y} está cerrado.",
+                })
+                continue
+
+            invoice = invoices.get(row['invoice']) or self._find_in_text(invoices, row.get('notes', ''))
+            if invoice is None:
+                skipped.append({'line': row['line'], 'reason': "No se encontró la factura."})
+                continue
+            if invoice['status'] in NOT_PAYABLE_STATUSES:
+                skipped.append({
+                    'line': row['line'],
+                    'reason': f"La factura {invoice['number']} está en estado {invoice['status_display']}.",
+                })
+                continue
+
+            key = self._payment_key(invoice['id'], row['date'], row['amount'], row.get('reference'))
+            if key in existing or key in seen or self._matches_unreferenced(unreferenced, invoice['id'], row):
+                skipped.append({
+                    'line': row['line'],
+                    'reason': f"Pago duplicado para la factura {invoice['number']}.",
+                })
+                continue
+            seen.add(key)
+
+            payments.append(Payment(
+                invoice_id=invoice['id'],
+                date=row['date'],
+                amount=row['amount'],
+                method=(row.get('method') or self.default_method)[:100],
+                notes=row.get('notes', ''),
+                reference=(row.get('reference') or '')[:100],
+            ))
+
+        invoice_ids = {payment.invoice_id for payment in payments}
+        with transaction.atomic():
+            # bulk_create no llama a Payment.save() ni dispara señales
+            Payment.objects.bulk_create(payments, batch_size=1000)
+            if invoice_ids:
+                Invoice.settle_from_payments(Invoice.objects.filter(pk__in=invoice_ids))
+
+        paid_ids = set(
+            Invoice.objects.filter(pk__in=invoice_ids, status='paid').values_list('id', flat=True)
+        )
+        result = {
+            'created': len(payments),
+            'total_amount': sum((payment.amount for payment in payments), Decimal('0.00')),
+            'invoice_count': len(invoice_ids),
+            'paid_invoice_count': len(paid_ids),
+            'skipped': skipped,
+        }
+        result['notified_agents'] = self._notify_agents(payments, invoices, paid_ids)
+        logger.info(
+            f"Importación de pagos: {result['created']} registrados en {result['invoice_count']} "
+            f"facturas, {len(skipped)} omitidos"
+        )
+        return result
+
+    def _load_invoices(self, rows):
+        """
+        Carga las facturas referenciadas, indexadas por número.
+
+        En OFX el número viene dentro del texto del movimiento, así que se
+        buscan las palabras del texto que contienen dígitos.
+        """
+        numbers = set()
+        for row in rows:
+            if row.get('invoice'):
+                numbers.add(row['invoice'])
+            elif row.get('notes'):
+                numbers.update(
+                    token for token in (word.strip('.,;:()') for word in row['notes'].split())
+                    if any(char.isdigit() for char in token)
+                )
+
+        status_labels = dict(Invoice.STATUS_CHOICES)
+        invoices = {}
+        numbers = sorted(numbers)
+        for start in range(0, len(numbers), self.LOOKUP_BATCH_SIZE):
+            batch = numbers[start:start + self.LOOKUP_BATCH_SIZE]
+            for invoice_id, number, status, agent_id in (
+                Invoice.objects.filter(number__in=batch)
+                .values_list('id', 'number', 'status', 'contract__agent_id')
+            ):
+                invoices[number] = {
+                    'id': invoice_id,
+                    'number': number,
+                    'status': status,
+                    'status_display': status_labels.get(status, status),
+                    'agent_id': agent_id,
+                }
+        return invoices
+
+    def _find_in_text(self, invoices, text):
+        for token in text.split():
+            invoice = invoices.get(token.strip('.,;:()'))
+            if invoice:
+                return invoice
+        return None
+
+    @staticmethod
+    def _payment_key(invoice_id, date, amount, reference=None):
+        """
+        Clave de deduplicación de un pago.
+
+        Con referencia bancaria se usa la referencia: dos cuotas iguales del
+        mismo día son pagos distintos. Sin referencia se compara fecha e importe.
+        """
+        reference = (reference or '')[:100]
+        if reference:
+            return (invoice_id, 'ref', reference)
+        return (invoice_id, date, amount)
+
+    @staticmethod
+    def _matches_unreferenced(unreferenced, invoice_id, row):
+        """
+        Indica si una fila con referencia corresponde a un pago cargado a mano.
+
+        Los pagos registrados desde el formulario no tienen referencia bancaria:
+        el mismo movimiento del extracto se reconoce por factura, fecha e
+        importe. Cada pago manual cubre una sola fila del archivo.
+        """
+        if not row.get('reference'):
+            return False
+        key = (invoice_id, row['date'], row['amount'])
+        if unreferenced[key] <= 0:
+            return False
+        unreferenced[key] -= 1
+        return True
+
+    def _existing_payments(self, invoices, rows):
+        """
+        Pagos ya registrados para las facturas del archivo, para no duplicarlos al reimportar.
+
+        Returns:
+            tuple: Claves de los pagos existentes y un ``Counter`` de los pagos
+            sin referencia por (factura, fecha, importe)
+        """
+        unreferenced = Counter()
+        if not invoices:
+            return set(), unreferenced
+        invoice_ids = [invoice['id'] for invoice in invoices.values()]
+        references = {row['reference'][:100] for row in rows if row.get('reference')}
+        dates = {row['date'] for row in rows if row.get('date')}
+        existing = set()
+        if references:
+            existing.update(
+                self._payment_key(invoice_id, None, None, reference)
+                for invoice_id, reference in Payment.objects.filter(
+                    invoice_id__in=invoice_ids, reference__in=references
+                ).values_list('invoice_id', 'reference')
+            )
+        if dates:
+            for invoice_id, payment_date, amount, reference in (
+                Payment.objects.filter(invoice_id__in=invoice_ids, date__in=dates)
+                .values_list('invoice_id', 'date', 'amount', 'reference')
+            ):
+                existing.add((invoice_id, payment_date, amount))
+                if not reference:
+                    unreferenced[(invoice_id, payment_date, amount)] += 1
+        return existing, unreferenced
+
+    def _notify_agents(self, payments, invoices, paid_ids):
+        """
+        Crea una notificación de resumen por agente con los pagos importados.
+
+        Returns:
+            int: Cantidad de agentes notificados
+        """
+        from agents.models import Agent
+
+        agent_by_invoice = {invoice['id']: invoice['agent_id'] for invoice in invoices.values()}
+        summary = defaultdict(lambda: {'count': 0, 'amount': Decimal('0.00'), 'invoices': set()})
+        for payment in payments:
+            agent_id = agent_by_invoice.get(payment.invoice_id)
+            if not agent_id:
+                continue
+            summary[agent_id]['count'] += 1
+            summary[agent_id]['amount'] += payment.amount
+            summary[agent_id]['invoices'].add(payment.invoice_id)
+
+        notified = 0
+        for agent in Agent.objects.filter(pk__in=summary.keys()):
+            data = summary[agent.pk]
+            fully_paid = len(data['invoices'] & paid_ids)
+            message = (
+                f"Se importaron {data['count']} pagos por ${data['amount']:,.2f} "
+                f"para {len(data['invoices'])} facturas de sus contratos."
+            )
+            if fully_paid:
+                message += f" {fully_paid} facturas quedaron totalmente pagadas."
+            try:
+                create_notification(
+                    agent=agent,
+                    title=f"Pagos Importados ({data['count']})",
+                    message=message,
+                    notification_type='invoice_payment_received',
+                )
+                notified += 1
+            except Exception as e:
+                logger.error(f"Error notificando la importación de pagos al agente {agent.pk}: {str(e)}")
+        return notified
@@ -0,0 +1,293 @@
+"""
+Caché de PDFs renderizados direccionada por contenido.
+
+La clave de cada PDF es el hash del HTML renderizado junto con la versión de
+la plantilla, así que dos documentos con el mismo contenido comparten archivo
+y cualquier cambio en los datos o en la plantilla produce una clave nueva. Los
+archivos se guardan bajo MEDIA_ROOT y se desalojan por antigüedad de uso (LRU)
+cuando el directorio supera el tamaño máximo configurado.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from accounting.service_modules.pdf_render_service import (
+    PDFRenderResult,
+    get_pdf_render_service,
+    render_pdf,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PDFCache:
+    """
+    Caché en disco de PDFs renderizados con desalojo LRU acotado por tamaño.
+
+    El acceso a un archivo actualiza su fecha de modificación, que se usa como
+    marca de último uso al desalojar.
+    """
+
+    def __init__(self, directory=None, max_size_bytes=None, template_version=None,
+                 enabled=None, eviction_interval=None):
+        config = getattr(settings, 'PDF_CACHE_CONFIG', {})
+        self.directory = directory or config.get('directory', 'pdf_cache')
+        self.max_size_bytes = max_size_bytes or config.get('max_size_mb', 512) * 1024 * 1024
+        self.template_version = template_version or str(config.get('template_version', '1'))
+        self.enabled = config.get('enabled', True) if enabled is None else enabled
+        self.eviction_interval = eviction_interval or config.get('eviction_interval', 20)
+
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+    @property
+    def root(self):
+        return os.path.join(str(settings.MEDIA_ROOT), self.directory)
+
+    def make_key(self, html_string, template_name=None, base_url=None):
+        """
+        Calcula la clave de un documento.
+
+        Args:
+            html_string (str): HTML renderizado del documento
+            template_name (str, optional): Plantilla usada para el HTML
+            base_url (str, optional): URL base usada al renderizar
+
+        Returns:
+            str: Hash SHA-256 en hexadecimal
+        """
+        digest = hashlib.sha256()
+        digest.update(self._template_fingerprint(template_name).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((base_url or '').encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(html_string.encode('utf-8'))
+        return digest.hexdigest()
+
+    def relative_path(self, key):
+        """
+        Devuelve la ruta del archivo de una clave, relativa a MEDIA_ROOT.
+        """
+        return os.path.join(self.directory, key[:2], f'{key}.pdf')
+
+    def read(self, relative_path):
+        """
+        Lee un PDF cacheado por su ruta relativa a MEDIA_ROOT.
+
+        Args:
+            relative_path (str): Ruta guardada, por ejemplo en ``pdf_file_path``
+
+        Returns:
+            bytes: Contenido del PDF, o None si no está en la caché
+        """
+        if not self.enabled or not relative_path or not isinstance(relative_path, str):
+            return None
+        path = os.path.join(str(settings.MEDIA_ROOT), relative_path)
+        try:
+            with open(path, 'rb') as pdf_file:
+                content = pdf_file.read()
+            os.utime(path)  # Marcar como usado recientemente
+        except OSError:
+            return None
+        return content or None
+
+    def write(self, key, content):
+        """
+        Guarda un PDF en la caché de forma atómica.
+
+        Args:
+            key (str): Clave del documento
+            content (bytes): Contenido del PDF
+
+        Returns:
+            str: Ruta del archivo relativa a MEDIA_ROOT
+        """
+        relative_path = self.relative_path(key)
+        path = os.path.join(str(settings.MEDIA_ROOT), relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._writes_since_eviction += 1
+            run_eviction = self._writes_since_eviction >= self.eviction_interval
+            if run_eviction:
+                self._writes_since_eviction = 0
+        if run_eviction:
+            self.evict()
+
+        return relative_path
+
+    def render(self, html_string, template_name=None, base_url=None, render_function=None):
+        """
+        Devuelve el PDF de un documento, renderizándolo solo si no está cacheado.
+
+        Args:
+            html_string (str): HTML renderizado del documento
+            template_name (str, optional): Plantilla usada para el HTML
+            base_url (str, optional): URL base para resolver recursos relativos
+            render_function (callable, optional): Función de renderizado (render_pdf por defecto)
+
+        Returns:
+            tuple: (contenido del PDF, ruta relativa a MEDIA_ROOT o '' si no se cacheó)
+        """
+        render_function = render_function or render_pdf
+        if not self.enabled:
+            return render_function(html_string, base_url=base_url), ''
+
+        key = self.make_key(html_string, template_name, base_url)
+        relative_path = self.relative_path(key)
+        content = self.read(relative_path)
+        if content is not None:
+            logger.debug(f"PDF servido desde la caché: {relative_path}")
+            return content, relative_path
+
+        content = render_function(html_string, base_url=base_url)
+        if not content or not content.startswith(b'%PDF-'):
+            # Nunca cachear una salida que no es un PDF válido
+            return content, ''
+        try:
+            relative_path = self.write(key, content)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el PDF en la caché: {str(e)}")
+            relative_path = ''
+        return content, relative_path
+
+    def render_many(self, documents):
+        """
+        Devuelve los PDFs de varios documentos, renderizando en paralelo solo los no cacheados.
+
+        Args:
+            documents (list): Tuplas (html_string, template_name, base_url)
+
+        Returns:
+            list: Un ``PDFRenderResult(content, error)`` por documento, en el mismo orden
+        """
+        results = [None] * len(documents)
+        misses = []
+        for index, (html_string, template_name, base_url) in enumerate(documents):
+            if not self.enabled:
+                misses.append((index, None, html_string, base_url))
+                continue
+            key = self.make_key(html_string, template_name, base_url)
+            content = self.read(self.relative_path(key))
+            if content is not None:
+                results[index] = PDFRenderResult(content, None)
+            else:
+                misses.append((index, key, html_string, base_url))
+
+        rendered = get_pdf_render_service().render_many(
+            [(html_string, base_url) for _, _, html_string, base_url in misses]
+        )
+        for (index, key, _, _), result in zip(misses, rendered):
+            results[index] = result
+            if key and result.content and result.content.startswith(b'%PDF-'):
+                try:
+                    self.write(key, result.content)
+                except OSError as e:
+                    logger.warning(f"No se pudo guardar el PDF en la caché: {str(e)}")
+
+        return results
+
+    def evict(self):
+        """
+        Elimina los PDFs usados hace más tiempo hasta volver bajo el tamaño máximo.
+
+        Se libera hasta el 90% del máximo para no desalojar en cada escritura.
+
+        Returns:
+            int: Bytes liberados
+        """
+        entries = []
+        total_size = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith('.pdf'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_size_bytes:
+            return 0
+
+        target_size = int(self.max_size_bytes * 0.9)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total_size - freed <= target_size:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                continue
+
+        logger.info(f"Caché de PDFs: {freed} bytes liberados")
+        return freed
+
+    def _template_fingerprint(self, template_name):
+        """
+        Combina la versión configurada con la fecha de modificación de la plantilla.
+        """
+        if not template_name:
+            return self.template_version
+        try:
+            origin = get_template(template_name).origin.name
+            mtime = int(os.path.getmtime(origin))
+        except Exception:
+            mtime = 0
+        return f'{self.template_version}:{template_name}:{mtime}'
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """
+    Devuelve la instancia compartida de la caché de PDFs.
+
+    Returns:
+        PDFCache: Caché de PDFs
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PDFCache()
+        return _cache
+
+
+def render_cached_pdf(html_string, template_name=None, base_url=None, render_function=None):
+    """
+    Devuelve el PDF de un documento usando la caché compartida.
+
+    Args:
+        html_string (str): HTML renderizado del documento
+        template_name (str, optional): Plantilla usada para el HTML
+        base_url (str, optional): URL base para resolver recursos relativos
+        render_function (callable, optional): Función de renderizado (render_pdf por defecto)
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    content, _ = get_pdf_cache().render(
+        html_string, template_name=template_name, base_url=base_url, render_function=render_function
+    )
+    return content
@@ -0,0 +1,286 @@
+"""
+Servicio de renderizado de PDFs con WeasyPrint en un pool de procesos.
+
+WeasyPrint es costoso de inicializar (carga de fuentes, fontconfig, parseo de
+CSS) y el renderizado es intensivo en CPU y retiene el GIL. Este servicio
+mantiene procesos de trabajo de larga vida que importan WeasyPrint y precalientan
+la configuración de fuentes una sola vez, de modo que los workers de gunicorn o
+Celery solo envían el HTML y reciben los bytes del PDF.
+"""
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+PDFRenderResult = namedtuple('PDFRenderResult', ['content', 'error'])
+
+
+class PDFRenderError(Exception):
+    """Excepción para errores de renderizado de PDF."""
+    pass
+
+
+class PDFRenderTimeout(PDFRenderError):
+    """El renderizado superó el tiempo máximo permitido."""
+    pass
+
+
+class PDFRenderQueueFull(PDFRenderError):
+    """La cola de renderizado está llena y no se liberó lugar a tiempo."""
+    pass
+
+
+# Estado de cada proceso de trabajo (WeasyPrint ya importado y fuentes cargadas)
+_worker_state = {}
+
+
+def _init_worker():
+    """
+    Inicializa un proceso de trabajo importando WeasyPrint y precalentando fuentes.
+    """
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    _worker_state['HTML'] = HTML
+    _worker_state['font_config'] = font_config
+
+    # Un primer renderizado carga fontconfig, Pango y las fuentes por defecto
+    HTML(string='<html><body><p>PDF</p></body></html>').write_pdf(font_config=font_config)
+
+
+def _render_document(html_string, base_url=None):
+    """
+    Renderiza un documento HTML a PDF en el proceso actual.
+
+    Args:
+        html_string (str): HTML completo del documento
+        base_url (str, optional): URL base para resolver recursos relativos
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    if not _worker_state:
+        _init_worker()
+    html = _worker_state['HTML'](string=html_string, base_url=base_url)
+    return html.write_pdf(font_config=_worker_state['font_config'])
+
+
+class PDFRenderService:
+    """
+    Servicio de renderizado de PDFs sobre un pool de procesos de larga vida.
+
+    La cantidad de trabajos en vuelo está acotada por ``max_pending_jobs``; si no
+    se libera lugar en ``queue_timeout`` segundos se lanza ``PDFRenderQueueFull``.
+    Cada trabajo tiene ``job_timeout`` segundos desde que entra en la cola; si se
+    excede, el pool se recicla para no dejar procesos colgados.
+
+    Cuando el pool está deshabilitado, o el proceso actual es un proceso daemon
+    que no puede crear hijos, el renderizado se hace en línea.
+    """
+
+    def __init__(self, workers=None, max_pending_jobs=None, job_timeout=None,
+                 queue_timeout=None, use_process_pool=None, start_method=None,
+                 render_function=None):
+        config = getattr(settings, 'PDF_RENDER_CONFIG', {})
+        self.workers = workers or config.get('workers', 2)
+        self.max_pending_jobs = max_pending_jobs or config.get('max_pending_jobs', self.workers * 8)
+        self.job_timeout = job_timeout or config.get('job_timeout', 60)
+        self.queue_timeout = queue_timeout or config.get('queue_timeout', 10)
+        self.use_process_pool = (
+            config.get('use_process_pool', True) if use_process_pool is None else use_process_pool
+        )
+        self.start_method = start_method or config.get('start_method', 'spawn')
+        self.render_function = render_function or _render_document
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending_jobs)
+
+    def render(self, html_string, base_url=None, timeout=None):
+        """
+        Renderiza un documento HTML a PDF.
+
+        Args:
+            html_string (str): HTML completo del documento
+            base_url (str, optional): URL base para resolver recursos relativos
+            timeout (int, optional): Segundos máximos para el trabajo
+
+        Returns:
+            bytes: Contenido del PDF
+
+        Raises:
+            PDFRenderError: Si el documento no se pudo renderizar
+        """
+        result = self.render_many([(html_string, base_url)], timeout=timeout)[0]
+        if result.error:
+            raise result.error
+        return result.content
+
+    def render_many(self, documents, timeout=None):
+        """
+        Renderiza varios documentos en paralelo repartiéndolos entre los procesos.
+
+        Args:
+            documents (iterable): Cadenas HTML o tuplas (html_string, base_url)
+            timeout (int, optional): Segundos máximos para cada trabajo
+
+        Returns:
+            list: Un ``PDFRenderResult(content, error)`` por documento, en el
+            mismo orden en que se recibieron
+        """
+        jobs = [self._normalize_document(document) for document in documents]
+        if not jobs:
+            return []
+
+        if not self._pool_available():
+            return [self._render_inline(html_string, base_url) for html_string, base_url in jobs]
+
+        timeout = timeout or self.job_timeout
+        submitted = []
+        for html_string, base_url in jobs:
+            try:
+                submitted.append(self._submit(html_string, base_url))
+            except PDFRenderError as e:
+                submitted.append((None, None, time.monotonic(), e))
+
+        return [self._collect(job, timeout) for job in submitted]
+
+    def shutdown(self):
+        """
+        Detiene los procesos de trabajo del pool.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _normalize_document(self, document):
+        if isinstance(document, str):
+            return document, None
+        html_string, base_url = document
+        return html_string, base_url
+
+    def _pool_available(self):
+        return (
+            self.use_process_pool
+            and self.workers > 0
+            and not multiprocessing.current_process().daemon
+        )
+
+    def _render_inline(self, html_string, base_url):
+        try:
+            return PDFRenderResult(self.render_function(html_string, base_url), None)
+        except Exception as e:
+            logger.error(f"Error renderizando PDF en línea: {str(e)}")
+            return PDFRenderResult(None, PDFRenderError(str(e)))
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                initializer = _init_worker if self.render_function is _render_document else None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=initializer,
+                )
+                logger.info(f"Pool de renderizado PDF iniciado con {self.workers} procesos")
+            return self._executor
+
+    def _submit(self, html_string, base_url):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PDFRenderQueueFull(
+                f"La cola de renderizado está llena ({self.max_pending_jobs} trabajos pendientes)"
+            )
+        try:
+            executor = self._get_executor()
+            future = executor.submit(self.render_function, html_string, base_url)
+        except Exception as e:
+            self._slots.release()
+            self._reset_pool(self._executor, f"error al encolar: {str(e)}")
+            raise PDFRenderError(f"No se pudo encolar el renderizado: {str(e)}")
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return executor, future, time.monotonic(), None
+
+    def _collect(self, job, timeout):
+        executor, future, queued_at, error = job
+        if error:
+            return PDFRenderResult(None, error)
+
+        remaining = max(0, queued_at + timeout - time.monotonic())
+        try:
+            return PDFRenderResult(future.result(timeout=remaining), None)
+        except FuturesTimeoutError:
+            future.cancel()
+            self._reset_pool(executor, f"trabajo excedió {timeout}s")
+            return PDFRenderResult(None, PDFRenderTimeout(f"El renderizado superó {timeout} segundos"))
+        except BrokenProcessPool as e:
+            self._reset_pool(executor, f"pool roto: {str(e)}")
+            return PDFRenderResult(None, PDFRenderError("El proceso de renderizado terminó inesperadamente"))
+        except Exception as e:
+            logger.error(f"Error renderizando PDF: {str(e)}")
+            return PDFRenderResult(None, PDFRenderError(str(e)))
+
+    def _reset_pool(self, executor, reason):
+        """
+        Descarta el pool si sigue siendo el actual y termina sus procesos.
+        """
+        with self._lock:
+            if executor is None or executor is not self._executor:
+                return
+            self._executor = None
+
+        logger.warning(f"Reiniciando pool de renderizado PDF: {reason}")
+        # ProcessPoolExecutor no permite cancelar un trabajo en ejecución;
+        # se terminan los procesos para no dejar renderizados colgados.
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_render_service():
+    """
+    Devuelve la instancia compartida del servicio de renderizado del proceso.
+
+    Returns:
+        PDFRenderService: Servicio de renderizado
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PDFRenderService()
+            atexit.register(_service.shutdown)
+        return _service
+
+
+def render_pdf(html_string, base_url=None, timeout=None):
+    """
+    Renderiza un documento HTML a PDF usando el servicio compartido.
+
+    Args:
+        html_string (str): HTML completo del documento
+        base_url (str, optional): URL base para resolver recursos relativos
+        timeout (int, optional): Segundos máximos para el trabajo
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    return get_pdf_render_service().render(html_string, base_url=base_url, timeout=timeout)
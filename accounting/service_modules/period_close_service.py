@@ -0,0 +1,325 @@
+"""
+Cierre de períodos contables mensuales y reportes a partir de los saldos de cierre.
+
+Cerrar un mes bloquea la edición de facturas, pagos y cobros de contratos con
+fecha en él (ver ``AccountingPeriod.check_open``) y guarda, por cliente,
+contrato y agente, los importes acumulados hasta el fin del mes:
+
+- ``invoiced``: facturas validadas, enviadas o pagadas
+- ``paid``: pagos de facturas que no están en borrador
+- ``balance``: facturado menos pagado
+- ``collected`` / ``collected_count``: cobros de contratos pagados
+- ``period_collected``: cobros de contratos del mes cerrado
+
+Los meses se cierran en orden, así que cada cierre parte de los saldos del
+cierre anterior y solo agrega los movimientos del mes. Los reportes hacen lo
+mismo: suman las filas del último cierre y recorren solo los movimientos
+posteriores a la fecha de bloqueo, de modo que su costo depende del período
+abierto y no del historial completo.
+"""
+import calendar
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounting.models_invoice import AccountingPeriod, Invoice, Payment, PeriodClosingBalance
+from accounting.service_modules.customer_statement_service import STATEMENT_INVOICE_STATUSES
+from payments.models import ContractPayment
+
+logger = logging.getLogger(__name__)
+
+
+# Campo de cada agrupación en las facturas, los pagos y los cobros de contratos
+INVOICE_KEYS = {
+    'customer': 'customer_id',
+    'contract': 'contract_id',
+    'agent': 'contract__agent_id',
+}
+PAYMENT_KEYS = {
+    'customer': 'invoice__customer_id',
+    'contract': 'invoice__contract_id',
+    'agent': 'invoice__contract__agent_id',
+}
+COLLECTION_KEYS = {
+    'customer': 'contract__customer_id',
+    'contract': 'contract_id',
+    'agent': 'contract__agent_id',
+}
+
+ZERO = Decimal('0.00')
+
+
+class AccountingPeriodError(Exception):
+    """Cierre o reapertura de período que no se puede aplicar."""
+    pass
+
+
+def month_bounds(day):
+    """
+    Devuelve el primer y el último día del mes de ``day``.
+    """
+    start = day.replace(day=1)
+    return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+def recent_months(today, count):
+    """
+    Devuelve el primer día de los últimos ``count`` meses, del más antiguo al actual.
+    """
+    months = []
+    month = today.replace(day=1)
+    for _ in range(count):
+        months.append(month)
+        month = (month - timedelta(days=1)).replace(day=1)
+    return list(reversed(months))
+
+
+def _empty_balance():
+    return {
+        'invoiced': ZERO,
+        'paid': ZERO,
+        'collected': ZERO,
+        'collected_count': 0,
+        'period_collected': ZERO,
+    }
+
+
+class PeriodCloseService:
+    """
+    Servicio que cierra y reabre meses contables.
+    """
+
+    BATCH_SIZE = 1000
+
+    def close(self, month, user=None, today=None):
+        """
+        Cierra el mes de ``month`` y guarda sus saldos de cierre.
+
+        Args:
+            month (date): Cualquier día del mes a cerrar
+            user: Agente que cierra el período (opcional)
+            today (date): Fecha de referencia (por defecto hoy)
+
+        Returns:
+            AccountingPeriod: El período cerrado
+
+        Raises:
+            AccountingPeriodError: Si el mes no terminó, ya está cerrado o hay
+            un mes anterior abierto después del último cierre
+        """
+        start, end = month_bounds(month)
+        today = today or timezone.localdate()
+        if end >= today:
+            raise AccountingPeriodError(f"No se puede cerrar {start:%m/%Y}: el mes todavía no terminó.")
+
+        with transaction.atomic():
+            previous = AccountingPeriod.objects.select_for_update().order_by('-period_end').first()
+            if previous is not None:
+                if start <= previous.period_end:
+                    raise AccountingPeriodError(f"El mes {start:%m/%Y} ya está cerrado.")
+                next_start = previous.period_end + timedelta(days=1)
+                if start != next_start:
+                    raise AccountingPeriodError(f"Primero debe cerrarse el mes {next_start:%m/%Y}.")
+
+            period = AccountingPeriod.objects.create(period_start=start, period_end=end, closed_by=user)
+            balances = self._opening_balances(previous)
+            self._add_movements(balances, start, end, after=previous.period_end if previous else None)
+            PeriodClosingBalance.objects.bulk_create(
+                [
+                    PeriodClosingBalance(
+                        period=period,
+                        dimension=dimension,
+                        object_id=object_id,
+                        balance=values['invoiced'] - values['paid'],
+                        **values,
+                    )
+                    for (dimension, object_id), values in balances.items()
+                ],
+                batch_size=self.BATCH_SIZE,
+            )
+
+        logger.info(f"Período contable {period} cerrado con {len(balances)} saldos de cierre")
+        return period
+
+    def reopen(self, period):
+        """
+        Reabre el último mes cerrado, descartando sus saldos de cierre.
+
+        Raises:
+            AccountingPeriodError: Si el período no es el último cerrado
+        """
+        with transaction.atomic():
+            latest = AccountingPeriod.objects.select_for_update().order_by('-period_end').first()
+            if latest is None or latest.pk != period.pk:
+                raise AccountingPeriodError("Solo se puede reabrir el último mes cerrado.")
+            period.delete()
+
+        logger.info(f"Período contable {period} reabierto")
+
+    def _opening_balances(self, previous):
+        """
+        Carga los saldos del cierre anterior como punto de partida.
+        """
+        balances = defaultdict(_empty_balance)
+        if previous is None:
+            return balances
+        for row in previous.balances.values(
+            'dimension', 'object_id', 'invoiced', 'paid', 'collected', 'collected_count'
+        ).iterator(chunk_size=self.BATCH_SIZE):
+            balances[(row.pop('dimension'), row.pop('object_id'))].update(row)
+        return balances
+
+    def _add_movements(self, balances, start, end, after=None):
+        """
+        Suma a ``balances`` los movimientos posteriores a ``after`` hasta ``end``.
+
+        Cada origen se agrupa una sola vez por las tres claves (cliente,
+        contrato y agente) y se reparte en memoria entre las agrupaciones.
+        """
+        def in_range(field):
+            conditions = Q(**{f'{field}__lte': end})
+            if after is not None:
+                conditions &= Q(**{f'{field}__gt': after})
+            return conditions
+
+        invoices = (
+            Invoice.objects.filter(in_range('date'), status__in=STATEMENT_INVOICE_STATUSES)
+            .order_by()
+            .values(*INVOICE_KEYS.values())
+            .annotate(total=Sum('total_amount'))
+        )
+        for row in invoices:
+            for dimension, key in INVOICE_KEYS.items():
+                balances[(dimension, row[key])]['invoiced'] += row['total']
+
+        payments = (
+            Payment.objects.filter(in_range('date'))
+            .exclude(invoice__status='draft')
+            .order_by()
+            .values(*PAYMENT_KEYS.values())
+            .annotate(total=Sum('amount'))
+        )
+        for row in payments:
+            for dimension, key in PAYMENT_KEYS.items():
+                balances[(dimension, row[key])]['paid'] += row['total']
+
+        collections = (
+            ContractPayment.objects.filter(in_range('payment_date'), status='paid')
+            .order_by()
+            .values(*COLLECTION_KEYS.values())
+            .annotate(
+                total=Sum('amount'),
+                count=Count('id'),
+                month_total=Sum('amount', filter=Q(payment_date__gte=start)),
+            )
+        )
+        for row in collections:
+            for dimension, key in COLLECTION_KEYS.items():
+                values = balances[(dimension, row[key])]
+                values['collected'] += row['total']
+                values['collected_count'] += row['count']
+                values['period_collected'] += row['month_total'] or ZERO
+
+
+def invoice_payments_total():
+    """
+    Total cobrado de facturas: lo pagado al último cierre más los pagos posteriores.
+
+    Returns:
+        Decimal: Suma de los pagos de facturas que no están en borrador
+    """
+    lock_date = AccountingPeriod.get_lock_date()
+    payments = Payment.objects.exclude(invoice__status='draft')
+    total = ZERO
+    if lock_date is not None:
+        total += PeriodClosingBalance.objects.filter(
+            period__period_end=lock_date, dimension='customer'
+        ).aggregate(total=Sum('paid'))['total'] or ZERO
+        payments = payments.filter(date__gt=lock_date)
+    return total + (payments.aggregate(total=Sum('amount'))['total'] or ZERO)
+
+
+def contract_collections_total(contracts=None):
+    """
+    Cobros de contratos pagados: los acumulados al último cierre más los posteriores.
+
+    Args:
+        contracts (QuerySet): Contratos a incluir (por defecto todos)
+
+    Returns:
+        dict: ``total`` (importe) y ``count`` (cantidad de cobros)
+    """
+    lock_date = AccountingPeriod.get_lock_date()
+    payments = ContractPayment.objects.filter(status='paid')
+    if contracts is not None:
+        payments = payments.filter(contract__in=contracts)
+
+    totals = {'total': ZERO, 'count': 0}
+    if lock_date is not None:
+        closing = PeriodClosingBalance.objects.filter(period__period_end=lock_date, dimension='contract')
+        if contracts is not None:
+            closing = closing.filter(object_id__in=contracts.values('pk'))
+        closed = closing.aggregate(total=Sum('collected'), count=Sum('collected_count'))
+        totals['total'] += closed['total'] or ZERO
+        totals['count'] += closed['count'] or 0
+        # Los cobros sin fecha de pago nunca entran en un cierre
+        payments = payments.filter(Q(payment_date__gt=lock_date) | Q(payment_date__isnull=True))
+
+    open_totals = payments.aggregate(total=Sum('amount'), count=Count('id'))
+    totals['total'] += open_totals['total'] or ZERO
+    totals['count'] += open_totals['count']
+    return totals
+
+
+def agent_monthly_collections(agent, months):
+    """
+    Cobros de contratos del agente por mes.
+
+    Los meses cerrados se leen de los saldos de cierre; los abiertos se
+    agrupan en una sola consulta sobre los cobros posteriores al último cierre.
+
+    Args:
+        agent: Agente
+        months (list): Primer día de cada mes (ver ``recent_months``)
+
+    Returns:
+        dict: Primer día del mes -> Decimal
+    """
+    lock_date = AccountingPeriod.get_lock_date()
+    totals = {month: ZERO for month in months}
+    closed_months = [month for month in months if lock_date and month <= lock_date]
+    open_months = [month for month in months if month not in closed_months]
+
+    if closed_months:
+        totals.update(
+            PeriodClosingBalance.objects.filter(
+                dimension='agent', object_id=agent.pk, period__period_start__in=closed_months
+            ).values_list('period__period_start', 'period_collected')
+        )
+
+    if open_months:
+        rows = (
+            ContractPayment.objects.filter(
+                contract__agent=agent,
+                status='paid',
+                payment_date__gte=open_months[0],
+                payment_date__lte=month_bounds(open_months[-1])[1],
+            )
+            .annotate(month=TruncMonth('payment_date'))
+            .order_by()
+            .values('month')
+            .annotate(total=Sum('amount'))
+        )
+        for row in rows:
+            month = row['month']
+            if hasattr(month, 'date'):
+                month = month.date()
+            if month in totals:
+                totals[month] = row['total']
+    return totals
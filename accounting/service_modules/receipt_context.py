@@ -0,0 +1,234 @@
+"""
+Contexto de datos de un comprobante de propietario.
+
+Generar, validar, renderizar y enviar un comprobante recorre siempre la misma
+cadena de relaciones: factura, cliente, contrato, agente, propiedad, tipo de
+propiedad y propietario, además de la empresa y de los comprobantes previos de
+la factura. ``ReceiptContext`` carga todo eso una vez (una consulta con
+``select_related`` por factura o por lote de facturas) y lo comparte entre la
+validación, el PDF, el email y el registro de operaciones.
+"""
+import logging
+
+from django.db import models
+from django.db.models import Count, Max, Q
+
+logger = logging.getLogger(__name__)
+
+
+# Relaciones que usan la validación, el PDF, el email y los logs
+INVOICE_RELATED_FIELDS = (
+    'customer',
+    'contract__agent',
+    'contract__property__owner',
+    'contract__property__property_type',
+)
+
+_UNSET = object()
+
+
+class ReceiptContext:
+    """
+    Datos precargados para operar sobre el comprobante de una factura.
+
+    Las relaciones se cargan sobre la misma instancia de factura que se recibe,
+    sin pisar sus campos, así que los cambios en memoria se respetan. La
+    validación y los datos del comprobante se calculan una sola vez.
+    """
+
+    def __init__(self, invoice, company=_UNSET, receipts_summary=None):
+        self.invoice = invoice
+        self._company = company
+        self._receipts_summary = receipts_summary
+        self.validation_result = None
+        self.receipt_data = None
+
+    @classmethod
+    def for_invoice(cls, invoice):
+        """
+        Crea el contexto de una factura cargando sus relaciones en una consulta.
+
+        Args:
+            invoice: Instancia de Invoice
+
+        Returns:
+            ReceiptContext: Contexto de la factura
+        """
+        return cls.for_invoices([invoice])[0]
+
+    @classmethod
+    def for_invoices(cls, invoices, company=_UNSET):
+        """
+        Crea los contextos de un lote de facturas con un número fijo de consultas.
+
+        Args:
+            invoices (list): Instancias de Invoice
+            company: Empresa a usar (se consulta una vez si no se indica)
+
+        Returns:
+            list: Un ReceiptContext por factura, en el mismo orden
+        """
+        from accounting.models_invoice import Invoice
+
+        invoices = list(invoices)
+        pending = [
+            invoice for invoice in invoices
+            if isinstance(invoice, models.Model) and invoice.pk and not cls._relations_loaded(invoice)
+        ]
+        if pending:
+            loaded = Invoice.objects.select_related(*INVOICE_RELATED_FIELDS).in_bulk(
+                [invoice.pk for invoice in pending]
+            )
+            for invoice in pending:
+                source = loaded.get(invoice.pk)
+                if source is not None:
+                    cls._copy_relations(source, invoice)
+
+        if company is _UNSET:
+            company = cls.load_company()
+        summaries = cls._load_receipts_summaries(invoices)
+
+        return [
+            cls(invoice, company=company, receipts_summary=summaries.get(getattr(invoice, 'pk', None)))
+            for invoice in invoices
+        ]
+
+    @classmethod
+    def for_receipt(cls, receipt):
+        """
+        Crea el contexto de la factura de un comprobante.
+
+        Args:
+            receipt: Instancia de OwnerReceipt
+
+        Returns:
+            ReceiptContext: Contexto de la factura del comprobante
+        """
+        from accounting.models_invoice import Invoice
+
+        if (
+            isinstance(receipt, models.Model)
+            and receipt.invoice_id
+            and 'invoice' not in receipt._state.fields_cache
+        ):
+            receipt.invoice = (
+                Invoice.objects.select_related(*INVOICE_RELATED_FIELDS).get(pk=receipt.invoice_id)
+            )
+        return cls.for_invoice(receipt.invoice)
+
+    @property
+    def contract(self):
+        return self.invoice.contract
+
+    @property
+    def property_obj(self):
+        contract = self.contract
+        return contract.property if contract else None
+
+    @property
+    def owner(self):
+        property_obj = self.property_obj
+        return property_obj.owner if property_obj else None
+
+    @property
+    def company(self):
+        if self._company is _UNSET:
+            self._company = self.load_company()
+        return self._company
+
+    @property
+    def receipts_summary(self):
+        """
+        Resumen de los comprobantes existentes de la factura.
+
+        Returns:
+            dict: ``sent_number`` (número de un comprobante enviado o None) y
+            ``pending_count`` (comprobantes generados sin enviar)
+        """
+        if self._receipts_summary is None:
+            summaries = self._load_receipts_summaries([self.invoice])
+            self._receipts_summary = summaries.get(getattr(self.invoice, 'pk', None), {})
+        return self._receipts_summary or {'sent_number': None, 'pending_count': 0}
+
+    def validate(self):
+        """
+        Valida la factura para generar el comprobante, una sola vez.
+
+        Returns:
+            tuple: (bool, str, list) - (es_válida, mensaje_error, advertencias)
+        """
+        if self.validation_result is None:
+            from accounting.validators import validate_owner_receipt_generation
+
+            self.validation_result = validate_owner_receipt_generation(self.invoice, context=self)
+        return self.validation_result
+
+    @staticmethod
+    def _relations_loaded(invoice):
+        """
+        Indica si la factura ya tiene cargadas todas las relaciones del contexto.
+        """
+        cache = invoice._state.fields_cache
+        if 'customer' not in cache or 'contract' not in cache:
+            return False
+        contract = cache['contract']
+        if contract is None:
+            return True
+        contract_cache = contract._state.fields_cache
+        if 'agent' not in contract_cache or 'property' not in contract_cache:
+            return False
+        property_obj = contract_cache['property']
+        return property_obj is None or (
+            'owner' in property_obj._state.fields_cache
+            and 'property_type' in property_obj._state.fields_cache
+        )
+
+    @staticmethod
+    def _copy_relations(source, target):
+        """
+        Copia las relaciones cargadas sin modificar los campos de la instancia destino.
+        """
+        if target.customer_id == source.customer_id:
+            target.customer = source.customer
+        if target.contract_id == source.contract_id:
+            target.contract = source.contract
+
+    @staticmethod
+    def load_company():
+        """
+        Devuelve la empresa usada en los comprobantes.
+        """
+        try:
+            from core.models import Company
+            return Company.objects.first()
+        except Exception as e:
+            logger.warning(f"Error obteniendo información de la empresa: {str(e)}")
+            return None
+
+    @staticmethod
+    def _load_receipts_summaries(invoices):
+        """
+        Resume los comprobantes existentes de varias facturas en una consulta.
+        """
+        from accounting.models_invoice import OwnerReceipt
+
+        invoice_ids = [invoice.pk for invoice in invoices if isinstance(invoice, models.Model) and invoice.pk]
+        if not invoice_ids:
+            return {}
+
+        rows = (
+            OwnerReceipt.objects.filter(invoice_id__in=invoice_ids)
+            .order_by()
+            .values('invoice_id')
+            .annotate(
+                sent_number=Max('receipt_number', filter=Q(status='sent')),
+                pending_count=Count('id', filter=Q(status='generated')),
+            )
+        )
+        summaries = {invoice_id: {'sent_number': None, 'pending_count': 0} for invoice_id in invoice_ids}
+        for row in rows:
+            summaries[row['invoice_id']] = {
+                'sent_number': row['sent_number'],
+                'pending_count': row['pending_count'],
+            }
+        return summaries
@@ -0,0 +1,353 @@
+"""
+Conciliación automática de extractos bancarios contra facturas abiertas.
+
+La importación de pagos (payment_import_service) exige que cada movimiento
+traiga el número de factura. En la práctica muchos cobros llegan sin él y hay
+que adivinar a qué factura corresponden. Este motor carga todas las facturas
+abiertas en memoria con una sola consulta y arma índices hash para resolver
+cada movimiento sin consultas por línea:
+
+1. número de factura que aparece en el concepto del movimiento,
+2. importe exacto del saldo + documento del cliente,
+3. importe exacto del saldo + vencimiento dentro de una ventana de días.
+
+Cada coincidencia lleva un puntaje de confianza; las que superan el umbral
+configurado se pueden registrar como pagos con PaymentImportService.
+"""
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+
+from accounting.models_invoice import Invoice
+from accounting.service_modules.payment_import_service import (
+    PaymentImportError,
+    PaymentImportService,
+    read_statement_file,
+)
+
+logger = logging.getLogger(__name__)
+
+
+OPEN_STATUSES = ('validated', 'sent')
+
+STATEMENT_REQUIRED_COLUMNS = ('date', 'amount')
+
+# Puntajes de confianza por regla de coincidencia
+CONFIDENCE_NUMBER_EXACT = Decimal('0.98')
+CONFIDENCE_NUMBER_PARTIAL = Decimal('0.80')
+CONFIDENCE_NUMBER_OVERPAID = Decimal('0.60')
+CONFIDENCE_DOCUMENT_UNIQUE = Decimal('0.90')
+CONFIDENCE_DOCUMENT_MULTIPLE = Decimal('0.70')
+CONFIDENCE_DUE_DATE_UNIQUE = Decimal('0.60')
+CONFIDENCE_DUE_DATE_MULTIPLE = Decimal('0.35')
+
+MATCH_RULES = {
+    'number': 'Número de factura en el concepto',
+    'amount_document': 'Importe y documento del cliente',
+    'amount_due_date': 'Importe y fecha de vencimiento',
+}
+
+# Cantidad máxima de candidatos alternativos que se informan por movimiento
+MAX_CANDIDATES = 5
+
+_TOKEN_STRIP = '.,;:()[]#'
+_NON_DIGITS = re.compile(r'\D')
+
+
+def _get_config():
+    """
+    Configuración de la conciliación (ACCOUNTING_RECONCILIATION_CONFIG).
+    """
+    config = getattr(settings, 'ACCOUNTING_RECONCILIATION_CONFIG', {})
+    return {
+        'due_date_window_days': config.get('due_date_window_days', 10),
+        'auto_apply_confidence': Decimal(str(config.get('auto_apply_confidence', '0.90'))),
+    }
+
+
+def normalize_document(value):
+    """
+    Deja solo los dígitos de un DNI/CUIT (``20-11122233-4`` -> ``20111222334``).
+    """
+    return _NON_DIGITS.sub('', value or '')
+
+
+class OpenInvoiceIndex:
+    """
+    Facturas abiertas en memoria con índices hash para la conciliación.
+
+    Cada factura es un diccionario liviano, así que 100.000
+    facturas ocupan unos pocos MB y se cargan en una sola consulta.
+    """
+
+    def __init__(self, invoices):
+        self.by_number = {}
+        self.by_amount_document = defaultdict(list)
+        self.by_amount = defaultdict(list)
+        self.documents = set()
+        for invoice in invoices:
+            self.by_number[invoice['number'].upper()] = invoice
+            self.by_amount[invoice['balance']].append(invoice)
+            if invoice['document']:
+                self.by_amount_document[(invoice['balance'], invoice['document'])].append(invoice)
+                self.documents.add(invoice['document'])
+        for candidates in self.by_amount.values():
+            candidates.sort(key=lambda invoice: (invoice['due_date'], invoice['id']))
+        for candidates in self.by_amount_document.values():
+            candidates.sort(key=lambda invoice: (invoice['due_date'], invoice['id']))
+
+    def __len__(self):
+        return len(self.by_number)
+
+    @classmethod
+    def load(cls, queryset=None):
+        """
+        Carga las facturas abiertas con saldo pendiente en una única consulta.
+
+        Args:
+            queryset: Facturas a considerar (por defecto todas las abiertas)
+        """
+        if queryset is None:
+            queryset = Invoice.objects.all()
+        rows = (
+            queryset.filter(status__in=OPEN_STATUSES, balance__gt=0)
+            .values_list(
+                'id', 'number', 'balance', 'due_date', 'customer_id',
+                'customer__document', 'customer__first_name', 'customer__last_name',
+            )
+            .iterator(chunk_size=5000)
+        )
+        return cls(
+            {
+                'id': invoice_id,
+                'number': number,
+                'balance': Decimal(balance).quantize(Decimal('0.01')),
+                'due_date': due_date,
+                'customer_id': customer_id,
+                'document': normalize_document(document),
+                'customer': f"{first_name} {last_name}".strip(),
+            }
+            for invoice_id, number, balance, due_date, customer_id, document, first_name, last_name in rows
+        )
+
+
+class ReconciliationEngine:
+    """
+    Motor que empareja movimientos de un extracto con facturas abiertas.
+    """
+
+    def __init__(self, index=None, due_date_window_days=None):
+        config = _get_config()
+        self.index = index if index is not None else OpenInvoiceIndex.load()
+        self.window = timedelta(days=(
+            due_date_window_days if due_date_window_days is not None else config['due_date_window_days']
+        ))
+        self.auto_apply_confidence = config['auto_apply_confidence']
+
+    def reconcile_file(self, uploaded_file, file_format=None):
+        """
+        Concilia los movimientos de un extracto CSV u OFX.
+
+        Returns:
+            dict: Resultado (ver reconcile)
+        """
+        rows = read_statement_file(uploaded_file, file_format, required_columns=STATEMENT_REQUIRED_COLUMNS)
+        return self.reconcile(rows)
+
+    def reconcile(self, rows):
+        """
+        Empareja los movimientos con las facturas abiertas, sin consultas a la base.
+
+        Primero se resuelven los movimientos que citan el número de factura y
+        después los que se emparejan por importe, para que una referencia
+        explícita no pierda su factura contra una coincidencia por importe.
+        Una factura se asigna a un solo movimiento por importe en cada lote.
+
+        Args:
+            rows (list): Filas de parse_csv / parse_ofx
+
+        Returns:
+            dict: ``matches`` (una entrada por movimiento con ``line``, ``date``,
+            ``amount``, ``description``, ``invoice`` (o None), ``rule``,
+            ``confidence``, ``auto`` y ``candidates``), ``matched``,
+            ``auto_count``, ``unmatched`` y ``errors``
+        """
+        results = {}
+        claimed = set()
+        pending = []
+        for row in rows:
+            if row.get('error'):
+                results[row['line']] = self._result(row, error=row['error'])
+                continue
+            match = self._match_number(row)
+            if match:
+                claimed.add(match['invoice']['id'])
+                results[row['line']] = match
+            else:
+                pending.append(row)
+
+        for row in pending:
+            match = (
+                self._match_amount_document(row, claimed)
+                or self._match_amount_due_date(row, claimed)
+                or self._result(row)
+            )
+            if match['invoice']:
+                claimed.add(match['invoice']['id'])
+            results[row['line']] = match
+
+        matches = [results[row['line']] for row in rows]
+        summary = {
+            'matches': matches,
+            'matched': sum(1 for match in matches if match['invoice']),
+            'auto_count': sum(1 for match in matches if match['auto']),
+            'unmatched': sum(1 for match in matches if not match['invoice'] and not match['error']),
+            'errors': sum(1 for match in matches if match['error']),
+        }
+        logger.info(
+            f"Conciliación: {summary['matched']} de {len(matches)} movimientos emparejados "
+            f"contra {len(self.index)} facturas abiertas"
+        )
+        return summary
+
+    def apply(self, matches, min_confidence=None, default_method=None):
+        """
+        Registra como pagos las coincidencias con confianza suficiente.
+
+        Args:
+            matches (list): Entradas de reconcile()['matches']
+            min_confidence (Decimal): Umbral mínimo (por defecto el de configuración)
+            default_method (str): Método de pago a registrar
+
+        Returns:
+            dict: Resultado de PaymentImportService.import_rows
+        """
+        threshold = self.auto_apply_confidence if min_confidence is None else Decimal(str(min_confidence))
+        rows = [
+            match_to_payment_row(match)
+            for match in matches
+            if match['invoice'] and match['confidence'] >= threshold
+        ]
+        return PaymentImportService(default_method=default_method).import_rows(rows)
+
+    # Reglas de coincidencia
+
+    def _tokens(self, row):
+        text = ' '.join(filter(None, (row.get('invoice'), row.get('notes'))))
+        return [token.strip(_TOKEN_STRIP).upper() for token in text.split()]
+
+    def _match_number(self, row):
+        for token in self._tokens(row):
+            invoice = self.index.by_number.get(token)
+            if invoice is None:
+                continue
+            if row['amount'] == invoice['balance']:
+                confidence = CONFIDENCE_NUMBER_EXACT
+            elif row['amount'] < invoice['balance']:
+                confidence = CONFIDENCE_NUMBER_PARTIAL
+            else:
+                confidence = CONFIDENCE_NUMBER_OVERPAID
+            return self._result(row, invoice, 'number', confidence)
+        return None
+
+    def _row_documents(self, row):
+        documents = []
+        document = normalize_document(row.get('document'))
+        if document:
+            documents.append(document)
+        # El CUIT/DNI del ordenante suele venir en el concepto de la transferencia
+        for token in (row.get('notes') or '').split():
+            document = normalize_document(token)
+            if len(document) >= 7 and document in self.index.documents:
+                documents.append(document)
+        return documents
+
+    def _match_amount_document(self, row, claimed):
+        for document in self._row_documents(row):
+            candidates = [
+                invoice for invoice in self.index.by_amount_document.get((row['amount'], document), ())
+                if invoice['id'] not in claimed
+            ]
+            if candidates:
+                confidence = (
+                    CONFIDENCE_DOCUMENT_UNIQUE if len(candidates) == 1 else CONFIDENCE_DOCUMENT_MULTIPLE
+                )
+                # Con varias facturas del mismo importe se cancela primero la más antigua
+                return self._result(row, candidates[0], 'amount_document', confidence, candidates[1:])
+        return None
+
+    def _match_amount_due_date(self, row, claimed):
+        candidates = [
+            invoice for invoice in self.index.by_amount.get(row['amount'], ())
+            if invoice['id'] not in claimed and abs(invoice['due_date'] - row['date']) <= self.window
+        ]
+        if not candidates:
+            return None
+        candidates.sort(key=lambda invoice: (abs(invoice['due_date'] - row['date']), invoice['id']))
+        confidence = CONFIDENCE_DUE_DATE_UNIQUE if len(candidates) == 1 else CONFIDENCE_DUE_DATE_MULTIPLE
+        return self._result(row, candidates[0], 'amount_due_date', confidence, candidates[1:])
+
+    def _result(self, row, invoice=None, rule=None, confidence=Decimal('0'), alternatives=(), error=None):
+        return {
+            'line': row['line'],
+            'date': row.get('date'),
+            'amount': row.get('amount'),
+            'description': row.get('notes', ''),
+            'reference': row.get('reference', ''),
+            'invoice': invoice,
+            'rule': rule,
+            'rule_display': MATCH_RULES.get(rule, ''),
+            'confidence': confidence,
+            'auto': bool(invoice) and confidence >= self.auto_apply_confidence,
+            'candidates': list(alternatives[:MAX_CANDIDATES]),
+            'error': error,
+        }
+
+
+def match_to_payment_row(match):
+    """
+    Convierte una coincidencia en una fila para PaymentImportService.import_rows.
+    """
+    return {
+        'line': match['line'],
+        'invoice': match['invoice']['number'],
+        'date': match['date'],
+        'amount': match['amount'],
+        'method': '',
+        'notes': match['description'],
+        'reference': match.get('reference', ''),
+    }
+
+
+def serialize_match(match):
+    """
+    Serializa una coincidencia para reenviarla desde el formulario de confirmación.
+    """
+    row = match_to_payment_row(match)
+    row['date'] = row['date'].isoformat()
+    row['amount'] = str(row['amount'])
+    return json.dumps(row)
+
+
+def deserialize_matches(values):
+    """
+    Reconstruye las filas de pago confirmadas en el formulario.
+
+    Raises:
+        PaymentImportError: Si alguna fila no es válida
+    """
+    rows = []
+    for value in values:
+        try:
+            row = json.loads(value)
+            row['date'] = date.fromisoformat(row['date'])
+            row['amount'] = Decimal(row['amount'])
+        except (ValueError, KeyError, TypeError, ArithmeticError):
+            raise PaymentImportError("Los movimientos seleccionados no son válidos.")
+        rows.append(row)
+    return rows
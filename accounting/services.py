@@ -4,7 +4,9 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from weasyprint import HTML
+from accounting.service_modules.pdf_render_service import render_pdf
+from accounting.service_modules.pdf_cache_service import get_pdf_cache, render_cached_pdf
+from accounting.service_modules.receipt_context import ReceiptContext
 import logging
 from decimal import Decimal
 import decimal
@@ -12,18 +14,28 @@ import time
 
 logger = logging.getLogger(__name__)
 
-def send_invoice_email(invoice):
+INVOICE_PDF_TEMPLATE = 'accounting/invoice_pdf.html'
+
+
+def render_invoice_html(invoice):
     """
-    Genera y envía una factura por correo electrónico.
+    Renderiza el HTML del PDF de una factura.
     """
-    if not invoice.customer.email:
-        raise ValueError("El cliente no tiene una dirección de correo electrónico.")
+    return render_to_string(INVOICE_PDF_TEMPLATE, {'invoice': invoice})
 
-    # Generar el PDF en memoria
-    html_string = render_to_string('accounting/invoice_pdf.html', {'invoice': invoice})
-    html = HTML(string=html_string)
-    pdf_file = html.write_pdf()
 
+def build_invoice_email(invoice, pdf_file, connection=None):
+    """
+    Construye el correo de una factura con su PDF adjunto.
+
+    Args:
+        invoice: Factura a enviar
+        pdf_file (bytes): PDF de la factura
+        connection: Conexión de correo a reutilizar (opcional)
+
+    Returns:
+        EmailMessage: Correo listo para enviar
+    """
     # Crear el correo electrónico
     subject = f"Factura Nº {invoice.number}"
     body = "Adjuntamos la factura correspondiente."
@@ -31,14 +43,31 @@ def send_invoice_email(invoice):
         subject,
         body,
         settings.DEFAULT_FROM_EMAIL,
-        [invoice.customer.email]
+        [invoice.customer.email],
+        connection=connection
     )
 
     # Adjuntar el PDF
     email.attach(f'factura_{invoice.number}.pdf', pdf_file, 'application/pdf')
+    return email
+
+
+def send_invoice_email(invoice):
+    """
+    Genera y envía una factura por correo electrónico.
+    """
+    if not invoice.customer.email:
+        raise ValueError("El cliente no tiene una dirección de correo electrónico.")
+
+    # Generar el PDF en memoria
+    html_string = render_invoice_html(invoice)
+    pdf_file = render_cached_pdf(html_string, INVOICE_PDF_TEMPLATE, render_function=render_pdf)
 
     # Enviar el correo
-    email.send()
+    build_invoice_email(invoice, pdf_file).send()
+
+
+OWNER_RECEIPT_PDF_TEMPLATE = 'accounting/owner_receipt_pdf.html'
 
 
 class OwnerReceiptValidationError(ValidationError):
@@ -80,20 +109,25 @@ class OwnerReceiptService:
             self.logger.addHandler(handler)
             self.logger.setLevel(logging.INFO)
     
-    def can_generate_receipt(self, invoice):
+    def can_generate_receipt(self, invoice, context=None):
         """
         Verifica si se puede generar un comprobante para la factura.
         
         Args:
             invoice: Instancia de Invoice para verificar
+            context (ReceiptContext, optional): Datos precargados de la factura
             
         Returns:
             tuple: (bool, str) - (puede_generar, mensaje_error)
         """
         try:
-            from .validators import validate_owner_receipt_generation
+            # La validación de un contexto se hace y se registra una sola vez
+            if context is not None and context.validation_result is not None:
+                is_valid, error_message, _ = context.validation_result
+                return is_valid, error_message
             
-            is_valid, error_message, warnings = validate_owner_receipt_generation(invoice)
+            context = context or ReceiptContext.for_invoice(invoice)
+            is_valid, error_message, warnings = context.validate()
             
             # Log warnings if any
             if warnings:
@@ -112,12 +146,13 @@ class OwnerReceiptService:
             self._log_receipt_operation('validation', invoice=invoice, success=False, error=str(e))
             return False, "Error interno al verificar la factura. Por favor, contacte al administrador del sistema."
     
-    def get_receipt_data(self, invoice):
+    def get_receipt_data(self, invoice, context=None):
         """
         Obtiene todos los datos necesarios para el comprobante.
         
         Args:
             invoice: Instancia de Invoice
+            context (ReceiptContext, optional): Datos precargados de la factura
             
         Returns:
             dict: Diccionario con todos los datos del comprobante
@@ -126,8 +161,12 @@ class OwnerReceiptService:
             OwnerReceiptValidationError: Si faltan datos requeridos
         """
         try:
+            context = context or ReceiptContext.for_invoice(invoice)
+            if context.receipt_data is not None:
+                return dict(context.receipt_data)
+            
             # Verificar que se puede generar el comprobante
-            can_generate, error_msg = self.can_generate_receipt(invoice)
+            can_generate, error_msg = self.can_generate_receipt(invoice, context=context)
             if not can_generate:
                 raise OwnerReceiptValidationError(error_msg)
             
@@ -266,7 +305,8 @@ class OwnerReceiptService:
             }
             
             self.logger.info(f"Datos del comprobante obtenidos exitosamente para factura {invoice.pk}")
-            return receipt_data
+            context.receipt_data = receipt_data
+            return dict(receipt_data)
             
         except OwnerReceiptValidationError:
             raise
@@ -314,13 +354,14 @@ class OwnerReceiptService:
         except Exception:
             return 'N/A'
     
-    def generate_receipt(self, invoice, user):
+    def generate_receipt(self, invoice, user, context=None):
         """
         Genera un comprobante para una factura específica.
         
         Args:
             invoice: Instancia de Invoice
             user: Usuario que genera el comprobante (Agent)
+            context (ReceiptContext, optional): Datos precargados de la factura
             
         Returns:
             OwnerReceipt: Instancia del comprobante generado
@@ -332,8 +373,10 @@ class OwnerReceiptService:
         from django.db import transaction, IntegrityError
         
         try:
+            context = context or ReceiptContext.for_invoice(invoice)
+            
             # Verificar que se puede generar el comprobante
-            can_generate, error_msg = self.can_generate_receipt(invoice)
+            can_generate, error_msg = self.can_generate_receipt(invoice, context=context)
             if not can_generate:
                 raise OwnerReceiptValidationError(error_msg)
             
@@ -342,7 +385,7 @@ class OwnerReceiptService:
                 raise OwnerReceiptValidationError("Usuario requerido para generar el comprobante")
             
             # Obtener datos del comprobante
-            receipt_data = self.get_receipt_data(invoice)
+            receipt_data = self.get_receipt_data(invoice, context=context)
             
             # Usar transacción para asegurar consistencia
             with transaction.atomic():
@@ -386,12 +429,59 @@ class OwnerReceiptService:
             self.logger.error(f"Error inesperado generando comprobante para factura {getattr(invoice, 'pk', 'unknown')}: {str(e)}", exc_info=True)
             raise OwnerReceiptValidationError("Error interno al generar el comprobante. Por favor, contacte al administrador del sistema.")
     
-    def generate_pdf(self, receipt):
+    def render_receipt_html(self, receipt, context=None):
+        """
+        Renderiza el HTML del PDF del comprobante.
+        
+        Args:
+            receipt: Instancia de OwnerReceipt
+            context (ReceiptContext, optional): Datos precargados de la factura
+            
+        Returns:
+            str: HTML del comprobante
+            
+        Raises:
+            OwnerReceiptPDFError: Si no se pueden obtener los datos o renderizar el template
+        """
+        # Obtener datos completos del comprobante
+        try:
+            context = context or ReceiptContext.for_receipt(receipt)
+            receipt_data = self.get_receipt_data(receipt.invoice, context=context)
+        except Exception as e:
+            self.logger.error(f"Error obteniendo datos para PDF del comprobante {receipt.pk}: {str(e)}")
+            raise OwnerReceiptPDFError("Error obteniendo datos del comprobante para el PDF")
+        
+        # Agregar información específica del comprobante
+        receipt_data['receipt'] = {
+            'number': getattr(receipt, 'receipt_number', 'N/A'),
+            'generated_at': getattr(receipt, 'generated_at', timezone.now()),
+            'generated_by': self._get_person_name(receipt.generated_by) if receipt.generated_by else 'Sistema',
+            'status': receipt.get_status_display() if hasattr(receipt, 'get_status_display') else 'N/A',
+        }
+        # La fecha de generación del comprobante mantiene el HTML estable para la caché
+        receipt_data['generated_at'] = getattr(receipt, 'generated_at', None) or receipt_data['generated_at']
+        
+        # Información de la empresa, cargada con el contexto
+        receipt_data['company'] = context.company
+        
+        # Renderizar el template HTML
+        try:
+            html_string = render_to_string(OWNER_RECEIPT_PDF_TEMPLATE, receipt_data)
+            if not html_string or len(html_string.strip()) == 0:
+                raise OwnerReceiptPDFError("El template HTML está vacío")
+        except Exception as e:
+            self.logger.error(f"Error renderizando template HTML para comprobante {receipt.pk}: {str(e)}")
+            raise OwnerReceiptPDFError("Error renderizando el template del comprobante")
+        
+        return html_string
+    
+    def generate_pdf(self, receipt, context=None):
         """
         Genera el PDF del comprobante.
         
         Args:
             receipt: Instancia de OwnerReceipt
+            context (ReceiptContext, optional): Datos precargados de la factura
             
         Returns:
             bytes: Contenido del PDF generado
@@ -407,43 +497,20 @@ class OwnerReceiptService:
             if not hasattr(receipt, 'invoice') or not receipt.invoice:
                 raise OwnerReceiptPDFError("El comprobante no tiene una factura asociada")
             
-            # Obtener datos completos del comprobante
-            try:
-                receipt_data = self.get_receipt_data(receipt.invoice)
-            except Exception as e:
-                self.logger.error(f"Error obteniendo datos para PDF del comprobante {receipt.pk}: {str(e)}")
-                raise OwnerReceiptPDFError("Error obteniendo datos del comprobante para el PDF")
-            
-            # Agregar información específica del comprobante
-            receipt_data['receipt'] = {
-                'number': getattr(receipt, 'receipt_number', 'N/A'),
-                'generated_at': getattr(receipt, 'generated_at', timezone.now()),
-                'generated_by': self._get_person_name(receipt.generated_by) if receipt.generated_by else 'Sistema',
-                'status': receipt.get_status_display() if hasattr(receipt, 'get_status_display') else 'N/A',
-            }
-            
-            # Obtener información de la empresa
-            try:
-                from core.models import Company
-                company = Company.objects.first()
-                receipt_data['company'] = company
-            except Exception as e:
-                self.logger.warning(f"Error obteniendo información de la empresa para PDF: {str(e)}")
-                receipt_data['company'] = None
+            # Servir el PDF cacheado si sus datos no cambiaron desde que se generó
+            pdf_cache = get_pdf_cache()
+            cached_content = pdf_cache.read(getattr(receipt, 'pdf_file_path', ''))
+            if cached_content is not None:
+                self._log_receipt_operation('pdf_generate', receipt=receipt, success=True, pdf_size=len(cached_content), cached=True)
+                return cached_content
             
-            # Renderizar el template HTML
-            try:
-                html_string = render_to_string('accounting/owner_receipt_pdf.html', receipt_data)
-                if not html_string or len(html_string.strip()) == 0:
-                    raise OwnerReceiptPDFError("El template HTML está vacío")
-            except Exception as e:
-                self.logger.error(f"Error renderizando template HTML para comprobante {receipt.pk}: {str(e)}")
-                raise OwnerReceiptPDFError("Error renderizando el template del comprobante")
+            html_string = self.render_receipt_html(receipt, context=context)
             
-            # Generar PDF con WeasyPrint
+            # Generar PDF con WeasyPrint en el pool de renderizado, o tomarlo de la caché
             try:
-                html = HTML(string=html_string)
-                pdf_content = html.write_pdf()
+                pdf_content, pdf_file_path = pdf_cache.render(
+                    html_string, OWNER_RECEIPT_PDF_TEMPLATE, render_function=render_pdf
+                )
                 
                 if not pdf_content or len(pdf_content) == 0:
                     raise OwnerReceiptPDFError("El PDF generado está vacío")
@@ -459,6 +526,10 @@ class OwnerReceiptService:
                 else:
                     raise OwnerReceiptPDFError(f"Error técnico generando PDF: {str(e)}")
             
+            if pdf_file_path and receipt.pk and pdf_file_path != receipt.pdf_file_path:
+                receipt.pdf_file_path = pdf_file_path
+                type(receipt).objects.filter(pk=receipt.pk).update(pdf_file_path=pdf_file_path)
+            
             self._log_receipt_operation('pdf_generate', receipt=receipt, success=True, pdf_size=len(pdf_content))
             
             return pdf_content
@@ -469,13 +540,14 @@ class OwnerReceiptService:
             self.logger.error(f"Error inesperado generando PDF para comprobante {getattr(receipt, 'pk', 'unknown')}: {str(e)}", exc_info=True)
             raise OwnerReceiptPDFError("Error interno al generar el PDF. Por favor, contacte al administrador del sistema.")
     
-    def send_receipt_email(self, receipt, retry_count=0):
+    def send_receipt_email(self, receipt, retry_count=0, context=None):
         """
         Envía el comprobante por email al propietario con mecanismo de reintentos.
         
         Args:
             receipt: Instancia de OwnerReceipt
             retry_count: Número de intento actual (para reintentos internos)
+            context (ReceiptContext, optional): Datos precargados de la factura
             
         Returns:
             bool: True si se envió correctamente
@@ -507,71 +579,22 @@ class OwnerReceiptService:
             except ValidationError:
                 raise OwnerReceiptEmailError(f"Dirección de email inválida: {receipt.email_sent_to}")
             
-            # Obtener datos del comprobante
+            # Obtener datos del comprobante; el contexto se reutiliza en el PDF
             try:
-                receipt_data = self.get_receipt_data(receipt.invoice)
+                context = context or ReceiptContext.for_receipt(receipt)
+                receipt_data = self.get_receipt_data(receipt.invoice, context=context)
             except Exception as e:
                 self.logger.error(f"Error obteniendo datos para email del comprobante {receipt.pk}: {str(e)}")
                 raise OwnerReceiptEmailError("Error obteniendo datos del comprobante para el email")
             
             # Generar PDF
             try:
-                pdf_content = self.generate_pdf(receipt)
+                pdf_content = self.generate_pdf(receipt, context=context)
             except OwnerReceiptPDFError as e:
                 self.logger.error(f"Error generando PDF para email del comprobante {receipt.pk}: {str(e)}")
                 raise OwnerReceiptEmailError(f"Error generando PDF para adjuntar al email: {str(e)}")
             
-            # Preparar datos para el template de email
-            try:
-                email_context = {
-                    'owner_name': receipt_data['owner']['name'],
-                    'property_address': receipt_data['property']['address'],
-                    'period': self._format_period(receipt.invoice.date),
-                    'net_amount': receipt.net_amount,
-                    'receipt_number': receipt.receipt_number,
-                    'company_name': getattr(settings, 'COMPANY_NAME', 'Inmobiliaria'),
-                    'invoice_number': receipt.invoice.number,
-                    'gross_amount': receipt.gross_amount,
-                    'discount_amount': receipt.discount_amount,
-                    'discount_percentage': receipt.discount_percentage,
-                }
-            except Exception as e:
-                self.logger.error(f"Error preparando contexto de email para comprobante {receipt.pk}: {str(e)}")
-                raise OwnerReceiptEmailError("Error preparando datos del email")
-            
-            # Renderizar el template de email
-            try:
-                email_body = render_to_string('emails/owner_receipt_email.html', email_context)
-                if not email_body or len(email_body.strip()) == 0:
-                    raise OwnerReceiptEmailError("El template de email está vacío")
-            except Exception as e:
-                self.logger.error(f"Error renderizando template de email para comprobante {receipt.pk}: {str(e)}")
-                raise OwnerReceiptEmailError("Error renderizando el template del email")
-            
-            # Crear el email
-            try:
-                subject = f"Comprobante de Alquiler - {email_context['property_address']} - {email_context['period']}"
-                
-                email = EmailMessage(
-                    subject=subject,
-                    body=email_body,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[receipt.email_sent_to],
-                )
-                
-                # Configurar email como HTML
-                email.content_subtype = 'html'
-                
-                # Adjuntar PDF
-                email.attach(
-                    f'comprobante_{receipt.receipt_number}.pdf',
-                    pdf_content,
-                    'application/pdf'
-                )
-                
-            except Exception as e:
-                self.logger.error(f"Error creando mensaje de email para comprobante {receipt.pk}: {str(e)}")
-                raise OwnerReceiptEmailError("Error creando el mensaje de email")
+            email = self.build_receipt_email(receipt, receipt_data, pdf_content)
             
             # Enviar email con manejo de errores específicos
             try:
@@ -585,7 +608,7 @@ class OwnerReceiptService:
                     if retry_count < self.max_retry_attempts:
                         self.logger.warning(f"Error SMTP enviando comprobante {receipt.pk}, reintentando en {self.retry_delay}s (intento {retry_count + 1}/{self.max_retry_attempts})")
                         time.sleep(self.retry_delay)
-                        return self.send_receipt_email(receipt, retry_count + 1)
+                        return self.send_receipt_email(receipt, retry_count + 1, context=context)
                     else:
                         raise OwnerReceiptEmailError("Error de conexión SMTP. Verifique la configuración del servidor de correo.")
                 
@@ -602,7 +625,7 @@ class OwnerReceiptService:
                     if retry_count < self.max_retry_attempts:
                         self.logger.warning(f"Error genérico enviando comprobante {receipt.pk}, reintentando en {self.retry_delay}s (intento {retry_count + 1}/{self.max_retry_attempts}): {str(e)}")
                         time.sleep(self.retry_delay)
-                        return self.send_receipt_email(receipt, retry_count + 1)
+                        return self.send_receipt_email(receipt, retry_count + 1, context=context)
                     else:
                         raise OwnerReceiptEmailError(f"Error enviando email después de {self.max_retry_attempts} intentos: {str(e)}")
             
@@ -639,6 +662,77 @@ class OwnerReceiptService:
             
             raise OwnerReceiptEmailError("Error interno enviando email. Por favor, contacte al administrador del sistema.")
     
+    def build_receipt_email(self, receipt, receipt_data, pdf_content, connection=None):
+        """
+        Construye el email del comprobante con el PDF adjunto.
+        
+        Args:
+            receipt: Instancia de OwnerReceipt
+            receipt_data (dict): Datos del comprobante (ver get_receipt_data)
+            pdf_content (bytes): PDF del comprobante
+            connection: Conexión de correo a reutilizar (opcional)
+            
+        Returns:
+            EmailMessage: Email listo para enviar
+            
+        Raises:
+            OwnerReceiptEmailError: Si no se puede preparar el email
+        """
+        # Preparar datos para el template de email
+        try:
+            email_context = {
+                'owner_name': receipt_data['owner']['name'],
+                'property_address': receipt_data['property']['address'],
+                'period': self._format_period(receipt.invoice.date),
+                'net_amount': receipt.net_amount,
+                'receipt_number': receipt.receipt_number,
+                'company_name': getattr(settings, 'COMPANY_NAME', 'Inmobiliaria'),
+                'invoice_number': receipt.invoice.number,
+                'gross_amount': receipt.gross_amount,
+                'discount_amount': receipt.discount_amount,
+                'discount_percentage': receipt.discount_percentage,
+            }
+        except Exception as e:
+            self.logger.error(f"Error preparando contexto de email para comprobante {receipt.pk}: {str(e)}")
+            raise OwnerReceiptEmailError("Error preparando datos del email")
+        
+        # Renderizar el template de email
+        try:
+            email_body = render_to_string('emails/owner_receipt_email.html', email_context)
+            if not email_body or len(email_body.strip()) == 0:
+                raise OwnerReceiptEmailError("El template de email está vacío")
+        except Exception as e:
+            self.logger.error(f"Error renderizando template de email para comprobante {receipt.pk}: {str(e)}")
+            raise OwnerReceiptEmailError("Error renderizando el template del email")
+        
+        # Crear el email
+        try:
+            subject = f"Comprobante de Alquiler - {email_context['property_address']} - {email_context['period']}"
+            
+            email = EmailMessage(
+                subject=subject,
+                body=email_body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[receipt.email_sent_to],
+                connection=connection,
+            )
+            
+            # Configurar email como HTML
+            email.content_subtype = 'html'
+            
+            # Adjuntar PDF
+            email.attach(
+                f'comprobante_{receipt.receipt_number}.pdf',
+                pdf_content,
+                'application/pdf'
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error creando mensaje de email para comprobante {receipt.pk}: {str(e)}")
+            raise OwnerReceiptEmailError("Error creando el mensaje de email")
+        
+        return email
+    
     def _format_period(self, date):
         """Formatea el período de la factura de forma segura."""
         try:
@@ -767,7 +861,8 @@ class OwnerReceiptService:
             
             # Verificar que se puede reenviar usando el validator
             from .validators import validate_receipt_resend
-            can_resend, error_msg = validate_receipt_resend(receipt)
+            context = ReceiptContext.for_receipt(receipt)
+            can_resend, error_msg = validate_receipt_resend(receipt, context=context)
             if not can_resend:
                 raise OwnerReceiptEmailError(error_msg)
             
@@ -786,7 +881,7 @@ class OwnerReceiptService:
             
             # Enviar email
             try:
-                return self.send_receipt_email(receipt)
+                return self.send_receipt_email(receipt, context=context)
             except OwnerReceiptEmailError:
                 raise
             except Exception as e:
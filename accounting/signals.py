@@ -5,12 +5,17 @@ This module handles automatic notification creation when payments are recorded
 or invoice statuses change, integrating with the user notification system.
 """
 
-from django.db.models.signals import post_save, pre_save
+from decimal import Decimal
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from user_notifications.checkers import InvoiceDueSoonChecker
 from user_notifications.services import create_notification_if_not_exists
-from .models_invoice import Payment, Invoice
+from .models_invoice import AccountingPeriod, Payment, Invoice
+from .service_modules.dashboard_service import invalidate_dashboard_kpis
+from .service_modules.invoice_transition_service import SIGNIFICANT_STATUS_CHANGES
 import logging
 
 logger = logging.getLogger(__name__)
@@ -82,34 +87,13 @@ def payment_received_notification(sender, instance, created, **kwargs):
             logger.error(f"Error creating payment notification for payment {instance.id}: {e}")
 
 
-@receiver(pre_save, sender=Invoice)
-def track_invoice_status_changes(sender, instance, **kwargs):
-    """
-    Track invoice status changes to create appropriate notifications.
-    
-    Args:
-        sender: The Invoice model class
-        instance: The Invoice instance about to be saved
-        **kwargs: Additional keyword arguments
-    """
-    if instance.pk:  # Only for existing invoices
-        try:
-            old_invoice = Invoice.objects.get(pk=instance.pk)
-            old_status = old_invoice.status
-            new_status = instance.status
-            
-            # Store old status for post_save signal
-            instance._old_status = old_status
-            
-        except Invoice.DoesNotExist:
-            # This shouldn't happen, but handle gracefully
-            instance._old_status = None
-
-
 @receiver(post_save, sender=Invoice)
 def invoice_status_change_notification(sender, instance, created, **kwargs):
     """
     Create a notification when an invoice status changes.
+
+    The previous status comes from the field snapshot taken when the invoice
+    was loaded (see ``FieldTrackerMixin``), so no extra query is needed.
     
     Args:
         sender: The Invoice model class
@@ -117,24 +101,13 @@ def invoice_status_change_notification(sender, instance, created, **kwargs):
         created: Boolean indicating if this is a new invoice
         **kwargs: Additional keyword arguments
     """
-    if not created and hasattr(instance, '_old_status') and instance._old_status:
+    if not created and instance.has_field_changed('status'):
         try:
-            old_status = instance._old_status
+            old_status = instance.previous_value('status')
             new_status = instance.status
             
             # Only notify for significant status changes
-            significant_changes = [
-                ('draft', 'validated'),
-                ('validated', 'sent'), 
-                ('sent', 'paid'),
-                ('paid', 'sent'),  # If payment was reversed
-                ('validated', 'cancelled'),
-                ('sent', 'cancelled'),
-                ('cancelled', 'validated'),
-                ('cancelled', 'sent'),
-            ]
-            
-            if (old_status, new_status) not in significant_changes:
+            if (old_status, new_status) not in SIGNIFICANT_STATUS_CHANGES:
                 return
             
             agent = instance.customer.agent if hasattr(instance.customer, 'agent') else None
@@ -205,3 +178,152 @@ def update_invoice_status_after_payment(sender, instance, created, **kwargs):
             
         except Exception as e:
             logger.error(f"Error updating invoice status after payment {instance.id}: {e}")
+
+
+def _invalidate_owner_receipt_pdfs(**filters):
+    """
+    Clear the cached PDF path of the owner receipts matching the filters.
+
+    The cached file itself is content-addressed and is left for LRU eviction;
+    the next request re-renders the HTML and picks up the new data.
+    """
+    from .models_invoice import OwnerReceipt
+
+    cleared = OwnerReceipt.objects.filter(**filters).exclude(pdf_file_path='').update(pdf_file_path='')
+    if cleared:
+        logger.debug(f"Invalidated {cleared} cached owner receipt PDFs ({filters})")
+
+
+@receiver(post_save, sender=Invoice)
+def invalidate_receipt_pdfs_on_invoice_change(sender, instance, created, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when their invoice changes.
+    """
+    if not created:
+        _invalidate_owner_receipt_pdfs(invoice=instance)
+
+
+@receiver(post_save, sender='contracts.Contract')
+def invalidate_receipt_pdfs_on_contract_change(sender, instance, created, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when the contract behind them changes.
+    """
+    if not created:
+        _invalidate_owner_receipt_pdfs(invoice__contract=instance)
+
+
+@receiver(post_save, sender='properties.Property')
+def invalidate_receipt_pdfs_on_property_change(sender, instance, created, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when the rented property changes.
+    """
+    if not created:
+        _invalidate_owner_receipt_pdfs(invoice__contract__property=instance)
+
+
+@receiver(post_save, sender='properties.PropertyType')
+def invalidate_receipt_pdfs_on_property_type_change(sender, instance, created, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when the property type they print is renamed.
+    """
+    if not created:
+        _invalidate_owner_receipt_pdfs(invoice__contract__property__property_type=instance)
+
+
+@receiver(post_save, sender='agents.Agent')
+def invalidate_receipt_pdfs_on_agent_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when the agent shown on them changes.
+
+    Logins only save ``last_login``, which the receipt does not print.
+    """
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    _invalidate_owner_receipt_pdfs(invoice__contract__agent=instance)
+
+
+@receiver(post_save, sender='customers.Customer')
+def invalidate_receipt_pdfs_on_customer_change(sender, instance, created, **kwargs):
+    """
+    Invalidate cached owner receipt PDFs when the tenant or owner changes.
+    """
+    if not created:
+        _invalidate_owner_receipt_pdfs(invoice__customer=instance)
+        _invalidate_owner_receipt_pdfs(invoice__contract__property__owner=instance)
+
+
+@receiver(post_save, sender='core.Company')
+def invalidate_receipt_pdfs_on_company_change(sender, instance, **kwargs):
+    """
+    Invalidate every cached owner receipt PDF when the company data changes.
+    """
+    _invalidate_owner_receipt_pdfs()
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_dashboard_on_change(sender, instance, **kwargs):
+    """
+    Discard the cached accounting dashboard KPIs when an invoice or payment changes.
+    """
+    invalidate_dashboard_kpis()
+
+
+@receiver(pre_save, sender='payments.ContractPayment')
+def check_contract_payment_period_lock(sender, instance, **kwargs):
+    """
+    Reject changes to collected contract payments dated in a closed accounting period.
+
+    Only paid payments feed the closing balances; the original values come from
+    the field tracker, so no extra query is needed.
+    """
+    if AccountingPeriod.get_lock_date() is None:
+        return
+    subject = "el cobro del contrato"
+    new_date = instance.payment_date if instance.status == 'paid' else None
+    if instance._state.adding:
+        AccountingPeriod.check_open(new_date, subject=subject)
+        return
+    if instance.changed_fields():
+        previous_date = (
+            instance.previous_value('payment_date') if instance.previous_value('status') == 'paid' else None
+        )
+        AccountingPeriod.check_open(previous_date, new_date, subject=subject)
+
+
+@receiver(pre_delete, sender='payments.ContractPayment')
+def check_contract_payment_delete_period_lock(sender, instance, **kwargs):
+    """
+    Reject deleting a collected contract payment dated in a closed accounting period.
+    """
+    if instance.status == 'paid':
+        AccountingPeriod.check_open(instance.payment_date, subject="el cobro del contrato")
+
+
+@receiver(pre_delete, sender=Payment)
+def check_payment_delete_period_lock(sender, instance, **kwargs):
+    """
+    Reject deleting a payment dated in a closed accounting period.
+
+    Runs for single deletes, queryset deletes and the admin bulk action alike.
+    """
+    AccountingPeriod.check_open(instance.date, subject="el pago")
+
+
+@receiver(post_delete, sender=Payment)
+def release_deleted_payment_amount(sender, instance, **kwargs):
+    """
+    Give a deleted payment's amount back to its invoice's stored totals.
+
+    The UPDATE uses F expressions so concurrent payments are not overwritten.
+    """
+    amount = Decimal(str(instance.amount))
+    updated = Invoice.objects.filter(pk=instance.invoice_id).update(
+        paid_amount=F('paid_amount') - amount,
+        balance=F('balance') + amount,
+    )
+    # Callers such as payment_delete keep using the loaded invoice afterwards
+    if updated and Payment._meta.get_field('invoice').is_cached(instance):
+        instance.invoice.refresh_from_db(fields=['paid_amount', 'balance'])
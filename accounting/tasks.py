@@ -105,3 +105,133 @@ def generate_quarterly_invoices():
     except Exception as e:
         logger.error(f"Error generando facturas trimestrales: {str(e)}")
         return {'success': False, 'error': str(e)}
+
+
+@shared_task(bind=True, max_retries=3)
+def send_bulk_invoice_emails_task(self, job_id):
+    """
+    Tarea que procesa un envío masivo de facturas por correo electrónico.
+
+    Si falla, se reintenta; solo se procesan las facturas que quedaron pendientes.
+    """
+    from .models_invoice import BulkEmailJob
+    from .service_modules.bulk_email_service import BulkInvoiceEmailService
+
+    try:
+        job = BulkInvoiceEmailService().process_job(job_id)
+        return {
+            'success': True,
+            'job_id': job.pk,
+            'sent': job.sent_count,
+            'errors': job.error_count,
+            'skipped': job.skipped_count,
+        }
+    except BulkEmailJob.DoesNotExist:
+        logger.error(f"Envío masivo #{job_id} no encontrado")
+        return {'success': False, 'error': 'Envío masivo no encontrado'}
+    except Exception as exc:
+        logger.error(f"Error en envío masivo #{job_id}: {str(exc)}")
+        if self.request.retries < self.max_retries:
+            # Volver a dejar el envío en proceso para que el reintento continúe
+            BulkEmailJob.objects.filter(pk=job_id).update(status='running', finished_at=None)
+            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+        return {'success': False, 'error': str(exc)}
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_owner_receipts_batch_task(self, job_id):
+    """
+    Tarea que genera y envía los comprobantes de propietarios de un período.
+
+    Si falla, se reintenta y continúa desde los ítems que quedaron pendientes.
+    """
+    from .models_invoice import OwnerReceiptBatchJob
+    from .service_modules.owner_receipt_batch_service import OwnerReceiptBatchService
+
+    try:
+        job = OwnerReceiptBatchService().process_job(job_id)
+        return {
+            'success': True,
+            'job_id': job.pk,
+            'generated': job.generated_count,
+            'sent': job.sent_count,
+            'errors': job.error_count,
+            'skipped': job.skipped_count,
+        }
+    except OwnerReceiptBatchJob.DoesNotExist:
+        logger.error(f"Generación masiva de comprobantes #{job_id} no encontrada")
+        return {'success': False, 'error': 'Generación masiva no encontrada'}
+    except Exception as exc:
+        logger.error(f"Error en generación masiva de comprobantes #{job_id}: {str(exc)}")
+        if self.request.retries < self.max_retries:
+            # Volver a dejar el proceso en curso para que el reintento lo reanude
+            OwnerReceiptBatchJob.objects.filter(pk=job_id).update(status='running', finished_at=None)
+            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+        return {'success': False, 'error': str(exc)}
+
+
+@shared_task
+def send_owner_statements_task(period, owner_ids=None):
+    """
+    Tarea que envía las liquidaciones consolidadas de propietarios de un período.
+
+    No se reintenta automáticamente: un reintento volvería a enviar las
+    liquidaciones que ya salieron.
+
+    Args:
+        period (str): Período en formato AAAA-MM
+        owner_ids (list): Limitar a estos propietarios (opcional)
+    """
+    from datetime import datetime
+    from .service_modules.owner_statement_service import OwnerStatementService
+
+    try:
+        period_date = datetime.strptime(period, '%Y-%m').date()
+        results = OwnerStatementService().send_period_statements(period_date, owner_ids=owner_ids)
+        return {
+            'success': True,
+            'period': period,
+            'sent': results['sent'],
+            'skipped': results['skipped'],
+            'errors': results['errors'],
+        }
+    except Exception as exc:
+        logger.error(f"Error enviando las liquidaciones de propietarios de {period}: {str(exc)}")
+        return {'success': False, 'error': str(exc)}
+
+
+@shared_task
+def take_aging_snapshot_task():
+    """
+    Tarea diaria que guarda la antigüedad de saldos del día.
+    """
+    from .service_modules.aging_service import take_aging_snapshot
+
+    try:
+        rows = take_aging_snapshot()
+        return {'success': True, 'rows': rows}
+    except Exception as exc:
+        logger.error(f"Error guardando la antigüedad de saldos: {str(exc)}")
+        return {'success': False, 'error': str(exc)}
+
+
+@shared_task
+def accrue_late_fees_task():
+    """
+    Tarea diaria que devenga los intereses por mora de las facturas vencidas.
+    """
+    from .service_modules.late_fee_service import LateFeeAccrualService
+
+    try:
+        result = LateFeeAccrualService().accrue()
+        return {
+            'success': True,
+            'invoices': result['invoices'],
+            'created': result['created'],
+            'updated': result['updated'],
+            'amount': str(result['amount']),
+            'skipped': result['skipped'],
+        }
+    except Exception as exc:
+        logger.error(f"Error devengando intereses por mora: {str(exc)}")
+        return {'success': False, 'error': str(exc)}
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import AgingSnapshot, Invoice
+from accounting.service_modules.aging_service import (
+    AgingError,
+    aging_totals,
+    compute_aging,
+    get_aging_report,
+    take_aging_snapshot,
+)
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class AgingServiceTest(TestCase):
+    """
+    Test suite for the accounts-receivable aging report.
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.agent = Agent.objects.create(
+            username='agingagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-AGING'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.other_customer = Customer.objects.create(
+            first_name='Ana', last_name='Martinez', email='ana@test.com',
+            phone='987654320', document='30111223'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=self.today - timedelta(days=365),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        # Un saldo por tramo para el inquilino del contrato
+        self._invoice('INV-001', days_overdue=-5, total='1000.00')
+        self._invoice('INV-002', days_overdue=0, total='100.00')
+        self._invoice('INV-003', days_overdue=10, total='1000.00', paid='300.00')
+        self._invoice('INV-004', days_overdue=45, total='200.00')
+        self._invoice('INV-005', days_overdue=75, total='300.00')
+        self._invoice('INV-006', days_overdue=120, total='400.00')
+        # Fuera del aging: pagada, borrador y cancelada
+        self._invoice('INV-007', days_overdue=30, total='999.00', status='paid')
+        self._invoice('INV-008', days_overdue=30, total='999.00', status='draft')
+        self._invoice('INV-009', days_overdue=30, total='999.00', status='cancelled')
+        # Cliente sin contrato
+        self._invoice('INV-010', days_overdue=31, total='50.00', customer=self.other_customer, contract=None)
+
+    def _invoice(self, number, days_overdue, total, paid='0.00', status='sent', customer=None, contract=False):
+        return Invoice.objects.create(
+            number=number,
+            date=self.today - timedelta(days=days_overdue + 30),
+            due_date=self.today - timedelta(days=days_overdue),
+            customer=customer or self.tenant,
+            contract=self.contract if contract is False else contract,
+            description='Alquiler',
+            total_amount=Decimal(total),
+            paid_amount=Decimal(paid),
+            status=status
+        )
+
+    def test_buckets_by_customer_in_one_query(self):
+        """All buckets for every customer come from a single grouped query."""
+        with self.assertNumQueries(1):
+            rows = compute_aging('customer', self.today)
+
+        self.assertEqual([row['label'] for row in rows], ['John Doe', 'Ana Martinez'])
+        tenant = rows[0]
+        self.assertEqual(tenant['object_id'], self.tenant.pk)
+        self.assertEqual(tenant['current'], Decimal('1100.00'))
+        self.assertEqual(tenant['days_1_30'], Decimal('700.00'))
+        self.assertEqual(tenant['days_31_60'], Decimal('200.00'))
+        self.assertEqual(tenant['days_61_90'], Decimal('300.00'))
+        self.assertEqual(tenant['days_over_90'], Decimal('400.00'))
+        self.assertEqual(tenant['total'], Decimal('2700.00'))
+        self.assertEqual(tenant['invoice_count'], 6)
+        self.assertEqual(rows[1]['days_31_60'], Decimal('50.00'))
+
+    def test_buckets_by_agent_and_property(self):
+        """Invoices without a contract are grouped under an empty agent/property."""
+        by_agent = compute_aging('agent', self.today)
+        self.assertEqual([row['label'] for row in by_agent], ['Test Agent', 'Sin agente'])
+        self.assertIsNone(by_agent[1]['object_id'])
+
+        by_property = compute_aging('property', self.today)
+        self.assertEqual(by_property[0]['label'], 'Departamento Centro')
+        self.assertEqual(by_property[0]['total'], Decimal('2700.00'))
+        self.assertEqual(aging_totals(by_property)['total'], Decimal('2750.00'))
+
+        with self.assertRaises(AgingError):
+            compute_aging('contract', self.today)
+
+    def test_snapshot_is_replaced_for_the_same_day(self):
+        """Taking the daily snapshot twice keeps a single copy."""
+        self.assertEqual(take_aging_snapshot(self.today), 6)
+        self.assertEqual(take_aging_snapshot(self.today), 6)
+
+        self.assertEqual(AgingSnapshot.objects.filter(snapshot_date=self.today).count(), 6)
+        snapshot = AgingSnapshot.objects.get(dimension='customer', object_id=self.tenant.pk)
+        self.assertEqual(snapshot.days_over_90, Decimal('400.00'))
+
+    def test_past_report_reads_snapshot_and_compares(self):
+        """Past dates are served from snapshots and the totals can be compared."""
+        yesterday = self.today - timedelta(days=1)
+        take_aging_snapshot(yesterday)
+        Invoice.objects.filter(number='INV-006').update(status='paid', balance=0)
+
+        with self.assertNumQueries(1):
+            past = get_aging_report('customer', as_of=yesterday)
+        self.assertEqual(past['source'], 'snapshot')
+        self.assertEqual(past['totals']['days_over_90'], Decimal('400.00'))
+
+        report = get_aging_report('customer', compare_to=yesterday)
+        self.assertEqual(report['source'], 'live')
+        self.assertEqual(report['comparison']['delta']['days_over_90'], Decimal('-400.00'))
+
+    def test_report_view_formats(self):
+        """The report renders as HTML and exports to CSV and JSON."""
+        self.client.force_login(self.agent)
+        url = reverse('accounting:aging_report')
+
+        response = self.client.get(url, {'group_by': 'agent'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['dimension'], 'agent')
+        self.assertContains(response, 'Sin agente')
+
+        response = self.client.get(url, {'format': 'csv'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:3], ['Nombre', 'Por vencer', '1-30 días'])
+        self.assertEqual(rows[1], ['John Doe', '1100.00', '700.00', '200.00', '300.00', '400.00', '2700.00', '6'])
+
+        response = self.client.get(url, {'format': 'json', 'group_by': 'property'})
+        data = json.loads(response.content)
+        self.assertEqual(data['source'], 'live')
+        self.assertEqual(data['totals']['total'], '2750.00')
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounting.models_invoice import Invoice, InvoiceLine
+from accounting.models_sequence import DocumentSequence
+from accounting.service_modules.automatic_invoice_service import AutomaticInvoiceService
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class AutomaticInvoiceServiceTest(TestCase):
+    """
+    Test suite for the set-based recurring invoice engine.
+    """
+
+    def setUp(self):
+        """Set up agents, customers, properties and monthly contracts."""
+        self.agent = Agent.objects.create(
+            username='billingagent',
+            email='billing@test.com',
+            first_name='Billing',
+            last_name='Agent',
+            license_number='LIC-AUTO-1'
+        )
+        self.property_type = PropertyType.objects.create(name='Departamento')
+        self.property_status = PropertyStatus.objects.create(name='Alquilada')
+
+        self.contracts = []
+        for index in range(3):
+            tenant = Customer.objects.create(
+                first_name=f'Tenant{index}',
+                last_name='Test',
+                email=f'tenant{index}@test.com',
+                phone='123456789',
+                document=f'DOC-{index}'
+            )
+            prop = Property.objects.create(
+                title=f'Depto {index}',
+                description='Departamento de prueba',
+                property_type=self.property_type,
+                property_status=self.property_status,
+                street='Calle',
+                number=str(index),
+                neighborhood='Centro',
+                total_surface=Decimal('50.00'),
+                agent=self.agent
+            )
+            self.contracts.append(Contract.objects.create(
+                customer=tenant,
+                agent=self.agent,
+                property=prop,
+                start_date=date(2024, 1, 1),
+                amount=Decimal('1000.00') + index,
+                frequency='monthly',
+                status=Contract.STATUS_ACTIVE
+            ))
+
+        self.reference_date = date(2024, 3, 5)
+
+    def test_generates_one_invoice_per_due_contract(self):
+        """Every due contract gets an invoice with its line and a unique number."""
+        result = AutomaticInvoiceService._generate_invoices_by_frequency(
+            'monthly', reference_date=self.reference_date
+        )
+
+        self.assertEqual(result['frequency'], 'monthly')
+        self.assertEqual(result['contracts_processed'], 3)
+        self.assertEqual(result['invoices_created'], 3)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['error_messages'], [])
+        self.assertEqual(len(result['created_invoices']), 3)
+
+        invoices = Invoice.objects.filter(contract__in=self.contracts)
+        self.assertEqual(invoices.count(), 3)
+        self.assertEqual(InvoiceLine.objects.filter(invoice__in=invoices).count(), 3)
+        numbers = set(invoices.values_list('number', flat=True))
+        self.assertEqual(numbers, {'INV-2024-001', 'INV-2024-002', 'INV-2024-003'})
+        for invoice in invoices:
+            self.assertEqual(invoice.status, 'validated')
+            self.assertEqual(invoice.total_amount, invoice.contract.amount)
+            self.assertEqual(invoice.balance, invoice.contract.amount)
+            self.assertEqual(invoice.lines.get().amount, invoice.contract.amount)
+
+    def test_skips_contracts_already_invoiced_in_period(self):
+        """A contract already invoiced this month is not billed again."""
+        Invoice.objects.create(
+            number='INV-2024-010',
+            date=date(2024, 3, 1),
+            due_date=date(2024, 3, 31),
+            customer=self.contracts[0].customer,
+            contract=self.contracts[0],
+            total_amount=Decimal('1000.00'),
+            status='validated'
+        )
+
+        result = AutomaticInvoiceService._generate_invoices_by_frequency(
+            'monthly', reference_date=self.reference_date
+        )
+
+        self.assertEqual(result['invoices_created'], 2)
+        self.assertEqual(Invoice.objects.filter(contract=self.contracts[0]).count(), 1)
+        # La numeración continúa desde el mayor número existente
+        created_numbers = sorted(inv.number for inv in result['created_invoices'])
+        self.assertEqual(created_numbers, ['INV-2024-011', 'INV-2024-012'])
+
+    def test_second_run_is_idempotent(self):
+        """Running twice for the same date does not duplicate invoices."""
+        AutomaticInvoiceService._generate_invoices_by_frequency(
+            'monthly', reference_date=self.reference_date
+        )
+        result = AutomaticInvoiceService._generate_invoices_by_frequency(
+            'monthly', reference_date=self.reference_date
+        )
+
+        self.assertEqual(result['invoices_created'], 0)
+        self.assertEqual(Invoice.objects.count(), 3)
+
+    def test_query_count_does_not_grow_with_contracts(self):
+        """The batch path uses the same number of queries for more contracts."""
+        DocumentSequence.objects.create(series=DocumentSequence.SERIES_INVOICE, year=2024)
+        with CaptureQueriesContext(connection) as few:
+            AutomaticInvoiceService._generate_invoices_by_frequency(
+                'monthly', reference_date=self.reference_date
+            )
+
+        for contract in self.contracts:
+            Contract.objects.create(
+                customer=contract.customer,
+                agent=self.agent,
+                property=contract.property,
+                start_date=date(2024, 2, 1),
+                amount=Decimal('900.00'),
+                frequency='monthly',
+                status=Contract.STATUS_ACTIVE
+            )
+        with CaptureQueriesContext(connection) as many:
+            result = AutomaticInvoiceService._generate_invoices_by_frequency(
+                'monthly', reference_date=date(2024, 4, 5)
+            )
+
+        self.assertEqual(result['invoices_created'], 6)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_should_generate_invoice_for_single_contract(self):
+        """The single-contract helpers keep working on top of the batch logic."""
+        contract = self.contracts[0]
+        self.assertTrue(
+            AutomaticInvoiceService._should_generate_invoice(contract, self.reference_date)
+        )
+        self.assertEqual(
+            AutomaticInvoiceService._calculate_next_billing_date(contract),
+            date(2024, 2, 1)
+        )
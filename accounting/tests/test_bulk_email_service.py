@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import BulkEmailJob, Invoice
+from accounting.service_modules.bulk_email_service import BulkInvoiceEmailService
+from accounting.service_modules.pdf_cache_service import PDFCache
+from accounting.service_modules.pdf_render_service import PDFRenderService
+from accounting.tasks import send_bulk_invoice_emails_task
+from agents.models import Agent
+from customers.models import Customer
+
+
+class WorkerLost(BaseException):
+    """Simula la caída del worker: no la captura ningún ``except Exception``."""
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+def failing_render(html_string, base_url=None):
+    raise RuntimeError('render failed')
+
+
+class BulkInvoiceEmailServiceTest(TestCase):
+    """
+    Test suite for the background bulk invoice email dispatch.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.agent = Agent.objects.create(
+            username='bulkagent',
+            email='agent@test.com',
+            first_name='Test',
+            last_name='Agent',
+            license_number='LIC-BULK'
+        )
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.no_email_customer = Customer.objects.create(
+            first_name='Jane', last_name='Roe', email='',
+            phone='123456789', document='30111333'
+        )
+        self.validated = self._create_invoice('INV-2024-001', 'validated')
+        self.sent = self._create_invoice('INV-2024-002', 'sent')
+        self.draft = self._create_invoice('INV-2024-003', 'draft')
+        self.no_email = self._create_invoice('INV-2024-004', 'validated', customer=self.no_email_customer)
+
+    def _create_invoice(self, number, status, customer=None):
+        return Invoice.objects.create(
+            number=number,
+            date=timezone.now().date(),
+            due_date=timezone.now().date() + timedelta(days=30),
+            customer=customer or self.customer,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status=status
+        )
+
+    def _service(self, render_function=fake_render, chunk_size=None):
+        render_service = PDFRenderService(use_process_pool=False, render_function=render_function)
+        patcher = patch(
+            'accounting.service_modules.pdf_cache_service.get_pdf_render_service',
+            return_value=render_service
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return BulkInvoiceEmailService(chunk_size=chunk_size, pdf_cache=PDFCache())
+
+    def _all_ids(self):
+        return [self.validated.pk, self.sent.pk, self.draft.pk, self.no_email.pk]
+
+    def test_create_job_records_skipped_invoices(self):
+        """Invoices without email or with an invalid status are skipped with a reason."""
+        job = self._service().create_job(self._all_ids(), requested_by=self.agent)
+
+        self.assertEqual(job.total_count, 4)
+        self.assertEqual(job.skipped_count, 2)
+        self.assertEqual(job.items.filter(status='pending').count(), 2)
+        skipped = job.items.get(invoice=self.no_email)
+        self.assertEqual(skipped.status, 'skipped')
+        self.assertIn('correo', skipped.error_message)
+
+    def test_process_job_sends_over_one_connection(self):
+        """All pending emails are sent and the job counters are updated."""
+        service = self._service(chunk_size=1)
+        job = service.create_job(self._all_ids(), requested_by=self.agent)
+
+        with patch('accounting.service_modules.bulk_email_service.get_connection',
+                   wraps=mail.get_connection) as get_connection:
+            job = service.process_job(job.pk)
+
+        # Una conexión por bloque, no una por correo
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, 'Factura Nº INV-2024-001')
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'factura_INV-2024-001.pdf')
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.sent_count, 2)
+        self.assertEqual(job.processed_count, 4)
+        self.assertEqual(job.progress_percentage(), 100)
+
+        self.validated.refresh_from_db()
+        self.assertEqual(self.validated.status, 'sent')
+
+    def test_render_errors_are_recorded_per_invoice(self):
+        """A failed render marks the item as failed without aborting the job."""
+        service = self._service(render_function=failing_render)
+        job = service.create_job([self.validated.pk, self.sent.pk])
+
+        job = service.process_job(job.pk)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.error_count, 2)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(job.items.filter(status='failed', error_message__contains='PDF').exists())
+
+    def test_resume_after_crash_while_sending_does_not_resend(self):
+        """Invoices emailed before the worker died are not emailed again on resume."""
+        service = self._service()
+        job = service.create_job([self.validated.pk, self.sent.pk])
+        send_messages = EmailBackend.send_messages
+
+        def die_on_second_email(backend, messages):
+            if mail.outbox:
+                raise WorkerLost()
+            return send_messages(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', die_on_second_email):
+            with self.assertRaises(WorkerLost):
+                service.process_job(job.pk)
+
+        # El primer envío quedó guardado aunque el bloque no terminó
+        self.assertEqual(job.items.get(invoice=self.validated).status, 'sent')
+        self.validated.refresh_from_db()
+        self.assertEqual(self.validated.status, 'sent')
+
+        job = service.process_job(job.pk)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.sent_count, job.processed_count), (2, 2))
+        self.assertEqual([message.subject for message in mail.outbox], [
+            'Factura Nº INV-2024-001', 'Factura Nº INV-2024-002'
+        ])
+
+    def test_process_job_is_idempotent(self):
+        """Processing a finished job again sends nothing."""
+        service = self._service()
+        job = service.create_job([self.validated.pk])
+        service.process_job(job.pk)
+        service.process_job(job.pk)
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_view_queues_job_and_reports_status(self):
+        """The AJAX view returns a status URL that reports the job progress."""
+        self._service()
+        self.client.force_login(self.agent)
+
+        # Sin broker en los tests: la tarea se ejecuta en el mismo proceso al encolarla
+        with patch(
+            'accounting.views_web.send_bulk_invoice_emails_task.delay',
+            side_effect=lambda job_id: send_bulk_invoice_emails_task.apply(args=(job_id,))
+        ) as delay:
+            response = self.client.post(
+                reverse('accounting:send_bulk_emails'),
+                {'invoice_ids': [self.validated.pk, self.draft.pk]},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(BulkEmailJob.objects.get(pk=data['job_id']).requested_by, self.agent)
+        delay.assert_called_once_with(data['job_id'])
+
+        status = self.client.get(data['status_url']).json()
+        self.assertEqual(status['total'], 2)
+        self.assertEqual(status['skipped'], 1)
+        self.assertTrue(status['is_finished'])
+        self.assertEqual(status['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
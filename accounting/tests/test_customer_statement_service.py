@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice, Payment
+from accounting.service_modules.customer_statement_service import CustomerStatementService
+from accounting.service_modules.pdf_cache_service import PDFCache
+from accounting.service_modules.pdf_render_service import PDFRenderService
+from agents.models import Agent
+from customers.models import Customer
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+class CustomerStatementServiceTest(TestCase):
+    """
+    Test suite for the customer statement of account.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        render_service = PDFRenderService(use_process_pool=False, render_function=fake_render)
+        patcher = patch(
+            'accounting.service_modules.pdf_cache_service.get_pdf_render_service',
+            return_value=render_service
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.agent = Agent.objects.create(
+            username='statementagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-CSTMT'
+        )
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='john@test.com',
+            phone='123456789', document='30111222'
+        )
+        self.january = self._invoice('INV-001', date(2024, 1, 5), '1000.00')
+        self.february = self._invoice('INV-002', date(2024, 2, 5), '1000.00')
+        self._invoice('INV-003', date(2024, 2, 10), '500.00', status='draft')
+        self._invoice('INV-004', date(2024, 2, 12), '700.00', status='cancelled')
+        # bulk_create evita las señales de pago: solo interesa el libro
+        Payment.objects.bulk_create([
+            Payment(invoice=self.january, date=date(2024, 1, 20), amount=Decimal('1000.00'), method='Transferencia'),
+            Payment(invoice=self.february, date=date(2024, 2, 5), amount=Decimal('400.00'), method='Efectivo'),
+        ])
+        self.service = CustomerStatementService(pdf_cache=PDFCache())
+
+    def _invoice(self, number, invoice_date, amount, status='sent'):
+        return Invoice.objects.create(
+            number=number,
+            date=invoice_date,
+            due_date=invoice_date,
+            customer=self.customer,
+            description='Alquiler',
+            total_amount=Decimal(amount),
+            status=status
+        )
+
+    def test_ledger_running_balance_in_one_query(self):
+        """Invoices and payments come interleaved with their running balance from a single query."""
+        with self.assertNumQueries(1):
+            entries = list(self.service.ledger(self.customer))
+
+        self.assertEqual(
+            [(entry['type'], entry['reference'], entry['balance']) for entry in entries],
+            [
+                ('invoice', 'INV-001', Decimal('1000.00')),
+                ('payment', 'INV-001', Decimal('0.00')),
+                ('invoice', 'INV-002', Decimal('1000.00')),
+                ('payment', 'INV-002', Decimal('600.00')),
+            ]
+        )
+
+    def test_date_range_keeps_balance_carried_forward(self):
+        """Filtering by date keeps the balance accumulated before the range."""
+        entries = list(self.service.ledger(self.customer, start=date(2024, 2, 1)))
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[-1]['balance'], Decimal('600.00'))
+        self.assertEqual(self.service.opening_balance(self.customer, date(2024, 3, 1)), Decimal('600.00'))
+
+    def test_html_is_generated_in_chunks(self):
+        """The document is produced in several fragments with opening and closing balances."""
+        self.service.CHUNK_SIZE = 1
+
+        fragments = list(self.service.iter_html(self.customer, start=date(2024, 1, 15), end=date(2024, 2, 28)))
+
+        # Encabezado, una fila por bloque y pie
+        self.assertEqual(len(fragments), 5)
+        html = ''.join(fragments)
+        self.assertIn('Saldo inicial', html)
+        self.assertIn('$1000,00', fragments[0])
+        self.assertIn('$600,00', fragments[-1])
+        self.assertNotIn('INV-003', html)
+
+    def test_statement_views(self):
+        """The HTML view streams the statement and the PDF view downloads it."""
+        self.client.force_login(self.agent)
+        url = reverse('accounting:customer_statement', args=[self.customer.pk])
+
+        response = self.client.get(url, {'start': '2024-01-01', 'end': '2024-02-28'})
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('INV-002', content)
+        self.assertIn('Descargar PDF', content)
+
+        response = self.client.get(url, {'format': 'pdf'})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('estado_de_cuenta_john-doe_', response['Content-Disposition'])
+        self.assertTrue(response.content.startswith(b'%PDF-'))
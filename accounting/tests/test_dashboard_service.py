@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, Payment
+from accounting.service_modules.dashboard_service import (
+    DASHBOARD_CACHE_KEY,
+    compute_dashboard_kpis,
+    get_dashboard_kpis,
+)
+from agents.models import Agent
+from customers.models import Customer
+
+
+class DashboardKPITest(TestCase):
+    """
+    Test suite for the cached accounting dashboard KPIs.
+    """
+
+    def setUp(self):
+        cache.delete(DASHBOARD_CACHE_KEY)
+        self.addCleanup(cache.delete, DASHBOARD_CACHE_KEY)
+
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.today = timezone.localdate()
+        self.pending = self._create_invoice('INV-2024-001', Decimal('1000.00'), 'validated')
+        self.overdue = self._create_invoice(
+            'INV-2024-002', Decimal('500.00'), 'sent', due_date=self.today - timedelta(days=5)
+        )
+        self._create_invoice('INV-2024-003', Decimal('300.00'), 'paid')
+        self._create_invoice('INV-2024-004', Decimal('200.00'), 'cancelled')
+        self._create_invoice('INV-2024-005', Decimal('100.00'), 'draft')
+
+    def _create_invoice(self, number, total, status, due_date=None):
+        return Invoice.objects.create(
+            number=number,
+            date=self.today - timedelta(days=10),
+            due_date=due_date or self.today + timedelta(days=30),
+            customer=self.customer,
+            description='Alquiler',
+            total_amount=total,
+            status=status
+        )
+
+    def test_kpis_in_one_query(self):
+        """All dashboard KPIs are computed with a single aggregation query."""
+        with self.assertNumQueries(1):
+            kpis = compute_dashboard_kpis(self.today)
+
+        self.assertEqual(kpis['total_invoices'], 5)
+        self.assertEqual(kpis['pending_invoices'], 2)
+        self.assertEqual(kpis['paid_invoices'], 1)
+        self.assertEqual(kpis['cancelled_invoices'], 1)
+        self.assertEqual(kpis['draft_invoices'], 1)
+        self.assertEqual(kpis['overdue_invoices_count'], 1)
+        self.assertEqual(kpis['total_pending'], Decimal('1500.00'))
+        self.assertEqual(kpis['total_paid'], Decimal('300.00'))
+        self.assertEqual(kpis['total_overdue'], Decimal('500.00'))
+
+    def test_snapshot_is_cached(self):
+        """A second read is served from the cache without queries."""
+        get_dashboard_kpis()
+
+        with self.assertNumQueries(0):
+            kpis = get_dashboard_kpis()
+        self.assertEqual(kpis['total_invoices'], 5)
+
+    def test_payment_invalidates_snapshot(self):
+        """Recording a payment discards the snapshot so the balances are fresh."""
+        self.assertEqual(get_dashboard_kpis()['total_overdue'], Decimal('500.00'))
+
+        Payment.objects.create(
+            invoice=self.overdue,
+            date=self.today,
+            amount=Decimal('200.00'),
+            method='Transferencia'
+        )
+
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(get_dashboard_kpis()['total_overdue'], Decimal('300.00'))
+
+    def test_invoice_save_and_delete_invalidate_snapshot(self):
+        """Saving or deleting an invoice discards the snapshot."""
+        get_dashboard_kpis()
+        self.pending.status = 'paid'
+        self.pending.save()
+        self.assertEqual(get_dashboard_kpis()['paid_invoices'], 2)
+
+        self.pending.delete()
+        self.assertEqual(get_dashboard_kpis()['total_invoices'], 4)
+
+    def test_stale_day_snapshot_is_recomputed(self):
+        """A snapshot from a previous day is recomputed because overdue status depends on the date."""
+        kpis = get_dashboard_kpis()
+        kpis['as_of'] = self.today - timedelta(days=1)
+        kpis['total_invoices'] = 99
+        cache.set(DASHBOARD_CACHE_KEY, kpis)
+
+        self.assertEqual(get_dashboard_kpis()['total_invoices'], 5)
+
+    def test_dashboard_view(self):
+        """The dashboard renders the cached KPIs."""
+        agent = Agent.objects.create(
+            username='dashagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-DASH'
+        )
+        self.client.force_login(agent)
+
+        response = self.client.get(reverse('accounting:accounting_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_invoices'], 2)
+        self.assertContains(response, '$500,00')
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounting.models_invoice import Invoice
+from accounting.models_sequence import DocumentSequence
+from customers.models import Customer
+
+
+class DocumentSequenceTest(TestCase):
+    """
+    Test suite for the per-series, per-year document number allocator.
+    """
+
+    def setUp(self):
+        """Set up a customer for invoices."""
+        self.customer = Customer.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='tenant@test.com',
+            phone='987654321',
+            document='30111222'
+        )
+
+    def _create_invoice(self, number):
+        return Invoice.objects.create(
+            number=number,
+            date=date(2024, 1, 10),
+            due_date=date(2024, 2, 10),
+            customer=self.customer,
+            description='Alquiler',
+            total_amount=Decimal('100.00'),
+            status='validated'
+        )
+
+    def test_allocate_formats_and_increments(self):
+        """Consecutive allocations return consecutive formatted numbers."""
+        first = DocumentSequence.allocate(DocumentSequence.SERIES_OWNER_RECEIPT, year=2024)
+        second = DocumentSequence.allocate(DocumentSequence.SERIES_OWNER_RECEIPT, year=2024)
+
+        self.assertEqual(first, ['REC-2024-0001'])
+        self.assertEqual(second, ['REC-2024-0002'])
+        self.assertEqual(DocumentSequence.objects.get(series='REC', year=2024).last_value, 2)
+
+    def test_series_are_independent_per_year(self):
+        """Each year starts its own numbering."""
+        DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, count=5, year=2024)
+        self.assertEqual(
+            DocumentSequence.allocate(DocumentSequence.SERIES_INVOICE, year=2025),
+            ['INV-2025-001']
+        )
+
+    def test_block_reservation_is_constant_queries(self):
+        """Reserving a large block costs the same as reserving one number."""
+        DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, year=2024)
+        with self.assertNumQueries(4):
+            block = DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, count=1000, year=2024)
+        self.assertEqual(block, range(2, 1002))
+
+    def test_initial_value_continues_existing_numbers(self):
+        """A new sequence continues after numbers assigned before it existed."""
+        self._create_invoice('INV-2024-007')
+        self._create_invoice('INV-2024-012')
+
+        self.assertEqual(DocumentSequence.peek(DocumentSequence.SERIES_INVOICE, 2024), 13)
+        self.assertEqual(
+            DocumentSequence.allocate(DocumentSequence.SERIES_INVOICE, year=2024),
+            ['INV-2024-013']
+        )
+
+    def test_release_unused_tail(self):
+        """The unused tail of the last block can be given back."""
+        block = DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, count=10, year=2024)
+        self.assertTrue(DocumentSequence.release(DocumentSequence.SERIES_INVOICE, 2024, block[6:]))
+        self.assertEqual(DocumentSequence.peek(DocumentSequence.SERIES_INVOICE, 2024), 7)
+
+    def test_release_after_newer_reservation_keeps_gap(self):
+        """A block cannot be released once later numbers were reserved."""
+        block = DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, count=10, year=2024)
+        DocumentSequence.reserve(DocumentSequence.SERIES_INVOICE, year=2024)
+        self.assertFalse(DocumentSequence.release(DocumentSequence.SERIES_INVOICE, 2024, block[6:]))
+        self.assertEqual(DocumentSequence.peek(DocumentSequence.SERIES_INVOICE, 2024), 12)
+
+    def test_assign_invoice_numbers_command(self):
+        """The command numbers blank invoices from one reserved block."""
+        self._create_invoice('INV-2024-003')
+        blank = self._create_invoice('')
+
+        call_command('assign_invoice_numbers', '--year', '2024', stdout=StringIO())
+
+        blank.refresh_from_db()
+        self.assertEqual(blank.number, 'INV-2024-004')
+        self.assertEqual(DocumentSequence.peek(DocumentSequence.SERIES_INVOICE, 2024), 5)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import csv
+import gzip
+import io
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, OwnerReceipt, Payment
+from accounting.service_modules.export_service import (
+    INVOICE_EXPORT_COLUMNS,
+    iter_export_rows,
+)
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class ExportServiceTest(TestCase):
+    """
+    Test suite for the streaming CSV/XLSX exports.
+    """
+
+    def setUp(self):
+        # La notificación del pago crea su ContentType dentro de la transacción
+        # del test; se limpia la caché para no reutilizar un id revertido
+        ContentType.objects.clear_cache()
+        self.agent = Agent.objects.create(
+            username='exportagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-EXP'
+        )
+        self.client.force_login(self.agent)
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.customer = Customer.objects.create(
+            first_name='José', last_name='Núñez', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.customer,
+            agent=self.agent,
+            property=self.property,
+            start_date=date(2024, 1, 1),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.invoices = [
+            Invoice.objects.create(
+                number=f'INV-2024-{index:03d}',
+                date=date(2024, 1, 1) + timedelta(days=index),
+                due_date=date(2024, 2, 1),
+                customer=self.customer,
+                contract=self.contract,
+                description='Alquiler "enero" & expensas',
+                total_amount=Decimal('1000.00'),
+                status='paid' if index == 0 else 'validated'
+            )
+            for index in range(3)
+        ]
+        Payment.objects.create(
+            invoice=self.invoices[1],
+            date=date(2024, 1, 15),
+            amount=Decimal('400.00'),
+            method='Transferencia'
+        )
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def _csv_rows(self, content):
+        return list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+
+    def test_iter_export_rows_formats_values(self):
+        """Rows are read as plain values with dates and choice labels formatted."""
+        rows = list(iter_export_rows(Invoice.objects.order_by('date'), INVOICE_EXPORT_COLUMNS))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][0], 'INV-2024-000')
+        self.assertEqual(rows[0][1], '01/01/2024')
+        self.assertEqual(rows[0][8], 'Pagada')
+        self.assertEqual(rows[1][11], Decimal('600.00'))
+
+    def test_invoice_csv_applies_list_filters(self):
+        """The invoice CSV streams the rows matching the list filters."""
+        response = self.client.get(reverse('accounting:invoice_export'), {'status': 'validated'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('.csv"', response['Content-Disposition'])
+        rows = self._csv_rows(self._content(response))
+        self.assertEqual(rows[0][0], 'Número')
+        # Más recientes primero, igual que el listado
+        self.assertEqual([row[0] for row in rows[1:]], ['INV-2024-002', 'INV-2024-001'])
+        self.assertEqual(rows[1][7], 'Alquiler "enero" & expensas')
+
+        response = self.client.get(reverse('accounting:invoice_export'), {'q': 'núñez'})
+        self.assertEqual(len(self._csv_rows(self._content(response))), 4)
+
+    def test_gzip_csv(self):
+        """The compressed CSV decompresses to the same rows."""
+        plain = self._content(self.client.get(reverse('accounting:invoice_export')))
+        response = self.client.get(reverse('accounting:invoice_export'), {'compress': 'gzip'})
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz"', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(self._content(response)), plain)
+
+    def test_invoice_xlsx(self):
+        """The XLSX export is a valid workbook with one row per invoice."""
+        response = self.client.get(reverse('accounting:invoice_export'), {'format': 'xlsx'})
+
+        self.assertIn('.xlsx"', response['Content-Disposition'])
+        archive = zipfile.ZipFile(io.BytesIO(self._content(response)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('[Content_Types].xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('INV-2024-002', sheet)
+        self.assertIn('Alquiler "enero" &amp; expensas', sheet)
+        self.assertIn('<c><v>1000.00</v></c>', sheet)
+
+    def test_payment_export(self):
+        """Payments are exported with their invoice and customer."""
+        response = self.client.get(reverse('accounting:payment_export'))
+
+        rows = self._csv_rows(self._content(response))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:5], ['15/01/2024', 'INV-2024-001', 'José', 'Núñez', '400.00'])
+
+    def test_owner_receipt_export_applies_filters(self):
+        """Owner receipts are exported with the list filters applied."""
+        sent = OwnerReceipt.objects.create(
+            invoice=self.invoices[0], generated_by=self.agent, email_sent_to=self.owner.email
+        )
+        OwnerReceipt.objects.filter(pk=sent.pk).update(status='sent', sent_at=timezone.now())
+        OwnerReceipt.objects.create(
+            invoice=self.invoices[1], generated_by=self.agent, email_sent_to=self.owner.email
+        )
+
+        response = self.client.get(reverse('accounting:owner_receipt_export'), {'status': 'sent'})
+
+        rows = self._csv_rows(self._content(response))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], sent.receipt_number)
+        self.assertEqual(rows[1][1], 'INV-2024-000')
+        self.assertEqual(rows[1][10], 'Departamento Centro')
+
+    def test_export_requires_login(self):
+        """Anonymous users are redirected to the login page."""
+        self.client.logout()
+
+        response = self.client.get(reverse('accounting:invoice_export'))
+
+        self.assertEqual(response.status_code, 302)
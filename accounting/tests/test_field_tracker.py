@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, OwnerReceipt
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class FieldTrackerTest(TestCase):
+    """
+    Test suite for the in-memory field change tracker.
+    """
+
+    def setUp(self):
+        self.agent = Agent.objects.create(
+            username='trackeragent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-TRACK'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=timezone.now().date(),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.invoice = Invoice.objects.create(
+            number='INV-2024-001',
+            date=timezone.now().date(),
+            due_date=timezone.now().date() + timedelta(days=30),
+            customer=self.tenant,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status='validated'
+        )
+
+    def test_loaded_values_are_tracked(self):
+        """Instances loaded from the database remember their original values."""
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        self.assertFalse(invoice.has_field_changed('status'))
+
+        invoice.status = 'sent'
+
+        self.assertTrue(invoice.has_field_changed('status'))
+        self.assertEqual(invoice.previous_value('status'), 'validated')
+        self.assertEqual(invoice.changed_fields(), {'status': ('validated', 'sent')})
+
+    def test_snapshot_is_renewed_after_save(self):
+        """After saving, the saved values become the new originals."""
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice.mark_as_sent()
+
+        self.assertFalse(invoice.has_field_changed('status'))
+        self.assertEqual(invoice.previous_value('status'), 'sent')
+
+    def test_deferred_fields_are_not_tracked(self):
+        """Deferred fields are ignored instead of being loaded."""
+        invoice = Invoice.objects.only('number').get(pk=self.invoice.pk)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(invoice.has_field_changed('status'))
+            self.assertIsNone(invoice.previous_value('status'))
+
+    def test_status_change_signals_see_old_status_without_queries(self):
+        """Saving an invoice no longer re-reads it to find the previous status."""
+        seen = []
+
+        def capture(sender, instance, **kwargs):
+            seen.append(instance.previous_value('status'))
+
+        pre_save.connect(capture, sender=Invoice)
+        self.addCleanup(pre_save.disconnect, capture, sender=Invoice)
+
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        with CaptureQueriesContext(connection) as queries:
+            invoice.mark_as_sent()
+
+        self.assertEqual(seen, ['validated'])
+        invoice_selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "accounting_invoice"' in query['sql']
+        ]
+        self.assertEqual(invoice_selects, [])
+
+    def test_contract_status_and_amount_are_tracked(self):
+        """Contracts track their status and amount."""
+        contract = Contract.objects.get(pk=self.contract.pk)
+        contract.amount = Decimal('1200.00')
+
+        self.assertEqual(contract.changed_fields(), {'amount': (Decimal('1000.00'), Decimal('1200.00'))})
+        self.assertFalse(contract.has_field_changed('status'))
+
+        contract.save()
+        self.assertEqual(contract.previous_value('amount'), Decimal('1200.00'))
+
+    def test_owner_receipt_status_is_tracked(self):
+        """Owner receipts track their status."""
+        invoice = Invoice.objects.create(
+            number='INV-2024-002',
+            date=timezone.now().date(),
+            due_date=timezone.now().date() + timedelta(days=30),
+            customer=self.tenant,
+            contract=self.contract,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status='validated'
+        )
+        receipt = OwnerReceipt.objects.create(invoice=invoice, generated_by=self.agent)
+        receipt = OwnerReceipt.objects.get(pk=receipt.pk)
+
+        receipt.status = 'sent'
+
+        self.assertEqual(receipt.changed_fields(), {'status': ('generated', 'sent')})
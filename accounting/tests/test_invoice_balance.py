@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, Payment
+from customers.models import Customer
+
+
+class InvoiceStoredBalanceTest(TestCase):
+    """
+    Test suite for the denormalized paid_amount and balance columns of Invoice.
+    """
+
+    def setUp(self):
+        """Set up a customer and an unpaid invoice."""
+        self.customer = Customer.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='tenant@test.com',
+            phone='987654321',
+            document='30111222'
+        )
+        self.today = timezone.now().date()
+        self.invoice = self._create_invoice('INV-2024-001', Decimal('1000.00'))
+
+    def _create_invoice(self, number, total, due_date=None):
+        return Invoice.objects.create(
+            number=number,
+            date=self.today,
+            due_date=due_date or self.today + timedelta(days=30),
+            customer=self.customer,
+            description='Alquiler',
+            total_amount=total,
+            status='validated'
+        )
+
+    def _create_payment(self, invoice, amount):
+        return Payment.objects.create(
+            invoice=invoice,
+            date=self.today,
+            amount=amount,
+            method='Transferencia'
+        )
+
+    def test_new_invoice_balance_equals_total(self):
+        """A new invoice starts with nothing paid and the full balance."""
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.paid_amount, Decimal('0'))
+        self.assertEqual(self.invoice.balance, Decimal('1000.00'))
+
+    def test_payment_create_updates_balance(self):
+        """Creating a payment updates the stored totals and the instance."""
+        self._create_payment(self.invoice, Decimal('400.00'))
+
+        self.assertEqual(self.invoice.paid_amount, Decimal('400.00'))
+        self.assertEqual(self.invoice.get_balance(), Decimal('600.00'))
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal('600.00'))
+
+    def test_payment_edit_applies_difference(self):
+        """Editing a payment amount applies only the difference."""
+        payment = self._create_payment(self.invoice, Decimal('400.00'))
+        payment.amount = Decimal('250.00')
+        payment.save()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.paid_amount, Decimal('250.00'))
+        self.assertEqual(self.invoice.balance, Decimal('750.00'))
+
+    def test_payment_moved_to_another_invoice(self):
+        """Moving a payment reverts it on the old invoice and applies it on the new one."""
+        other = self._create_invoice('INV-2024-002', Decimal('500.00'))
+        payment = self._create_payment(self.invoice, Decimal('300.00'))
+        payment.invoice = other
+        payment.save()
+
+        self.invoice.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal('1000.00'))
+        self.assertEqual(other.paid_amount, Decimal('300.00'))
+        self.assertEqual(other.balance, Decimal('200.00'))
+
+    def test_payment_delete_restores_balance(self):
+        """Deleting a payment gives its amount back to the balance."""
+        payment = self._create_payment(self.invoice, Decimal('1000.00'))
+        payment.delete()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.paid_amount, Decimal('0'))
+        self.assertEqual(self.invoice.balance, Decimal('1000.00'))
+
+    def test_queryset_delete_restores_balances(self):
+        """Bulk payment deletes (as in the admin action) also restore the stored totals."""
+        other = self._create_invoice('INV-2024-002', Decimal('500.00'))
+        self._create_payment(self.invoice, Decimal('300.00'))
+        self._create_payment(self.invoice, Decimal('200.00'))
+        self._create_payment(other, Decimal('500.00'))
+
+        Payment.objects.all().delete()
+
+        for invoice in (self.invoice, other):
+            invoice.refresh_from_db()
+            self.assertEqual(invoice.paid_amount, Decimal('0'))
+            self.assertEqual(invoice.balance, invoice.total_amount)
+
+    def test_stale_instance_save_keeps_payments(self):
+        """Saving an instance loaded before a payment does not overwrite the stored totals."""
+        stale = Invoice.objects.get(pk=self.invoice.pk)
+        self._create_payment(Invoice.objects.get(pk=self.invoice.pk), Decimal('400.00'))
+
+        stale.compute_total()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.total_amount, Decimal('0'))
+        self.assertEqual(self.invoice.paid_amount, Decimal('400.00'))
+        self.assertEqual(self.invoice.balance, Decimal('-400.00'))
+        self.assertEqual(self.invoice.balance, self.invoice.calculate_balance())
+
+        stale.total_amount = Decimal('1000.00')
+        stale.description = 'Alquiler editado'
+        stale.save()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.paid_amount, Decimal('400.00'))
+        self.assertEqual(self.invoice.balance, Decimal('600.00'))
+
+    def test_update_status_uses_stored_balance(self):
+        """A fully paid invoice is marked as paid without aggregating payments."""
+        self._create_payment(self.invoice, Decimal('1000.00'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.invoice.update_status()
+        self.assertFalse(any('accounting_payment' in q['sql'] for q in ctx.captured_queries))
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.status, 'paid')
+        self.assertEqual(self.invoice.balance, Decimal('0'))
+
+    def test_total_change_recomputes_balance(self):
+        """Changing the total keeps the balance consistent with what was paid."""
+        self._create_payment(self.invoice, Decimal('200.00'))
+        self.invoice.total_amount = Decimal('1500.00')
+        self.invoice.save(update_fields=['total_amount'])
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal('1300.00'))
+
+    def test_overdue_queryset_filters_on_balance(self):
+        """Overdue invoices are filtered on the stored balance column."""
+        overdue_paid = self._create_invoice(
+            'INV-2024-003', Decimal('100.00'), due_date=self.today - timedelta(days=5)
+        )
+        overdue_unpaid = self._create_invoice(
+            'INV-2024-004', Decimal('100.00'), due_date=self.today - timedelta(days=5)
+        )
+        self._create_payment(overdue_paid, Decimal('100.00'))
+
+        overdue = list(Invoice.get_overdue_invoices())
+        self.assertIn(overdue_unpaid, overdue)
+        self.assertNotIn(overdue_paid, overdue)
+
+    def test_rebuild_command_fixes_stale_balances(self):
+        """The rebuild command recomputes totals from the payment history."""
+        self._create_payment(self.invoice, Decimal('400.00'))
+        Invoice.objects.filter(pk=self.invoice.pk).update(
+            paid_amount=Decimal('0'), balance=Decimal('1000.00')
+        )
+
+        out = StringIO()
+        call_command('rebuild_invoice_balances', '--dry-run', stdout=out)
+        self.assertIn('Found 1 invoices with stale balances', out.getvalue())
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.balance, Decimal('1000.00'))
+
+        call_command('rebuild_invoice_balances', stdout=StringIO())
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.paid_amount, Decimal('400.00'))
+        self.assertEqual(self.invoice.balance, Decimal('600.00'))
+        self.assertEqual(self.invoice.balance, self.invoice.calculate_balance())
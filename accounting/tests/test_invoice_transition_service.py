@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, InvoiceLine, Payment
+from accounting.service_modules.dashboard_service import DASHBOARD_CACHE_KEY
+from accounting.service_modules.invoice_transition_service import (
+    NOTIFICATION_DETAIL_LIMIT,
+    InvoiceTransitionError,
+    InvoiceTransitionService,
+)
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+from user_notifications.models import Notification
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'invoice-transition-tests',
+    }
+}
+
+
+class InvoiceTransitionServiceTest(TestCase):
+    """
+    Test suite for set-based invoice status transitions.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        self.agent = Agent.objects.create(
+            username='transitionagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-TRANS'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=date(2024, 1, 1),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.service = InvoiceTransitionService()
+
+    def _invoice(self, number, status='draft', with_line=True):
+        invoice = Invoice.objects.create(
+            number=number,
+            date=date(2024, 1, 1),
+            due_date=date(2024, 1, 31),
+            customer=self.tenant,
+            contract=self.contract,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status=status
+        )
+        if with_line:
+            InvoiceLine.objects.create(invoice=invoice, concept='Alquiler', amount=Decimal('1000.00'))
+        return invoice
+
+    def test_validate_drafts_in_fixed_queries(self):
+        """Drafts are validated with one check query and one UPDATE, regardless of the count."""
+        drafts = [self._invoice(f'INV-{index:03d}') for index in range(15)]
+        Notification.objects.all().delete()
+        # El tipo de contenido queda en caché desde antes de medir
+        ContentType.objects.get_for_model(Invoice)
+
+        # Verificación y UPDATEs, más agentes, logs recientes, los dos INSERT
+        # (en su propio savepoint) y preferencias
+        with self.assertNumQueries(12):
+            result = self.service.transition([invoice.pk for invoice in drafts], 'validate')
+
+        self.assertEqual(result['updated'], 15)
+        self.assertEqual(result['skipped'], [])
+        self.assertEqual(Invoice.objects.filter(status='validated').count(), 15)
+        self.assertEqual(result['notified'], 15)
+        self.assertEqual(
+            Notification.objects.filter(agent=self.agent, notification_type='invoice_status_change').count(), 15
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_notifications_update_unread_counter(self):
+        """Status-change notifications from a bulk transition update the cached unread counter."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        draft = self._invoice('INV-001')
+        Notification.objects.all().delete()
+        cache.set(Notification._unread_count_key(self.agent.pk), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.transition([draft.pk], 'validate')
+
+        self.assertEqual(cache.get(Notification._unread_count_key(self.agent.pk)), 1)
+        self.assertEqual(Notification.get_unread_count(self.agent), 1)
+
+    def test_notifications_are_published_after_commit(self):
+        """Status-change notifications from a bulk transition reach the live stream once committed."""
+        drafts = [self._invoice('INV-001'), self._invoice('INV-002')]
+        Notification.objects.all().delete()
+
+        with patch('user_notifications.services.publish_notifications') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.service.transition([invoice.pk for invoice in drafts], 'validate')
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        publish.assert_called_once()
+        self.assertEqual(
+            {notification.pk for notification in publish.call_args.args[0]},
+            set(Notification.objects.values_list('pk', flat=True)),
+        )
+        self.assertEqual(len(publish.call_args.args[0]), 2)
+
+    def test_illegal_transitions_are_skipped(self):
+        """Invoices in the wrong state, without lines or missing are reported, not changed."""
+        draft = self._invoice('INV-001')
+        paid = self._invoice('INV-002', status='paid')
+        empty = self._invoice('INV-003', with_line=False)
+
+        result = self.service.transition([draft.pk, paid.pk, empty.pk, 999999], 'validate')
+
+        self.assertEqual(result['updated'], 1)
+        reasons = {row['invoice_id']: row['reason'] for row in result['skipped']}
+        self.assertIn('Pagada', reasons[paid.pk])
+        self.assertEqual(reasons[empty.pk], "No se puede validar una factura sin líneas.")
+        self.assertEqual(reasons[999999], "No se encontró la factura.")
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, 'paid')
+
+    def test_reactivate_depends_on_payments(self):
+        """Reactivated invoices return to sent when they have payments, validated otherwise."""
+        with_payment = self._invoice('INV-001', status='cancelled')
+        without_payment = self._invoice('INV-002', status='cancelled')
+        Payment.objects.bulk_create([
+            Payment(invoice=with_payment, date=date(2024, 1, 15), amount=Decimal('100.00'), method='Efectivo')
+        ])
+
+        result = self.service.transition([with_payment.pk, without_payment.pk], 'reactivate')
+
+        self.assertEqual(result['updated'], 2)
+        with_payment.refresh_from_db()
+        without_payment.refresh_from_db()
+        self.assertEqual(with_payment.status, 'sent')
+        self.assertEqual(without_payment.status, 'validated')
+
+    def test_large_batch_gets_summary_notification(self):
+        """An agent with many changes in one batch receives a single summary."""
+        invoices = [
+            self._invoice(f'INV-{index:03d}', status='sent') for index in range(NOTIFICATION_DETAIL_LIMIT + 1)
+        ]
+        Notification.objects.all().delete()
+        cache.set(DASHBOARD_CACHE_KEY, {'as_of': timezone.localdate()})
+
+        result = self.service.transition([invoice.pk for invoice in invoices], 'cancel')
+
+        self.assertEqual(result['notified'], 1)
+        self.assertIn(f'{NOTIFICATION_DETAIL_LIMIT + 1} Facturas', Notification.objects.get().title)
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+
+    def test_unknown_action(self):
+        """Unknown actions are rejected."""
+        with self.assertRaises(InvoiceTransitionError):
+            self.service.transition([1], 'archive')
+
+    def test_bulk_transition_view(self):
+        """The bulk action endpoint applies the transition and reports skipped invoices."""
+        self.client.force_login(self.agent)
+        draft = self._invoice('INV-001')
+        sent = self._invoice('INV-002', status='sent')
+
+        response = self.client.post(
+            reverse('accounting:invoice_bulk_transition'),
+            {'invoice_ids': [draft.pk, sent.pk], 'action': 'validate'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual(len(data['skipped']), 1)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice
+from accounting.service_modules.keyset_pagination import KeysetPaginator
+from agents.models import Agent
+from customers.models import Customer
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Test suite for keyset pagination of the invoice list.
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.other_customer = Customer.objects.create(
+            first_name='Ana', last_name='Martinez', email='ana@test.com',
+            phone='987654320', document='30111223'
+        )
+        # Varias facturas comparten fecha para ejercitar el desempate por id
+        base_date = date(2024, 1, 1)
+        for index in range(12):
+            Invoice.objects.create(
+                number=f'INV-2024-{index:03d}',
+                date=base_date + timedelta(days=index // 3),
+                due_date=base_date + timedelta(days=30),
+                customer=self.other_customer if index == 5 else self.customer,
+                description='Alquiler',
+                total_amount=Decimal('100.00'),
+                status='validated'
+            )
+        self.expected = list(Invoice.objects.order_by('-date', '-id').values_list('pk', flat=True))
+
+    def _paginator(self, per_page=5, count_cap=1000):
+        return KeysetPaginator(Invoice.objects.all(), per_page=per_page, count_cap=count_cap)
+
+    def test_forward_pages_cover_all_rows_once(self):
+        """Walking forward returns every invoice exactly once in (date, id) order."""
+        paginator = self._paginator()
+        seen = []
+        page = paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(invoice.pk for invoice in page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(after=page.next_cursor)
+
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_page(self):
+        """The previous-page cursor returns the rows before the current page."""
+        paginator = self._paginator()
+        second = paginator.get_page(after=paginator.get_page().next_cursor)
+        third = paginator.get_page(after=second.next_cursor)
+
+        back = paginator.get_page(before=third.previous_cursor)
+
+        self.assertEqual([invoice.pk for invoice in back], [invoice.pk for invoice in second])
+        self.assertTrue(back.has_next())
+        self.assertTrue(back.has_previous())
+
+        first = paginator.get_page(before=back.previous_cursor)
+        self.assertEqual([invoice.pk for invoice in first], self.expected[:5])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """A tampered cursor falls back to the first page."""
+        page = self._paginator().get_page(after='not-a-cursor')
+
+        self.assertEqual([invoice.pk for invoice in page], self.expected[:5])
+
+    def test_capped_count(self):
+        """The total is counted up to the cap and flagged when there are more rows."""
+        paginator = self._paginator(count_cap=10)
+
+        self.assertEqual(paginator.count, 10)
+        self.assertTrue(paginator.count_capped)
+        self.assertFalse(self._paginator().count_capped)
+        self.assertEqual(self._paginator().count, 12)
+
+    def test_page_uses_no_offset(self):
+        """Deep pages seek by key instead of using OFFSET."""
+        paginator = self._paginator()
+        cursor = paginator.get_page().next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            list(paginator.get_page(after=cursor))
+
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'].upper())
+
+    def test_invoice_list_view_search_and_pagination(self):
+        """The invoice list searches by customer name and links to the next page."""
+        agent = Agent.objects.create(
+            username='listagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-LIST'
+        )
+        self.client.force_login(agent)
+
+        response = self.client.get(reverse('accounting:invoice_list'))
+        self.assertEqual(response.status_code, 200)
+        page = response.context['invoices']
+        self.assertEqual(len(page), 12)
+        self.assertEqual(page.paginator.count, 12)
+
+        response = self.client.get(reverse('accounting:invoice_list'), {'q': 'martin'})
+        self.assertEqual([invoice.number for invoice in response.context['invoices']], ['INV-2024-005'])
+
+        response = self.client.get(reverse('accounting:invoice_list'), {'q': 'INV-2024-01'})
+        self.assertEqual(len(response.context['invoices']), 2)
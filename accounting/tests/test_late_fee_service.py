@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice, InvoiceLine
+from accounting.service_modules.late_fee_service import (
+    LATE_FEE_CONCEPT,
+    LateFeeAccrualService,
+    load_late_fee_config,
+)
+from agents.models import Agent
+from core.models import Company
+from customers.models import Customer
+
+
+class LateFeeAccrualServiceTest(TestCase):
+    """
+    Test suite for the daily late-fee accrual engine.
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Inmobiliaria Test')
+        self.company.set_configuration('late_fee_enabled', True, 'boolean')
+        self.company.set_configuration('late_fee_rate', '3', 'decimal')
+        self.company.set_configuration('late_fee_rate_period', 'month')
+        self.company.set_configuration('late_fee_grace_days', 5, 'integer')
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='john@test.com',
+            phone='123456789', document='30111222'
+        )
+        self.overdue = self._invoice('INV-001', date(2024, 1, 31))
+
+    def _invoice(self, number, due_date, status='sent'):
+        invoice = Invoice.objects.create(
+            number=number,
+            date=date(2024, 1, 1),
+            due_date=due_date,
+            customer=self.customer,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status=status
+        )
+        InvoiceLine.objects.create(invoice=invoice, concept='Alquiler', amount=Decimal('1000.00'))
+        return invoice
+
+    def _service(self):
+        return LateFeeAccrualService(load_late_fee_config(self.company))
+
+    def test_accrues_interest_line(self):
+        """Overdue invoices past the grace period get one late-fee line and a higher balance."""
+        within_grace = self._invoice('INV-002', date(2024, 3, 1))
+        self._invoice('INV-003', date(2024, 1, 31), status='draft')
+
+        result = self._service().accrue(as_of=date(2024, 3, 1))
+
+        # 30 días de atraso al 3% mensual sobre $1.000
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['amount'], Decimal('30.00'))
+        line = InvoiceLine.objects.get(is_late_fee=True)
+        self.assertEqual(line.invoice, self.overdue)
+        self.assertEqual(line.concept, LATE_FEE_CONCEPT)
+        self.overdue.refresh_from_db()
+        self.assertEqual(self.overdue.total_amount, Decimal('1030.00'))
+        self.assertEqual(self.overdue.balance, Decimal('1030.00'))
+        self.assertFalse(InvoiceLine.objects.filter(invoice=within_grace, is_late_fee=True).exists())
+
+    def test_idempotent_per_day(self):
+        """Running twice on the same day does not add interest again."""
+        service = self._service()
+        service.accrue(as_of=date(2024, 3, 1))
+
+        result = service.accrue(as_of=date(2024, 3, 1))
+
+        self.assertEqual(result['invoices'], 0)
+        self.overdue.refresh_from_db()
+        self.assertEqual(self.overdue.total_amount, Decimal('1030.00'))
+
+    def test_next_day_adjusts_existing_line(self):
+        """The next run extends the same line with the new days only."""
+        service = self._service()
+        service.accrue(as_of=date(2024, 3, 1))
+
+        result = service.accrue(as_of=date(2024, 3, 11))
+
+        self.assertEqual((result['created'], result['updated']), (0, 1))
+        line = InvoiceLine.objects.get(is_late_fee=True)
+        self.assertEqual(line.amount, Decimal('40.00'))
+        self.assertEqual(line.accrued_until, date(2024, 3, 11))
+        self.overdue.refresh_from_db()
+        self.assertEqual(self.overdue.balance, Decimal('1040.00'))
+
+    def test_cap_limits_accrued_interest(self):
+        """Accrued interest never exceeds the configured cap."""
+        self.company.set_configuration('late_fee_cap_percent', '5', 'decimal')
+
+        self._service().accrue(as_of=date(2024, 12, 31))
+
+        self.assertEqual(InvoiceLine.objects.get(is_late_fee=True).amount, Decimal('50.00'))
+
+    def test_disabled_configuration_skips(self):
+        """Nothing is accrued while the feature is disabled."""
+        self.company.set_configuration('late_fee_enabled', False, 'boolean')
+
+        result = self._service().accrue(as_of=date(2024, 3, 1))
+
+        self.assertTrue(result['skipped'])
+        self.assertFalse(InvoiceLine.objects.filter(is_late_fee=True).exists())
+
+    def test_duplicate_invoice_skips_late_fee_lines(self):
+        """Duplicating an invoice copies its regular lines but not the accrued interest."""
+        self._service().accrue(as_of=date(2024, 3, 1))
+        agent = Agent.objects.create(
+            username='latefeeagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-LATEFEE'
+        )
+        self.client.force_login(agent)
+
+        response = self.client.post(reverse('accounting:invoice_duplicate', args=[self.overdue.pk]))
+
+        self.assertEqual(response.status_code, 302)
+        copy = Invoice.objects.get(number=f'COPIA-{self.overdue.number}')
+        self.assertEqual(list(copy.lines.values_list('concept', 'is_late_fee')), [('Alquiler', False)])
+        self.assertEqual(copy.total_amount, Decimal('1000.00'))
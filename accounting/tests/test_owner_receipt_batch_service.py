@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice, OwnerReceipt, OwnerReceiptBatchJob
+from accounting.service_modules.owner_receipt_batch_service import OwnerReceiptBatchService
+from accounting.service_modules.pdf_cache_service import PDFCache
+from accounting.service_modules.pdf_render_service import PDFRenderService
+from accounting.tasks import generate_owner_receipts_batch_task
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class WorkerLost(BaseException):
+    """Simula la caída del worker: no la captura ningún ``except Exception``."""
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_HOST='localhost',
+    EMAIL_HOST_USER='',
+    DEFAULT_FROM_EMAIL='noreply@test.com',
+)
+class OwnerReceiptBatchServiceTest(TestCase):
+    """
+    Test suite for the period owner receipt batch job.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        render_service = PDFRenderService(use_process_pool=False, render_function=fake_render)
+        patcher = patch(
+            'accounting.service_modules.pdf_cache_service.get_pdf_render_service',
+            return_value=render_service
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.period = date(2024, 5, 1)
+        property_type = PropertyType.objects.create(name='Departamento')
+        property_status = PropertyStatus.objects.create(name='Alquilada')
+        self.agents = []
+        self.invoices = []
+        for index in range(2):
+            agent = Agent.objects.create(
+                username=f'batchagent{index}',
+                email=f'agent{index}@test.com',
+                first_name='Agente',
+                last_name=f'Numero{index}',
+                license_number=f'LIC-BATCH-{index}'
+            )
+            self.agents.append(agent)
+            for unit in range(2):
+                key = f'{index}{unit}'
+                owner = Customer.objects.create(
+                    first_name='Owner', last_name=key, email=f'owner{key}@test.com',
+                    phone='123456789', document=f'20{key}'
+                )
+                tenant = Customer.objects.create(
+                    first_name='Tenant', last_name=key, email=f'tenant{key}@test.com',
+                    phone='987654321', document=f'30{key}'
+                )
+                property_obj = Property.objects.create(
+                    title=f'Depto {key}',
+                    description='Departamento',
+                    property_type=property_type,
+                    property_status=property_status,
+                    street='Av. Principal',
+                    number=key,
+                    neighborhood='Centro',
+                    total_surface=Decimal('50.00'),
+                    agent=agent,
+                    owner=owner
+                )
+                contract = Contract.objects.create(
+                    customer=tenant,
+                    agent=agent,
+                    property=property_obj,
+                    start_date=date(2024, 1, 1),
+                    amount=Decimal('1000.00'),
+                    owner_discount_percentage=Decimal('10.00'),
+                    status=Contract.STATUS_ACTIVE
+                )
+                self.invoices.append(Invoice.objects.create(
+                    number=f'INV-2024-1{key}',
+                    date=self.period + timedelta(days=4),
+                    due_date=self.period + timedelta(days=14),
+                    customer=tenant,
+                    contract=contract,
+                    description='Alquiler mayo',
+                    total_amount=Decimal('1000.00'),
+                    status='validated'
+                ))
+
+    def _service(self, chunk_size=None):
+        return OwnerReceiptBatchService(chunk_size=chunk_size, pdf_cache=PDFCache())
+
+    def test_create_job_selects_period_invoices(self):
+        """Only invoices of the period without a sent receipt are included."""
+        other_period = self.invoices[0]
+        other_period.date = date(2024, 6, 3)
+        other_period.save()
+
+        job = self._service().create_job(self.period, requested_by=self.agents[0])
+
+        self.assertEqual(job.total_count, 3)
+        self.assertEqual(
+            set(job.items.values_list('agent_id', flat=True)),
+            {self.agents[0].pk, self.agents[1].pk}
+        )
+
+    def test_process_job_generates_and_sends(self):
+        """Every receipt is generated with consecutive numbers and sent."""
+        service = self._service(chunk_size=3)
+        job = service.create_job(self.period, requested_by=self.agents[0])
+
+        job = service.process_job(job.pk)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.generated_count, 4)
+        self.assertEqual(job.sent_count, 4)
+        self.assertEqual(job.progress_percentage(), 100)
+        self.assertEqual(len(mail.outbox), 4)
+
+        numbers = sorted(OwnerReceipt.objects.values_list('receipt_number', flat=True))
+        self.assertEqual(len(set(numbers)), 4)
+        self.assertFalse(OwnerReceipt.objects.exclude(status='sent').exists())
+        # El PDF enviado mostraba el estado anterior: no queda guardado para descargas
+        self.assertFalse(OwnerReceipt.objects.exclude(pdf_file_path='').exists())
+
+        progress = {row['agent_id']: row for row in job.agent_progress()}
+        self.assertEqual(progress[self.agents[1].pk]['sent'], 2)
+
+    def test_resume_does_not_duplicate_receipts(self):
+        """A job interrupted after generating receipts resumes by sending them."""
+        service = self._service()
+        job = service.create_job(self.period)
+
+        with patch.object(OwnerReceiptBatchService, '_render_and_send', side_effect=RuntimeError('worker lost')):
+            with self.assertRaises(RuntimeError):
+                service.process_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(OwnerReceipt.objects.count(), 4)
+        self.assertEqual(job.items.filter(status='generated').count(), 4)
+
+        # El reintento de la tarea vuelve a dejar el proceso en curso
+        OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(status='running')
+        job = service.process_job(job.pk)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(OwnerReceipt.objects.count(), 4)
+        self.assertEqual(job.sent_count, 4)
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_resume_after_crash_while_sending_does_not_resend(self):
+        """Receipts emailed before the worker died are not emailed again on resume."""
+        service = self._service()
+        job = service.create_job(self.period)
+        send_messages = EmailBackend.send_messages
+
+        def die_on_third_email(backend, messages):
+            if len(mail.outbox) == 2:
+                raise WorkerLost()
+            return send_messages(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', die_on_third_email):
+            with self.assertRaises(WorkerLost):
+                service.process_job(job.pk)
+
+        # Los dos envíos quedaron guardados aunque el bloque no terminó
+        self.assertEqual(job.items.filter(status='sent').count(), 2)
+        self.assertEqual(OwnerReceipt.objects.filter(status='sent').count(), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.sent_count, 2)
+
+        job = service.process_job(job.pk)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.sent_count, 4)
+        self.assertEqual(job.processed_count, 4)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 4)
+
+    def test_invalid_invoices_are_skipped(self):
+        """Invoices failing validation are skipped with the validation message."""
+        owner = self.invoices[0].contract.property.owner
+        owner.email = ''
+        owner.save()
+
+        service = self._service()
+        job = service.process_job(service.create_job(self.period).pk)
+
+        self.assertEqual(job.skipped_count, 1)
+        self.assertEqual(job.sent_count, 3)
+        skipped = job.items.get(invoice=self.invoices[0])
+        self.assertEqual(skipped.status, 'skipped')
+        self.assertTrue(skipped.error_message)
+
+    def test_without_email_only_generates(self):
+        """With send_email disabled receipts are generated but not sent."""
+        service = self._service()
+        job = service.process_job(service.create_job(self.period, send_email=False).pk)
+
+        self.assertEqual(job.generated_count, 4)
+        self.assertEqual(job.sent_count, 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(job.items.filter(status='done').count(), 4)
+        self.assertFalse(OwnerReceipt.objects.exclude(status='generated').exists())
+        self.assertFalse(OwnerReceipt.objects.filter(pdf_file_path='').exists())
+
+    def test_view_starts_job_and_reports_agent_progress(self):
+        """The AJAX view queues the job and the status endpoint groups it by agent."""
+        self.client.force_login(self.agents[0])
+
+        # Sin broker en los tests: la tarea se ejecuta en el mismo proceso al encolarla
+        with patch(
+            'accounting.views_web.generate_owner_receipts_batch_task.delay',
+            side_effect=lambda job_id: generate_owner_receipts_batch_task.apply(args=(job_id,))
+        ) as delay:
+            response = self.client.post(
+                reverse('accounting:owner_receipt_batch_create'),
+                {'period': '2024-05', 'send_email': 'true', 'only_mine': 'true'},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['total'], 2)
+        delay.assert_called_once_with(data['job_id'])
+
+        status = self.client.get(data['status_url']).json()
+        self.assertTrue(status['is_finished'])
+        self.assertEqual(status['sent'], 2)
+        self.assertEqual([row['agent_id'] for row in status['agents']], [self.agents[0].pk])
@@ -287,12 +287,10 @@ class OwnerReceiptServiceErrorHandlingTests(TestCase):
             self.service.generate_pdf(receipt)
         self.assertIn("Error renderizando el template", str(cm.exception))
     
-    @patch('accounting.services.HTML')
-    def test_generate_pdf_weasyprint_error(self, mock_html):
+    @patch('accounting.services.render_pdf')
+    def test_generate_pdf_weasyprint_error(self, mock_render_pdf):
         """Test PDF generation with WeasyPrint error."""
-        mock_html_instance = Mock()
-        mock_html_instance.write_pdf.side_effect = Exception("WeasyPrint error")
-        mock_html.return_value = mock_html_instance
+        mock_render_pdf.side_effect = Exception("WeasyPrint error")
         
         receipt = OwnerReceipt.objects.create(
             invoice=self.invoice,
@@ -135,10 +135,8 @@ class OwnerReceiptEndToEndIntegrationTest(TransactionTestCase):
         self.assertTrue(receipt.receipt_number.startswith('REC-'))
         
         # Step 3: Test PDF generation
-        with patch('accounting.services.HTML') as mock_html:
-            mock_html_instance = Mock()
-            mock_html_instance.write_pdf.return_value = b'PDF content'
-            mock_html.return_value = mock_html_instance
+        with patch('accounting.services.render_pdf') as mock_html:
+            mock_html.return_value = b'PDF content'
             
             pdf_content = self.service.generate_pdf(receipt)
             
@@ -651,10 +649,8 @@ class OwnerReceiptEdgeCasesTest(TestCase):
         self.assertEqual(receipt.email_sent_to, self.owner.email)
         
         # Test PDF generation with special characters
-        with patch('accounting.services.HTML') as mock_html:
-            mock_html_instance = Mock()
-            mock_html_instance.write_pdf.return_value = b'PDF with special chars'
-            mock_html.return_value = mock_html_instance
+        with patch('accounting.services.render_pdf') as mock_html:
+            mock_html.return_value = b'PDF with special chars'
             
             pdf_content = self.service.generate_pdf(receipt)
             self.assertIsNotNone(pdf_content)
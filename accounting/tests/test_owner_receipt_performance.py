@@ -407,10 +407,8 @@ class OwnerReceiptPerformanceTest(TestCase):
             receipts.append(receipt)
         
         # Test PDF generation performance
-        with patch('accounting.services.HTML') as mock_html:
-            mock_html_instance = Mock()
-            mock_html_instance.write_pdf.return_value = b'Mock PDF content'
-            mock_html.return_value = mock_html_instance
+        with patch('accounting.services.render_pdf') as mock_html:
+            mock_html.return_value = b'Mock PDF content'
             
             start_time = time.time()
             pdf_count = 0
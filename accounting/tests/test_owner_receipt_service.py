@@ -277,8 +277,8 @@ class OwnerReceiptServiceTest(TestCase):
         self.assertIsNone(receipt.generated_by)
     
     @patch('accounting.services.render_to_string')
-    @patch('accounting.services.HTML')
-    def test_generate_pdf_success(self, mock_html_class, mock_render):
+    @patch('accounting.services.render_pdf')
+    def test_generate_pdf_success(self, mock_render_pdf, mock_render):
         """Test successful PDF generation."""
         # Create a receipt
         receipt = OwnerReceipt.objects.create(
@@ -294,18 +294,15 @@ class OwnerReceiptServiceTest(TestCase):
         # Mock render_to_string
         mock_render.return_value = '<html>Test HTML</html>'
         
-        # Mock HTML and write_pdf
-        mock_html_instance = Mock()
-        mock_html_instance.write_pdf.return_value = b'PDF content'
-        mock_html_class.return_value = mock_html_instance
+        # Mock the PDF render service
+        mock_render_pdf.return_value = b'PDF content'
         
         # Generate PDF
         pdf_content = self.service.generate_pdf(receipt)
         
         # Verify calls
         mock_render.assert_called_once()
-        mock_html_class.assert_called_once_with(string='<html>Test HTML</html>')
-        mock_html_instance.write_pdf.assert_called_once()
+        mock_render_pdf.assert_called_once_with('<html>Test HTML</html>')
         
         # Verify result
         self.assertEqual(pdf_content, b'PDF content')
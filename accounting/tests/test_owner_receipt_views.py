@@ -382,11 +382,10 @@ class OwnerReceiptPDFViewTest(OwnerReceiptViewsTestCase):
             status='sent'
         )
     
-    @patch('accounting.views_web.HTML')
-    def test_receipt_pdf_generation(self, mock_html):
+    @patch('accounting.services.render_pdf')
+    def test_receipt_pdf_generation(self, mock_render_pdf):
         """Test PDF generation for receipt."""
-        mock_pdf = MagicMock()
-        mock_html.return_value.write_pdf.return_value = b'fake pdf content'
+        mock_render_pdf.return_value = b'fake pdf content'
         
         url = reverse('accounting:owner_receipt_pdf', kwargs={'receipt_pk': self.receipt.pk})
         
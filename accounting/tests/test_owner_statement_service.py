@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice
+from accounting.service_modules.owner_statement_service import OwnerStatementError, OwnerStatementService
+from accounting.service_modules.pdf_cache_service import PDFCache
+from accounting.service_modules.pdf_render_service import PDFRenderService
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_HOST='localhost',
+    EMAIL_HOST_USER='',
+    DEFAULT_FROM_EMAIL='noreply@test.com',
+)
+class OwnerStatementServiceTest(TestCase):
+    """
+    Test suite for the consolidated monthly owner statement.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        render_service = PDFRenderService(use_process_pool=False, render_function=fake_render)
+        patcher = patch(
+            'accounting.service_modules.pdf_cache_service.get_pdf_render_service',
+            return_value=render_service
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.period = date(2024, 5, 1)
+        self.agent = Agent.objects.create(
+            username='statementagent',
+            email='agent@test.com',
+            first_name='Agente',
+            last_name='Liquidaciones',
+            license_number='LIC-STMT'
+        )
+        property_type = PropertyType.objects.create(name='Departamento')
+        property_status = PropertyStatus.objects.create(name='Alquilada')
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.other_owner = Customer.objects.create(
+            first_name='Pedro', last_name='Lopez', email='other@test.com',
+            phone='123456780', document='20111223'
+        )
+
+        # Tres unidades de la misma propietaria y una de otro propietario
+        self.invoices = []
+        units = [(self.owner, '10.00'), (self.owner, '10.00'), (self.owner, None), (self.other_owner, '5.00')]
+        for index, (owner, discount) in enumerate(units):
+            tenant = Customer.objects.create(
+                first_name='Tenant', last_name=str(index), email=f'tenant{index}@test.com',
+                phone='987654321', document=f'30{index}'
+            )
+            property_obj = Property.objects.create(
+                title=f'Depto {index}',
+                description='Departamento',
+                property_type=property_type,
+                property_status=property_status,
+                street='Av. Principal',
+                number=str(100 + index),
+                neighborhood='Centro',
+                total_surface=Decimal('50.00'),
+                agent=self.agent,
+                owner=owner
+            )
+            contract = Contract.objects.create(
+                customer=tenant,
+                agent=self.agent,
+                property=property_obj,
+                start_date=date(2024, 1, 1),
+                amount=Decimal('1000.00'),
+                owner_discount_percentage=Decimal(discount) if discount else None,
+                status=Contract.STATUS_ACTIVE
+            )
+            self.invoices.append(Invoice.objects.create(
+                number=f'INV-2024-2{index}',
+                date=self.period + timedelta(days=4),
+                due_date=self.period + timedelta(days=14),
+                customer=tenant,
+                contract=contract,
+                description='Alquiler mayo',
+                total_amount=Decimal('1000.00') + index,
+                status='validated'
+            ))
+
+        self.service = OwnerStatementService(pdf_cache=PDFCache())
+
+    def test_owner_totals_in_one_grouped_query(self):
+        """Gross, discount and net per owner come from a single query."""
+        with self.assertNumQueries(1):
+            totals = self.service.owner_totals(self.period)
+
+        owner_totals = totals[self.owner.pk]
+        self.assertEqual(owner_totals['invoice_count'], 3)
+        self.assertEqual(owner_totals['property_count'], 3)
+        self.assertEqual(owner_totals['gross_amount'], Decimal('3003.00'))
+        # 10% de 1000.00 y de 1001.00 (redondeado), sin descuento para la tercera
+        self.assertEqual(owner_totals['discount_amount'], Decimal('200.10'))
+        self.assertEqual(owner_totals['net_amount'], Decimal('2802.90'))
+        self.assertEqual(totals[self.other_owner.pk]['net_amount'], Decimal('952.85'))
+
+    def test_period_and_status_filter(self):
+        """Draft invoices and invoices of other months are left out."""
+        self.invoices[0].status = 'draft'
+        self.invoices[0].save()
+        self.invoices[1].date = date(2024, 6, 2)
+        self.invoices[1].save()
+
+        totals = self.service.owner_totals(self.period)
+
+        self.assertEqual(totals[self.owner.pk]['invoice_count'], 1)
+        self.assertEqual(totals[self.owner.pk]['gross_amount'], Decimal('1002.00'))
+
+    def test_statement_groups_invoices_by_property(self):
+        """The statement lists every invoice under its property and matches the totals."""
+        data = self.service.get_statement_data(self.owner, self.period)
+
+        self.assertEqual(len(data['properties']), 3)
+        lines = [line for group in data['properties'] for line in group['lines']]
+        self.assertEqual(sum(line['net_amount'] for line in lines), data['totals']['net_amount'])
+        self.assertEqual(data['period_label'], '05/2024')
+
+    def test_owner_without_invoices_raises(self):
+        """An owner with nothing to settle in the period gets an error."""
+        with self.assertRaises(OwnerStatementError):
+            self.service.get_statement_data(self.owner, date(2024, 7, 1))
+
+    def test_send_statement_sends_one_email(self):
+        """A multi-unit owner receives a single email with a single PDF."""
+        self.service.send_statement(self.owner, self.period)
+
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['owner@test.com'])
+        self.assertEqual(len(message.attachments), 1)
+        filename, content, mimetype = message.attachments[0]
+        self.assertEqual(mimetype, 'application/pdf')
+        for invoice in self.invoices[:3]:
+            self.assertIn(invoice.number.encode(), content)
+        self.assertNotIn(self.invoices[3].number.encode(), content)
+
+    def test_send_period_statements(self):
+        """Every owner of the period gets one statement over one connection."""
+        with CaptureQueriesContext(connection) as queries:
+            results = self.service.send_period_statements(self.period)
+
+        self.assertEqual(results['sent'], 2)
+        self.assertEqual(results['errors'], [])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['other@test.com', 'owner@test.com']
+        )
+        # Totales, facturas y empresa
+        self.assertEqual(len(queries.captured_queries), 3)
+
+    def test_owner_without_email_is_skipped(self):
+        """Owners without email are skipped in the period run."""
+        self.other_owner.email = ''
+        self.other_owner.save()
+
+        results = self.service.send_period_statements(self.period)
+
+        self.assertEqual(results['sent'], 1)
+        self.assertEqual(results['skipped'], 1)
+
+    def test_pdf_view(self):
+        """The PDF view returns the owner's statement for the requested period."""
+        self.client.force_login(self.agent)
+
+        response = self.client.get(
+            reverse('accounting:owner_statement_pdf', args=[self.owner.pk]),
+            {'period': '2024-05'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(b'INV-2024-20', response.content)
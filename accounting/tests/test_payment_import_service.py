@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, Payment
+from accounting.service_modules.dashboard_service import DASHBOARD_CACHE_KEY
+from accounting.service_modules.payment_import_service import (
+    PaymentImportError,
+    PaymentImportService,
+    parse_amount,
+    parse_ofx,
+)
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+from user_notifications.models import Notification
+
+
+OFX_STATEMENT = """OFXHEADER:100
+DATA:OFXSGML
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240115120000[-3:ART]
+<TRNAMT>400.00
+<FITID>TX-1
+<NAME>JOHN DOE
+<MEMO>Pago factura INV-2024-001
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240116
+<TRNAMT>-50.00
+<FITID>TX-2
+<MEMO>Comision bancaria
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class PaymentImportServiceTest(TestCase):
+    """
+    Test suite for the bulk payment import.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        self.agent = Agent.objects.create(
+            username='importagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-IMPORT'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=date(2024, 1, 1),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.partial = self._invoice('INV-2024-001', status='sent')
+        self.full = self._invoice('INV-2024-002', status='validated')
+        self.cancelled = self._invoice('INV-2024-003', status='cancelled')
+        self.service = PaymentImportService()
+
+    def _invoice(self, number, status):
+        return Invoice.objects.create(
+            number=number,
+            date=date(2024, 1, 1),
+            due_date=date(2024, 1, 31),
+            customer=self.tenant,
+            contract=self.contract,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status=status
+        )
+
+    def _csv(self, content, name='extracto.csv'):
+        return SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv')
+
+    def _statement(self):
+        return self._csv(
+            "Fecha;Factura;Monto;Concepto\n"
+            "15/01/2024;INV-2024-001;400,00;Transferencia parcial\n"
+            "16/01/2024;INV-2024-002;600,00;Primer pago\n"
+            "17/01/2024;INV-2024-002;400,00;Saldo\n"
+            "17/01/2024;INV-2024-002;400,00;Saldo repetido\n"
+            "18/01/2024;INV-2024-003;100,00;Factura anulada\n"
+            "18/01/2024;INV-9999;100,00;Desconocida\n"
+            "fecha mala;INV-2024-001;100,00;\n"
+        )
+
+    def test_import_creates_payments_and_settles_invoices(self):
+        """Payments are inserted in bulk and balances and statuses recalculated."""
+        cache.set(DASHBOARD_CACHE_KEY, {'as_of': timezone.localdate()})
+
+        result = self.service.import_file(self._statement())
+
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['total_amount'], Decimal('1400.00'))
+        self.assertEqual(result['invoice_count'], 2)
+        self.assertEqual(result['paid_invoice_count'], 1)
+        self.assertEqual([row['line'] for row in result['skipped']], [5, 6, 7, 8])
+
+        self.partial.refresh_from_db()
+        self.assertEqual(self.partial.paid_amount, Decimal('400.00'))
+        self.assertEqual(self.partial.balance, Decimal('600.00'))
+        self.assertEqual(self.partial.status, 'sent')
+        self.full.refresh_from_db()
+        self.assertEqual(self.full.balance, Decimal('0.00'))
+        self.assertEqual(self.full.status, 'paid')
+        self.assertEqual(Payment.objects.get(invoice=self.partial).method, 'Transferencia')
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+
+    def test_one_summary_notification_per_agent(self):
+        """The agent gets a single summary instead of one notification per payment."""
+        result = self.service.import_file(self._statement())
+
+        self.assertEqual(result['notified_agents'], 1)
+        notifications = Notification.objects.filter(agent=self.agent)
+        self.assertEqual(notifications.count(), 1)
+        self.assertIn('3 pagos', notifications.get().message)
+
+    def test_reimport_skips_existing_payments(self):
+        """Importing the same statement twice does not duplicate payments."""
+        self.service.import_file(self._statement())
+
+        result = self.service.import_file(self._statement())
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_equal_installments_with_bank_reference_are_kept(self):
+        """Same-day payments of equal amount are distinct when the bank reference differs."""
+        statement = (
+            "Fecha;Factura;Monto;Referencia\n"
+            "15/01/2024;INV-2024-002;500,00;OP-1001\n"
+            "15/01/2024;INV-2024-002;500,00;OP-1002\n"
+            "15/01/2024;INV-2024-002;500,00;OP-1002\n"
+        )
+
+        result = self.service.import_file(self._csv(statement))
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([row['line'] for row in result['skipped']], [4])
+        self.assertEqual(
+            sorted(Payment.objects.filter(invoice=self.full).values_list('reference', flat=True)),
+            ['OP-1001', 'OP-1002']
+        )
+        self.full.refresh_from_db()
+        self.assertEqual(self.full.status, 'paid')
+
+        # Al reimportar se reconocen por la referencia
+        self.assertEqual(self.service.import_file(self._csv(statement))['created'], 0)
+        # Sin referencia se sigue comparando fecha e importe
+        without_reference = self.service.import_file(self._csv(
+            "Fecha;Factura;Monto\n"
+            "15/01/2024;INV-2024-001;500,00\n"
+            "15/01/2024;INV-2024-001;500,00\n"
+        ))
+        self.assertEqual(without_reference['created'], 1)
+
+    def test_referenced_row_matches_manual_payment(self):
+        """A statement row with a bank reference is not imported again over a payment entered by hand."""
+        Payment.objects.create(
+            invoice=self.full, date=date(2024, 1, 15), amount=Decimal('500.00'), method='Transferencia'
+        )
+        statement = (
+            "Fecha;Factura;Monto;Referencia\n"
+            "15/01/2024;INV-2024-002;500,00;OP-1001\n"
+            "15/01/2024;INV-2024-002;500,00;OP-1002\n"
+        )
+
+        result = self.service.import_file(self._csv(statement))
+
+        # El pago manual cubre una sola de las dos cuotas iguales
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([row['line'] for row in result['skipped']], [2])
+        self.full.refresh_from_db()
+        self.assertEqual(self.full.paid_amount, Decimal('1000.00'))
+        self.assertEqual(self.service.import_file(self._csv(statement))['created'], 0)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """The import runs a fixed number of queries regardless of the file size."""
+        invoices = [
+            self._invoice(f'INV-2024-1{index:02d}', status='sent') for index in range(40)
+        ]
+        lines = ["factura,fecha,monto"] + [
+            f"{invoice.number},2024-01-15,100.00" for invoice in invoices
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.service.import_file(self._csv('\n'.join(lines)))
+
+        self.assertEqual(result['created'], 40)
+        self.assertLess(len(queries.captured_queries), 15)
+
+    def test_ofx_matches_invoice_in_memo(self):
+        """OFX credits are matched by the invoice number in the memo; debits are ignored."""
+        rows = parse_ofx(OFX_STATEMENT)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['date'], date(2024, 1, 15))
+
+        result = self.service.import_file(
+            SimpleUploadedFile('extracto.ofx', OFX_STATEMENT.encode('latin-1'))
+        )
+
+        self.assertEqual(result['created'], 1)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.invoice, self.partial)
+        self.assertEqual(payment.reference, 'TX-1')
+
+    def test_invalid_files(self):
+        """Unsupported formats and CSVs without the required columns are rejected."""
+        with self.assertRaises(PaymentImportError):
+            self.service.import_file(self._csv('x', name='extracto.txt'))
+        with self.assertRaises(PaymentImportError):
+            self.service.import_file(self._csv('nombre,monto\nJohn,100'))
+
+    def test_parse_amount_separators(self):
+        """Amounts accept both decimal separator conventions."""
+        self.assertEqual(parse_amount('1.234,56'), Decimal('1234.56'))
+        self.assertEqual(parse_amount('1,234.56'), Decimal('1234.56'))
+        self.assertEqual(parse_amount('$ 500'), Decimal('500.00'))
+
+    def test_settle_from_payments_reopens_overpaid_status(self):
+        """A paid invoice whose payments no longer cover it returns to sent."""
+        Invoice.objects.filter(pk=self.full.pk).update(status='paid', paid_amount=1000, balance=0)
+        Payment.objects.bulk_create([
+            Payment(invoice=self.full, date=date(2024, 1, 15), amount=Decimal('250.00'), method='Efectivo')
+        ])
+
+        # Un UPDATE descarta los PDFs de comprobantes y otro recalcula las facturas
+        with self.assertNumQueries(2):
+            Invoice.settle_from_payments(Invoice.objects.filter(pk=self.full.pk))
+
+        self.full.refresh_from_db()
+        self.assertEqual(self.full.status, 'sent')
+        self.assertEqual(self.full.balance, Decimal('750.00'))
+
+    def test_import_view(self):
+        """The import page uploads a file and shows the summary."""
+        self.client.force_login(self.agent)
+
+        response = self.client.post(reverse('accounting:payment_import'), {'file': self._statement()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result']['created'], 3)
+        self.assertContains(response, 'No se encontró la factura.')
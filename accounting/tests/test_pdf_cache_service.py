@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice, OwnerReceipt, Payment
+from accounting.service_modules.pdf_cache_service import PDFCache
+from accounting.services import OwnerReceiptService
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+class PDFCacheTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+
+class PDFCacheTest(PDFCacheTestMixin, TestCase):
+    """
+    Test suite for the content-addressed PDF cache.
+    """
+
+    def test_hit_does_not_render(self):
+        """The second request for the same HTML is served from disk."""
+        cache = PDFCache()
+        with patch('accounting.service_modules.pdf_cache_service.render_pdf', side_effect=fake_render) as render:
+            first, path = cache.render('<p>uno</p>', 'accounting/invoice_pdf.html')
+            second, second_path = cache.render('<p>uno</p>', 'accounting/invoice_pdf.html')
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(path, second_path)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+
+    def test_template_version_changes_key(self):
+        """Bumping the template version produces a different key."""
+        self.assertNotEqual(
+            PDFCache(template_version='1').make_key('<p>uno</p>'),
+            PDFCache(template_version='2').make_key('<p>uno</p>')
+        )
+
+    def test_invalid_output_is_not_cached(self):
+        """Output that is not a PDF is returned but never stored."""
+        cache = PDFCache()
+        content, path = cache.render('<p>uno</p>', render_function=lambda html, base_url=None: b'oops')
+        self.assertEqual(content, b'oops')
+        self.assertEqual(path, '')
+
+    def test_lru_eviction(self):
+        """Least recently used files are evicted when the cache is over size."""
+        cache = PDFCache(max_size_bytes=100, eviction_interval=1000)
+        paths = []
+        for index in range(3):
+            key = cache.make_key(f'<p>{index}</p>')
+            paths.append(cache.write(key, b'%PDF-' + b'x' * 45))
+            os.utime(os.path.join(self.media_root, paths[-1]), (index, index))
+
+        # Usar el primero lo convierte en el más reciente
+        self.assertIsNotNone(cache.read(paths[0]))
+        self.assertGreater(cache.evict(), 0)
+
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, paths[0])))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, paths[1])))
+
+
+class OwnerReceiptPDFCacheTest(PDFCacheTestMixin, TestCase):
+    """
+    Test suite for owner receipt PDFs served from the cache.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.agent = Agent.objects.create(
+            username='cacheagent',
+            email='agent@test.com',
+            first_name='Test',
+            last_name='Agent',
+            license_number='LIC-CACHE'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=timezone.now().date(),
+            amount=Decimal('1000.00'),
+            owner_discount_percentage=Decimal('10.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.invoice = Invoice.objects.create(
+            number='INV-2024-001',
+            date=timezone.now().date(),
+            due_date=timezone.now().date() + timedelta(days=30),
+            customer=self.tenant,
+            contract=self.contract,
+            description='Alquiler',
+            total_amount=Decimal('1000.00'),
+            status='validated'
+        )
+        self.receipt = OwnerReceipt.objects.create(
+            invoice=self.invoice,
+            generated_by=self.agent,
+            email_sent_to=self.owner.email
+        )
+        self.service = OwnerReceiptService()
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_generate_pdf_populates_path_and_reuses_file(self, render):
+        """The first render stores pdf_file_path; later calls skip rendering."""
+        first = self.service.generate_pdf(self.receipt)
+        self.receipt.refresh_from_db()
+        self.assertTrue(self.receipt.pdf_file_path)
+
+        with patch.object(OwnerReceiptService, 'get_receipt_data') as get_data:
+            second = self.service.generate_pdf(self.receipt)
+            get_data.assert_not_called()
+
+        self.assertEqual(first, second)
+        self.assertEqual(render.call_count, 1)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_data_change_invalidates_cached_pdf(self, render):
+        """Changing the contract clears the cached path and renders again."""
+        self.service.generate_pdf(self.receipt)
+
+        self.contract.amount = Decimal('1200.00')
+        self.contract.save()
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.pdf_file_path, '')
+
+        self.service.generate_pdf(self.receipt)
+        self.assertEqual(render.call_count, 2)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_agent_change_invalidates_cached_pdf(self, render):
+        """Editing the agent printed on the receipt clears the cached path; a login does not."""
+        self.service.generate_pdf(self.receipt)
+
+        self.agent.last_login = timezone.now()
+        self.agent.save(update_fields=['last_login'])
+        self.receipt.refresh_from_db()
+        self.assertTrue(self.receipt.pdf_file_path)
+
+        self.agent.phone = '1155550000'
+        self.agent.save()
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.pdf_file_path, '')
+
+        self.service.generate_pdf(self.receipt)
+        self.assertEqual(render.call_count, 2)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_property_type_change_invalidates_cached_pdf(self, render):
+        """Renaming the property type printed on the receipt clears the cached path."""
+        self.service.generate_pdf(self.receipt)
+
+        property_type = self.property.property_type
+        property_type.name = 'Monoambiente'
+        property_type.save()
+
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.pdf_file_path, '')
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_receipt_status_change_invalidates_cached_pdf(self, render):
+        """Marking the receipt as sent clears its cached path, so the PDF shows the new status."""
+        self.service.generate_pdf(self.receipt)
+
+        self.receipt.mark_as_sent()
+
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.pdf_file_path, '')
+        self.assertIn(b'Enviado', self.service.generate_pdf(self.receipt))
+        self.assertEqual(render.call_count, 2)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_bulk_invoice_update_invalidates_cached_pdf(self, render):
+        """Settling invoices with a set-based UPDATE also clears the cached path."""
+        self.service.generate_pdf(self.receipt)
+        # Pago insertado en bloque, sin pasar por Payment.save()
+        Payment.objects.bulk_create([Payment(
+            invoice=self.invoice, date=timezone.now().date(), amount=Decimal('1000.00'), method='Transferencia'
+        )])
+
+        Invoice.settle_from_payments(Invoice.objects.filter(pk=self.invoice.pk))
+
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.pdf_file_path, '')
+        self.service.generate_pdf(self.receipt)
+        self.assertEqual(render.call_count, 2)
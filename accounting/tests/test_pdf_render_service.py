@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.test import SimpleTestCase
+
+from accounting.service_modules.pdf_render_service import (
+    PDFRenderError,
+    PDFRenderQueueFull,
+    PDFRenderService,
+    PDFRenderTimeout,
+)
+
+
+def fake_render(html_string, base_url=None):
+    """Render stand-in that runs in the worker processes."""
+    if html_string == 'fail':
+        raise ValueError('template roto')
+    if html_string == 'slow':
+        time.sleep(5)
+    return b'%PDF-' + html_string.encode()
+
+
+class PDFRenderServiceTest(SimpleTestCase):
+    """
+    Test suite for the WeasyPrint process-pool render service.
+    """
+
+    def _service(self, **kwargs):
+        options = {'workers': 2, 'render_function': fake_render, 'use_process_pool': True}
+        options.update(kwargs)
+        service = PDFRenderService(**options)
+        self.addCleanup(service.shutdown)
+        return service
+
+    def test_render_many_keeps_order(self):
+        """Results come back in the same order as the documents."""
+        service = self._service()
+        results = service.render_many(['a', ('b', 'http://testserver/'), 'c'])
+
+        self.assertEqual([r.content for r in results], [b'%PDF-a', b'%PDF-b', b'%PDF-c'])
+        self.assertTrue(all(r.error is None for r in results))
+
+    def test_errors_are_reported_per_document(self):
+        """A failing document does not affect the rest of the batch."""
+        service = self._service()
+        results = service.render_many(['ok', 'fail'])
+
+        self.assertEqual(results[0].content, b'%PDF-ok')
+        self.assertIsInstance(results[1].error, PDFRenderError)
+
+    def test_render_raises_on_error(self):
+        """The single-document API raises PDFRenderError."""
+        service = self._service()
+        with self.assertRaises(PDFRenderError):
+            service.render('fail')
+
+    def test_job_timeout_recycles_pool(self):
+        """A job over its timeout fails and the pool keeps working afterwards."""
+        service = self._service(job_timeout=1)
+        with self.assertRaises(PDFRenderTimeout):
+            service.render('slow')
+        self.assertEqual(service.render('again'), b'%PDF-again')
+
+    def test_bounded_queue(self):
+        """Submissions fail when the queue stays full."""
+        service = self._service(workers=1, max_pending_jobs=1, queue_timeout=0.1, job_timeout=1)
+        service._submit('slow', None)
+        with self.assertRaises(PDFRenderQueueFull):
+            service._submit('a', None)
+
+    def test_inline_fallback(self):
+        """Without the process pool documents are rendered in the current process."""
+        service = self._service(use_process_pool=False)
+        self.assertEqual(service.render('x'), b'%PDF-x')
+        self.assertIsNone(service._executor)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from accounting.models_invoice import AccountingPeriod, Invoice, Payment, PeriodClosingBalance
+from accounting.service_modules.invoice_transition_service import InvoiceTransitionService
+from accounting.service_modules.period_close_service import (
+    AccountingPeriodError,
+    PeriodCloseService,
+    agent_monthly_collections,
+    contract_collections_total,
+    invoice_payments_total,
+)
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from payments.models import ContractPayment, PaymentMethod
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+class PeriodCloseServiceTest(TestCase):
+    """
+    Test suite for accounting period closing and closing-balance reports.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+
+        self.agent = Agent.objects.create(
+            username='periodagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-PERIOD'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=date(2024, 1, 1),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.method = PaymentMethod.objects.create(name='Transferencia')
+
+        self.january = self._invoice('INV-001', date(2024, 1, 5), '1000.00')
+        self.february = self._invoice('INV-002', date(2024, 2, 5), '1000.00')
+        Payment.objects.create(invoice=self.january, date=date(2024, 1, 20), amount=Decimal('600.00'), method='Efectivo')
+        Payment.objects.create(invoice=self.january, date=date(2024, 2, 10), amount=Decimal('400.00'), method='Efectivo')
+        self._collection(date(2024, 1, 10), '1000.00')
+        self._collection(date(2024, 2, 10), '1000.00')
+        self._collection(date(2024, 3, 10), '1000.00')
+        self.service = PeriodCloseService()
+
+    def _invoice(self, number, invoice_date, amount, status='sent'):
+        return Invoice.objects.create(
+            number=number,
+            date=invoice_date,
+            due_date=invoice_date,
+            customer=self.tenant,
+            contract=self.contract,
+            description='Alquiler',
+            total_amount=Decimal(amount),
+            status=status
+        )
+
+    def _collection(self, payment_date, amount, status='paid'):
+        return ContractPayment.objects.create(
+            contract=self.contract,
+            payment_method=self.method,
+            amount=Decimal(amount),
+            due_date=payment_date,
+            payment_date=payment_date,
+            status=status
+        )
+
+    def _close(self, month):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.service.close(month, today=date(2024, 6, 1))
+
+    def _balance(self, period, dimension, object_id):
+        return PeriodClosingBalance.objects.get(period=period, dimension=dimension, object_id=object_id)
+
+    def test_close_persists_cumulative_balances(self):
+        """Each close stores per-customer, contract and agent balances carried forward from the previous one."""
+        january = self._close(date(2024, 1, 15))
+        february = self._close(date(2024, 2, 1))
+
+        customer = self._balance(january, 'customer', self.tenant.pk)
+        self.assertEqual((customer.invoiced, customer.paid, customer.balance), (1000, 600, 400))
+        self.assertEqual(customer.collected, Decimal('1000.00'))
+
+        agent = self._balance(february, 'agent', self.agent.pk)
+        self.assertEqual((agent.invoiced, agent.paid, agent.balance), (2000, 1000, 1000))
+        self.assertEqual((agent.collected, agent.collected_count), (Decimal('2000.00'), 2))
+        self.assertEqual(agent.period_collected, Decimal('1000.00'))
+        self.assertEqual(self._balance(february, 'contract', self.contract.pk).balance, Decimal('1000.00'))
+        self.assertEqual(AccountingPeriod.get_lock_date(), date(2024, 2, 29))
+
+    def test_periods_close_in_order(self):
+        """Months must close one after another, only after they end, and only the last one reopens."""
+        with self.assertRaises(AccountingPeriodError):
+            self.service.close(date(2024, 6, 1), today=date(2024, 6, 15))
+        january = self._close(date(2024, 1, 1))
+        with self.assertRaises(AccountingPeriodError):
+            self._close(date(2024, 1, 1))
+        with self.assertRaises(AccountingPeriodError):
+            self._close(date(2024, 3, 1))
+        february = self._close(date(2024, 2, 1))
+
+        with self.assertRaises(AccountingPeriodError):
+            self.service.reopen(january)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.reopen(february)
+
+        self.assertFalse(PeriodClosingBalance.objects.filter(period_id=february.pk).exists())
+        self.assertEqual(AccountingPeriod.get_lock_date(), date(2024, 1, 31))
+
+    def test_closed_month_is_locked(self):
+        """Invoices, payments and contract collections dated in a closed month cannot change."""
+        locked = self._invoice('INV-003', date(2024, 1, 25), '500.00')
+        self._close(date(2024, 1, 1))
+
+        with self.assertRaises(ValidationError):
+            self._invoice('INV-004', date(2024, 1, 25), '500.00')
+        with self.assertRaises(ValidationError):
+            Payment.objects.create(invoice=self.february, date=date(2024, 1, 31), amount=Decimal('10.00'), method='Efectivo')
+        with self.assertRaises(ValidationError):
+            self._collection(date(2024, 1, 20), '500.00')
+
+        locked.total_amount = Decimal('1500.00')
+        with self.assertRaises(ValidationError):
+            locked.save()
+
+        result = InvoiceTransitionService().transition([locked.pk, self.february.pk], 'cancel')
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['skipped'][0]['reason'], "La factura pertenece a un período contable cerrado.")
+
+        # Los cambios de estado que no alteran los saldos se permiten
+        locked.refresh_from_db()
+        locked.status = 'paid'
+        locked.save()
+
+    def test_bulk_payment_delete_in_closed_month_is_rejected(self):
+        """Queryset deletes of payments dated in a closed month are rejected like single deletes."""
+        self._close(date(2024, 1, 1))
+
+        with self.assertRaises(ValidationError), transaction.atomic():
+            Payment.objects.filter(invoice=self.january).delete()
+        self.assertEqual(Payment.objects.filter(invoice=self.january).count(), 2)
+        self.january.refresh_from_db()
+        self.assertEqual(self.january.paid_amount, Decimal('1000.00'))
+
+    def test_close_from_another_process_is_enforced(self):
+        """A close made elsewhere (no local invalidation) blocks writes on the next check."""
+        # Este proceso ya consultó la fecha de bloqueo antes del cierre
+        self.assertIsNone(AccountingPeriod.get_lock_date())
+        # Cierre hecho por otro worker: ninguna invalidación llega a este proceso
+        AccountingPeriod.objects.create(period_start=date(2024, 1, 1), period_end=date(2024, 1, 31))
+
+        with self.assertRaises(ValidationError):
+            self._invoice('INV-005', date(2024, 1, 20), '300.00')
+        with self.assertRaises(ValidationError):
+            Payment.objects.create(invoice=self.february, date=date(2024, 1, 15), amount=Decimal('10.00'), method='Efectivo')
+
+    def test_reports_start_from_last_close(self):
+        """Reports return the same totals after a close while reading the stored balances."""
+        before = (invoice_payments_total(), contract_collections_total())
+        self._close(date(2024, 1, 1))
+        self._close(date(2024, 2, 1))
+        # Un saldo de cierre alterado muestra que el reporte no recorre el historial cerrado
+        PeriodClosingBalance.objects.filter(dimension='contract').update(collected=Decimal('5000.00'))
+
+        self.assertEqual(before[0], Decimal('1000.00'))
+        self.assertEqual(invoice_payments_total(), before[0])
+        self.assertEqual(before[1], {'total': Decimal('3000.00'), 'count': 3})
+        self.assertEqual(contract_collections_total(), {'total': Decimal('6000.00'), 'count': 3})
+
+    def test_agent_monthly_collections(self):
+        """Closed months come from the closing balances and open months from one grouped query."""
+        self._close(date(2024, 1, 1))
+        self._close(date(2024, 2, 1))
+        months = [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)]
+
+        # Fecha de bloqueo, saldos de cierre y cobros del período abierto
+        with self.assertNumQueries(3):
+            totals = agent_monthly_collections(self.agent, months)
+
+        self.assertEqual(list(totals), months)
+        self.assertEqual(
+            list(totals.values()),
+            [Decimal('1000.00'), Decimal('1000.00'), Decimal('1000.00'), Decimal('0.00')]
+        )
+
+    def test_close_view_requires_staff(self):
+        """Only staff users can close a month from the periods page."""
+        self.client.force_login(self.agent)
+        url = reverse('accounting:accounting_periods')
+
+        response = self.client.post(url, {'month': '2024-01'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 403)
+
+        self.agent.is_staff = True
+        self.agent.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'month': '2024-01'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertTrue(response.json()['success'])
+        self.assertTrue(AccountingPeriod.objects.filter(period_start=date(2024, 1, 1)).exists())
+        self.assertContains(self.client.get(url), '01/2024')
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounting import validators
+from accounting.models_invoice import Invoice, OwnerReceipt
+from accounting.service_modules.receipt_context import ReceiptContext
+from accounting.services import OwnerReceiptService
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+
+
+def fake_render(html_string, base_url=None):
+    return b'%PDF-1.7 ' + html_string.encode()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_HOST='localhost',
+    EMAIL_HOST_USER='',
+    DEFAULT_FROM_EMAIL='noreply@test.com',
+)
+class ReceiptContextTest(TestCase):
+    """
+    Test suite for the preloaded owner receipt context.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.agent = Agent.objects.create(
+            username='contextagent',
+            email='agent@test.com',
+            first_name='Test',
+            last_name='Agent',
+            license_number='LIC-CTX'
+        )
+        self.owner = Customer.objects.create(
+            first_name='Maria', last_name='Garcia', email='owner@test.com',
+            phone='123456789', document='20111222'
+        )
+        self.tenant = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property = Property.objects.create(
+            title='Departamento Centro',
+            description='Departamento en el centro',
+            property_type=PropertyType.objects.create(name='Departamento'),
+            property_status=PropertyStatus.objects.create(name='Alquilada'),
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=self.agent,
+            owner=self.owner
+        )
+        self.contract = Contract.objects.create(
+            customer=self.tenant,
+            agent=self.agent,
+            property=self.property,
+            start_date=timezone.now().date(),
+            amount=Decimal('1000.00'),
+            owner_discount_percentage=Decimal('10.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        self.invoices = [
+            Invoice.objects.create(
+                number=f'INV-2024-00{index}',
+                date=timezone.now().date(),
+                due_date=timezone.now().date() + timedelta(days=30),
+                customer=self.tenant,
+                contract=self.contract,
+                description='Alquiler',
+                total_amount=Decimal('1000.00'),
+                status='validated'
+            )
+            for index in range(1, 4)
+        ]
+        self.service = OwnerReceiptService()
+
+    def _fresh_invoice(self, index=0):
+        return Invoice.objects.get(pk=self.invoices[index].pk)
+
+    def test_relations_loaded_in_one_query(self):
+        """Walking the receipt relations after building the context costs no queries."""
+        invoice = self._fresh_invoice()
+        context = ReceiptContext.for_invoice(invoice)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(context.owner.email, 'owner@test.com')
+            self.assertEqual(invoice.contract.agent.license_number, 'LIC-CTX')
+            self.assertEqual(invoice.contract.property.property_type.name, 'Departamento')
+            self.assertEqual(invoice.customer.email, 'tenant@test.com')
+            context.company
+
+    def test_batch_query_count_is_constant(self):
+        """A batch of invoices is loaded with the same queries as a single one."""
+        invoices = [self._fresh_invoice(index) for index in range(3)]
+
+        # Facturas, empresa y resumen de comprobantes
+        with self.assertNumQueries(3):
+            contexts = ReceiptContext.for_invoices(invoices)
+        self.assertEqual(len(contexts), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(contexts[2].owner.email, 'owner@test.com')
+
+    def test_in_memory_changes_are_kept(self):
+        """Loading relations does not overwrite unsaved field values."""
+        invoice = self._fresh_invoice()
+        invoice.status = 'draft'
+        context = ReceiptContext.for_invoice(invoice)
+
+        is_valid, error_message, _ = context.validate()
+        self.assertFalse(is_valid)
+        self.assertIn('validada', error_message)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_send_validates_and_loads_once(self, render):
+        """Generating and sending a receipt validates once and reloads no related data."""
+        invoice = self._fresh_invoice()
+        context = ReceiptContext.for_invoice(invoice)
+
+        with patch.object(
+            validators, 'validate_owner_receipt_generation',
+            wraps=validators.validate_owner_receipt_generation
+        ) as validate:
+            with CaptureQueriesContext(connection) as queries:
+                receipt = self.service.generate_receipt(invoice, self.agent, context=context)
+                self.service.send_receipt_email(receipt, context=context)
+
+        self.assertEqual(validate.call_count, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        company_queries = [q for q in queries.captured_queries if 'core_company' in q['sql']]
+        contract_queries = [q for q in queries.captured_queries if 'FROM "contracts_contract"' in q['sql']]
+        self.assertEqual(len(company_queries), 0)
+        self.assertEqual(len(contract_queries), 0)
+
+    @patch('accounting.services.render_pdf', side_effect=fake_render)
+    def test_send_without_context_builds_one(self, render):
+        """Sending a freshly loaded receipt builds its own context and validates once."""
+        receipt = OwnerReceipt.objects.create(
+            invoice=self.invoices[0],
+            generated_by=self.agent,
+            email_sent_to=self.owner.email
+        )
+        receipt = OwnerReceipt.objects.get(pk=receipt.pk)
+
+        with patch.object(
+            validators, 'validate_owner_receipt_generation',
+            wraps=validators.validate_owner_receipt_generation
+        ) as validate:
+            self.service.send_receipt_email(receipt)
+
+        self.assertEqual(validate.call_count, 1)
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.status, 'sent')
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from accounting.models_invoice import Invoice, Payment
+from accounting.service_modules.reconciliation_service import (
+    CONFIDENCE_DOCUMENT_UNIQUE,
+    CONFIDENCE_NUMBER_EXACT,
+    CONFIDENCE_NUMBER_PARTIAL,
+    OpenInvoiceIndex,
+    ReconciliationEngine,
+    serialize_match,
+)
+from agents.models import Agent
+from customers.models import Customer
+
+
+class ReconciliationEngineTest(TestCase):
+    """
+    Test suite for the bank statement reconciliation engine.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        self.agent = Agent.objects.create(
+            username='reconcileagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-RECON'
+        )
+        self.john = Customer.objects.create(
+            first_name='John', last_name='Doe', email='john@test.com',
+            phone='123456789', document='20-30111222-3'
+        )
+        self.jane = Customer.objects.create(
+            first_name='Jane', last_name='Roe', email='jane@test.com',
+            phone='987654321', document='27444555'
+        )
+        self.by_number = self._invoice('INV-2024-001', self.john, '1000.00', date(2024, 1, 31))
+        self.by_document = self._invoice('INV-2024-002', self.john, '750.00', date(2024, 2, 29))
+        self.by_due_date = self._invoice('INV-2024-003', self.jane, '820.00', date(2024, 1, 20))
+        self._invoice('INV-2024-004', self.jane, '500.00', date(2024, 1, 10), status='draft')
+
+    def _invoice(self, number, customer, amount, due_date, status='sent'):
+        return Invoice.objects.create(
+            number=number,
+            date=date(2024, 1, 1),
+            due_date=due_date,
+            customer=customer,
+            description='Alquiler',
+            total_amount=Decimal(amount),
+            status=status
+        )
+
+    def _row(self, line, amount, notes='', document='', day=date(2024, 1, 18)):
+        return {
+            'line': line, 'invoice': '', 'method': '', 'notes': notes,
+            'document': document, 'date': day, 'amount': Decimal(amount),
+        }
+
+    def test_matches_by_each_rule_without_queries(self):
+        """Number, amount+document and amount+due-date rules match in memory."""
+        engine = ReconciliationEngine(index=OpenInvoiceIndex.load())
+        rows = [
+            self._row(2, '1000.00', notes='Pago INV-2024-001'),
+            self._row(3, '750.00', notes='Transferencia de 20301112223'),
+            self._row(4, '820.00', notes='Transferencia'),
+            self._row(5, '500.00', notes='Factura en borrador'),
+        ]
+
+        with self.assertNumQueries(0):
+            result = engine.reconcile(rows)
+
+        matches = result['matches']
+        self.assertEqual(matches[0]['invoice']['id'], self.by_number.pk)
+        self.assertEqual(matches[0]['confidence'], CONFIDENCE_NUMBER_EXACT)
+        self.assertEqual(matches[1]['invoice']['id'], self.by_document.pk)
+        self.assertEqual(matches[1]['rule'], 'amount_document')
+        self.assertEqual(matches[1]['confidence'], CONFIDENCE_DOCUMENT_UNIQUE)
+        self.assertEqual(matches[2]['invoice']['id'], self.by_due_date.pk)
+        self.assertEqual(matches[2]['rule'], 'amount_due_date')
+        self.assertFalse(matches[2]['auto'])
+        self.assertIsNone(matches[3]['invoice'])
+        self.assertEqual((result['matched'], result['auto_count'], result['unmatched']), (3, 2, 1))
+
+    def test_partial_payment_lowers_confidence(self):
+        """A payment smaller than the balance still matches by number with less confidence."""
+        engine = ReconciliationEngine(index=OpenInvoiceIndex.load())
+
+        match = engine.reconcile([self._row(2, '400.00', notes='inv-2024-001')])['matches'][0]
+
+        self.assertEqual(match['invoice']['id'], self.by_number.pk)
+        self.assertEqual(match['confidence'], CONFIDENCE_NUMBER_PARTIAL)
+
+    def test_invoice_claimed_once_per_batch(self):
+        """Two identical amount-only lines do not both get the same invoice."""
+        engine = ReconciliationEngine(index=OpenInvoiceIndex.load())
+
+        result = engine.reconcile([
+            self._row(2, '820.00'),
+            self._row(3, '820.00'),
+        ])
+
+        self.assertEqual(result['matches'][0]['invoice']['id'], self.by_due_date.pk)
+        self.assertIsNone(result['matches'][1]['invoice'])
+
+    def test_due_date_window(self):
+        """Amount-only matches outside the due date window are rejected."""
+        engine = ReconciliationEngine(index=OpenInvoiceIndex.load(), due_date_window_days=3)
+
+        result = engine.reconcile([self._row(2, '820.00', day=date(2024, 3, 1))])
+
+        self.assertIsNone(result['matches'][0]['invoice'])
+
+    def test_apply_registers_confident_matches(self):
+        """Applying creates payments only for matches above the threshold."""
+        engine = ReconciliationEngine(index=OpenInvoiceIndex.load())
+        result = engine.reconcile([
+            self._row(2, '1000.00', notes='Pago INV-2024-001'),
+            self._row(3, '820.00'),
+        ])
+
+        applied = engine.apply(result['matches'])
+
+        self.assertEqual(applied['created'], 1)
+        self.by_number.refresh_from_db()
+        self.assertEqual(self.by_number.status, 'paid')
+        self.assertFalse(Payment.objects.filter(invoice=self.by_due_date).exists())
+
+    def test_reconcile_view_previews_and_applies(self):
+        """The page previews matches from a CSV and registers the confirmed ones."""
+        self.client.force_login(self.agent)
+        statement = SimpleUploadedFile(
+            'extracto.csv',
+            "fecha;monto;concepto\n18/01/2024;1000,00;Pago INV-2024-001\n".encode('utf-8'),
+        )
+
+        response = self.client.post(reverse('accounting:payment_reconcile'), {'file': statement})
+
+        self.assertEqual(response.status_code, 200)
+        match = response.context['result']['matches'][0]
+        self.assertTrue(match['auto'])
+        self.assertContains(response, 'INV-2024-001')
+
+        response = self.client.post(reverse('accounting:payment_reconcile'), {
+            'action': 'apply', 'selected': [serialize_match(match)], 'method': 'Transferencia',
+        })
+
+        self.assertRedirects(response, reverse('accounting:payment_list'), fetch_redirect_response=False)
+        self.assertEqual(Payment.objects.get().invoice, self.by_number)
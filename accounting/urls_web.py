@@ -6,6 +6,8 @@ app_name = 'accounting'
 urlpatterns = [
     path('dashboard/', views_web.accounting_dashboard, name='accounting_dashboard'),
     path('invoices/', views_web.invoice_list, name='invoice_list'),
+    path('aging/', views_web.aging_report, name='aging_report'),
+    path('invoices/export/', views_web.invoice_export, name='invoice_export'),
     path('invoices/create/', views_web.invoice_create, name='invoice_create'),
     path('invoices/<int:pk>/', views_web.invoice_detail, name='invoice_detail'),
     path('invoices/<int:pk>/edit/', views_web.invoice_update, name='invoice_update'),
@@ -15,11 +17,15 @@ urlpatterns = [
     path('invoices/<int:pk>/cancel/', views_web.invoice_cancel, name='invoice_cancel'),
     path('invoices/<int:pk>/reactivate/', views_web.invoice_reactivate, name='invoice_reactivate'),
     path('invoices/<int:pk>/validate/', views_web.invoice_validate, name='invoice_validate'),
+    path('invoices/bulk-transition/', views_web.invoice_bulk_transition, name='invoice_bulk_transition'),
     path('invoices/<int:pk>/duplicate/', views_web.invoice_duplicate, name='invoice_duplicate'),
     path('invoices/<int:invoice_pk>/invoicelines/create/', views_web.invoiceline_create, name='invoiceline_create'),
     path('invoicelines/<int:pk>/edit/', views_web.invoiceline_update, name='invoiceline_update'),
     path('invoicelines/<int:pk>/delete/', views_web.invoiceline_delete, name='invoiceline_delete'),
     path('payments/', views_web.payment_list, name='payment_list'),
+    path('payments/export/', views_web.payment_export, name='payment_export'),
+    path('payments/import/', views_web.payment_import, name='payment_import'),
+    path('payments/reconcile/', views_web.payment_reconcile, name='payment_reconcile'),
     path('invoices/<int:invoice_pk>/payments/create/', views_web.payment_create, name='payment_create'),
     path('invoices/<int:invoice_pk>/quick-payment/', views_web.quick_payment_create, name='quick_payment_create'),
     path('payments/<int:pk>/', views_web.payment_detail, name='payment_detail'),
@@ -29,6 +35,7 @@ urlpatterns = [
     path('notifications/<int:pk>/mark-as-read/', views_web.mark_notification_as_read, name='mark_notification_as_read'),
     path('notifications/mark-all-as-read/', views_web.mark_all_notifications_as_read, name='mark_all_notifications_as_read'),
     path('invoices/send-bulk-emails/', views_web.send_bulk_emails, name='send_bulk_emails'),
+    path('invoices/bulk-email-jobs/<int:pk>/status/', views_web.bulk_email_job_status, name='bulk_email_job_status'),
     
     # Owner Receipt URLs
     path('invoice/<int:invoice_pk>/generate-owner-receipt/', views_web.generate_owner_receipt, name='generate_owner_receipt'),
@@ -37,4 +44,12 @@ urlpatterns = [
     path('owner-receipt/<int:receipt_pk>/resend/', views_web.resend_owner_receipt, name='resend_owner_receipt'),
     path('owner-receipt/<int:receipt_pk>/pdf/', views_web.owner_receipt_pdf, name='owner_receipt_pdf'),
     path('owner-receipts/', views_web.owner_receipts_list, name='owner_receipts_list'),
+    path('owner-receipts/export/', views_web.owner_receipt_export, name='owner_receipt_export'),
+    path('owner-receipts/batch/', views_web.owner_receipt_batch_create, name='owner_receipt_batch_create'),
+    path('owner-receipts/batch/<int:pk>/status/', views_web.owner_receipt_batch_status, name='owner_receipt_batch_status'),
+    path('owner-statements/send/', views_web.send_owner_statements, name='send_owner_statements'),
+    path('owner-statements/<int:owner_pk>/pdf/', views_web.owner_statement_pdf, name='owner_statement_pdf'),
+    path('owner-statements/<int:owner_pk>/send/', views_web.send_owner_statement, name='send_owner_statement'),
+    path('customers/<int:customer_pk>/statement/', views_web.customer_statement, name='customer_statement'),
+    path('periods/', views_web.accounting_periods, name='accounting_periods'),
 ]
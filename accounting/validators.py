@@ -257,34 +257,30 @@ class OwnerReceiptValidator:
             self.errors.append("Error interno en los cálculos financieros")
             return False, {}
     
-    def validate_existing_receipts(self, invoice):
+    def validate_existing_receipts(self, invoice, receipts_summary=None):
         """
         Validate existing receipts for the invoice.
         
         Args:
             invoice: Invoice instance
+            receipts_summary (dict, optional): Preloaded ``sent_number`` and
+                ``pending_count`` from a ReceiptContext
             
         Returns:
             bool: True if no conflicts, False otherwise
         """
         try:
-            from accounting.models_invoice import OwnerReceipt
+            if receipts_summary is None:
+                from accounting.service_modules.receipt_context import ReceiptContext
+                receipts_summary = ReceiptContext(invoice).receipts_summary
             
             # Check for existing successful receipts
-            existing_receipt = OwnerReceipt.objects.filter(
-                invoice=invoice,
-                status='sent'
-            ).first()
-            
-            if existing_receipt:
-                self.warnings.append(f"Ya existe un comprobante enviado exitosamente para esta factura: {existing_receipt.receipt_number}")
+            if receipts_summary['sent_number']:
+                self.warnings.append(f"Ya existe un comprobante enviado exitosamente para esta factura: {receipts_summary['sent_number']}")
                 return False
             
             # Check for pending receipts
-            pending_receipts = OwnerReceipt.objects.filter(
-                invoice=invoice,
-                status='generated'
-            ).count()
+            pending_receipts = receipts_summary['pending_count']
             
             if pending_receipts > 0:
                 self.warnings.append(f"Existen {pending_receipts} comprobante(s) pendiente(s) de envío para esta factura")
@@ -296,12 +292,13 @@ class OwnerReceiptValidator:
             self.warnings.append("Error verificando comprobantes existentes")
             return True  # Don't block generation for this error
     
-    def validate_complete(self, invoice):
+    def validate_complete(self, invoice, context=None):
         """
         Perform complete validation for owner receipt generation.
         
         Args:
             invoice: Invoice instance to validate
+            context (ReceiptContext, optional): Preloaded receipt data
             
         Returns:
             tuple: (bool, list, list) - (is_valid, errors, warnings)
@@ -331,7 +328,9 @@ class OwnerReceiptValidator:
                 return False, self.errors, self.warnings
             
             # Validate existing receipts
-            self.validate_existing_receipts(invoice)
+            self.validate_existing_receipts(
+                invoice, receipts_summary=context.receipts_summary if context else None
+            )
             
             return len(self.errors) == 0, self.errors, self.warnings
             
@@ -369,18 +368,19 @@ class OwnerReceiptValidator:
             return 'N/A'
 
 
-def validate_owner_receipt_generation(invoice):
+def validate_owner_receipt_generation(invoice, context=None):
     """
     Convenience function to validate owner receipt generation.
     
     Args:
         invoice: Invoice instance to validate
+        context (ReceiptContext, optional): Preloaded receipt data
         
     Returns:
         tuple: (bool, str, list) - (is_valid, error_message, warnings)
     """
     validator = OwnerReceiptValidator()
-    is_valid, errors, warnings = validator.validate_complete(invoice)
+    is_valid, errors, warnings = validator.validate_complete(invoice, context=context)
     
     if not is_valid:
         error_message = "; ".join(errors)
@@ -389,12 +389,13 @@ def validate_owner_receipt_generation(invoice):
     return True, "", warnings
 
 
-def validate_receipt_resend(receipt):
+def validate_receipt_resend(receipt, context=None):
     """
     Validate if a receipt can be resent.
     
     Args:
         receipt: OwnerReceipt instance
+        context (ReceiptContext, optional): Preloaded data of the receipt invoice
         
     Returns:
         tuple: (bool, str) - (can_resend, error_message)
@@ -409,7 +410,10 @@ def validate_receipt_resend(receipt):
         
         # Validate associated invoice is still valid
         if hasattr(receipt, 'invoice') and receipt.invoice:
-            is_valid, error_message, warnings = validate_owner_receipt_generation(receipt.invoice)
+            if context is not None:
+                is_valid, error_message, warnings = context.validate()
+            else:
+                is_valid, error_message, warnings = validate_owner_receipt_generation(receipt.invoice)
             if not is_valid:
                 return False, f"La factura asociada ya no es válida: {error_message}"
         
@@ -4,14 +4,53 @@ from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.utils import timezone
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
-from django.db.models import Q, Sum
+from django.db.models import Count, Q
 from django.forms import modelform_factory
-from weasyprint import HTML
-from .models_invoice import Invoice, InvoiceLine, Payment
+from .models_invoice import (
+    AccountingPeriod,
+    AgingSnapshot,
+    BulkEmailJob,
+    Invoice,
+    InvoiceLine,
+    OwnerReceiptBatchJob,
+    Payment,
+)
 from .forms_invoice import InvoiceForm, InvoiceLineFormSet, InvoiceLineForm
 from .services import send_invoice_email
+from .service_modules.pdf_cache_service import render_cached_pdf
+from .service_modules.bulk_email_service import BulkInvoiceEmailService
+from .service_modules.aging_service import (
+    AGING_BUCKETS,
+    AGING_DIMENSIONS,
+    AGING_EXPORT_COLUMNS,
+    AMOUNT_KEYS,
+    get_aging_report,
+)
+from .service_modules.customer_statement_service import CustomerStatementService, CustomerStatementError
+from .service_modules.dashboard_service import get_dashboard_kpis
+from .service_modules.export_service import (
+    EXPORT_FORMATS,
+    INVOICE_EXPORT_COLUMNS,
+    OWNER_RECEIPT_EXPORT_COLUMNS,
+    PAYMENT_EXPORT_COLUMNS,
+    export_response,
+    rows_response,
+)
+from .service_modules.keyset_pagination import KeysetPaginator
+from .service_modules.owner_receipt_batch_service import OwnerReceiptBatchService
+from .service_modules.period_close_service import AccountingPeriodError, PeriodCloseService
+from .service_modules.payment_import_service import PaymentImportService, PaymentImportError
+from .service_modules.invoice_transition_service import InvoiceTransitionService, InvoiceTransitionError
+from .service_modules.reconciliation_service import ReconciliationEngine, deserialize_matches, serialize_match
+from .service_modules.owner_statement_service import OwnerStatementService, OwnerStatementError
+from .service_modules.receipt_context import ReceiptContext
+from .tasks import (
+    send_bulk_invoice_emails_task,
+    generate_owner_receipts_batch_task,
+    send_owner_statements_task,
+)
 from core.models import Company
 from user_notifications.models import Notification
 import logging
@@ -21,25 +60,8 @@ logger = logging.getLogger(__name__)
 
 @login_required
 def accounting_dashboard(request):
-    # Obtener estadísticas de facturas
-    total_invoices = Invoice.objects.count()
-    pending_invoices = Invoice.objects.filter(status__in=["validated", "sent"]).count()
-    paid_invoices = Invoice.objects.filter(status="paid").count()
-    cancelled_invoices = Invoice.objects.filter(status="cancelled").count()
-
-    # Calcular totales por estado
-    total_pending = (
-        Invoice.objects.filter(status__in=["validated", "sent"]).aggregate(
-            total=Sum("total_amount")
-        )["total"]
-        or 0
-    )
-    total_paid = (
-        Invoice.objects.filter(status="paid").aggregate(total=Sum("total_amount"))[
-            "total"
-        ]
-        or 0
-    )
+    # Indicadores calculados en una consulta y cacheados hasta el próximo cambio
+    kpis = get_dashboard_kpis()
 
     # Facturas recientes
     recent_invoices = Invoice.objects.select_related("customer").order_by("-date")[:10]
@@ -50,19 +72,14 @@ def accounting_dashboard(request):
     # Facturas vencidas
     overdue_invoices = (
         Invoice.objects.filter(
-            status__in=["validated", "sent"], due_date__lt=timezone.now().date()
+            status__in=["validated", "sent"], due_date__lt=timezone.now().date(), balance__gt=0
         )
         .select_related("customer")
-        .order_by("due_date")
+        .order_by("due_date")[:10]
     )
 
     context = {
-        "total_invoices": total_invoices,
-        "pending_invoices": pending_invoices,
-        "paid_invoices": paid_invoices,
-        "cancelled_invoices": cancelled_invoices,
-        "total_pending": total_pending,
-        "total_paid": total_paid,
+        **kpis,
         "recent_invoices": recent_invoices,
         "recent_payments": recent_payments,
         "overdue_invoices": overdue_invoices,
@@ -71,18 +88,23 @@ def accounting_dashboard(request):
     return render(request, "accounting/accounting_dashboard.html", context)
 
 
-@login_required
-def invoice_list(request):
-    invoice_list = Invoice.objects.select_related("customer").order_by("-date")
-    today = timezone.now().date()
+def _filter_invoices(request, invoice_list):
+    """
+    Aplica al QuerySet de facturas los filtros del listado recibidos por GET.
+
+    Returns:
+        tuple: (QuerySet filtrado, dict con los valores de los filtros para el template)
+    """
+    from customers.models import Customer
 
-    # Búsqueda
+    # Búsqueda: número de factura o nombre del cliente, cada uno con su índice trigram
     query = request.GET.get("q")
     if query:
+        matching_customers = Customer.objects.filter(
+            Q(first_name__icontains=query) | Q(last_name__icontains=query)
+        ).values("pk")
         invoice_list = invoice_list.filter(
-            Q(number__icontains=query)
-            | Q(customer__first_name__icontains=query)
-            | Q(customer__last_name__icontains=query)
+            Q(number__icontains=query) | Q(customer_id__in=matching_customers)
         )
 
     # Filtro por estado
@@ -176,9 +198,37 @@ def invoice_list(request):
         elif contract == "without_contract":
             invoice_list = invoice_list.filter(contract__isnull=True)
 
-    paginator = Paginator(invoice_list, 25)  # 25 facturas por página
-    page_number = request.GET.get("page")
-    invoices = paginator.get_page(page_number)
+    return invoice_list, {
+        "query": query,
+        "status": status,
+        "customer_id": customer_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "due_date_from": due_date_from,
+        "due_date_to": due_date_to,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "overdue": overdue,
+        "contract": contract,
+    }
+
+
+@login_required
+def invoice_list(request):
+    invoice_list = Invoice.objects.select_related("customer")
+    today = timezone.now().date()
+
+    invoice_list, filters = _filter_invoices(request, invoice_list)
+    date_from = filters["date_from"]
+    date_to = filters["date_to"]
+    due_date_from = filters["due_date_from"]
+    due_date_to = filters["due_date_to"]
+
+    # Paginación por clave (fecha, id): el costo no crece con la profundidad de la página
+    paginator = KeysetPaginator(invoice_list, per_page=25, ordering=("-date", "-id"))
+    invoices = paginator.get_page(
+        after=request.GET.get("after"), before=request.GET.get("before")
+    )
 
     # Obtener lista de clientes para el filtro
     from customers.models import Customer
@@ -189,11 +239,9 @@ def invoice_list(request):
         request,
         "accounting/invoice_list.html",
         {
+            **filters,
             "invoices": invoices,
             "today": today,
-            "query": query,
-            "status": status,
-            "customer_id": customer_id,
             "date_from": (
                 date_from
                 if isinstance(date_from, str)
@@ -228,10 +276,6 @@ def invoice_list(request):
                     else ""
                 )
             ),
-            "min_amount": min_amount,
-            "max_amount": max_amount,
-            "overdue": overdue,
-            "contract": contract,
             "customers": customers,
         },
     )
@@ -243,9 +287,9 @@ def invoice_detail(request, pk):
         Invoice.objects.prefetch_related("lines", "payments"), pk=pk
     )
 
-    # Calcular el total pagado y el saldo pendiente
-    total_paid = invoice.payments.aggregate(total=Sum("amount"))["total"] or 0
-    balance = invoice.total_amount - total_paid
+    # Total pagado y saldo pendiente almacenados en la factura
+    total_paid = invoice.paid_amount
+    balance = invoice.balance
 
     if request.method == "POST":
         form = InvoiceLineForm(request.POST)
@@ -420,6 +464,123 @@ def payment_list(request):
     return render(request, "accounting/payment_list.html", {"payments": payments})
 
 
+@login_required
+def payment_import(request):
+    """
+    Importa en bloque los pagos de un extracto bancario (CSV u OFX).
+
+    Los pagos se insertan juntos y los saldos y estados de las facturas se
+    recalculan al final; cada agente recibe una notificación de resumen.
+    """
+    result = None
+    if request.method == "POST":
+        is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+        uploaded_file = request.FILES.get("file")
+        if not uploaded_file:
+            error_message = "Seleccione un archivo CSV u OFX."
+            if is_ajax:
+                return JsonResponse({"success": False, "error": error_message}, status=400)
+            messages.error(request, error_message)
+            return render(request, "accounting/payment_import.html", {"result": None})
+
+        try:
+            result = PaymentImportService(default_method=request.POST.get("method")).import_file(
+                uploaded_file, file_format=request.POST.get("format") or None
+            )
+        except PaymentImportError as e:
+            if is_ajax:
+                return JsonResponse({"success": False, "error": str(e)}, status=400)
+            messages.error(request, str(e))
+            return render(request, "accounting/payment_import.html", {"result": None})
+        except Exception as e:
+            logger.error(f"Error importando pagos desde {uploaded_file.name}: {str(e)}")
+            if is_ajax:
+                return JsonResponse({"success": False, "error": "No se pudo importar el archivo."}, status=500)
+            messages.error(request, "No se pudo importar el archivo.")
+            return render(request, "accounting/payment_import.html", {"result": None})
+
+        if is_ajax:
+            return JsonResponse({"success": True, **result})
+
+        if result["created"]:
+            messages.success(
+                request,
+                f"Se registraron {result['created']} pagos por ${result['total_amount']:,.2f} "
+                f"en {result['invoice_count']} facturas.",
+            )
+        if result["skipped"]:
+            messages.warning(request, f"{len(result['skipped'])} movimientos fueron omitidos.")
+
+    return render(request, "accounting/payment_import.html", {"result": result})
+
+
+@login_required
+def payment_reconcile(request):
+    """
+    Concilia un extracto bancario contra las facturas abiertas.
+
+    El primer envío sube el archivo y muestra las coincidencias propuestas con
+    su confianza; el segundo registra como pagos las que el usuario confirma.
+    """
+    template = "accounting/payment_reconcile.html"
+    if request.method != "POST":
+        return render(request, template, {"result": None})
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+    if request.POST.get("action") == "apply":
+        try:
+            rows = deserialize_matches(request.POST.getlist("selected"))
+            result = PaymentImportService(default_method=request.POST.get("method")).import_rows(rows)
+        except PaymentImportError as e:
+            if is_ajax:
+                return JsonResponse({"success": False, "error": str(e)}, status=400)
+            messages.error(request, str(e))
+            return render(request, template, {"result": None})
+
+        if is_ajax:
+            return JsonResponse({"success": True, **result})
+        messages.success(
+            request,
+            f"Se registraron {result['created']} pagos por ${result['total_amount']:,.2f} "
+            f"en {result['invoice_count']} facturas.",
+        )
+        if result["skipped"]:
+            messages.warning(request, f"{len(result['skipped'])} movimientos fueron omitidos.")
+        return redirect("accounting:payment_list")
+
+    uploaded_file = request.FILES.get("file")
+    if not uploaded_file:
+        error_message = "Seleccione un archivo CSV u OFX."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.error(request, error_message)
+        return render(request, template, {"result": None})
+
+    try:
+        result = ReconciliationEngine().reconcile_file(
+            uploaded_file, file_format=request.POST.get("format") or None
+        )
+    except PaymentImportError as e:
+        if is_ajax:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+        messages.error(request, str(e))
+        return render(request, template, {"result": None})
+    except Exception as e:
+        logger.error(f"Error conciliando el extracto {uploaded_file.name}: {str(e)}")
+        if is_ajax:
+            return JsonResponse({"success": False, "error": "No se pudo conciliar el archivo."}, status=500)
+        messages.error(request, "No se pudo conciliar el archivo.")
+        return render(request, template, {"result": None})
+
+    for match in result["matches"]:
+        match["payload"] = serialize_match(match) if match["invoice"] else ""
+
+    if is_ajax:
+        return JsonResponse({"success": True, **result})
+    return render(request, template, {"result": result, "method": request.POST.get("method", "")})
+
+
 @login_required
 def payment_detail(request, pk):
     payment = get_object_or_404(Payment, pk=pk)
@@ -430,9 +591,8 @@ def payment_detail(request, pk):
 def payment_create(request, invoice_pk):
     invoice = get_object_or_404(Invoice, pk=invoice_pk)
 
-    # Calcular el saldo pendiente para sugerir como monto predeterminado
-    total_paid = invoice.payments.aggregate(total=Sum("amount"))["total"] or 0
-    balance = invoice.total_amount - total_paid
+    # Saldo pendiente para sugerir como monto predeterminado
+    balance = invoice.balance
 
     PaymentForm = modelform_factory(
         Payment, fields=("date", "amount", "method", "notes")
@@ -479,11 +639,9 @@ def quick_payment_create(request, invoice_pk):
 
             # Si es una petición AJAX, devolver JSON
             if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-                # Recalcular totales
-                total_paid = (
-                    invoice.payments.aggregate(total=Sum("amount"))["total"] or 0
-                )
-                balance = invoice.total_amount - total_paid
+                # Totales actualizados al registrar el pago
+                total_paid = invoice.paid_amount
+                balance = invoice.balance
 
                 return JsonResponse(
                     {
@@ -652,8 +810,7 @@ def mark_notification_as_read(request, pk):
     notification = get_object_or_404(Notification, pk=pk, agent=request.user)
 
     if request.method == "POST":
-        notification.is_read = True
-        notification.save()
+        notification.mark_as_read()
         return JsonResponse({"success": True})
 
     return JsonResponse({"success": False}, status=400)
@@ -673,6 +830,7 @@ def mark_all_notifications_as_read(request):
                 "invoice_status_change",
             ],
         ).update(is_read=True)
+        Notification.invalidate_unread_count(request.user.pk)
         return JsonResponse({"success": True})
 
     return JsonResponse({"success": False}, status=400)
@@ -813,8 +971,9 @@ def invoice_pdf(request, pk):
         "accounting/invoice_pdf.html", {"invoice": invoice, "company": company}
     )
 
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf = html.write_pdf()
+    pdf = render_cached_pdf(
+        html_string, "accounting/invoice_pdf.html", base_url=request.build_absolute_uri()
+    )
 
     response = HttpResponse(pdf, content_type="application/pdf")
     response["Content-Disposition"] = (
@@ -873,8 +1032,8 @@ def owner_receipt_detail(request, receipt_pk):
     owner_info = receipt.get_owner_info()
 
     # Calcular totales de la factura para mostrar balance
-    total_paid = receipt.invoice.payments.aggregate(total=Sum("amount"))["total"] or 0
-    balance = receipt.invoice.total_amount - total_paid
+    total_paid = receipt.invoice.paid_amount
+    balance = receipt.invoice.balance
 
     # Determinar acciones disponibles según el estado
     can_resend = receipt.can_resend()
@@ -1144,6 +1303,46 @@ def invoice_validate(request, pk):
     return JsonResponse({"error": "Método no permitido"}, status=405)
 
 
+@login_required
+def invoice_bulk_transition(request):
+    """
+    Cambia el estado de las facturas seleccionadas en una sola operación.
+
+    Acciones: ``validate``, ``send``, ``cancel`` y ``reactivate``. Las facturas
+    que no admiten el cambio se omiten y se informan en la respuesta.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    invoice_ids = request.POST.getlist("invoice_ids")
+
+    if not invoice_ids:
+        error_message = "No se seleccionaron facturas."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.warning(request, error_message)
+        return redirect("accounting:invoice_list")
+
+    try:
+        result = InvoiceTransitionService().transition(invoice_ids, request.POST.get("action", ""))
+    except (InvoiceTransitionError, ValueError) as e:
+        error_message = str(e) if isinstance(e, InvoiceTransitionError) else "Selección de facturas inválida."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.error(request, error_message)
+        return redirect("accounting:invoice_list")
+
+    if is_ajax:
+        return JsonResponse({"success": True, **result})
+
+    if result["updated"]:
+        messages.success(request, f"{result['updated']} facturas {result['label']} correctamente.")
+    if result["skipped"]:
+        messages.warning(request, f"{len(result['skipped'])} facturas no admitían el cambio y fueron omitidas.")
+    return redirect("accounting:invoice_list")
+
+
 @login_required
 def invoice_duplicate(request, pk):
     """Función para duplicar una factura existente"""
@@ -1158,13 +1357,13 @@ def invoice_duplicate(request, pk):
             date=timezone.now().date(),
             due_date=timezone.now().date() + timezone.timedelta(days=30),
             status="draft",
-            user=request.user,
             # Generar un nuevo número de factura
             number=f"COPIA-{original_invoice.number}",
         )
 
-        # Duplicar las líneas de la factura
-        for line in original_invoice.lines.all():
+        # Duplicar las líneas de la factura; el interés por mora es propio de la
+        # original y el servicio de mora lo vuelve a generar si la copia vence
+        for line in original_invoice.lines.filter(is_late_fee=False):
             InvoiceLine.objects.create(
                 invoice=new_invoice, concept=line.concept, amount=line.amount
             )
@@ -1190,85 +1389,88 @@ def invoice_duplicate(request, pk):
 def send_bulk_emails(request):
     """
     Vista para enviar correos electrónicos de manera masiva a las facturas seleccionadas.
+
+    El envío se encola en Celery; la respuesta AJAX incluye la URL para
+    consultar el avance.
     """
     if request.method != "POST":
         return redirect("accounting:invoice_list")
 
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
     # Obtener los IDs de las facturas seleccionadas
     invoice_ids = request.POST.getlist("invoice_ids")
 
     if not invoice_ids:
+        if is_ajax:
+            return JsonResponse(
+                {"success": False, "error": "No se seleccionaron facturas para enviar correos."},
+                status=400,
+            )
         messages.warning(request, "No se seleccionaron facturas para enviar correos.")
         return redirect("accounting:invoice_list")
 
-    # Obtener las facturas seleccionadas que cumplan con los requisitos:
-    # 1. El cliente debe tener correo electrónico
-    # 2. La factura debe estar en estado "validated" o "sent"
-    invoices = (
-        Invoice.objects.filter(id__in=invoice_ids, status__in=["validated", "sent"])
-        .select_related("customer")
-        .filter(customer__email__isnull=False)
-        .exclude(customer__email="")
-    )
-
-    # Contar facturas procesadas y errores
-    success_count = 0
-    error_count = 0
-    no_email_count = 0
-    invalid_status_count = 0
-
-    # Procesar cada factura
-    for invoice in invoices:
-        try:
-            # Verificar si el cliente tiene correo electrónico
-            if not invoice.customer.email:
-                no_email_count += 1
-                continue
-
-            # Verificar si la factura está en un estado válido
-            if invoice.status not in ["validated", "sent"]:
-                invalid_status_count += 1
-                continue
-
-            # Enviar el correo electrónico
-            send_invoice_email(invoice)
-
-            # Marcar la factura como enviada si estaba validada
-            if invoice.status == "validated":
-                invoice.mark_as_sent()
-
-            success_count += 1
-
-        except Exception as e:
-            error_count += 1
-            # Registrar el error para depuración
-            logger.error(f"Error al enviar correo para factura {invoice.id}: {str(e)}")
-
-    # Mostrar mensajes según los resultados
-    if success_count > 0:
-        messages.success(
-            request, f"Se enviaron correctamente {success_count} correos electrónicos."
-        )
+    try:
+        job = BulkInvoiceEmailService().create_job(invoice_ids, requested_by=request.user)
+        task = send_bulk_invoice_emails_task.delay(job.pk)
+        BulkEmailJob.objects.filter(pk=job.pk).update(celery_task_id=task.id or "")
+    except Exception as e:
+        logger.error(f"Error al iniciar el envío masivo de correos: {str(e)}")
+        if is_ajax:
+            return JsonResponse(
+                {"success": False, "error": "No se pudo iniciar el envío de correos."},
+                status=500,
+            )
+        messages.error(request, "No se pudo iniciar el envío de correos.")
+        return redirect("accounting:invoice_list")
 
-    if error_count > 0:
-        messages.error(
-            request,
-            f"Ocurrieron {error_count} errores al enviar correos. Revise el registro para más detalles.",
+    if is_ajax:
+        return JsonResponse(
+            {
+                "success": True,
+                "job_id": job.pk,
+                "status_url": reverse("accounting:bulk_email_job_status", args=[job.pk]),
+            }
         )
 
-    if no_email_count > 0:
+    messages.info(
+        request,
+        f"Se inició el envío de {job.total_count - job.skipped_count} correos electrónicos. "
+        "Las facturas se marcarán como enviadas a medida que se procesen.",
+    )
+    if job.skipped_count > 0:
         messages.warning(
             request,
-            f"{no_email_count} facturas fueron omitidas porque los clientes no tienen correo electrónico.",
+            f"{job.skipped_count} facturas fueron omitidas porque el cliente no tiene correo "
+            "electrónico o no están en estado 'Validada' o 'Enviada'.",
         )
+    return redirect("accounting:invoice_list")
 
-    if invalid_status_count > 0:
-        messages.warning(
-            request,
-            f"{invalid_status_count} facturas fueron omitidas porque no están en estado 'Validada' o 'Enviada'.",
-        )
 
-    return redirect("accounting:invoice_list")
+@login_required
+def bulk_email_job_status(request, pk):
+    """
+    Devuelve en JSON el avance de un envío masivo de facturas.
+    """
+    job = get_object_or_404(BulkEmailJob, pk=pk)
+    data = {
+        "job_id": job.pk,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "is_finished": job.is_finished,
+        "progress": job.progress_percentage(),
+        "total": job.total_count,
+        "processed": job.processed_count,
+        "sent": job.sent_count,
+        "errors": job.error_count,
+        "skipped": job.skipped_count,
+    }
+    if job.is_finished:
+        data["failures"] = list(
+            job.items.filter(status__in=["failed", "skipped"])
+            .values("invoice__number", "status", "error_message")[:50]
+        )
+    return JsonResponse(data)
 
 
 # Owner Receipt Views
@@ -1303,9 +1505,11 @@ def generate_owner_receipt(request, invoice_pk):
             )
 
             service = OwnerReceiptService()
+            # Cargar una vez los datos de la factura para validar, generar y enviar
+            context = ReceiptContext.for_invoice(invoice)
 
             # Verificar si se puede generar el comprobante
-            can_generate, error_message = service.can_generate_receipt(invoice)
+            can_generate, error_message = service.can_generate_receipt(invoice, context=context)
             if not can_generate:
                 logger.warning(
                     f"No se puede generar comprobante para factura {invoice.pk}: {error_message}"
@@ -1325,7 +1529,7 @@ def generate_owner_receipt(request, invoice_pk):
 
             # Generar el comprobante
             try:
-                receipt = service.generate_receipt(invoice, request.user)
+                receipt = service.generate_receipt(invoice, request.user, context=context)
                 logger.info(
                     f"Comprobante {receipt.receipt_number} generado exitosamente por usuario {request.user}"
                 )
@@ -1347,7 +1551,7 @@ def generate_owner_receipt(request, invoice_pk):
 
             if send_email:
                 try:
-                    service.send_receipt_email(receipt)
+                    service.send_receipt_email(receipt, context=context)
                     success_message = f"Comprobante {receipt.receipt_number} generado y enviado correctamente a {receipt.email_sent_to}."
                     logger.info(
                         f"Comprobante {receipt.receipt_number} enviado exitosamente"
@@ -1429,16 +1633,17 @@ def generate_owner_receipt(request, invoice_pk):
         from .services import OwnerReceiptService, OwnerReceiptValidationError
 
         service = OwnerReceiptService()
+        context = ReceiptContext.for_invoice(invoice)
 
         # Verificar si se puede generar
-        can_generate, error_message = service.can_generate_receipt(invoice)
+        can_generate, error_message = service.can_generate_receipt(invoice, context=context)
         if not can_generate:
             messages.error(request, error_message)
             return redirect("accounting:invoice_detail", pk=invoice.pk)
 
         # Obtener datos para preview
         try:
-            receipt_data = service.get_receipt_data(invoice)
+            receipt_data = service.get_receipt_data(invoice, context=context)
         except OwnerReceiptValidationError as e:
             messages.error(request, str(e))
             return redirect("accounting:invoice_detail", pk=invoice.pk)
@@ -1490,9 +1695,10 @@ def preview_owner_receipt(request, invoice_pk):
         from .services import OwnerReceiptService, OwnerReceiptValidationError
 
         service = OwnerReceiptService()
+        context = ReceiptContext.for_invoice(invoice)
 
         # Verificar si se puede generar
-        can_generate, error_message = service.can_generate_receipt(invoice)
+        can_generate, error_message = service.can_generate_receipt(invoice, context=context)
         if not can_generate:
             logger.warning(
                 f"No se puede previsualizar comprobante para factura {invoice.pk}: {error_message}"
@@ -1502,7 +1708,7 @@ def preview_owner_receipt(request, invoice_pk):
 
         # Obtener datos del comprobante sin generarlo
         try:
-            receipt_data = service.get_receipt_data(invoice)
+            receipt_data = service.get_receipt_data(invoice, context=context)
         except OwnerReceiptValidationError as e:
             logger.warning(
                 f"Error de validación obteniendo datos para preview de factura {invoice.pk}: {str(e)}"
@@ -1789,26 +1995,13 @@ def resend_owner_receipt(request, receipt_pk):
         return redirect("accounting:owner_receipt_detail", pk=receipt.pk)
 
 
-@login_required
-def owner_receipts_list(request):
+def _filter_owner_receipts(request, receipts_list):
     """
-    Lista todos los comprobantes generados con filtros y paginación.
+    Aplica al QuerySet de comprobantes los filtros del listado recibidos por GET.
 
-    Permite filtrar por estado, fecha, factura y buscar por número de comprobante.
+    Returns:
+        tuple: (QuerySet filtrado, dict con los valores de los filtros para el template)
     """
-    from .models_invoice import OwnerReceipt
-
-    # Obtener todos los comprobantes con relaciones
-    receipts_list = OwnerReceipt.objects.select_related(
-        "invoice",
-        "invoice__customer",
-        "invoice__contract",
-        "invoice__contract__property",
-        "generated_by",
-    ).order_by("-generated_at")
-
-    # Filtros
-
     # Búsqueda por número de comprobante o factura
     query = request.GET.get("q")
     if query:
@@ -1876,6 +2069,40 @@ def owner_receipts_list(request):
     elif has_errors == "no":
         receipts_list = receipts_list.exclude(status="failed")
 
+    return receipts_list, {
+        "query": query,
+        "status": status,
+        "date_from": date_from,
+        "date_to": date_to,
+        "generated_by": generated_by,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "has_errors": has_errors,
+    }
+
+
+@login_required
+def owner_receipts_list(request):
+    """
+    Lista todos los comprobantes generados con filtros y paginación.
+
+    Permite filtrar por estado, fecha, factura y buscar por número de comprobante.
+    """
+    from .models_invoice import OwnerReceipt
+
+    # Obtener todos los comprobantes con relaciones
+    receipts_list = OwnerReceipt.objects.select_related(
+        "invoice",
+        "invoice__customer",
+        "invoice__contract",
+        "invoice__contract__property",
+        "generated_by",
+    ).order_by("-generated_at")
+
+    receipts_list, filters = _filter_owner_receipts(request, receipts_list)
+    date_from = filters["date_from"]
+    date_to = filters["date_to"]
+
     # Paginación
     paginator = Paginator(receipts_list, 25)  # 25 comprobantes por página
     page_number = request.GET.get("page")
@@ -1895,9 +2122,8 @@ def owner_receipts_list(request):
     pending_receipts = OwnerReceipt.objects.filter(status="generated").count()
 
     context = {
+        **filters,
         "receipts": receipts,
-        "query": query,
-        "status": status,
         "date_from": (
             date_from.strftime("%Y-%m-%d")
             if hasattr(date_from, "strftime")
@@ -1906,10 +2132,6 @@ def owner_receipts_list(request):
         "date_to": (
             date_to.strftime("%Y-%m-%d") if hasattr(date_to, "strftime") else date_to
         ),
-        "generated_by": generated_by,
-        "min_amount": min_amount,
-        "max_amount": max_amount,
-        "has_errors": has_errors,
         "agents": agents,
         "total_receipts": total_receipts,
         "sent_receipts": sent_receipts,
@@ -1964,3 +2186,449 @@ def owner_receipt_pdf(request, receipt_pk):
             "Error interno al generar el PDF. Por favor, contacte al administrador del sistema.",
         )
         return redirect("accounting:owner_receipt_detail", pk=receipt.pk)
+
+
+@login_required
+def owner_receipt_batch_create(request):
+    """
+    Inicia la generación y envío masivo de comprobantes de un período.
+
+    Recibe el período en formato AAAA-MM; el proceso se ejecuta en Celery y la
+    respuesta AJAX incluye la URL para consultar el avance.
+    """
+    if request.method != "POST":
+        return redirect("accounting:owner_receipts_list")
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+    try:
+        period = timezone.datetime.strptime(request.POST.get("period", ""), "%Y-%m").date()
+    except ValueError:
+        error_message = "Indique un período válido (mes y año)."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.error(request, error_message)
+        return redirect("accounting:owner_receipts_list")
+
+    send_email = request.POST.get("send_email", "true").lower() in ("true", "on", "1")
+    only_mine = request.POST.get("only_mine", "false").lower() in ("true", "on", "1")
+
+    try:
+        job = OwnerReceiptBatchService().create_job(
+            period,
+            requested_by=request.user,
+            agent=request.user if only_mine else None,
+            send_email=send_email,
+        )
+        task = generate_owner_receipts_batch_task.delay(job.pk)
+        OwnerReceiptBatchJob.objects.filter(pk=job.pk).update(celery_task_id=task.id or "")
+    except Exception as e:
+        logger.error(f"Error al iniciar la generación masiva de comprobantes: {str(e)}")
+        error_message = "No se pudo iniciar la generación masiva de comprobantes."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=500)
+        messages.error(request, error_message)
+        return redirect("accounting:owner_receipts_list")
+
+    if is_ajax:
+        return JsonResponse(
+            {
+                "success": True,
+                "job_id": job.pk,
+                "total": job.total_count,
+                "status_url": reverse("accounting:owner_receipt_batch_status", args=[job.pk]),
+            }
+        )
+
+    messages.info(
+        request,
+        f"Se inició la generación de comprobantes de {period:%m/%Y} para {job.total_count} facturas.",
+    )
+    return redirect("accounting:owner_receipts_list")
+
+
+@login_required
+def owner_receipt_batch_status(request, pk):
+    """
+    Devuelve en JSON el avance de una generación masiva de comprobantes, total y por agente.
+    """
+    job = get_object_or_404(OwnerReceiptBatchJob, pk=pk)
+    agents = [
+        {
+            "agent_id": row["agent_id"],
+            "agent": f"{row['agent__first_name'] or ''} {row['agent__last_name'] or ''}".strip() or "Sin agente",
+            "total": row["total"],
+            "pending": row["pending"],
+            "sent": row["sent"],
+            "done": row["done"],
+            "failed": row["failed"],
+            "skipped": row["skipped"],
+        }
+        for row in job.agent_progress()
+    ]
+    return JsonResponse(
+        {
+            "job_id": job.pk,
+            "period": job.period.strftime("%m/%Y"),
+            "status": job.status,
+            "status_display": job.get_status_display(),
+            "is_finished": job.is_finished,
+            "progress": job.progress_percentage(),
+            "total": job.total_count,
+            "processed": job.processed_count,
+            "generated": job.generated_count,
+            "sent": job.sent_count,
+            "errors": job.error_count,
+            "skipped": job.skipped_count,
+            "agents": agents,
+        }
+    )
+
+
+def _parse_statement_period(value):
+    """
+    Convierte un período AAAA-MM en una fecha; si no se indica usa el mes anterior.
+    """
+    if not value:
+        return (timezone.localdate().replace(day=1) - timezone.timedelta(days=1)).replace(day=1)
+    return timezone.datetime.strptime(value, "%Y-%m").date()
+
+
+@login_required
+def owner_statement_pdf(request, owner_pk):
+    """
+    Descarga la liquidación consolidada de un propietario para un período (?period=AAAA-MM).
+    """
+    from customers.models import Customer
+
+    owner = get_object_or_404(Customer, pk=owner_pk)
+    try:
+        period = _parse_statement_period(request.GET.get("period"))
+    except ValueError:
+        messages.error(request, "Indique un período válido (mes y año).")
+        return redirect("accounting:owner_receipts_list")
+
+    try:
+        service = OwnerStatementService()
+        statement_data = service.get_statement_data(owner, period)
+        pdf_content = service.generate_pdf(owner, period, statement_data=statement_data)
+    except OwnerStatementError as e:
+        messages.error(request, str(e))
+        return redirect("accounting:owner_receipts_list")
+    except Exception as e:
+        logger.error(
+            f"Error inesperado generando la liquidación del propietario {owner_pk}: {str(e)}",
+            exc_info=True,
+        )
+        messages.error(request, "Error interno al generar la liquidación.")
+        return redirect("accounting:owner_receipts_list")
+
+    response = HttpResponse(pdf_content, content_type="application/pdf")
+    response["Content-Disposition"] = f'attachment; filename="{statement_data["filename"]}"'
+    return response
+
+
+@login_required
+def customer_statement(request, customer_pk):
+    """
+    Estado de cuenta de un cliente (?start=AAAA-MM-DD&end=AAAA-MM-DD&format=html|pdf).
+
+    El HTML se devuelve por bloques a medida que se leen los movimientos.
+    """
+    from customers.models import Customer
+
+    customer = get_object_or_404(Customer, pk=customer_pk)
+    start = _parse_report_date(request, "start")
+    end = _parse_report_date(request, "end")
+    if start and end and start > end:
+        start, end = end, start
+    service = CustomerStatementService()
+
+    if request.GET.get("format") == "pdf":
+        try:
+            pdf_content = service.generate_pdf(customer, start, end)
+        except CustomerStatementError as e:
+            messages.error(request, str(e))
+            return redirect("customers:customer_detail", pk=customer.pk)
+        except Exception as e:
+            logger.error(
+                f"Error inesperado generando el estado de cuenta del cliente {customer_pk}: {str(e)}",
+                exc_info=True,
+            )
+            messages.error(request, "Error interno al generar el estado de cuenta.")
+            return redirect("customers:customer_detail", pk=customer.pk)
+
+        response = HttpResponse(pdf_content, content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="{service.filename(customer, end)}"'
+        return response
+
+    return StreamingHttpResponse(
+        service.iter_html(customer, start, end, toolbar=True),
+        content_type="text/html; charset=utf-8",
+    )
+
+
+@login_required
+def send_owner_statement(request, owner_pk):
+    """
+    Envía por email la liquidación consolidada de un propietario para un período.
+    """
+    from customers.models import Customer
+
+    if request.method != "POST":
+        return redirect("accounting:owner_receipts_list")
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    owner = get_object_or_404(Customer, pk=owner_pk)
+
+    try:
+        period = _parse_statement_period(request.POST.get("period"))
+        totals = OwnerStatementService().send_statement(owner, period)
+    except ValueError:
+        error_message = "Indique un período válido (mes y año)."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.error(request, error_message)
+        return redirect("accounting:owner_receipts_list")
+    except OwnerStatementError as e:
+        if is_ajax:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+        messages.error(request, str(e))
+        return redirect("accounting:owner_receipts_list")
+    except Exception as e:
+        logger.error(f"Error enviando la liquidación del propietario {owner_pk}: {str(e)}", exc_info=True)
+        error_message = "No se pudo enviar la liquidación. Por favor, intente nuevamente."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=500)
+        messages.error(request, error_message)
+        return redirect("accounting:owner_receipts_list")
+
+    success_message = f"Liquidación de {period:%m/%Y} enviada a {owner.email}."
+    if is_ajax:
+        return JsonResponse(
+            {
+                "success": True,
+                "message": success_message,
+                "invoice_count": totals["invoice_count"],
+                "net_amount": str(totals["net_amount"]),
+            }
+        )
+    messages.success(request, success_message)
+    return redirect("accounting:owner_receipts_list")
+
+
+@login_required
+def send_owner_statements(request):
+    """
+    Inicia en segundo plano el envío de las liquidaciones de todos los propietarios de un período.
+    """
+    if request.method != "POST":
+        return redirect("accounting:owner_receipts_list")
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    try:
+        period = timezone.datetime.strptime(request.POST.get("period", ""), "%Y-%m").date()
+    except ValueError:
+        error_message = "Indique un período válido (mes y año)."
+        if is_ajax:
+            return JsonResponse({"success": False, "error": error_message}, status=400)
+        messages.error(request, error_message)
+        return redirect("accounting:owner_receipts_list")
+
+    owner_count = len(OwnerStatementService().owner_totals(period))
+    send_owner_statements_task.delay(period.strftime("%Y-%m"))
+
+    success_message = f"Se inició el envío de {owner_count} liquidaciones de propietarios de {period:%m/%Y}."
+    if is_ajax:
+        return JsonResponse({"success": True, "message": success_message, "owner_count": owner_count})
+    messages.info(request, success_message)
+    return redirect("accounting:owner_receipts_list")
+
+
+def _export_options(request):
+    """
+    Formato y compresión pedidos para una exportación (?format=csv|xlsx&compress=gzip).
+    """
+    file_format = request.GET.get("format", "csv").lower()
+    if file_format not in EXPORT_FORMATS:
+        file_format = "csv"
+    return file_format, request.GET.get("compress", "").lower() == "gzip"
+
+
+@login_required
+def invoice_export(request):
+    """
+    Exporta en streaming las facturas con los mismos filtros del listado.
+    """
+    invoice_list, _ = _filter_invoices(request, Invoice.objects.all())
+    file_format, compress = _export_options(request)
+    return export_response(
+        invoice_list.order_by("-date", "-id"),
+        INVOICE_EXPORT_COLUMNS,
+        "facturas",
+        file_format=file_format,
+        compress=compress,
+        sheet_name="Facturas",
+    )
+
+
+@login_required
+def payment_export(request):
+    """
+    Exporta en streaming los pagos, en el mismo orden del listado.
+    """
+    file_format, compress = _export_options(request)
+    return export_response(
+        Payment.objects.order_by("-date", "-id"),
+        PAYMENT_EXPORT_COLUMNS,
+        "pagos",
+        file_format=file_format,
+        compress=compress,
+        sheet_name="Pagos",
+    )
+
+
+@login_required
+def owner_receipt_export(request):
+    """
+    Exporta en streaming los comprobantes de propietarios con los mismos filtros del listado.
+    """
+    from .models_invoice import OwnerReceipt
+
+    receipts_list, _ = _filter_owner_receipts(request, OwnerReceipt.objects.all())
+    file_format, compress = _export_options(request)
+    return export_response(
+        receipts_list.order_by("-generated_at", "-id"),
+        OWNER_RECEIPT_EXPORT_COLUMNS,
+        "comprobantes_propietarios",
+        file_format=file_format,
+        compress=compress,
+        sheet_name="Comprobantes",
+    )
+
+
+def _parse_report_date(request, name):
+    """
+    Lee una fecha AAAA-MM-DD de los parámetros GET; None si falta o es inválida.
+    """
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return timezone.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        messages.warning(request, f"Formato de fecha incorrecto: {value}. Use YYYY-MM-DD.")
+        return None
+
+
+@login_required
+def aging_report(request):
+    """
+    Reporte de antigüedad de saldos por cliente, agente o propiedad.
+
+    Parámetros GET: ``group_by`` (customer/agent/property), ``date`` (fecha del
+    reporte; las fechas pasadas se leen de las instantáneas diarias),
+    ``compare_to`` (instantánea a comparar) y ``format`` (html, csv, xlsx o json).
+    """
+    dimension = request.GET.get("group_by", "customer")
+    if dimension not in AGING_DIMENSIONS:
+        dimension = "customer"
+    as_of = _parse_report_date(request, "date")
+    if as_of and as_of > timezone.localdate():
+        as_of = None
+    compare_to = _parse_report_date(request, "compare_to")
+
+    report = get_aging_report(dimension, as_of=as_of, compare_to=compare_to)
+    file_format = request.GET.get("format", "html").lower()
+
+    if file_format == "json":
+        return JsonResponse(report)
+
+    if file_format in EXPORT_FORMATS:
+        rows = (
+            [row[column.field] for column in AGING_EXPORT_COLUMNS] for row in report["rows"]
+        )
+        return rows_response(
+            AGING_EXPORT_COLUMNS,
+            rows,
+            f"antiguedad_saldos_{dimension}_{report['as_of']:%Y%m%d}",
+            file_format=file_format,
+            compress=request.GET.get("compress", "").lower() == "gzip",
+            sheet_name="Antigüedad de Saldos",
+        )
+
+    # Montos en el orden de las columnas de la tabla
+    for row in report["rows"]:
+        row["amounts"] = [row[key] for key in AMOUNT_KEYS]
+    report["totals"]["amounts"] = [report["totals"][key] for key in AMOUNT_KEYS]
+    if report["comparison"]:
+        report["comparison"]["amounts"] = [report["comparison"]["totals"][key] for key in AMOUNT_KEYS]
+        report["comparison"]["delta_amounts"] = [report["comparison"]["delta"][key] for key in AMOUNT_KEYS]
+
+    context = {
+        **report,
+        "buckets": [title for _, title, _, _ in AGING_BUCKETS],
+        "dimensions": AgingSnapshot.DIMENSION_CHOICES,
+        "dimension_label": dict(AgingSnapshot.DIMENSION_CHOICES)[dimension],
+        "compare_to": compare_to,
+    }
+    return render(request, "accounting/aging_report.html", context)
+
+
+@login_required
+def accounting_periods(request):
+    """
+    Lista los meses contables cerrados y permite cerrar el siguiente o reabrir el último.
+
+    POST: ``action`` (``close`` o ``reopen``), ``month`` (AAAA-MM, para cerrar)
+    y ``period_id`` (para reabrir). Solo el personal administrativo puede
+    cerrar o reabrir períodos.
+    """
+    if request.method == "POST":
+        is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+        if not request.user.is_staff:
+            error_message = "Solo el personal administrativo puede cerrar o reabrir períodos."
+            if is_ajax:
+                return JsonResponse({"success": False, "error": error_message}, status=403)
+            messages.error(request, error_message)
+            return redirect("accounting:accounting_periods")
+
+        service = PeriodCloseService()
+        try:
+            if request.POST.get("action") == "reopen":
+                period = get_object_or_404(AccountingPeriod, pk=request.POST.get("period_id"))
+                service.reopen(period)
+                message = f"Se reabrió el período {period}."
+            else:
+                try:
+                    month = timezone.datetime.strptime(request.POST.get("month", ""), "%Y-%m").date()
+                except ValueError:
+                    raise AccountingPeriodError("Seleccione un mes válido (AAAA-MM).")
+                period = service.close(month, user=request.user)
+                message = f"Se cerró el período {period}."
+        except AccountingPeriodError as e:
+            if is_ajax:
+                return JsonResponse({"success": False, "error": str(e)}, status=400)
+            messages.error(request, str(e))
+            return redirect("accounting:accounting_periods")
+
+        if is_ajax:
+            return JsonResponse({"success": True, "message": message})
+        messages.success(request, message)
+        return redirect("accounting:accounting_periods")
+
+    periods = list(
+        AccountingPeriod.objects.select_related("closed_by").annotate(balance_count=Count("balances"))
+    )
+    today = timezone.localdate()
+    if periods:
+        next_month = periods[0].period_end + timezone.timedelta(days=1)
+    else:
+        next_month = (today.replace(day=1) - timezone.timedelta(days=1)).replace(day=1)
+
+    context = {
+        "periods": periods,
+        "latest_period": periods[0] if periods else None,
+        "next_month": next_month if next_month < today.replace(day=1) else None,
+    }
+    return render(request, "accounting/accounting_periods.html", context)
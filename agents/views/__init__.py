@@ -15,6 +15,10 @@ from properties.models import Property
 from contracts.models import Contract
 from customers.models import Customer
 from payments.models import ContractPayment
+from accounting.service_modules.period_close_service import (
+    agent_monthly_collections,
+    recent_months,
+)
 
 
 def agent_login(request):
@@ -197,23 +201,12 @@ def dashboard(request):
 
     # Datos para gráficos
     # Ingresos por mes (últimos 6 meses)
-    months_data = []
-    for i in range(5, -1, -1):
-        month_start = (today.replace(day=1) - timedelta(days=i * 30)).replace(day=1)
-        month_end = month_start.replace(
-            month=month_start.month + 1 if month_start.month < 12 else 1,
-            year=month_start.year if month_start.month < 12 else month_start.year + 1,
-        ) - timedelta(days=1)
-
-        month_payments = ContractPayment.objects.filter(
-            contract__agent=request.user, payment_date__range=[month_start, month_end]
-        ).aggregate(total=Sum("amount"))
-
-        month_total = month_payments["total"] if month_payments["total"] else 0
-
-        months_data.append(
-            {"month": month_start.strftime("%b %Y"), "income": float(month_total)}
-        )
+    # Los meses cerrados se leen de los saldos de cierre contable
+    monthly_income = agent_monthly_collections(request.user, recent_months(today, 6))
+    months_data = [
+        {"month": month_start.strftime("%b %Y"), "income": float(month_total)}
+        for month_start, month_total in monthly_income.items()
+    ]
 
     # Propiedades por tipo (para gráfico de pastel)
     property_types_chart = list(property_types)
@@ -344,23 +337,12 @@ def dashboard_data(request):
     period_income = period_payments["total"] if period_payments["total"] else 0
 
     # Ingresos por mes (últimos 6 meses)
-    months_data = []
-    for i in range(5, -1, -1):
-        month_start = (today.replace(day=1) - timedelta(days=i * 30)).replace(day=1)
-        month_end = month_start.replace(
-            month=month_start.month + 1 if month_start.month < 12 else 1,
-            year=month_start.year if month_start.month < 12 else month_start.year + 1,
-        ) - timedelta(days=1)
-
-        month_payments = ContractPayment.objects.filter(
-            contract__agent=request.user, payment_date__range=[month_start, month_end]
-        ).aggregate(total=Sum("amount"))
-
-        month_total = month_payments["total"] if month_payments["total"] else 0
-
-        months_data.append(
-            {"month": month_start.strftime("%b %Y"), "income": float(month_total)}
-        )
+    # Los meses cerrados se leen de los saldos de cierre contable
+    monthly_income = agent_monthly_collections(request.user, recent_months(today, 6))
+    months_data = [
+        {"month": month_start.strftime("%b %Y"), "income": float(month_total)}
+        for month_start, month_total in monthly_income.items()
+    ]
 
     # Actividad de contratos (nuevos vs expirados por mes)
     contract_activity = []
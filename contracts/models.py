@@ -1,11 +1,11 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from core.models import BaseModel
+from core.models import BaseModel, FieldTrackerMixin
 from decimal import Decimal
 
 
-class Contract(BaseModel):
+class Contract(FieldTrackerMixin, BaseModel):
     """
     Modelo de Contrato que representa acuerdos entre clientes y propietarios.
     
@@ -68,6 +68,9 @@ class Contract(BaseModel):
         default=STATUS_DRAFT,
         verbose_name="Estado del Contrato"
     )
+
+    # Valores originales disponibles en las señales sin releer la fila
+    tracked_fields = ('status', 'amount')
     
     class Meta:
         verbose_name = "Contrato"
@@ -18,6 +18,78 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class FieldTrackerMixin:
+    """
+    Mixin que conserva los valores originales de los campos indicados en ``tracked_fields``.
+
+    Los valores se toman al construir la instancia (incluida la carga desde la
+    base de datos con ``from_db``) y se renuevan después de guardarla o
+    refrescarla, de modo que las señales pre_save/post_save pueden saber qué
+    cambió sin volver a consultar la base de datos.
+
+    Los campos diferidos (``only()``/``defer()``) no se registran y se
+    consideran sin cambios.
+    """
+
+    tracked_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked_values = {}
+        self._snapshot_tracked_fields()
+
+    def _tracked_attname(self, name):
+        return self._meta.get_field(name).attname
+
+    def _snapshot_tracked_fields(self, fields=None):
+        for name in self.tracked_fields:
+            if fields is not None and name not in fields:
+                continue
+            attname = self._tracked_attname(name)
+            if attname in self.__dict__:
+                self._tracked_values[name] = self.__dict__[attname]
+
+    def previous_value(self, name):
+        """
+        Devuelve el valor que tenía el campo al cargarse o guardarse por última vez.
+
+        Returns:
+            El valor original, o None si el campo no se registró
+        """
+        return self._tracked_values.get(name)
+
+    def has_field_changed(self, name):
+        """
+        Indica si el campo cambió desde que se cargó o guardó la instancia.
+        """
+        attname = self._tracked_attname(name)
+        if name not in self._tracked_values or attname not in self.__dict__:
+            return False
+        return self._tracked_values[name] != self.__dict__[attname]
+
+    def changed_fields(self):
+        """
+        Devuelve los campos registrados que cambiaron.
+
+        Returns:
+            dict: Nombre del campo -> (valor original, valor actual)
+        """
+        return {
+            name: (self._tracked_values[name], self.__dict__[self._tracked_attname(name)])
+            for name in self.tracked_fields
+            if self.has_field_changed(name)
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Las señales post_save ya vieron los valores anteriores
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_tracked_fields(fields)
+
+
 class Company(models.Model):
     """
     Modelo para almacenar información de la empresa inmobiliaria.
@@ -29,6 +29,7 @@ from .services.company_configuration_service import CompanyConfigurationService
 from .services.document_template_service import DocumentTemplateService
 from .services.backup_service import BackupService
 
+from accounting.service_modules.period_close_service import contract_collections_total
 from contracts.models import Contract
 from payments.models import ContractPayment
 from properties.models import Property, PropertyType, PropertyStatus
@@ -64,8 +65,10 @@ def dashboard(request):
         contract__in=rent_contracts, 
         status='paid'
     )
-    rent_income = rent_payments.aggregate(total=Sum('amount'))['total'] or 0
-    rent_count = rent_payments.count()
+    # Acumulado al último cierre contable más los cobros posteriores
+    rent_collections = contract_collections_total(rent_contracts)
+    rent_income = rent_collections['total']
+    rent_count = rent_collections['count']
 
     # Pagos pendientes
     pending_payments_qs = ContractPayment.objects.filter(status='pending')
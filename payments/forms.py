@@ -1,5 +1,6 @@
 
 from django import forms
+from accounting.models_invoice import AccountingPeriod
 from .models import ContractPayment, PaymentMethod
 
 
@@ -18,6 +19,20 @@ class ContractPaymentForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Los cobros con fecha en un período contable cerrado no se pueden modificar
+        dates = []
+        if cleaned_data.get('status') == 'paid':
+            dates.append(cleaned_data.get('payment_date'))
+        if self.instance.pk and self.instance.previous_value('status') == 'paid':
+            dates.append(self.instance.previous_value('payment_date'))
+        try:
+            AccountingPeriod.check_open(*dates, subject="el cobro del contrato")
+        except forms.ValidationError as e:
+            self.add_error(None, e)
+        return cleaned_data
+
 
 class PaymentMethodForm(forms.ModelForm):
     class Meta:
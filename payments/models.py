@@ -1,6 +1,6 @@
 
 from django.db import models
-from core.models import BaseModel
+from core.models import BaseModel, FieldTrackerMixin
 
 
 class PaymentMethod(BaseModel):
@@ -23,7 +23,7 @@ class PaymentMethod(BaseModel):
         return self.name
 
 
-class ContractPayment(BaseModel):
+class ContractPayment(FieldTrackerMixin, BaseModel):
     """
     Modelo que representa los pagos asociados a contratos inmobiliarios.
     
@@ -51,6 +51,9 @@ class ContractPayment(BaseModel):
     # Additional Information
     receipt_number = models.CharField(max_length=100, blank=True, verbose_name="Número de Recibo")
     notes = models.TextField(blank=True, verbose_name="Notas")
+
+    # Valores originales para verificar el cierre de períodos contables sin releer la fila
+    tracked_fields = ('status', 'amount', 'payment_date', 'contract')
     
     class Meta:
         verbose_name = "Pago de Contrato"
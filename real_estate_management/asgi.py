@@ -1,6 +1,8 @@
-
 """
 ASGI config for real_estate_management project.
+
+Besides the Django application it serves the live notification stream
+(server-sent events) at ``NOTIFICATION_STREAM_CONFIG['path']``.
 """
 
 import os
@@ -9,4 +11,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'real_estate_management.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de inicializar Django
+from user_notifications.streams import NotificationStreamRouter  # noqa: E402
+
+application = NotificationStreamRouter(django_application)
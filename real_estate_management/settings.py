@@ -98,6 +98,24 @@ CELERY_BEAT_SCHEDULE = {
         }
     },
     
+    # Accounts-receivable aging snapshot - daily at 11:30 PM
+    'take-aging-snapshot': {
+        'task': 'accounting.tasks.take_aging_snapshot_task',
+        'schedule': crontab(hour=23, minute=30),
+        'options': {
+            'expires': 3600,
+        }
+    },
+
+    # Late-fee interest accrual on overdue invoices - daily at 12:30 AM
+    'accrue-late-fees': {
+        'task': 'accounting.tasks.accrue_late_fees_task',
+        'schedule': crontab(hour=0, minute=30),
+        'options': {
+            'expires': 3600,
+        }
+    },
+    
     # Process notification batches - daily at 6:00 PM
     'process-notification-batches': {
         'task': 'user_notifications.tasks.process_notification_batches',
@@ -113,6 +131,15 @@ CELERY_BEAT_SCHEDULE = {
             }
         }
     },
+
+    # Reconcile cached unread notification counters - every 15 minutes
+    'reconcile-unread-notification-counts': {
+        'task': 'user_notifications.tasks.reconcile_unread_notification_counts',
+        'schedule': crontab(minute='*/15'),
+        'options': {
+            'expires': 600,
+        }
+    },
 }
 
 # Additional Celery configuration for monitoring and failure handling
@@ -227,6 +254,16 @@ DATABASES = {
     }
 }
 
+# Cache shared by the web and Celery processes (unread notification counters,
+# dashboard KPIs): a per-process LocMemCache would drift between workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default=CELERY_BROKER_URL),
+        'KEY_PREFIX': 'realtor',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -497,3 +534,42 @@ PERFORMANCE_MONITORING_CONFIG = {
         'error_rate': 5,        # errors per minute
     }
 }
+
+# PDF rendering configuration (WeasyPrint worker process pool)
+PDF_RENDER_CONFIG = {
+    'use_process_pool': config('PDF_RENDER_USE_PROCESS_POOL', default=True, cast=bool),
+    'workers': config('PDF_RENDER_WORKERS', default=2, cast=int),
+    'max_pending_jobs': config('PDF_RENDER_MAX_PENDING_JOBS', default=32, cast=int),
+    'job_timeout': 60,    # seconds per document, counted from enqueue
+    'queue_timeout': 10,  # seconds waiting for a free slot in the queue
+    'start_method': 'spawn',
+}
+
+# Rendered PDF cache (content-addressed, stored under MEDIA_ROOT)
+PDF_CACHE_CONFIG = {
+    'enabled': config('PDF_CACHE_ENABLED', default=True, cast=bool),
+    'directory': 'pdf_cache',
+    'max_size_mb': config('PDF_CACHE_MAX_SIZE_MB', default=512, cast=int),
+    'template_version': '1',  # bump to invalidate every cached PDF
+    'eviction_interval': 20,  # writes between size checks
+}
+
+# Accounting dashboard KPI snapshot (invalidated on invoice/payment changes)
+ACCOUNTING_DASHBOARD_CONFIG = {
+    'enabled': True,
+    'cache_timeout': 60,  # seconds
+}
+
+# Live notification stream (server-sent events served by asgi.py, fed by Redis pub/sub)
+NOTIFICATION_STREAM_CONFIG = {
+    'enabled': config('NOTIFICATION_STREAM_ENABLED', default=True, cast=bool),
+    'redis_url': config('NOTIFICATION_STREAM_REDIS_URL', default=CELERY_BROKER_URL),
+    'path': '/notifications/stream/',
+    'keepalive_seconds': 15,
+}
+
+# Bank statement reconciliation against open invoices
+ACCOUNTING_RECONCILIATION_CONFIG = {
+    'due_date_window_days': 10,      # amount-only matches must fall this close to the due date
+    'auto_apply_confidence': '0.90',  # matches at or above this score are preselected
+}
@@ -299,10 +299,36 @@ class NotificationManager {
         }
     }
 
-    // Method to handle real-time updates (can be extended with WebSockets)
+    // Method to handle real-time updates: server-sent events with polling fallback
     startRealTimeUpdates() {
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+
+        const source = new EventSource('/notifications/stream/');
+        source.addEventListener('notification', (event) => {
+            const data = JSON.parse(event.data);
+            if (typeof data.unread_count === 'number') {
+                this.updateUnreadCount(data.unread_count);
+            } else {
+                this.updateNotificationCount();
+            }
+        });
+        source.onerror = () => {
+            // The browser reconnects on its own; a closed stream means it is not served (e.g. WSGI)
+            if (source.readyState === EventSource.CLOSED) {
+                this.startPolling();
+            }
+        };
+    }
+
+    startPolling() {
+        if (this.pollingInterval) {
+            return;
+        }
         // Poll for updates every 30 seconds
-        setInterval(() => {
+        this.pollingInterval = setInterval(() => {
             this.updateNotificationCount();
         }, 30000);
     }
@@ -622,11 +622,95 @@ const OwnerReceipts = {
         }
     },
 
+    /**
+     * Start a period batch job and poll its progress
+     */
+    initBatchGeneration: function() {
+        const form = document.getElementById('batchReceiptsForm');
+        if (!form) {
+            return;
+        }
+
+        form.addEventListener('submit', (e) => {
+            e.preventDefault();
+            const submitButton = document.getElementById('batchReceiptsSubmit');
+            submitButton.disabled = true;
+
+            fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'X-CSRFToken': this.getCSRFToken()
+                }
+            })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        submitButton.disabled = false;
+                        this.showAlert('danger', data.error || 'No se pudo iniciar la generación de comprobantes.');
+                        return;
+                    }
+                    document.getElementById('batchProgress').classList.remove('d-none');
+                    this.pollBatchJob(data.status_url, submitButton);
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    submitButton.disabled = false;
+                    this.showAlert('danger', 'Error de conexión al iniciar la generación de comprobantes.');
+                });
+        });
+    },
+
+    pollBatchJob: function(statusUrl, submitButton) {
+        fetch(statusUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(data => {
+                document.getElementById('batchProgressBar').style.width = data.progress + '%';
+                document.getElementById('batchProgressLabel').textContent =
+                    `${data.status_display} - Período ${data.period}`;
+                document.getElementById('batchProgressCount').textContent =
+                    `${data.processed} de ${data.total}`;
+                document.getElementById('batchAgentProgress').innerHTML = data.agents.map(row => `
+                    <tr>
+                        <td>${row.agent}</td>
+                        <td class="text-end">${row.total}</td>
+                        <td class="text-end">${row.pending}</td>
+                        <td class="text-end">${row.sent}</td>
+                        <td class="text-end">${row.done}</td>
+                        <td class="text-end">${row.failed}</td>
+                        <td class="text-end">${row.skipped}</td>
+                    </tr>
+                `).join('');
+
+                if (!data.is_finished) {
+                    setTimeout(() => this.pollBatchJob(statusUrl, submitButton), 2000);
+                    return;
+                }
+
+                submitButton.disabled = false;
+                if (data.status === 'completed') {
+                    this.showAlert(
+                        data.errors > 0 ? 'warning' : 'success',
+                        `Comprobantes generados: ${data.generated}. Enviados: ${data.sent}. Errores: ${data.errors}. Omitidas: ${data.skipped}.`,
+                        10000
+                    );
+                } else {
+                    this.showAlert('danger', 'La generación de comprobantes se interrumpió. Revise el registro para más detalles.');
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                setTimeout(() => this.pollBatchJob(statusUrl, submitButton), 5000);
+            });
+    },
+
     /**
      * Initialize owner receipts functionality
      */
     init: function() {
         this.initTooltips();
+        this.initBatchGeneration();
         this.initFormHandling();
         this.initAjaxHandlers();
         this.initKeyboardShortcuts();
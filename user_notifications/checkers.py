@@ -12,7 +12,11 @@ from django.utils import timezone
 from django.db.models import Q
 from contracts.models import Contract
 from accounting.models_invoice import Invoice
-from .services import create_notification_if_not_exists
+from .services import (
+    NotificationRunContext,
+    bulk_create_notifications_if_not_exist,
+    create_notification_if_not_exists,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +29,13 @@ class ContractExpirationChecker:
     and creating appropriate notifications based on urgency levels.
     """
     
-    def __init__(self):
+    def __init__(self, context=None):
+        """
+        Args:
+            context (NotificationRunContext): Shared run state with the preloaded
+                preferences (default: a new context for this checker)
+        """
+        self.context = context or NotificationRunContext()
         self.today = timezone.now().date()
     
     def get_expiring_contracts(self, days_threshold=30):
@@ -71,24 +81,19 @@ class ContractExpirationChecker:
         Returns:
             bool: True if notification should be created
         """
-        # Check if agent has notification preferences
-        try:
-            from .models_preferences import NotificationPreference
-            preferences = NotificationPreference.objects.get(agent=contract.agent)
-            
-            # Check if contract expiration notifications are enabled
-            return preferences.receive_contract_expiration
-        except NotificationPreference.DoesNotExist:
-            # Default to creating notifications if no preferences set
-            return True
+        # Contract expiration preference; defaults to True if no preferences set
+        return self.context.allows(contract.agent_id, notification_type)
     
-    def create_expiration_notification(self, contract, days_until_expiry):
+    def build_expiration_notification(self, contract, days_until_expiry):
         """
-        Create an expiration notification for a contract.
+        Build the expiration notification data for a contract.
         
         Args:
             contract (Contract): The contract that is expiring
             days_until_expiry (int): Number of days until expiry (negative if expired)
+            
+        Returns:
+            dict: Candidate notification for bulk_create_notifications_if_not_exist
         """
         if days_until_expiry < 0:
             # Contract has expired
@@ -122,13 +127,26 @@ class ContractExpirationChecker:
             )
             notification_type = 'contract_expiring_soon'
         
+        return {
+            'agent': contract.agent,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'related_object': contract,
+        }
+    
+    def create_expiration_notification(self, contract, days_until_expiry):
+        """
+        Create an expiration notification for a contract.
+        
+        Args:
+            contract (Contract): The contract that is expiring
+            days_until_expiry (int): Number of days until expiry (negative if expired)
+        """
         notification, created = create_notification_if_not_exists(
-            agent=contract.agent,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            related_object=contract,
-            duplicate_threshold_days=1
+            **self.build_expiration_notification(contract, days_until_expiry),
+            duplicate_threshold_days=1,
+            context=self.context
         )
         return notification
     
@@ -146,14 +164,14 @@ class ContractExpirationChecker:
             'total_notifications': 0
         }
         
+        candidates = []
+        
         # Check expired contracts
         expired_contracts = self.get_expired_contracts()
         for contract in expired_contracts:
             if self.should_notify(contract, 'contract_expired'):
                 days_until_expiry = (contract.end_date - self.today).days
-                notification = self.create_expiration_notification(contract, days_until_expiry)
-                if notification:  # Only count if notification was actually created (not duplicate)
-                    results['expired_notifications'] += 1
+                candidates.append(self.build_expiration_notification(contract, days_until_expiry))
         
         # Check contracts expiring within 7 days
         urgent_contracts = self.get_expiring_contracts(7)
@@ -161,9 +179,7 @@ class ContractExpirationChecker:
             if self.should_notify(contract, 'contract_expiring_urgent'):
                 days_until_expiry = (contract.end_date - self.today).days
                 if days_until_expiry <= 7:  # Double check to avoid duplicates
-                    notification = self.create_expiration_notification(contract, days_until_expiry)
-                    if notification:  # Only count if notification was actually created (not duplicate)
-                        results['urgent_notifications'] += 1
+                    candidates.append(self.build_expiration_notification(contract, days_until_expiry))
         
         # Check contracts expiring within 30 days (but not within 7 days)
         advance_contracts = self.get_expiring_contracts(30).exclude(
@@ -172,9 +188,16 @@ class ContractExpirationChecker:
         for contract in advance_contracts:
             if self.should_notify(contract, 'contract_expiring_soon'):
                 days_until_expiry = (contract.end_date - self.today).days
-                notification = self.create_expiration_notification(contract, days_until_expiry)
-                if notification:  # Only count if notification was actually created (not duplicate)
-                    results['advance_notifications'] += 1
+                candidates.append(self.build_expiration_notification(contract, days_until_expiry))
+        
+        # Only count notifications actually created (not duplicates)
+        counters = {
+            'contract_expired': 'expired_notifications',
+            'contract_expiring_urgent': 'urgent_notifications',
+            'contract_expiring_soon': 'advance_notifications',
+        }
+        for notification in bulk_create_notifications_if_not_exist(candidates, context=self.context):
+            results[counters[notification.notification_type]] += 1
         
         results['total_notifications'] = (
             results['expired_notifications'] + 
@@ -193,19 +216,29 @@ class InvoiceOverdueChecker:
     escalating notifications based on how long they have been overdue.
     """
     
-    def __init__(self):
+    def __init__(self, context=None):
+        """
+        Args:
+            context (NotificationRunContext): Shared run state with the preloaded
+                preferences (default: a new context for this checker)
+        """
+        self.context = context or NotificationRunContext()
         self.today = timezone.now().date()
     
     def get_overdue_invoices(self):
         """
         Get invoices that are overdue with outstanding balances.
         
+        The outstanding balance is filtered in SQL on the stored ``balance``
+        column, so the rows already carry the value used in the messages.
+        
         Returns:
             QuerySet: Overdue invoices with balances > 0
         """
         return Invoice.objects.filter(
             due_date__lt=self.today,
-            status__in=['validated', 'sent']  # Exclude draft, paid, and cancelled
+            status__in=['validated', 'sent'],  # Exclude draft, paid, and cancelled
+            balance__gt=0
         ).select_related('customer', 'contract__agent')
     
     def calculate_days_overdue(self, invoice):
@@ -236,26 +269,26 @@ class InvoiceOverdueChecker:
         if not agent:
             return False
         
-        try:
-            from .models_preferences import NotificationPreference
-            preferences = NotificationPreference.objects.get(agent=agent)
-            return preferences.receive_invoice_overdue and preferences.email_notifications
-        except NotificationPreference.DoesNotExist:
-            return True
+        return self.context.allows(agent, notification_type, require_email=True)
     
-    def create_overdue_notification(self, invoice, days_overdue):
+    def build_overdue_notification(self, invoice, days_overdue, balance=None):
         """
-        Create an overdue notification for an invoice.
+        Build the overdue notification data for an invoice.
         
         Args:
             invoice (Invoice): The overdue invoice
             days_overdue (int): Number of days the invoice is overdue
+            balance (Decimal, optional): Outstanding balance already loaded with the invoice
+            
+        Returns:
+            dict: Candidate notification, or None if the invoice has no agent
         """
         agent = invoice.contract.agent if invoice.contract else None
         if not agent:
             return None
         
-        balance = invoice.get_balance()
+        if balance is None:
+            balance = invoice.get_balance()
         
         if days_overdue >= 30:
             # Critical overdue - 30+ days
@@ -287,13 +320,30 @@ class InvoiceOverdueChecker:
             )
             notification_type = 'invoice_overdue'
         
+        return {
+            'agent': agent,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'related_object': invoice,
+        }
+    
+    def create_overdue_notification(self, invoice, days_overdue):
+        """
+        Create an overdue notification for an invoice.
+        
+        Args:
+            invoice (Invoice): The overdue invoice
+            days_overdue (int): Number of days the invoice is overdue
+        """
+        candidate = self.build_overdue_notification(invoice, days_overdue)
+        if candidate is None:
+            return None
+        
         notification, created = create_notification_if_not_exists(
-            agent=agent,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            related_object=invoice,
-            duplicate_threshold_days=1
+            **candidate,
+            duplicate_threshold_days=1,
+            context=self.context
         )
         return notification
     
@@ -312,20 +362,22 @@ class InvoiceOverdueChecker:
         }
         
         overdue_invoices = self.get_overdue_invoices()
+        candidates = []
         
+        # The queryset only returns invoices with outstanding balances
         for invoice in overdue_invoices:
-            # Only process invoices with outstanding balances
-            if invoice.get_balance() > 0:
-                if self.should_notify(invoice, 'invoice_overdue'):
-                    days_overdue = self.calculate_days_overdue(invoice)
-                    self.create_overdue_notification(invoice, days_overdue)
-                    
-                    if days_overdue >= 30:
-                        results['critical_overdue'] += 1
-                    elif days_overdue >= 7:
-                        results['urgent_overdue'] += 1
-                    else:
-                        results['standard_overdue'] += 1
+            if self.should_notify(invoice, 'invoice_overdue'):
+                days_overdue = self.calculate_days_overdue(invoice)
+                candidates.append(self.build_overdue_notification(invoice, days_overdue, invoice.balance))
+        
+        # Only count notifications actually created (not duplicates)
+        counters = {
+            'invoice_overdue': 'standard_overdue',
+            'invoice_overdue_urgent': 'urgent_overdue',
+            'invoice_overdue_critical': 'critical_overdue',
+        }
+        for notification in bulk_create_notifications_if_not_exist(candidates, context=self.context):
+            results[counters[notification.notification_type]] += 1
         
         results['total_notifications'] = (
             results['standard_overdue'] + 
@@ -345,7 +397,13 @@ class RentIncreaseChecker:
     and provides methods for calculating next increase dates.
     """
     
-    def __init__(self):
+    def __init__(self, context=None):
+        """
+        Args:
+            context (NotificationRunContext): Shared run state with the preloaded
+                preferences (default: a new context for this checker)
+        """
+        self.context = context or NotificationRunContext()
         self.today = timezone.now().date()
     
     def get_contracts_with_increases_due(self, days_threshold=7):
@@ -390,12 +448,7 @@ class RentIncreaseChecker:
         Returns:
             bool: True if notification should be created
         """
-        try:
-            from .models_preferences import NotificationPreference
-            preferences = NotificationPreference.objects.get(agent=contract.agent)
-            return preferences.receive_rent_increase and preferences.email_notifications
-        except NotificationPreference.DoesNotExist:
-            return True
+        return self.context.allows(contract.agent_id, notification_type, require_email=True)
     
     def calculate_days_until_increase(self, contract):
         """
@@ -515,13 +568,16 @@ class RentIncreaseChecker:
         
         return None
     
-    def create_rent_increase_notification(self, contract, days_until_increase):
+    def build_rent_increase_notification(self, contract, days_until_increase):
         """
-        Create a rent increase notification for a contract.
+        Build the rent increase notification data for a contract.
         
         Args:
             contract (Contract): The contract with rent increase due
             days_until_increase (int): Days until increase (negative if overdue)
+            
+        Returns:
+            dict: Candidate notification for bulk_create_notifications_if_not_exist
         """
         frequency_display = self.get_increase_frequency_display(contract)
         
@@ -552,13 +608,26 @@ class RentIncreaseChecker:
             )
             notification_type = 'rent_increase_due'
         
+        return {
+            'agent': contract.agent,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'related_object': contract,
+        }
+    
+    def create_rent_increase_notification(self, contract, days_until_increase):
+        """
+        Create a rent increase notification for a contract.
+        
+        Args:
+            contract (Contract): The contract with rent increase due
+            days_until_increase (int): Days until increase (negative if overdue)
+        """
         notification, created = create_notification_if_not_exists(
-            agent=contract.agent,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            related_object=contract,
-            duplicate_threshold_days=1
+            **self.build_rent_increase_notification(contract, days_until_increase),
+            duplicate_threshold_days=1,
+            context=self.context
         )
         return notification, created
     
@@ -576,15 +645,15 @@ class RentIncreaseChecker:
             'contracts_processed': 0
         }
         
+        candidates = []
+        
         # Check overdue increases
         overdue_contracts = self.get_overdue_increases()
         for contract in overdue_contracts:
             results['contracts_processed'] += 1
             if self.should_notify(contract, 'rent_increase_overdue'):
                 days_until_increase = self.calculate_days_until_increase(contract)
-                notification, created = self.create_rent_increase_notification(contract, days_until_increase)
-                if created:
-                    results['overdue_increases'] += 1
+                candidates.append(self.build_rent_increase_notification(contract, days_until_increase))
         
         # Check upcoming increases (within 7 days, but not overdue)
         upcoming_contracts = self.get_contracts_with_increases_due(7).filter(
@@ -594,9 +663,14 @@ class RentIncreaseChecker:
             results['contracts_processed'] += 1
             if self.should_notify(contract, 'rent_increase_due'):
                 days_until_increase = self.calculate_days_until_increase(contract)
-                notification, created = self.create_rent_increase_notification(contract, days_until_increase)
-                if created:
-                    results['upcoming_increases'] += 1
+                candidates.append(self.build_rent_increase_notification(contract, days_until_increase))
+        
+        counters = {
+            'rent_increase_overdue': 'overdue_increases',
+            'rent_increase_due': 'upcoming_increases',
+        }
+        for notification in bulk_create_notifications_if_not_exist(candidates, context=self.context):
+            results[counters[notification.notification_type]] += 1
         
         results['total_notifications'] = (
             results['overdue_increases'] + 
@@ -753,7 +827,13 @@ class InvoiceDueSoonChecker:
     their due dates and creating advance notice notifications.
     """
     
-    def __init__(self):
+    def __init__(self, context=None):
+        """
+        Args:
+            context (NotificationRunContext): Shared run state with the preloaded
+                preferences (default: a new context for this checker)
+        """
+        self.context = context or NotificationRunContext()
         self.today = timezone.now().date()
     
     def get_due_soon_invoices(self, days_threshold=7):
@@ -764,14 +844,15 @@ class InvoiceDueSoonChecker:
             days_threshold (int): Number of days to look ahead
             
         Returns:
-            QuerySet: Invoices due within the threshold
+            QuerySet: Invoices due within the threshold with balances > 0
         """
         threshold_date = self.today + timedelta(days=days_threshold)
         
         return Invoice.objects.filter(
             due_date__lte=threshold_date,
             due_date__gte=self.today,
-            status__in=['validated', 'sent']  # Exclude draft, paid, and cancelled
+            status__in=['validated', 'sent'],  # Exclude draft, paid, and cancelled
+            balance__gt=0
         ).select_related('customer', 'contract__agent')
     
     def calculate_days_until_due(self, invoice):
@@ -801,26 +882,26 @@ class InvoiceDueSoonChecker:
         if not agent:
             return False
         
-        try:
-            from .models_preferences import NotificationPreference
-            preferences = NotificationPreference.objects.get(agent=agent)
-            return preferences.receive_invoice_due_soon and preferences.email_notifications
-        except NotificationPreference.DoesNotExist:
-            return True
+        return self.context.allows(agent, notification_type, require_email=True)
     
-    def create_due_soon_notification(self, invoice, days_until_due):
+    def build_due_soon_notification(self, invoice, days_until_due, balance=None):
         """
-        Create a due soon notification for an invoice.
+        Build the due soon notification data for an invoice.
         
         Args:
             invoice (Invoice): The invoice that is due soon
             days_until_due (int): Number of days until due
+            balance (Decimal, optional): Outstanding balance already loaded with the invoice
+            
+        Returns:
+            dict: Candidate notification, or None if the invoice has no agent
         """
         agent = invoice.contract.agent if invoice.contract else None
         if not agent:
             return None
         
-        balance = invoice.get_balance()
+        if balance is None:
+            balance = invoice.get_balance()
         
         if days_until_due <= 3:
             # Urgent - due within 3 days
@@ -843,13 +924,30 @@ class InvoiceDueSoonChecker:
             )
             notification_type = 'invoice_due_soon'
         
+        return {
+            'agent': agent,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'related_object': invoice,
+        }
+    
+    def create_due_soon_notification(self, invoice, days_until_due):
+        """
+        Create a due soon notification for an invoice.
+        
+        Args:
+            invoice (Invoice): The invoice that is due soon
+            days_until_due (int): Number of days until due
+        """
+        candidate = self.build_due_soon_notification(invoice, days_until_due)
+        if candidate is None:
+            return None
+        
         notification, created = create_notification_if_not_exists(
-            agent=agent,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            related_object=invoice,
-            duplicate_threshold_days=1
+            **candidate,
+            duplicate_threshold_days=1,
+            context=self.context
         )
         return notification
     
@@ -897,27 +995,31 @@ class InvoiceDueSoonChecker:
             'total_notifications': 0
         }
         
+        candidates = []
+        
         # Check invoices due within 3 days
         urgent_invoices = self.get_due_soon_invoices(3)
         for invoice in urgent_invoices:
-            if invoice.get_balance() > 0:  # Only notify for unpaid invoices
-                if self.should_notify(invoice, 'invoice_due_urgent'):
-                    days_until_due = self.calculate_days_until_due(invoice)
-                    notification = self.create_due_soon_notification(invoice, days_until_due)
-                    if notification:  # Only count if notification was actually created (not duplicate)
-                        results['urgent_due_soon'] += 1
+            if self.should_notify(invoice, 'invoice_due_urgent'):
+                days_until_due = self.calculate_days_until_due(invoice)
+                candidates.append(self.build_due_soon_notification(invoice, days_until_due, invoice.balance))
         
         # Check invoices due within 7 days (but not within 3 days)
         standard_invoices = self.get_due_soon_invoices(7).exclude(
             due_date__lte=self.today + timedelta(days=3)
         )
         for invoice in standard_invoices:
-            if invoice.get_balance() > 0:  # Only notify for unpaid invoices
-                if self.should_notify(invoice, 'invoice_due_soon'):
-                    days_until_due = self.calculate_days_until_due(invoice)
-                    notification = self.create_due_soon_notification(invoice, days_until_due)
-                    if notification:  # Only count if notification was actually created (not duplicate)
-                        results['standard_due_soon'] += 1
+            if self.should_notify(invoice, 'invoice_due_soon'):
+                days_until_due = self.calculate_days_until_due(invoice)
+                candidates.append(self.build_due_soon_notification(invoice, days_until_due, invoice.balance))
+        
+        # Only count notifications actually created (not duplicates)
+        counters = {
+            'invoice_due_urgent': 'urgent_due_soon',
+            'invoice_due_soon': 'standard_due_soon',
+        }
+        for notification in bulk_create_notifications_if_not_exist(candidates, context=self.context):
+            results[counters[notification.notification_type]] += 1
         
         results['total_notifications'] = (
             results['urgent_due_soon'] + 
@@ -2,6 +2,6 @@ from .models import Notification
 
 def unread_notifications_count(request):
     if request.user.is_authenticated:
-        count = Notification.objects.filter(agent=request.user, is_read=False).count()
+        count = Notification.get_unread_count(request.user)
         return {'unread_notifications_count': count}
     return {'unread_notifications_count': 0}
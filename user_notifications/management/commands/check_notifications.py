@@ -15,6 +15,7 @@ from user_notifications.checkers import (
     RentIncreaseChecker,
     InvoiceDueSoonChecker
 )
+from user_notifications.services import NotificationRunContext
 import logging
 
 logger = logging.getLogger(__name__)
@@ -56,6 +57,9 @@ class Command(BaseCommand):
             'total_notifications': 0
         }
         
+        # Las preferencias de los agentes se cargan una sola vez para todos los chequeos
+        self.context = NotificationRunContext()
+        
         try:
             # Contract expiration notifications
             if not options['type'] or options['type'] == 'contract':
@@ -125,7 +129,7 @@ class Command(BaseCommand):
     def _check_contract_expirations(self, dry_run=False, verbose=False):
         """Check for contract expiration notifications."""
         try:
-            checker = ContractExpirationChecker()
+            checker = ContractExpirationChecker(context=self.context)
             
             if dry_run:
                 # In dry run mode, just count what would be processed
@@ -168,15 +172,12 @@ class Command(BaseCommand):
     def _check_invoice_overdue(self, dry_run=False, verbose=False):
         """Check for overdue invoice notifications."""
         try:
-            checker = InvoiceOverdueChecker()
+            checker = InvoiceOverdueChecker(context=self.context)
             
             if dry_run:
                 # In dry run mode, just count what would be processed
-                overdue_invoices = checker.get_overdue_invoices()
-                count = 0
-                for invoice in overdue_invoices:
-                    if invoice.get_balance() > 0:
-                        count += 1
+                # (the queryset already excludes invoices without balance)
+                count = checker.get_overdue_invoices().count()
                 
                 results = {
                     'total_notifications': count,
@@ -207,7 +208,7 @@ class Command(BaseCommand):
     def _check_rent_increases(self, dry_run=False, verbose=False):
         """Check for rent increase notifications."""
         try:
-            checker = RentIncreaseChecker()
+            checker = RentIncreaseChecker(context=self.context)
             
             if dry_run:
                 # In dry run mode, just count what would be processed
@@ -247,7 +248,7 @@ class Command(BaseCommand):
     def _check_invoice_due_soon(self, dry_run=False, verbose=False):
         """Check for invoice due soon notifications."""
         try:
-            checker = InvoiceDueSoonChecker()
+            checker = InvoiceDueSoonChecker(context=self.context)
             
             if dry_run:
                 # In dry run mode, just count what would be processed
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_notifications', '0004_notificationpreference_receive_contract_expiration_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['agent', 'is_read'], name='user_notifi_agent_i_cb0c17_idx'),
+        ),
+    ]
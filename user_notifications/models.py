@@ -1,13 +1,17 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from core.models import BaseModel
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from datetime import timedelta
+import logging
 
 # Importar el modelo de preferencias de notificaciones
 from .models_preferences import NotificationPreference
 
+logger = logging.getLogger(__name__)
+
 
 class Notification(BaseModel):
     """
@@ -39,18 +43,136 @@ class Notification(BaseModel):
     object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object = GenericForeignKey('content_type', 'object_id')
 
+    # Contador de no leídas por agente, guardado en la caché
+    UNREAD_COUNT_CACHE_KEY = 'user_notifications:unread:{agent_id}'
+    UNREAD_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
     class Meta:
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['agent', 'is_read']),
+        ]
 
     def __str__(self):
         return self.title
 
     def mark_as_read(self):
-        """Mark notification as read"""
+        """Mark notification as read and decrement the cached unread counter"""
+        # El UPDATE condicional evita descontar dos veces la misma notificación
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True)
         self.is_read = True
-        self.save(update_fields=['is_read'])
+        if updated:
+            Notification.adjust_unread_count(self.agent_id, -updated)
+
+    @classmethod
+    def _unread_count_key(cls, agent_id):
+        return cls.UNREAD_COUNT_CACHE_KEY.format(agent_id=agent_id)
+
+    @classmethod
+    def get_unread_count(cls, agent):
+        """
+        Get the number of unread notifications for an agent.
+        
+        The counter lives in the shared cache (``CACHES``, Redis), so every
+        web and Celery process reads and adjusts the same value. It is only
+        computed from the (agent, is_read) index on a cache miss, or when the
+        cache is unavailable.
+        
+        Args:
+            agent: The agent (or agent id)
+            
+        Returns:
+            int: Number of unread notifications
+        """
+        agent_id = getattr(agent, 'pk', agent)
+        key = cls._unread_count_key(agent_id)
+        try:
+            count = cache.get(key)
+        except Exception as e:
+            # Una caché caída no debe romper las páginas que muestran el contador
+            logger.warning(f"No se pudo leer el contador de notificaciones no leídas: {str(e)}")
+            return cls.objects.filter(agent_id=agent_id, is_read=False).count()
+        if count is None:
+            count = cls.objects.filter(agent_id=agent_id, is_read=False).count()
+            cls._update_unread_cache(cache.set, key, count, cls.UNREAD_COUNT_CACHE_TIMEOUT)
+        return count
+
+    @staticmethod
+    def _update_unread_cache(operation, *args):
+        """
+        Run a cache write for the unread counter, logging instead of raising on cache errors.
+        
+        The counter is only an optimization: the data is already committed and
+        the next read (or the periodic reconcile) recomputes it from the DB.
+        """
+        try:
+            return operation(*args)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el contador de notificaciones no leídas: {str(e)}")
+
+    @classmethod
+    def adjust_unread_count(cls, agent_id, delta):
+        """
+        Add ``delta`` to the cached unread counter once the transaction commits.
+        
+        A missing counter is left alone: the next read computes it from the DB.
+        """
+        def apply():
+            key = cls._unread_count_key(agent_id)
+            try:
+                if cache.incr(key, delta) < 0:
+                    cache.delete(key)
+            except ValueError:
+                pass
+
+        transaction.on_commit(lambda: cls._update_unread_cache(apply))
+
+    @classmethod
+    def reset_unread_count(cls, agent_id, count=0):
+        """
+        Store a known unread count for an agent once the transaction commits.
+        """
+        transaction.on_commit(
+            lambda: cls._update_unread_cache(
+                cache.set, cls._unread_count_key(agent_id), count, cls.UNREAD_COUNT_CACHE_TIMEOUT
+            )
+        )
+
+    @classmethod
+    def invalidate_unread_count(cls, agent_id):
+        """
+        Discard the cached unread counter so the next read recomputes it.
+        """
+        transaction.on_commit(lambda: cls._update_unread_cache(cache.delete, cls._unread_count_key(agent_id)))
+
+    @classmethod
+    def reconcile_unread_counts(cls):
+        """
+        Recompute every agent's unread counter from the DB and store it in the cache.
+        
+        Corrects any drift from changes that bypass the counter (bulk updates,
+        cache evictions during a transaction, etc.).
+        
+        Returns:
+            int: Number of agents reconciled
+        """
+        from agents.models import Agent
+        
+        counts = dict(
+            cls.objects.filter(is_read=False)
+            .order_by()
+            .values('agent_id')
+            .annotate(count=models.Count('id'))
+            .values_list('agent_id', 'count')
+        )
+        agent_ids = Agent.objects.values_list('pk', flat=True)
+        cache.set_many(
+            {cls._unread_count_key(agent_id): counts.get(agent_id, 0) for agent_id in agent_ids},
+            cls.UNREAD_COUNT_CACHE_TIMEOUT,
+        )
+        return len(agent_ids)
 
     def get_related_object_url(self):
         """Get URL for the related object if applicable"""
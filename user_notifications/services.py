@@ -4,17 +4,147 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils import timezone
-from datetime import timedelta
-from collections import defaultdict
+from django.db import transaction
+from datetime import date, timedelta
+from collections import Counter, defaultdict
 from .models import Notification, NotificationLog
+from .streams import publish_notifications
 from .models_preferences import NotificationPreference
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_notification(agent, title, message, notification_type, related_object=None):
+# Filas por INSERT en las altas masivas de notificaciones
+BULK_BATCH_SIZE = 500
+
+# Campo de NotificationPreference que habilita cada tipo de notificación.
+# Los tipos que no figuran (p. ej. 'generic') no dependen de ninguna preferencia.
+NOTIFICATION_PREFERENCE_FIELDS = {
+    'invoice_due_soon': 'receive_invoice_due_soon',
+    'invoice_due_urgent': 'receive_invoice_due_soon',
+    'invoice_overdue': 'receive_invoice_overdue',
+    'invoice_overdue_urgent': 'receive_invoice_overdue',
+    'invoice_overdue_critical': 'receive_invoice_overdue',
+    'invoice_payment_received': 'receive_invoice_payment',
+    'invoice_status_change': 'receive_invoice_status_change',
+    'contract_expired': 'receive_contract_expiration',
+    'contract_expiring_urgent': 'receive_contract_expiration',
+    'contract_expiring_soon': 'receive_contract_expiration',
+    'rent_increase_due': 'receive_rent_increase',
+    'rent_increase_overdue': 'receive_rent_increase',
+}
+
+
+def build_preference_table(preferences):
+    """
+    Precompute which notification types an agent's preferences allow.
+
+    Args:
+        preferences: NotificationPreference instance
+
+    Returns:
+        dict: notification_type -> bool for every type in NOTIFICATION_PREFERENCE_FIELDS
+    """
+    return {
+        notification_type: getattr(preferences, field)
+        for notification_type, field in NOTIFICATION_PREFERENCE_FIELDS.items()
+    }
+
+
+class NotificationRunContext:
+    """
+    Shared state for one run of the notification checkers.
+
+    The notification preferences are loaded with a single query the first time
+    they are needed and reused for every row of the run, both to decide whether
+    to notify and whether to send the email. Pass the same context to several
+    checkers to share the load across them.
+    """
+
+    def __init__(self, agents=None):
+        """
+        Args:
+            agents: Agents (or agent ids) to load preferences for (default: all agents)
+        """
+        self.today = timezone.now().date()
+        self._agent_ids = None if agents is None else [_agent_id(agent) for agent in agents]
+        self._preferences = None
+        self._tables = None
+
+    def _load(self):
+        if self._preferences is not None:
+            return
+        preferences = NotificationPreference.objects.all()
+        if self._agent_ids is not None:
+            preferences = preferences.filter(agent_id__in=self._agent_ids)
+        self._preferences = {preference.agent_id: preference for preference in preferences}
+        self._tables = {
+            agent_id: build_preference_table(preference)
+            for agent_id, preference in self._preferences.items()
+        }
+        logger.debug(f"Loaded notification preferences for {len(self._preferences)} agents")
+
+    def get_preferences(self, agent):
+        """
+        Returns:
+            NotificationPreference: The agent's preferences, or None if not configured
+        """
+        self._load()
+        return self._preferences.get(_agent_id(agent))
+
+    def preference_table(self, agent):
+        """
+        Returns:
+            dict: Precomputed notification_type -> bool table, or None if not configured
+        """
+        self._load()
+        return self._tables.get(_agent_id(agent))
+
+    def allows(self, agent, notification_type, require_email=False):
+        """
+        Check whether the agent wants to receive this type of notification.
+
+        Args:
+            agent: The agent (or agent id) to check
+            notification_type: Type of notification to check
+            require_email: Also require email notifications to be enabled
+
+        Returns:
+            bool: True if the notification should be created
+        """
+        if agent is None:
+            return False
+        preferences = self.get_preferences(agent)
+        if preferences is None:
+            # Sin preferencias configuradas se notifica por defecto
+            return True
+        if require_email and not preferences.email_notifications:
+            return False
+        return self.preference_table(agent).get(notification_type, True)
+
+    def sends_email(self, agent, notification_type):
+        """
+        Check whether a notification of this type should also be emailed.
+
+        Returns:
+            bool: False when the agent has no preferences configured
+        """
+        preferences = self.get_preferences(agent)
+        if preferences is None or not preferences.email_notifications:
+            return False
+        return self.preference_table(agent).get(notification_type, False)
+
+
+def _agent_id(agent):
+    return getattr(agent, 'pk', agent)
+
+
+def create_notification(agent, title, message, notification_type, related_object=None, context=None):
     """
     Creates a new notification and sends an email if configured.
+
+    Args:
+        context: NotificationRunContext with the preloaded preferences (optional)
     """
     content_type = None
     object_id = None
@@ -32,31 +162,12 @@ def create_notification(agent, title, message, notification_type, related_object
         object_id=object_id,
     )
     
-    # Verificar si el usuario desea recibir notificaciones por correo electrónico
-    try:
-        preferences = NotificationPreference.objects.get(agent=agent)
-        if preferences.email_notifications:
-            # Verificar el tipo de notificación y las preferencias específicas
-            should_send_email = False
-            
-            if notification_type in ['invoice_due_soon', 'invoice_due_urgent'] and preferences.receive_invoice_due_soon:
-                should_send_email = True
-            elif notification_type in ['invoice_overdue', 'invoice_overdue_urgent', 'invoice_overdue_critical'] and preferences.receive_invoice_overdue:
-                should_send_email = True
-            elif notification_type == 'invoice_payment_received' and preferences.receive_invoice_payment:
-                should_send_email = True
-            elif notification_type == 'invoice_status_change' and preferences.receive_invoice_status_change:
-                should_send_email = True
-            elif notification_type in ['contract_expired', 'contract_expiring_urgent', 'contract_expiring_soon'] and preferences.receive_contract_expiration:
-                should_send_email = True
-            elif notification_type in ['rent_increase_due', 'rent_increase_overdue'] and preferences.receive_rent_increase:
-                should_send_email = True
-            
-            if should_send_email and agent.email:
-                send_notification_email(notification)
-    except NotificationPreference.DoesNotExist:
-        # Si no hay preferencias configuradas, no enviar correo electrónico
-        pass
+    # Verificar si el usuario desea recibir notificaciones por correo electrónico.
+    # Si no hay preferencias configuradas, no enviar correo electrónico
+    if context is None:
+        context = NotificationRunContext(agents=[agent])
+    if context.sends_email(agent, notification_type) and agent.email:
+        send_notification_email(notification)
     
     return notification
 
@@ -140,7 +251,7 @@ def send_notification_email(notification):
         # Don't raise exception to avoid breaking the notification creation process
 
 
-def create_notification_if_not_exists(agent, title, message, notification_type, related_object=None, duplicate_threshold_days=1):
+def create_notification_if_not_exists(agent, title, message, notification_type, related_object=None, duplicate_threshold_days=1, context=None):
     """
     Creates a notification only if a similar one doesn't exist within the threshold period.
     
@@ -151,6 +262,7 @@ def create_notification_if_not_exists(agent, title, message, notification_type,
         notification_type: Type of notification
         related_object: Related object (optional)
         duplicate_threshold_days: Days to check for duplicates (default: 1)
+        context: NotificationRunContext with the preloaded preferences (optional)
         
     Returns:
         tuple: (notification, created) where created is True if notification was created
@@ -172,7 +284,8 @@ def create_notification_if_not_exists(agent, title, message, notification_type,
             title=title,
             message=message,
             notification_type=notification_type,
-            related_object=related_object
+            related_object=related_object,
+            context=context
         )
         
         # Log the notification creation
@@ -190,6 +303,105 @@ def create_notification_if_not_exists(agent, title, message, notification_type,
         return None, False
 
 
+def bulk_create_notifications_if_not_exist(candidates, duplicate_threshold_days=1, context=None):
+    """
+    Batch version of create_notification_if_not_exists.
+    
+    Every NotificationLog key inside the deduplication window is read with a
+    single query into memory, the candidates are filtered against it (and
+    against each other), and the survivors are written with one bulk_create
+    for the notifications and one for the logs.
+    
+    Args:
+        candidates: List of dicts with agent, title, message, notification_type,
+                    related_object (optional) and duplicate_threshold_days (optional)
+        duplicate_threshold_days: Default days to check for duplicates (default: 1)
+        context: NotificationRunContext with the preloaded preferences (optional)
+        
+    Returns:
+        list: The Notification instances created
+    """
+    if not candidates:
+        return []
+    
+    today = timezone.now().date()
+    
+    def log_key(candidate):
+        related_object = candidate.get('related_object')
+        if related_object is None:
+            return None
+        # get_for_model usa la caché de ContentType: no consulta por candidato
+        return (
+            _agent_id(candidate['agent']),
+            candidate['notification_type'],
+            ContentType.objects.get_for_model(related_object).pk,
+            related_object.pk,
+        )
+    
+    keyed = [(candidate, log_key(candidate)) for candidate in candidates]
+    keys = [key for _, key in keyed if key is not None]
+    thresholds = [c.get('duplicate_threshold_days', duplicate_threshold_days) for c in candidates]
+    
+    # Última fecha registrada para cada clave dentro de la ventana más amplia
+    recent = {}
+    if keys:
+        logs = NotificationLog.objects.filter(
+            agent_id__in={key[0] for key in keys},
+            notification_type__in={key[1] for key in keys},
+            object_id__in={key[3] for key in keys},
+            created_date__gte=today - timedelta(days=max(thresholds)),
+        ).values_list('agent_id', 'notification_type', 'content_type_id', 'object_id', 'created_date')
+        for agent_id, notification_type, content_type_id, object_id, created_date in logs.iterator():
+            key = (agent_id, notification_type, content_type_id, object_id)
+            if key not in recent or created_date > recent[key]:
+                recent[key] = created_date
+    
+    notifications = []
+    logs = []
+    seen = set()
+    for (candidate, key), threshold in zip(keyed, thresholds):
+        if key is not None:
+            if key in seen or recent.get(key, date.min) >= today - timedelta(days=threshold):
+                logger.info(f"Duplicate notification prevented for agent {key[0]}, type {key[1]}")
+                continue
+            seen.add(key)
+            logs.append(NotificationLog(
+                agent_id=key[0],
+                notification_type=key[1],
+                content_type_id=key[2],
+                object_id=key[3],
+            ))
+        notifications.append(Notification(
+            agent=candidate['agent'],
+            title=candidate['title'],
+            message=candidate['message'],
+            notification_type=candidate['notification_type'],
+            content_type_id=key[2] if key else None,
+            object_id=key[3] if key else None,
+        ))
+    
+    if not notifications:
+        return []
+    
+    # Las notificaciones y sus logs se guardan juntos: sin el log se volverían a crear
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications, batch_size=BULK_BATCH_SIZE)
+        NotificationLog.objects.bulk_create(logs, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        # bulk_create no dispara post_save: se actualizan los contadores de no leídas
+        for agent_id, count in Counter(n.agent_id for n in notifications).items():
+            Notification.adjust_unread_count(agent_id, count)
+        transaction.on_commit(lambda: publish_notifications(notifications))
+    logger.info(f"Bulk notification creation: {len(notifications)} created, {len(candidates) - len(notifications)} duplicates")
+    
+    if context is None:
+        context = NotificationRunContext(agents={n.agent_id for n in notifications})
+    for notification in notifications:
+        if context.sends_email(notification.agent_id, notification.notification_type) and notification.agent.email:
+            send_notification_email(notification)
+    
+    return notifications
+
+
 def get_notification_preferences(agent):
     """
     Get notification preferences for an agent, creating default preferences if none exist.
@@ -235,6 +447,7 @@ def batch_create_notifications(notification_data_list):
     immediate_count = 0
     batched_count = 0
     skipped_count = 0
+    immediate = []
     
     for data in notification_data_list:
         try:
@@ -249,20 +462,8 @@ def batch_create_notifications(notification_data_list):
             preferences = get_notification_preferences(agent)
             
             if preferences.notification_frequency == 'immediately':
-                # Create notification immediately
-                notification, created = create_notification_if_not_exists(
-                    agent=agent,
-                    title=title,
-                    message=message,
-                    notification_type=notification_type,
-                    related_object=related_object,
-                    duplicate_threshold_days=duplicate_threshold
-                )
-                
-                if created:
-                    immediate_count += 1
-                else:
-                    skipped_count += 1
+                # Las notificaciones inmediatas se crean juntas al final
+                immediate.append(data)
             else:
                 # Create batched notification
                 batch_notification = create_batched_notification(
@@ -283,6 +484,12 @@ def batch_create_notifications(notification_data_list):
             logger.error(f"Error in batch notification creation: {e}")
             skipped_count += 1
     
+    try:
+        immediate_count = len(bulk_create_notifications_if_not_exist(immediate))
+    except Exception as e:
+        logger.error(f"Error in batch notification creation: {e}")
+    skipped_count += len(immediate) - immediate_count
+    
     results = {
         'immediate_notifications': immediate_count,
         'batched_notifications': batched_count,
@@ -555,39 +762,25 @@ def _get_notification_type_display_name(notification_type):
     return type_names.get(notification_type, notification_type.replace('_', ' ').title())
 
 
-def should_send_notification_by_preference(agent, notification_type):
+def should_send_notification_by_preference(agent, notification_type, context=None):
     """
     Check if a notification should be sent based on agent preferences.
     
     Args:
         agent: The agent to check preferences for
         notification_type: Type of notification to check
+        context: NotificationRunContext with the preloaded preferences (optional)
         
     Returns:
         bool: True if notification should be sent
     """
     try:
-        preferences = get_notification_preferences(agent)
-        
-        # Map notification types to preference fields
-        preference_mapping = {
-            'invoice_due_soon': preferences.receive_invoice_due_soon,
-            'invoice_due_urgent': preferences.receive_invoice_due_soon,
-            'invoice_overdue': preferences.receive_invoice_overdue,
-            'invoice_overdue_urgent': preferences.receive_invoice_overdue,
-            'invoice_overdue_critical': preferences.receive_invoice_overdue,
-            'invoice_payment_received': preferences.receive_invoice_payment,
-            'invoice_status_change': preferences.receive_invoice_status_change,
-            'contract_expired': preferences.receive_contract_expiration,
-            'contract_expiring_urgent': preferences.receive_contract_expiration,
-            'contract_expiring_soon': preferences.receive_contract_expiration,
-            'rent_increase_due': preferences.receive_rent_increase,
-            'rent_increase_overdue': preferences.receive_rent_increase,
-            'generic': True,              # Default to True for generic
-        }
+        if context is not None:
+            return context.allows(agent, notification_type)
         
-        return preference_mapping.get(notification_type, True)
+        preferences = get_notification_preferences(agent)
+        return build_preference_table(preferences).get(notification_type, True)
         
     except Exception as e:
         logger.error(f"Error checking notification preferences: {e}")
-        return True  # Default to sending if there's an error
\ No newline at end of file
+        return True  # Default to sending if there's an error
@@ -6,10 +6,13 @@ when certain events occur in the system, such as payment creation.
 """
 
 import logging
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from accounting.models_invoice import Payment
 from .checkers import InvoiceDueSoonChecker
+from .models import Notification
+from .streams import publish_notifications
 
 logger = logging.getLogger(__name__)
 
@@ -42,4 +45,39 @@ def create_payment_received_notification(sender, instance, created, **kwargs):
                 logger.debug(f"No notification created for payment on invoice {instance.invoice.number} (no agent or duplicate)")
                 
         except Exception as e:
-            logger.error(f"Error creating payment received notification for payment {instance.id}: {e}")
\ No newline at end of file
+            logger.error(f"Error creating payment received notification for payment {instance.id}: {e}")
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count_on_save(sender, instance, created, **kwargs):
+    """
+    Keep the cached unread counter of the agent in sync with saved notifications.
+    
+    New unread notifications increment the counter; any other save may have
+    changed ``is_read``, so the counter is discarded and recomputed on the next read.
+    """
+    if created:
+        if not instance.is_read:
+            Notification.adjust_unread_count(instance.agent_id, 1)
+    else:
+        Notification.invalidate_unread_count(instance.agent_id)
+
+
+@receiver(post_save, sender=Notification)
+def publish_new_notification(sender, instance, created, **kwargs):
+    """
+    Publish new notifications to the live stream once the transaction commits.
+    
+    Registered after the counter handler, so the published unread count
+    already includes this notification.
+    """
+    if created:
+        transaction.on_commit(lambda: publish_notifications([instance]))
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_count_on_delete(sender, instance, **kwargs):
+    """
+    Discard the cached unread counter when a notification is deleted.
+    """
+    Notification.invalidate_unread_count(instance.agent_id)
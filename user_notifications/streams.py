@@ -0,0 +1,310 @@
+"""
+Live notification stream over server-sent events.
+
+New notifications are published to a Redis pub/sub channel per agent when
+they are committed. The ASGI application in ``real_estate_management/asgi.py``
+serves ``/notifications/stream/`` with ``NotificationStreamRouter``: each
+connection authenticates once from the session cookie and then waits on an
+in-memory queue, so an idle connection costs a coroutine and no DB queries.
+
+Every worker process holds a single Redis connection, subscribed to the
+pattern of all agent channels, and fans the messages out to the queues of the
+connected agents (``NotificationBroker``). Under WSGI the endpoint is not
+served and the browser falls back to polling ``notification_count``.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _config():
+    config = {
+        'enabled': True,
+        'redis_url': getattr(settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0'),
+        'channel_prefix': 'notifications:agent:',
+        'path': '/notifications/stream/',
+        'keepalive_seconds': 15,
+        'queue_size': 100,
+        'retry_ms': 5000,
+    }
+    config.update(getattr(settings, 'NOTIFICATION_STREAM_CONFIG', {}))
+    return config
+
+
+def agent_channel(agent_id):
+    """
+    Returns:
+        str: Pub/sub channel of an agent
+    """
+    return f"{_config()['channel_prefix']}{agent_id}"
+
+
+def serialize_notification(notification, unread_count=None):
+    """
+    Build the event payload for a notification.
+
+    Args:
+        notification: Notification instance
+        unread_count (int, optional): Agent's unread counter after the notification
+
+    Returns:
+        dict: JSON-serializable payload
+    """
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'unread_count': unread_count,
+    }
+
+
+# --- Publicación (código sincrónico, después del commit) ---
+
+_redis_client = None
+
+
+def _get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(_config()['redis_url'])
+    return _redis_client
+
+
+def publish_notifications(notifications):
+    """
+    Publish new notifications to their agents' channels.
+
+    Failures are logged and never propagate: the notifications are already
+    stored and the browser will pick them up on its next count refresh.
+
+    Args:
+        notifications: Iterable of Notification instances
+    """
+    if not _config()['enabled']:
+        return
+    notifications = [notification for notification in notifications if notification.pk]
+    if not notifications:
+        return
+
+    from .models import Notification
+
+    unread_counts = {}
+    try:
+        pipeline = _get_redis_client().pipeline(transaction=False)
+        for notification in notifications:
+            if notification.agent_id not in unread_counts:
+                unread_counts[notification.agent_id] = Notification.get_unread_count(notification.agent_id)
+            payload = serialize_notification(notification, unread_counts[notification.agent_id])
+            pipeline.publish(agent_channel(notification.agent_id), json.dumps(payload))
+        pipeline.execute()
+    except Exception as e:
+        logger.warning(f"Could not publish {len(notifications)} notifications to the live stream: {e}")
+
+
+# --- Suscripción (código asíncrono, en el proceso ASGI) ---
+
+class NotificationBroker:
+    """
+    Fans out the messages of one pattern subscription to the connected agents.
+
+    Each open stream registers an asyncio.Queue for its agent. The Redis
+    listener is started on the first subscription and reconnects on errors.
+    """
+
+    RECONNECT_DELAY = 5  # seconds
+
+    def __init__(self):
+        self._queues = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, agent_id):
+        """
+        Register a new connection of ``agent_id``.
+
+        Returns:
+            asyncio.Queue: Queue receiving the agent's event payloads (JSON strings)
+        """
+        queue = asyncio.Queue(maxsize=_config()['queue_size'])
+        self._queues[agent_id].add(queue)
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, agent_id, queue):
+        """
+        Remove a closed connection of ``agent_id``.
+        """
+        queues = self._queues.get(agent_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[agent_id]
+
+    def dispatch(self, agent_id, data):
+        """
+        Deliver a payload to every open connection of ``agent_id``.
+
+        Slow connections whose queue is full lose the event; the unread
+        counter in the next event (or a page refresh) corrects them.
+        """
+        for queue in self._queues.get(agent_id, ()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                logger.debug(f"Notification stream queue full for agent {agent_id}")
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        config = _config()
+        prefix = config['channel_prefix']
+        while True:
+            client = aioredis.Redis.from_url(config['redis_url'])
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{prefix}*")
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    channel = message['channel'].decode()
+                    try:
+                        agent_id = int(channel[len(prefix):])
+                    except ValueError:
+                        continue
+                    self.dispatch(agent_id, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification stream listener error, reconnecting: {e}")
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+
+broker = NotificationBroker()
+
+
+@sync_to_async
+def get_agent_id(scope):
+    """
+    Resolve the logged-in agent from the session cookie of an ASGI scope.
+
+    Returns:
+        int: Agent id, or None if the session is not authenticated
+    """
+    from django.contrib.auth import get_user
+    from django.http import HttpRequest
+
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    if session_cookie is None:
+        return None
+
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_cookie.value)
+        # get_user valida el hash de sesión igual que AuthenticationMiddleware
+        user = get_user(request)
+        return user.pk if user.is_authenticated and user.is_active else None
+    finally:
+        close_old_connections()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def notification_stream(scope, receive, send):
+    """
+    ASGI application streaming the agent's new notifications as server-sent events.
+    """
+    config = _config()
+    agent_id = await get_agent_id(scope)
+    if agent_id is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 403,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Forbidden'})
+        return
+
+    queue = broker.subscribe(agent_id)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f"retry: {config['retry_ms']}\n\n".encode(),
+            'more_body': True,
+        })
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnect},
+                timeout=config['keepalive_seconds'],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                next_event.cancel()
+                break
+            if next_event in done:
+                body = f"event: notification\ndata: {next_event.result()}\n\n"
+            else:
+                next_event.cancel()
+                # Comentario SSE para mantener viva la conexión a través de proxies
+                body = ": keepalive\n\n"
+            await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(agent_id, queue)
+
+
+class NotificationStreamRouter:
+    """
+    ASGI router sending the stream path to ``notification_stream`` and
+    everything else to the Django application.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+        self.path = _config()['path']
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == self.path and _config()['enabled']:
+            await notification_stream(scope, receive, send)
+        else:
+            await self.django_application(scope, receive, send)
@@ -163,4 +163,27 @@ def process_notification_batches(self):
         raise self.retry(countdown=60 * (2 ** self.request.retries))
     except Exception as e:
         logger.error(f"Unexpected error in notification batch processing: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task(bind=True, max_retries=3)
+def reconcile_unread_notification_counts(self):
+    """
+    Recompute the cached unread notification counters from the database.
+    
+    The counters are kept up to date incrementally when notifications are
+    created or read; this periodic pass corrects any drift.
+    
+    Returns:
+        dict: Number of agents reconciled
+    """
+    try:
+        from .models import Notification
+        
+        agents = Notification.reconcile_unread_counts()
+        logger.info(f"Unread notification counters reconciled for {agents} agents")
+        return {'success': True, 'agents_reconciled': agents}
+        
+    except DatabaseError as e:
+        logger.error(f"Database error reconciling unread notification counters: {e}")
+        raise self.retry(countdown=60 * (2 ** self.request.retries))
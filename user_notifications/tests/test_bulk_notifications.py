@@ -0,0 +1,178 @@
+"""
+Unit tests for bulk notification deduplication and creation.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+
+from accounting.models_invoice import Invoice
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+from user_notifications.checkers import InvoiceOverdueChecker
+from user_notifications.models import Notification, NotificationLog
+from user_notifications.services import (
+    NotificationRunContext,
+    batch_create_notifications,
+    bulk_create_notifications_if_not_exist,
+)
+
+
+class BulkNotificationTest(TestCase):
+    """
+    Test suite for bulk_create_notifications_if_not_exist.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        self.agent = Agent.objects.create(
+            username='bulkagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-BULK'
+        )
+        self.customers = [
+            Customer.objects.create(
+                first_name='Cliente', last_name=str(number), email=f'c{number}@test.com',
+                phone='123456789', document=f'3011122{number}'
+            )
+            for number in range(3)
+        ]
+
+    def _candidate(self, related_object, notification_type='invoice_overdue', **extra):
+        return {
+            'agent': self.agent,
+            'title': 'Aviso',
+            'message': 'Mensaje',
+            'notification_type': notification_type,
+            'related_object': related_object,
+            **extra,
+        }
+
+    def test_deduplicates_against_logs_and_batch(self):
+        """Existing logs and repeated candidates are skipped; survivors are written in bulk."""
+        NotificationLog.log_notification(self.agent, 'invoice_overdue', self.customers[0])
+        candidates = [
+            self._candidate(self.customers[0]),
+            self._candidate(self.customers[1]),
+            self._candidate(self.customers[1]),
+            self._candidate(self.customers[2], notification_type='invoice_due_soon'),
+            self._candidate(None, notification_type='generic'),
+        ]
+        context = NotificationRunContext()
+        context.get_preferences(self.agent)
+
+        # Lectura de los logs y, dentro de un savepoint, un INSERT para notificaciones y otro para logs
+        with self.assertNumQueries(5):
+            created = bulk_create_notifications_if_not_exist(candidates, context=context)
+
+        self.assertEqual(
+            [(n.notification_type, n.object_id) for n in created],
+            [('invoice_overdue', self.customers[1].pk), ('invoice_due_soon', self.customers[2].pk), ('generic', None)]
+        )
+        self.assertTrue(all(n.pk for n in created))
+        self.assertEqual(NotificationLog.objects.count(), 3)
+        self.assertEqual(bulk_create_notifications_if_not_exist(candidates[:4], context=context), [])
+
+    def test_log_failure_rolls_back_notifications(self):
+        """Notifications are not kept without their deduplication logs."""
+        with patch.object(NotificationLog.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                bulk_create_notifications_if_not_exist([self._candidate(self.customers[0])])
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_threshold_window(self):
+        """Logs older than the candidate's threshold do not block a new notification."""
+        NotificationLog.log_notification(self.agent, 'invoice_overdue', self.customers[0])
+        NotificationLog.objects.update(created_date=timezone.now().date() - timedelta(days=3))
+
+        created = bulk_create_notifications_if_not_exist([
+            self._candidate(self.customers[0], duplicate_threshold_days=5),
+        ])
+        self.assertEqual(created, [])
+
+        created = bulk_create_notifications_if_not_exist([self._candidate(self.customers[0])])
+        self.assertEqual(len(created), 1)
+
+    def test_batch_create_notifications_counts(self):
+        """Immediate notifications go through the bulk path and duplicates are reported as skipped."""
+        results = batch_create_notifications([
+            self._candidate(self.customers[0]),
+            self._candidate(self.customers[0]),
+        ])
+
+        self.assertEqual(results['immediate_notifications'], 1)
+        self.assertEqual(results['skipped_notifications'], 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def _overdue_invoices(self, *days_overdue):
+        owner = self.customers[0]
+        contract = Contract.objects.create(
+            customer=owner,
+            agent=self.agent,
+            property=Property.objects.create(
+                title='Departamento Centro',
+                description='Departamento en el centro',
+                property_type=PropertyType.objects.create(name='Departamento'),
+                property_status=PropertyStatus.objects.create(name='Alquilada'),
+                street='Av. Principal',
+                number='123',
+                neighborhood='Centro',
+                total_surface=Decimal('80.00'),
+                agent=self.agent,
+                owner=owner
+            ),
+            start_date=timezone.now().date() - timedelta(days=365),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+        today = timezone.now().date()
+        return [
+            Invoice.objects.create(
+                number=f'INV-00{number}',
+                date=today - timedelta(days=days + 10),
+                due_date=today - timedelta(days=days),
+                customer=owner,
+                contract=contract,
+                description='Alquiler',
+                total_amount=Decimal('1000.00'),
+                status='sent'
+            )
+            for number, days in enumerate(days_overdue)
+        ]
+
+    def test_overdue_checker_run(self):
+        """The overdue checker writes one notification per invoice and none on a second run."""
+        self._overdue_invoices(2, 10, 40)
+
+        results = InvoiceOverdueChecker().check_and_notify()
+
+        self.assertEqual(
+            (results['standard_overdue'], results['urgent_overdue'], results['critical_overdue']),
+            (1, 1, 1)
+        )
+        self.assertEqual(InvoiceOverdueChecker().check_and_notify()['total_notifications'], 0)
+        self.assertEqual(Notification.objects.filter(notification_type__startswith='invoice_overdue').count(), 3)
+
+    def test_overdue_balance_filtered_in_query(self):
+        """Invoices without balance are excluded in SQL and the loaded balance is used in the message."""
+        partial, settled = self._overdue_invoices(2, 3)
+        # Se ajusta la columna almacenada sin pasar por las señales de pago
+        Invoice.objects.filter(pk=partial.pk).update(paid_amount=Decimal('250.00'), balance=Decimal('750.00'))
+        Invoice.objects.filter(pk=settled.pk).update(paid_amount=Decimal('1000.00'), balance=Decimal('0.00'))
+
+        with self.assertNumQueries(1):
+            invoices = list(InvoiceOverdueChecker().get_overdue_invoices())
+        self.assertEqual(invoices, [partial])
+
+        InvoiceOverdueChecker().check_and_notify()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.object_id, partial.pk)
+        self.assertIn('Saldo pendiente: $750.00', notification.message)
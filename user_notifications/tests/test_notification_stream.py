@@ -0,0 +1,97 @@
+"""
+Unit tests for the live notification stream (server-sent events).
+"""
+
+import json
+from unittest.mock import patch
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from agents.models import Agent
+from user_notifications import streams
+from user_notifications.models import Notification
+from user_notifications.streams import NotificationStreamRouter, broker, publish_notifications
+
+
+async def django_application(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class NotificationStreamTest(TestCase):
+    """
+    Test suite for the SSE endpoint and the pub/sub fan-out.
+    """
+
+    def setUp(self):
+        self.agent = Agent.objects.create(
+            username='streamagent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-STREAM'
+        )
+        self.client.force_login(self.agent)
+        self.session_cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        # El listener de Redis no se inicia: los eventos se entregan con broker.dispatch
+        patcher = patch.object(broker, '_ensure_listener')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _communicator(self, path='/notifications/stream/', cookie=None):
+        headers = [(b'cookie', cookie.encode())] if cookie else []
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': headers}
+        return ApplicationCommunicator(NotificationStreamRouter(django_application), scope)
+
+    async def test_anonymous_connection_is_rejected(self):
+        """Connections without an authenticated session get a 403."""
+        communicator = self._communicator()
+        await communicator.send_input({'type': 'http.request'})
+
+        response = await communicator.receive_output(1)
+
+        self.assertEqual(response['status'], 403)
+
+    async def test_other_paths_reach_django(self):
+        """Requests outside the stream path go to the Django application."""
+        communicator = self._communicator(path='/notifications/count/', cookie=self.session_cookie)
+        await communicator.send_input({'type': 'http.request'})
+
+        response = await communicator.receive_output(1)
+
+        self.assertEqual(response['status'], 204)
+
+    async def test_streams_agent_events_until_disconnect(self):
+        """Published events reach the agent's open stream, which unsubscribes on disconnect."""
+        communicator = self._communicator(cookie=self.session_cookie)
+        await communicator.send_input({'type': 'http.request'})
+
+        start = await communicator.receive_output(1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertTrue((await communicator.receive_output(1))['body'].startswith(b'retry:'))
+
+        payload = json.dumps({'id': 1, 'title': 'Factura vencida', 'unread_count': 3})
+        broker.dispatch(self.agent.pk + 1, json.dumps({'id': 2}))
+        broker.dispatch(self.agent.pk, payload)
+        event = await communicator.receive_output(1)
+
+        self.assertEqual(event['body'].decode(), f"event: notification\ndata: {payload}\n\n")
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+        self.assertNotIn(self.agent.pk, broker._queues)
+
+    def test_publish_failure_does_not_propagate(self):
+        """An unreachable Redis only logs a warning: the notification is already stored."""
+        config = {'redis_url': 'redis://127.0.0.1:1/0'}
+        streams._redis_client = None
+        self.addCleanup(setattr, streams, '_redis_client', None)
+        notification = Notification.objects.create(
+            agent=self.agent, title='Aviso', message='Mensaje', notification_type='generic'
+        )
+
+        with override_settings(NOTIFICATION_STREAM_CONFIG=config):
+            publish_notifications([notification])
+
+        payload = streams.serialize_notification(notification, unread_count=1)
+        self.assertEqual((payload['id'], payload['unread_count']), (notification.pk, 1))
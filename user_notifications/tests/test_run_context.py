@@ -0,0 +1,124 @@
+"""
+Unit tests for the shared notification run context.
+
+These tests cover the preference preloading used by the notification
+checkers and by notification creation.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from agents.models import Agent
+from contracts.models import Contract
+from customers.models import Customer
+from properties.models import Property, PropertyStatus, PropertyType
+from user_notifications.checkers import ContractExpirationChecker, InvoiceOverdueChecker
+from user_notifications.models import Notification
+from user_notifications.models_preferences import NotificationPreference
+from user_notifications.services import (
+    NotificationRunContext,
+    create_notification,
+    should_send_notification_by_preference,
+)
+
+
+class NotificationRunContextTest(TestCase):
+    """
+    Test suite for NotificationRunContext.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        self.customer = Customer.objects.create(
+            first_name='John', last_name='Doe', email='tenant@test.com',
+            phone='987654321', document='30111222'
+        )
+        self.property_type = PropertyType.objects.create(name='Departamento')
+        self.property_status = PropertyStatus.objects.create(name='Alquilada')
+        self.muted = self._agent('muted', receive_contract_expiration=False)
+        self.emailed = self._agent('emailed', email_notifications=True)
+        # Agente sin preferencias configuradas
+        self.default = self._agent('default', preferences=False)
+
+    def _agent(self, username, preferences=True, **fields):
+        agent = Agent.objects.create(
+            username=username, email=f'{username}@test.com', first_name='Test',
+            last_name='Agent', license_number=f'LIC-{username.upper()}'
+        )
+        if preferences:
+            NotificationPreference.objects.create(agent=agent, **fields)
+        return agent
+
+    def _contract(self, agent):
+        property_obj = Property.objects.create(
+            title=f'Propiedad {agent.username}',
+            description='Departamento en el centro',
+            property_type=self.property_type,
+            property_status=self.property_status,
+            street='Av. Principal',
+            number='123',
+            neighborhood='Centro',
+            total_surface=Decimal('80.00'),
+            agent=agent,
+            owner=self.customer
+        )
+        return Contract.objects.create(
+            customer=self.customer,
+            agent=agent,
+            property=property_obj,
+            start_date=date(2024, 1, 1),
+            end_date=timezone.now().date() + timedelta(days=5),
+            amount=Decimal('1000.00'),
+            status=Contract.STATUS_ACTIVE
+        )
+
+    def test_preferences_loaded_once_per_run(self):
+        """Checkers sharing a context read every agent's preferences with a single query."""
+        contracts = [self._contract(agent) for agent in (self.muted, self.emailed, self.default)]
+        context = NotificationRunContext()
+        contract_checker = ContractExpirationChecker(context=context)
+        overdue_checker = InvoiceOverdueChecker(context=context)
+
+        with self.assertNumQueries(1):
+            decisions = [contract_checker.should_notify(c, 'contract_expiring_urgent') for c in contracts]
+            decisions.append(context.allows(self.muted, 'invoice_overdue', require_email=True))
+            decisions.append(context.allows(self.emailed, 'invoice_overdue', require_email=True))
+
+        self.assertEqual(decisions, [False, True, True, False, True])
+        self.assertIs(overdue_checker.context, contract_checker.context)
+
+    def test_preference_table(self):
+        """The per-type table is precomputed and unknown types are allowed."""
+        context = NotificationRunContext(agents=[self.muted])
+
+        table = context.preference_table(self.muted)
+
+        self.assertFalse(table['contract_expired'])
+        self.assertTrue(table['invoice_due_soon'])
+        self.assertNotIn('generic', table)
+        self.assertTrue(context.allows(self.muted, 'generic'))
+        # Solo se cargan las preferencias de los agentes indicados
+        self.assertIsNone(context.get_preferences(self.emailed))
+        self.assertFalse(should_send_notification_by_preference(self.muted, 'contract_expired', context=context))
+        self.assertTrue(should_send_notification_by_preference(self.emailed, 'contract_expired'))
+
+    def test_create_notification_reuses_context(self):
+        """Notifications use the preloaded preferences to decide whether to send the email."""
+        context = NotificationRunContext()
+        context.get_preferences(self.emailed)
+
+        with self.assertNumQueries(1):
+            create_notification(self.default, 'Aviso', 'Mensaje', 'invoice_overdue', context=context)
+        create_notification(self.emailed, 'Aviso', 'Mensaje', 'generic', context=context)
+        self.assertEqual(len(mail.outbox), 0)
+
+        create_notification(self.emailed, 'Factura vencida', 'Mensaje', 'invoice_overdue', context=context)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['emailed@test.com'])
+        self.assertEqual(Notification.objects.count(), 3)
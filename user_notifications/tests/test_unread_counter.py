@@ -0,0 +1,128 @@
+"""
+Unit tests for the cached unread notification counter.
+"""
+
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from agents.models import Agent
+from user_notifications.models import Notification
+from user_notifications.services import bulk_create_notifications_if_not_exist, create_notification
+from user_notifications.tasks import reconcile_unread_notification_counts
+
+# Los contadores no deben leer ni escribir el Redis compartido durante los tests
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'unread-counter-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UnreadCounterTest(TestCase):
+    """
+    Test suite for the per-agent unread counter kept in the cache.
+    """
+
+    def setUp(self):
+        ContentType.objects.clear_cache()
+        # La caché no se revierte con la transacción del test
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.agent = Agent.objects.create(
+            username='counteragent', email='agent@test.com', first_name='Test',
+            last_name='Agent', license_number='LIC-COUNTER'
+        )
+
+    def _notify(self, title='Aviso'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification(self.agent, title, 'Mensaje', 'generic')
+
+    def test_counter_follows_create_and_read(self):
+        """The counter is computed once and then adjusted on create and mark_as_read."""
+        first = self._notify()
+        self.assertEqual(Notification.get_unread_count(self.agent), 1)
+
+        second = self._notify()
+        with self.assertNumQueries(0):
+            self.assertEqual(Notification.get_unread_count(self.agent), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+            # Marcarla otra vez no vuelve a descontar
+            Notification.objects.get(pk=first.pk).mark_as_read()
+
+        self.assertEqual(Notification.get_unread_count(self.agent), 1)
+        second.refresh_from_db()
+        self.assertFalse(second.is_read)
+
+    def test_bulk_create_increments_counter(self):
+        """Notifications written with bulk_create also update the counter."""
+        self.assertEqual(Notification.get_unread_count(self.agent), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_create_notifications_if_not_exist([
+                {'agent': self.agent, 'title': 'A', 'message': 'M', 'notification_type': 'generic'},
+                {'agent': self.agent, 'title': 'B', 'message': 'M', 'notification_type': 'generic'},
+            ])
+
+        self.assertEqual(Notification.get_unread_count(self.agent), 2)
+
+    def test_views_use_cached_counter(self):
+        """The count endpoint reads the counter and mark-all resets it."""
+        self._notify()
+        self._notify()
+        self.client.force_login(self.agent)
+
+        response = self.client.get(reverse('user_notifications:notification_count'))
+        self.assertEqual(response.json()['unread_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('user_notifications:mark_all_notifications_read'))
+
+        self.assertEqual(cache.get(Notification._unread_count_key(self.agent.pk)), 0)
+        response = self.client.get(reverse('user_notifications:notification_count'))
+        self.assertEqual(response.json()['unread_count'], 0)
+
+    def test_reconcile_corrects_drift(self):
+        """The periodic task rewrites the counters from the database."""
+        self._notify()
+        cache.set(Notification._unread_count_key(self.agent.pk), 7)
+
+        result = reconcile_unread_notification_counts.apply().get()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(Notification.get_unread_count(self.agent), 1)
+
+    def test_counter_shared_between_cache_connections(self):
+        """Another process, with its own cache connection, sees the same counter."""
+        first = self._notify()
+        self.assertEqual(Notification.get_unread_count(self.agent), 1)
+        # Conexión independiente, como la de un worker de Celery
+        other_process_cache = caches.create_connection('default')
+        key = Notification._unread_count_key(self.agent.pk)
+
+        self.assertEqual(other_process_cache.get(key), 1)
+        other_process_cache.incr(key)
+        self.assertEqual(Notification.get_unread_count(self.agent), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+        self.assertEqual(other_process_cache.get(key), 1)
+
+    def test_cache_outage_falls_back_to_database(self):
+        """With the cache down, pages still get the DB count and writes do not fail."""
+        with mock.patch.object(cache, 'get', side_effect=ConnectionError), \
+                mock.patch.object(cache, 'incr', side_effect=ConnectionError):
+            self._notify()
+            self.assertEqual(Notification.get_unread_count(self.agent), 1)
+
+            self.client.force_login(self.agent)
+            response = self.client.get(reverse('user_notifications:notification_count'))
+
+        self.assertEqual(response.json()['unread_count'], 1)
@@ -131,7 +131,7 @@ def mark_notification_read(request, pk):
         notification.mark_as_read()
         
         # Get updated unread count
-        unread_count = Notification.objects.filter(agent=request.user, is_read=False).count()
+        unread_count = Notification.get_unread_count(request.user)
         
         return JsonResponse({
             'success': True,
@@ -155,6 +155,7 @@ def mark_all_notifications_read(request):
             agent=request.user,
             is_read=False
         ).update(is_read=True)
+        Notification.reset_unread_count(request.user.pk)
         
         return JsonResponse({
             'success': True,
@@ -170,19 +171,12 @@ def notification_count(request):
     """AJAX endpoint to get current notification count"""
     
     try:
-        unread_count = Notification.objects.filter(
-            agent=request.user,
-            is_read=False
-        ).count()
-        
-        total_count = Notification.objects.filter(
-            agent=request.user
-        ).count()
+        # El contador sale de la caché; este endpoint se consulta desde cada pestaña abierta
+        unread_count = Notification.get_unread_count(request.user)
         
         return JsonResponse({
             'success': True,
             'unread_count': unread_count,
-            'total_count': total_count
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)